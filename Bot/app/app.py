@@ -1,6 +1,6 @@
 from telebot.async_telebot import AsyncTeleBot
 from telebot.util import smart_split
-from bot_message_broker import BotMessageBroker
+from async_bot_message_broker import AsyncBotMessageBroker
 from users_manager import UserManager
 from utils import get_message_id
 from currencies_to_str import set_currencies_to_str, CURRENCIES2STR_SHORT, CURRENCIES2STR_LONG, CURRENCIES2STR_FULL
@@ -22,7 +22,7 @@ del args
 
 # Initializing logging, message broker, and user manager
 bot_docker_logger = BotLogger()
-bot_message_broker = BotMessageBroker()
+bot_message_broker = AsyncBotMessageBroker(bot_docker_logger=bot_docker_logger)
 message_processor = UserManager(bot, bot_message_broker)
 
 async def try_except_send_message(username, message_id, *message_args, **message_kwargs):
@@ -233,14 +233,27 @@ async def notify(bot, message):
 
     Args:
         bot (AsyncTeleBot): The Telegram bot instance.
-        message (dict): Notification message details.
+        message (list|dict): Notification messages of all users with a met condition, or a single notification.
     """
+    if isinstance(message, list) is True:
+        for user_message in message:
+            await notify(bot, user_message)
+        return
+
     message_id = get_message_id()
 
     bot_docker_logger.log(message["user"][1], message, 'auto', message_id=message_id)
 
-    notify_message =    f'{message["user"][1]}, {message["pair1_name"]} has become {"greater" if message["condition_flag"] is True else "less"} than ' \
-                        f'{message["check_value"]} {message["pair2_name"]} and is now {message["now_pair_value"]} {message["pair2_name"]}'
+    direction = {True: "up", False: "down", None: "in any direction"}[message["condition_flag"]]
+    if message.get("kind") == 'percent_move':
+        notify_message =    f'{message["user"][1]}, {message["pair1_name"]}/{message["pair2_name"]} has moved {direction} by {message["check_value"]}% ' \
+                            f'within {message["window"]} seconds and is now {message["now_pair_value"]} {message["pair2_name"]}'
+    elif message.get("kind") == 'ma_cross':
+        notify_message =    f'{message["user"][1]}, {message["pair1_name"]}/{message["pair2_name"]} has crossed {direction} its moving average ' \
+                            f'over {message["window"]} seconds and is now {message["now_pair_value"]} {message["pair2_name"]}'
+    else:
+        notify_message =    f'{message["user"][1]}, {message["pair1_name"]} has become {"greater" if message["condition_flag"] is True else "less"} than ' \
+                            f'{message["check_value"]} {message["pair2_name"]} and is now {message["now_pair_value"]} {message["pair2_name"]}'
 
     await log_and_try_send_message(message["user"][1], message_id, message["user"][0], notify_message)
 
@@ -266,17 +279,23 @@ class OnUpdateCurrencies():
         self.req_time = 0.0
         self.update_interval = update_interval
     
-    async def __call__(self, bot: AsyncTeleBot, currencies):
+    async def __call__(self, bot: AsyncTeleBot, snapshot_delta):
         """
         Updates currency rates and logs the updates.
 
         Args:
             bot (AsyncTeleBot): The Telegram bot instance.
-            currencies (list): List of updated currencies.
+            snapshot_delta (dict): Versioned delta of currencies from the parser, merged from all updates waiting in the queue.
         """
         message_id = get_message_id()
 
-        message_processor.on_update_currencies(currencies)
+        if "timestamp" in snapshot_delta:
+            bot_docker_logger.log_info(
+                f'Currencies update {snapshot_delta["version"]} is {time() - snapshot_delta["timestamp"]:.2f} s old, ' \
+                f'{snapshot_delta.get("update_count", 1)} updates were merged into it.'
+            )
+
+        currencies = message_processor.on_update_currencies(snapshot_delta)
         if time() > self.req_time + self.update_interval:
             short_currencies_str = set_currencies_to_str(currencies, mode=CURRENCIES2STR_SHORT)
             long_currencies_str = set_currencies_to_str(currencies, CURRENCIES2STR_LONG)
@@ -291,23 +310,16 @@ class OnUpdateCurrencies():
 
 on_update_currencies = OnUpdateCurrencies()
 
-async def check_messages():
-    """
-    Continuously checks for new messages from the message broker.
-    """
-    while True:
-        await bot_message_broker.read_message_from_parser2bot_queue(notify, bot)
-        await bot_message_broker.read_message_from_parser_info_queue(on_update_currencies, bot)
-        await asyncio.sleep(1)
-
-
 async def main():
     """
-    Main entry point for running the bot and checking messages concurrently.
+    Main entry point for running the bot and consuming messages of the parser concurrently.
     """
+    await bot_message_broker.start()
+
     L = await asyncio.gather(
         bot.polling(),
-        check_messages(),
+        bot_message_broker.consume_parser2bot_queue(notify, bot),
+        bot_message_broker.consume_parser_info_queue(on_update_currencies, bot),
     )
     bot_docker_logger.exit_message()
 
@@ -1,9 +1,13 @@
+from time import time
+from wire_format import decode_message, encode_message
+
 import pika
-import json
+import secrets
 
 class BotMessageBroker():
     """
     A class to manage message brokering between bot and parser using RabbitMQ.
+    Every call blocks the event loop until the broker answers, the bot uses AsyncBotMessageBroker.
 
     Attributes:
         connection (pika.BlockingConnection): The connection to the RabbitMQ server.
@@ -11,15 +15,20 @@ class BotMessageBroker():
         mq (dict): A dictionary to hold any additional message queue configurations.
     """
 
-    def __init__(self):
+    def __init__(self, connection=None):
         """
         Initializes the BotMessageBroker, setting up the RabbitMQ connection and declaring necessary queues.
+
+        Args:
+            connection (pika.BlockingConnection, optional): An open RabbitMQ connection. Defaults to a new connection to 'rabbit-1'.
         """
-        connection_params = pika.ConnectionParameters(
-            host='rabbit-1'
-        )
+        if connection is None:
+            connection_params = pika.ConnectionParameters(
+                host='rabbit-1'
+            )
+            connection = pika.BlockingConnection(connection_params)
 
-        self.connection = pika.BlockingConnection(connection_params)
+        self.connection = connection
 
         self.channel = self.connection.channel()
 
@@ -29,7 +38,7 @@ class BotMessageBroker():
 
         self.mq = {}
     
-    def send_message2bot2parser_queue(self, user, pair1_name, pair2_name, check_value, condition_flag):
+    def send_message2bot2parser_queue(self, user, pair1_name, pair2_name, check_value, condition_flag, condition_options=None):
         """
         Sends a message to the 'bot2parser_queue'.
 
@@ -37,27 +46,41 @@ class BotMessageBroker():
             user (str): The username of the user.
             pair1_name (str): The name of the first currency pair.
             pair2_name (str): The name of the second currency pair.
-            check_value (float): The value to check against.
+            check_value (float): The value to check against, or the percent of a "percent_move" condition.
             condition_flag (bool): The condition flag indicating whether to check if the value is greater or less.
+            condition_options (dict, optional): Options of a windowed condition: "kind" ("percent_move" or "ma_cross")
+                                                and "window" (window length in seconds). Defaults to None.
+
+        Returns:
+            str: Id of the condition, the parser skips a redelivered message with the same id.
         """
+        condition_options = dict(condition_options) if condition_options is not None else {}
+        condition_options["id"] = secrets.token_hex(8)
+        message = [user, pair1_name, pair2_name, check_value, condition_flag, condition_options]
+        body, content_type = encode_message(message, 'json')
+
         self.channel.basic_publish(
             exchange='',
             routing_key='bot2parser_queue',
-            body=json.dumps([user, pair1_name, pair2_name, check_value, condition_flag])
+            body=body,
+            # The parser reports how long new conditions wait in the queue
+            properties=pika.BasicProperties(content_type=content_type, headers={"sent_at": time()})
         )
+        return condition_options["id"]
 
-    async def ack_channel(self, method_frame, body, callback, *callback_args):
+    async def ack_channel(self, method_frame, header_frame, body, callback, *callback_args):
         """
         Acknowledges a message and calls the provided callback with the message data.
 
         Args:
             method_frame (pika.frame.Method): The method frame containing the delivery tag.
+            header_frame (pika.BasicProperties): Properties of the message with its content type.
             body (str): The body of the message.
             callback (function): The callback function to process the message.
             *callback_args: Additional arguments to pass to the callback.
         """
         if method_frame:
-            message = json.loads(body)
+            message = decode_message(body, getattr(header_frame, 'content_type', None))
 
             self.channel.basic_ack(method_frame.delivery_tag)
 
@@ -71,8 +94,8 @@ class BotMessageBroker():
             callback (function): The callback function to process the message.
             bot (AsyncTeleBot): The bot instance to pass to the callback.
         """
-        method_frame, _, body = self.channel.basic_get('parser2bot_queue')
-        await self.ack_channel(method_frame, body, callback, bot)
+        method_frame, header_frame, body = self.channel.basic_get('parser2bot_queue')
+        await self.ack_channel(method_frame, header_frame, body, callback, bot)
     
     async def read_message_from_parser_info_queue(self, callback, bot):
         """
@@ -83,5 +106,5 @@ class BotMessageBroker():
             bot (AsyncTeleBot): The bot instance to pass to the callback.
         """
         method_frame, header_frame, body = self.channel.basic_get('parser_info_queue')
-        await self.ack_channel(method_frame, body, callback, bot)
+        await self.ack_channel(method_frame, header_frame, body, callback, bot)
 
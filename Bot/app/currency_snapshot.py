@@ -0,0 +1,120 @@
+import numpy as np
+
+class CurrencySnapshot():
+    """
+    A currencies snapshot with vectorized cross rates.
+
+    Prices are kept in one NumPy vector with a name-to-index map. A row of
+    cross rates (one currency against all others) is computed with a single
+    vectorized division the first time it is needed, the full matrix with a
+    single outer division.
+
+    Attributes:
+        currency_names (list): Names of currencies in the order of the price vector.
+        currency_ids (dict): Currency names and their indexes in the price vector.
+        prices (np.ndarray): Float64 vector of currency values.
+        min_denominator (float): Values at or below it can`t be used as the second currency of a pair.
+    """
+
+    def __init__(self, currencies, min_denominator=1e-18) -> None:
+        """
+        Initializes the CurrencySnapshot.
+
+        Args:
+            currencies (dict): A dictionary with currency names as keys and their values as values.
+            min_denominator (float, optional): Values at or below it can`t be used as the second currency of a pair. Defaults to 1e-18.
+        """
+        self.currency_names = list(currencies.keys())
+        self.currency_ids = {currency_name: currency_id for currency_id, currency_name in enumerate(self.currency_names)}
+        self.prices = np.fromiter(currencies.values(), dtype=np.float64, count=len(self.currency_names))
+        self.min_denominator = min_denominator
+        self.is_denominator = self.prices > self.min_denominator
+
+        self.rows = {}
+        self.matrix = None
+
+    def __contains__(self, currency_name):
+        """
+        Checks if the snapshot has a currency.
+
+        Args:
+            currency_name (str): The name of the currency.
+
+        Returns:
+            bool: True if the currency is in the snapshot.
+        """
+        return currency_name in self.currency_ids
+
+    def __len__(self):
+        """
+        Returns the number of currencies in the snapshot.
+
+        Returns:
+            int: Number of currencies.
+        """
+        return len(self.currency_names)
+
+    def get_row(self, currency_name):
+        """
+        Returns cross rates of a currency against all currencies of the snapshot.
+
+        Args:
+            currency_name (str): The name of the first currency of the pairs.
+
+        Returns:
+            np.ndarray or None: Rates in the order of `currency_names` (NaN for unusable denominators),
+                                or None if the currency is unknown.
+        """
+        if currency_name not in self.currency_ids:
+            return None
+
+        if currency_name not in self.rows:
+            if self.matrix is not None:
+                self.rows[currency_name] = self.matrix[self.currency_ids[currency_name]]
+            else:
+                row = np.full(len(self.prices), np.nan)
+                np.divide(self.prices[self.currency_ids[currency_name]], self.prices, out=row, where=self.is_denominator)
+                self.rows[currency_name] = row
+
+        return self.rows[currency_name]
+
+    def get_matrix(self):
+        """
+        Returns cross rates of all pairs.
+
+        Returns:
+            np.ndarray: Matrix where the element [i, j] is the rate of the i-th currency in the j-th one.
+        """
+        if self.matrix is None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.matrix = np.divide.outer(self.prices, self.prices)
+            self.matrix[:, ~self.is_denominator] = np.nan
+        return self.matrix
+
+    def get_rate(self, first_el_name, second_el_name=None):
+        """
+        Returns the value ratio between two currencies.
+
+        Args:
+            first_el_name (str): The name of the first currency.
+            second_el_name (str, optional): The name of the second currency, None returns the value of the first one. Defaults to None.
+
+        Returns:
+            float or None: The value ratio, or None if a currency is unknown or the second one has no usable value.
+        """
+        if second_el_name is None:
+            if first_el_name not in self.currency_ids:
+                return None
+            return float(self.prices[self.currency_ids[first_el_name]])
+
+        if second_el_name not in self.currency_ids:
+            return None
+
+        row = self.get_row(first_el_name)
+        if row is None:
+            return None
+
+        rate = row[self.currency_ids[second_el_name]]
+        if np.isnan(rate):
+            return None
+        return float(rate)
@@ -0,0 +1,59 @@
+def conflate_snapshot_deltas(snapshot_deltas):
+    """
+    Merges currency updates taken from the 'parser_info_queue' at once into one update.
+
+    Applying the merged update gives the same currencies as applying all of them in order,
+    but the bot rebuilds its cross rates and message maps only once. A keyframe, or a full
+    snapshot of an older parser, replaces the updates before it. A delta with a version not
+    newer than the previous one is a redelivered or superseded update and is skipped. A delta
+    based on another version than the previous one follows a lost update: the updates before it
+    are dropped and the merged update keeps its base version, so the bot discards it too.
+
+    Args:
+        snapshot_deltas (list): Versioned deltas or full dictionaries of currencies in the order of the queue.
+
+    Returns:
+        dict or None: The merged update, its "update_count" key is the number of merged versioned updates.
+                      None if there are no updates.
+    """
+    conflated = None
+    update_count = 0
+
+    for snapshot_delta in snapshot_deltas:
+        if "version" not in snapshot_delta:
+            conflated = {"is_keyframe": True, "currencies": dict(snapshot_delta), "removed": []}
+            continue
+
+        if conflated is not None and "version" in conflated and snapshot_delta["is_keyframe"] is False \
+                and snapshot_delta["version"] <= conflated["version"]:
+            continue
+        update_count += 1
+
+        # Deltas of older parsers have no base version
+        is_gap = conflated is not None and "version" in conflated and "base_version" in snapshot_delta \
+            and snapshot_delta["base_version"] != conflated["version"]
+
+        if conflated is None or snapshot_delta["is_keyframe"] is True or is_gap is True:
+            conflated = dict(snapshot_delta, currencies=dict(snapshot_delta["currencies"]), removed=list(snapshot_delta["removed"]))
+            continue
+
+        conflated["currencies"].update(snapshot_delta["currencies"])
+        removed_names = set(conflated["removed"]).difference(snapshot_delta["currencies"])
+        for currency_name in snapshot_delta["removed"]:
+            conflated["currencies"].pop(currency_name, None)
+            # A keyframe lists all currencies, a removed one is just left out
+            if conflated["is_keyframe"] is False:
+                removed_names.add(currency_name)
+
+        conflated["removed"] = list(removed_names)
+        conflated["version"] = snapshot_delta["version"]
+        conflated["timestamp"] = snapshot_delta["timestamp"]
+
+    if conflated is None:
+        return None
+    if "version" not in conflated:
+        # Only full snapshots of an older parser
+        return conflated["currencies"]
+
+    conflated["update_count"] = update_count
+    return conflated
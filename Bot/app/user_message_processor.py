@@ -1,6 +1,7 @@
-from bot_message_broker import BotMessageBroker
+from async_bot_message_broker import AsyncBotMessageBroker
 from reply_actions import BaseReplyAction, ButtonReply, ValueReply, EndReply, ErrorReplyAction
-from utils import get_currency_pair_value
+from currency_snapshot import CurrencySnapshot
+from utils import round_currency_pair_value
 
 import json
 
@@ -12,33 +13,33 @@ class UserMessageProcessor():
         bot (telebot.TeleBot): The bot instance.
         user (str): The user identifier.
         username (str): The username of the user.
-        bot_message_broker (BotMessageBroker): An instance of the BotMessageBroker for sending messages.
+        bot_message_broker (AsyncBotMessageBroker): An instance of the AsyncBotMessageBroker for sending messages.
         currencies (dict): A dictionary of available currencies.
+        currency_snapshot (CurrencySnapshot): Snapshot of the available currencies with cross rates.
         message_templates (dict): A dictionary of message templates.
         message_map (dict): A dictionary representing the message map for replies.
         message_coords (list): A list of message coordinates.
         message_data (dict): A dictionary storing data from messages.
     """
 
-    def __init__(self, bot, bot_message_broker: BotMessageBroker, user, username, currencies):
+    def __init__(self, bot, bot_message_broker: AsyncBotMessageBroker, user, username, currencies, currency_snapshot=None):
         """
         Initialize the UserMessageProcessor with bot, message broker, user details, and currencies.
 
         Args:
             bot (telebot.TeleBot): The bot instance.
-            bot_message_broker (BotMessageBroker): The bot message broker instance.
+            bot_message_broker (AsyncBotMessageBroker): The bot message broker instance.
             user (str): The user identifier.
             username (str): The username of the user.
             currencies (dict): A dictionary of available currencies.
+            currency_snapshot (CurrencySnapshot, optional): Snapshot of the currencies shared between users. Defaults to a new snapshot.
         """
         self.bot = bot
         self.user = user
         self.username = username
         self.bot_message_broker = bot_message_broker
 
-        self.update_currencies(currencies)
-        
-        self.update_message_map()
+        self.update_currencies(currencies, currency_snapshot)
         
         self.message_templates = {
             "check_value": [None, 5]
@@ -46,14 +47,16 @@ class UserMessageProcessor():
 
         self.set_start_message_data()
     
-    def update_currencies(self, currencies):
+    def update_currencies(self, currencies, currency_snapshot=None):
         """
         Update the available currencies and pair names.
 
         Args:
             currencies (dict): A dictionary of available currencies.
+            currency_snapshot (CurrencySnapshot, optional): Snapshot of the currencies shared between users. Defaults to a new snapshot.
         """
         self.currencies = currencies
+        self.currency_snapshot = currency_snapshot if currency_snapshot is not None else CurrencySnapshot(currencies)
 
         self.pair_names = list(currencies.keys())
         
@@ -77,11 +80,11 @@ class UserMessageProcessor():
         if pair2_name not in self.currencies:
             return f'... The specified cryptocurrency pair was not found! I couldn`t find "{pair2_name}"'
         
-        pair_value = get_currency_pair_value(self.currencies[pair1_name], self.currencies[pair2_name])
+        pair_value = self.currency_snapshot.get_rate(pair1_name, pair2_name)
         if pair_value is None:
             return f'... The value of the cryptocurrency "{pair2_name}" is 0 USDC, calculation cannot be performed! If you insist, the result tends towards ∞ {pair2_name}, which is meaningless.'
         
-        return f': {pair_value} {pair2_name}'
+        return f': {round_currency_pair_value(pair_value)} {pair2_name}'
 
 
     def update_message_map(self):
@@ -1,4 +1,5 @@
 from user_message_processor import UserMessageProcessor
+from currency_snapshot import CurrencySnapshot
 
 class UserManager():
     """
@@ -6,9 +7,11 @@ class UserManager():
 
     Attributes:
         bot (telebot.TeleBot): The bot instance.
-        bot_message_broker (BotMessageBroker): An instance of the BotMessageBroker for sending messages.
+        bot_message_broker (AsyncBotMessageBroker): An instance of the AsyncBotMessageBroker for sending messages.
         users_messages (dict): A dictionary storing UserMessageProcessor instances for each user.
         currencies (dict): A dictionary of available currencies with their values.
+        snapshot_version (int or None): Version of the last applied currencies snapshot.
+        currency_snapshot (CurrencySnapshot): Snapshot of the available currencies with cross rates, shared by all users.
     """
 
     def __init__(self, bot, bot_message_broker):
@@ -17,7 +20,7 @@ class UserManager():
 
         Args:
             bot (telebot.TeleBot): The bot instance.
-            bot_message_broker (BotMessageBroker): The bot message broker instance.
+            bot_message_broker (AsyncBotMessageBroker): The bot message broker instance.
         """
         self.bot = bot
         self.bot_message_broker = bot_message_broker
@@ -28,6 +31,8 @@ class UserManager():
             'BTC': 63000,
             'USDC': 1
         }
+        self.snapshot_version = None
+        self.currency_snapshot = CurrencySnapshot(self.currencies)
     
     def add_new_user(self, message):
         """
@@ -41,7 +46,8 @@ class UserManager():
             self.bot_message_broker, 
             message.chat.id, 
             message.chat.username if message.chat.username != "None" and message.chat.username is not None else message.chat.first_name, 
-            self.currencies
+            self.currencies,
+            self.currency_snapshot
         )
     
     def set_start_message(self, message):
@@ -93,13 +99,70 @@ class UserManager():
         self.add_new_user(message)
         return self.users_messages[message.chat.id].check_message(message=message)
     
-    def on_update_currencies(self, currencies):
+    def apply_snapshot_delta(self, snapshot_delta):
+        """
+        Apply a versioned currencies delta from the parser to the known currencies.
+
+        Keyframes replace all currencies, other deltas only update the changed and remove the delisted ones.
+        Deltas not newer than the applied version are skipped. A delta based on another version than the applied one
+        follows a lost delta, it is discarded, a keyframe is requested from the parser and currencies stay as they are until it comes.
+        Messages without a version are full snapshots from an older parser.
+
+        Args:
+            snapshot_delta (dict): A versioned delta or a full dictionary of currencies.
+
+        Returns:
+            dict or None: The updated currencies, or None if nothing changed.
+        """
+        if "version" not in snapshot_delta:
+            return dict(snapshot_delta)
+
+        # A restarted parser counts versions from a keyframe again, older deltas are superseded
+        if snapshot_delta["is_keyframe"] is False and self.snapshot_version is not None and snapshot_delta["version"] <= self.snapshot_version:
+            return None
+
+        if snapshot_delta["is_keyframe"] is True:
+            self.snapshot_version = snapshot_delta["version"]
+            return dict(snapshot_delta["currencies"])
+
+        # Deltas of older parsers have no base version
+        if "base_version" in snapshot_delta and snapshot_delta["base_version"] != self.snapshot_version:
+            self.bot_message_broker.request_keyframe(self.snapshot_version)
+            return None
+
+        self.snapshot_version = snapshot_delta["version"]
+
+        if len(snapshot_delta["currencies"]) == 0 and len(snapshot_delta["removed"]) == 0:
+            return None
+
+        currencies = dict(self.currencies)
+        currencies.update(snapshot_delta["currencies"])
+        for currency_name in snapshot_delta["removed"]:
+            currencies.pop(currency_name, None)
+        return currencies
+
+    def on_update_currencies(self, snapshot_delta):
         """
         Update the available currencies for all users.
 
         Args:
-            currencies (dict): A dictionary of available currencies with their values.
+            snapshot_delta (dict): A versioned delta or a full dictionary of currencies.
+
+        Returns:
+            dict: A dictionary of available currencies with their values.
         """
+        currencies = self.apply_snapshot_delta(snapshot_delta)
+        if currencies is None:
+            return self.currencies
+
         self.currencies = currencies
+
+        # All cross rates are computed once per update and shared by the message maps of all users
+        self.currency_snapshot = CurrencySnapshot(currencies)
+        if len(self.users_messages) > 0:
+            self.currency_snapshot.get_matrix()
+
         for user in self.users_messages:
-            self.users_messages[user].update_currencies(currencies)
\ No newline at end of file
+            self.users_messages[user].update_currencies(currencies, self.currency_snapshot)
+
+        return self.currencies
\ No newline at end of file
@@ -45,7 +45,18 @@ def get_currency_pair_value(pair1, pair2):
     if pair2 <= 0.000000000000000001:
         return None
     
-    full_pair_value = pair1 / pair2
+    return round_currency_pair_value(pair1 / pair2)
+
+def round_currency_pair_value(full_pair_value):
+    """
+    Round the value of a currency pair for displaying.
+
+    Args:
+        full_pair_value (float): The full value of the currency pair.
+
+    Returns:
+        float: The value rounded to 3 decimal places if greater than 0.001, or the full value otherwise.
+    """
     rounded_pair_value = round(full_pair_value, 3)
 
     if rounded_pair_value > 0.001:
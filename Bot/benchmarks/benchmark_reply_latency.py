@@ -0,0 +1,255 @@
+"""
+Measures the latency of replies to users and of notifications while the bot
+works with the blocking BotMessageBroker, polling the parser queues once per
+period as the bot did before, and with the AsyncBotMessageBroker consumers.
+
+Users set notifications at `--commands` per second: a command publishes the
+condition and replies in Telegram. The parser sends `--notifications` per
+second and `--updates` currency updates per second, processing an update
+takes `--update-cost` seconds. The age of the currencies the bot applies is
+reported. Telegram requests and broker round trips are simulated:
+    $ python benchmark_reply_latency.py --duration 10 --rtt 0.005 --telegram-rtt 0.02
+"""
+from memory_amqp import MemoryBlockingConnection, MemoryServer
+from time import perf_counter, time
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from async_bot_message_broker import AsyncBotMessageBroker
+from bot_message_broker import BotMessageBroker
+
+
+def get_percentile(values, percent):
+    """
+    Returns a percentile of values.
+
+    Args:
+        values (list): The values.
+        percent (float): The percentile from 0 to 100.
+
+    Returns:
+        float: The percentile, 0 if there are no values.
+    """
+    if len(values) == 0:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class LatencyRecorder():
+    """
+    Simulated bot callbacks recording latencies.
+
+    Attributes:
+        telegram_rtt (float): Duration of a Telegram request in seconds.
+        reply_latencies (list): Times between user commands and the replies in seconds.
+        notification_latencies (list): Times between sending notifications by the parser and by the bot in seconds.
+        update_cost (float): Duration of processing a currency update in seconds.
+        update_ages (list): Ages of the processed currency updates in seconds.
+    """
+
+    def __init__(self, telegram_rtt, update_cost):
+        """
+        Initializes the LatencyRecorder.
+
+        Args:
+            telegram_rtt (float): Duration of a Telegram request in seconds.
+            update_cost (float): Duration of processing a currency update in seconds.
+        """
+        self.telegram_rtt = telegram_rtt
+        self.reply_latencies = []
+        self.notification_latencies = []
+        self.update_cost = update_cost
+        self.update_ages = []
+
+    async def reply(self, bot_message_broker, command_time, command_id):
+        """
+        Sets a notification for a user and replies to the user.
+
+        Args:
+            bot_message_broker (BotMessageBroker or AsyncBotMessageBroker): The broker.
+            command_time (float): Time the user sent the command.
+            command_id (int): Number of the command.
+        """
+        bot_message_broker.send_message2bot2parser_queue([command_id, f'user_{command_id}'], 'BTC', 'USDT', 50000.0, True)
+        await asyncio.sleep(self.telegram_rtt)
+        self.reply_latencies.append(perf_counter() - command_time)
+
+    async def notify(self, bot, notifications):
+        """
+        Sends notifications of the parser to users.
+
+        Args:
+            bot (None): Stands for the bot instance.
+            notifications (list): The notifications.
+        """
+        for notification in notifications:
+            await asyncio.sleep(self.telegram_rtt)
+            self.notification_latencies.append(perf_counter() - notification["sent_at"])
+
+    async def on_update_currencies(self, bot, snapshot_delta):
+        """
+        Records the age of a currency update and processes it.
+
+        Args:
+            bot (None): Stands for the bot instance.
+            snapshot_delta (dict): The update.
+        """
+        self.update_ages.append(time() - snapshot_delta["timestamp"])
+        await asyncio.sleep(self.update_cost)
+
+
+async def send_commands(bot_message_broker, latency_recorder, command_rate, duration):
+    """
+    Sends user commands at a constant rate, a late command is timed from when it was due.
+
+    Args:
+        bot_message_broker (BotMessageBroker or AsyncBotMessageBroker): The broker.
+        latency_recorder (LatencyRecorder): The recorder.
+        command_rate (float): Commands per second.
+        duration (float): Duration in seconds.
+    """
+    start_time = perf_counter()
+    tasks = []
+    for command_id in range(int(command_rate * duration)):
+        command_time = start_time + command_id / command_rate
+        await asyncio.sleep(max(0.0, command_time - perf_counter()))
+        tasks.append(asyncio.create_task(latency_recorder.reply(bot_message_broker, command_time, command_id)))
+    await asyncio.gather(*tasks)
+
+
+async def send_notifications(server, notification_rate, duration):
+    """
+    Sends notifications as the parser.
+
+    Args:
+        server (MemoryServer): The server.
+        notification_rate (float): Notifications per second.
+        duration (float): Duration in seconds.
+    """
+    start_time = perf_counter()
+    for notification_id in range(int(notification_rate * duration)):
+        await asyncio.sleep(max(0.0, start_time + notification_id / notification_rate - perf_counter()))
+        server.publish('parser2bot_queue', json.dumps([{"user": [notification_id, f'user_{notification_id}'], "sent_at": perf_counter()}]))
+
+
+async def send_currency_updates(server, update_rate, duration):
+    """
+    Sends versioned currency deltas as the parser, every 60th one is a keyframe.
+
+    Args:
+        server (MemoryServer): The server.
+        update_rate (float): Updates per second.
+        duration (float): Duration in seconds.
+    """
+    start_time = perf_counter()
+    for version in range(1, int(update_rate * duration) + 1):
+        await asyncio.sleep(max(0.0, start_time + (version - 1) / update_rate - perf_counter()))
+        snapshot_delta = {"version": version, "is_keyframe": version % 60 == 1, "timestamp": time(), "currencies": {"BTC": 65000.0 + version}, "removed": []}
+        server.publish('parser_info_queue', json.dumps(snapshot_delta))
+
+
+async def poll_blocking(bot_message_broker, latency_recorder, period):
+    """
+    Reads one message of every parser queue per period, as the bot did with BotMessageBroker.
+
+    Args:
+        bot_message_broker (BotMessageBroker): The broker.
+        latency_recorder (LatencyRecorder): The recorder.
+        period (float): Polling period in seconds.
+    """
+    while True:
+        await bot_message_broker.read_message_from_parser2bot_queue(latency_recorder.notify, None)
+        await bot_message_broker.read_message_from_parser_info_queue(latency_recorder.on_update_currencies, None)
+        await asyncio.sleep(period)
+
+
+async def run_blocking(args):
+    """
+    Runs the load with the blocking broker.
+
+    Args:
+        args (argparse.Namespace): Arguments of the benchmark.
+
+    Returns:
+        tuple: The recorder and the server.
+    """
+    server = MemoryServer(args.rtt)
+    latency_recorder = LatencyRecorder(args.telegram_rtt, args.update_cost)
+    bot_message_broker = BotMessageBroker(connection=MemoryBlockingConnection(server))
+
+    poll_task = asyncio.create_task(poll_blocking(bot_message_broker, latency_recorder, args.period))
+    await asyncio.gather(
+        send_commands(bot_message_broker, latency_recorder, args.commands, args.duration),
+        send_notifications(server, args.notifications, args.duration),
+        send_currency_updates(server, args.updates, args.duration)
+    )
+    await asyncio.sleep(args.drain)
+    poll_task.cancel()
+    return latency_recorder, server
+
+
+async def run_async(args):
+    """
+    Runs the load with the asynchronous broker.
+
+    Args:
+        args (argparse.Namespace): Arguments of the benchmark.
+
+    Returns:
+        tuple: The recorder and the server.
+    """
+    server = MemoryServer(args.rtt)
+    latency_recorder = LatencyRecorder(args.telegram_rtt, args.update_cost)
+    bot_message_broker = AsyncBotMessageBroker(connect=server.connect)
+    await bot_message_broker.start()
+
+    consumer_tasks = [
+        asyncio.create_task(bot_message_broker.consume_parser2bot_queue(latency_recorder.notify, None)),
+        asyncio.create_task(bot_message_broker.consume_parser_info_queue(latency_recorder.on_update_currencies, None))
+    ]
+    await asyncio.gather(
+        send_commands(bot_message_broker, latency_recorder, args.commands, args.duration),
+        send_notifications(server, args.notifications, args.duration),
+        send_currency_updates(server, args.updates, args.duration)
+    )
+    await asyncio.sleep(args.drain)
+    for consumer_task in consumer_tasks:
+        consumer_task.cancel()
+    await bot_message_broker.close()
+    return latency_recorder, server
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--duration', type=float, default=10.0)
+    args_parser.add_argument('--commands', type=float, default=20.0, help='User commands per second')
+    args_parser.add_argument('--notifications', type=float, default=10.0, help='Notifications per second')
+    args_parser.add_argument('--updates', type=float, default=4.0, help='Currency updates per second')
+    args_parser.add_argument('--update-cost', type=float, default=0.3, help='Duration of processing a currency update in seconds')
+    args_parser.add_argument('--rtt', type=float, default=0.005, help='Round trip to the broker in seconds')
+    args_parser.add_argument('--telegram-rtt', type=float, default=0.02, help='Duration of a Telegram request in seconds')
+    args_parser.add_argument('--period', type=float, default=1.0, help='Polling period of the blocking broker in seconds')
+    args_parser.add_argument('--drain', type=float, default=1.0, help='Time to process the last messages in seconds')
+    args = args_parser.parse_args()
+
+    notification_count = int(args.notifications * args.duration)
+    for broker_name, run_function in (('blocking', run_blocking), ('async', run_async)):
+        latency_recorder, server = asyncio.run(run_function(args))
+        reply_latencies = latency_recorder.reply_latencies
+        notification_latencies = latency_recorder.notification_latencies
+        update_ages = latency_recorder.update_ages
+        print(
+            f'{broker_name:>8}: replies p50 {get_percentile(reply_latencies, 50) * 1000:.1f} ms, ' \
+            f'p99 {get_percentile(reply_latencies, 99) * 1000:.1f} ms, max {max(reply_latencies, default=0.0) * 1000:.1f} ms; ' \
+            f'notifications {len(notification_latencies)}/{notification_count} sent, ' \
+            f'p50 {get_percentile(notification_latencies, 50) * 1000:.1f} ms, max {max(notification_latencies, default=0.0) * 1000:.1f} ms; ' \
+            f'{len(update_ages)} currency update calls for {int(args.updates * args.duration)} updates, ' \
+            f'age p50 {get_percentile(update_ages, 50):.2f} s, max {max(update_ages, default=0.0):.2f} s'
+        )
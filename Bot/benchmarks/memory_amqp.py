@@ -0,0 +1,392 @@
+"""
+An in-process stand-in for RabbitMQ used by the bot benchmarks.
+
+MemoryServer keeps the queues. Blocking connections implement the part of the
+pika API used by BotMessageBroker, asynchronous ones the part of the aio-pika
+API used by AsyncBotMessageBroker. Every call waiting for an answer of the
+broker takes a simulated network round trip: blocking calls sleep and block
+the event loop, asynchronous calls only suspend the calling task.
+"""
+from collections import deque
+from time import sleep
+from types import SimpleNamespace
+
+import asyncio
+
+
+class MemoryServer():
+    """
+    Queues of messages shared by all connections.
+
+    Attributes:
+        rtt (float): Round trip time in seconds.
+        queues (dict): Queue names and deques of (body, headers, content type) tuples.
+        events (dict): Queue names and events set when a message is published to them.
+        published_count (int): Number of published messages.
+    """
+
+    def __init__(self, rtt):
+        """
+        Initializes the MemoryServer.
+
+        Args:
+            rtt (float): Round trip time in seconds.
+        """
+        self.rtt = rtt
+        self.queues = {}
+        self.events = {}
+        self.published_count = 0
+
+    def declare(self, queue_name):
+        """
+        Declares a queue.
+
+        Args:
+            queue_name (str): Queue name.
+
+        Returns:
+            deque: The queue.
+        """
+        return self.queues.setdefault(queue_name, deque())
+
+    def get_event(self, queue_name):
+        """
+        Returns the event set when a message is published to a queue.
+
+        Args:
+            queue_name (str): Queue name.
+
+        Returns:
+            asyncio.Event: The event.
+        """
+        return self.events.setdefault(queue_name, asyncio.Event())
+
+    def publish(self, queue_name, body, headers=None, content_type=None):
+        """
+        Appends a message to a queue and wakes its consumer.
+
+        Args:
+            queue_name (str): Queue name.
+            body (bytes|str): Message body.
+            headers (dict, optional): Message headers. Defaults to None.
+            content_type (str, optional): Content type of the body. Defaults to None.
+        """
+        self.declare(queue_name).append((body, headers, content_type))
+        self.get_event(queue_name).set()
+        self.published_count += 1
+
+    async def connect(self, url):
+        """
+        Opens an asynchronous connection, the signature of aio_pika.connect_robust.
+
+        Args:
+            url (str): URL of the server, ignored.
+
+        Returns:
+            MemoryAsyncConnection: The connection.
+        """
+        await asyncio.sleep(self.rtt)
+        return MemoryAsyncConnection(self)
+
+
+class MemoryBlockingConnection():
+    """
+    A blocking connection with the API of pika.BlockingConnection.
+
+    Attributes:
+        server (MemoryServer): The server.
+    """
+
+    def __init__(self, server):
+        """
+        Initializes the MemoryBlockingConnection.
+
+        Args:
+            server (MemoryServer): The server.
+        """
+        self.server = server
+
+    def channel(self):
+        """
+        Opens a channel.
+
+        Returns:
+            MemoryBlockingChannel: The channel.
+        """
+        sleep(self.server.rtt)
+        return MemoryBlockingChannel(self.server)
+
+
+class MemoryBlockingChannel():
+    """
+    A blocking channel with the API of pika.BlockingConnection.channel.
+
+    Attributes:
+        server (MemoryServer): The server.
+        delivery_tag (int): Tag of the last delivered message.
+    """
+
+    def __init__(self, server):
+        """
+        Initializes the MemoryBlockingChannel.
+
+        Args:
+            server (MemoryServer): The server.
+        """
+        self.server = server
+        self.delivery_tag = 0
+
+    def queue_declare(self, queue, **kwargs):
+        """
+        Declares a queue, waiting for the answer of the server.
+
+        Args:
+            queue (str): Queue name.
+        """
+        sleep(self.server.rtt)
+        self.server.declare(queue)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None):
+        """
+        Publishes a message, the server doesn't answer.
+
+        Args:
+            exchange (str): Exchange name, ignored.
+            routing_key (str): Queue name.
+            body (str|bytes): Message body.
+            properties (pika.BasicProperties, optional): Message properties. Defaults to None.
+        """
+        if properties is None:
+            self.server.publish(routing_key, body)
+        else:
+            self.server.publish(routing_key, body, properties.headers, properties.content_type)
+
+    def basic_get(self, queue):
+        """
+        Takes a message from a queue, waiting for the answer of the server.
+
+        Args:
+            queue (str): Queue name.
+
+        Returns:
+            tuple: Method frame, properties and body, or three None values if the queue is empty.
+        """
+        sleep(self.server.rtt)
+        messages = self.server.declare(queue)
+        if len(messages) == 0:
+            return None, None, None
+
+        body, headers, content_type = messages.popleft()
+        self.delivery_tag += 1
+        return SimpleNamespace(delivery_tag=self.delivery_tag), SimpleNamespace(headers=headers, content_type=content_type), body
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        """
+        Acknowledges a message, the server doesn't answer.
+
+        Args:
+            delivery_tag (int, optional): Tag of the message. Defaults to 0.
+            multiple (bool, optional): Ignored. Defaults to False.
+        """
+
+
+class MemoryAsyncConnection():
+    """
+    An asynchronous connection with the API of aio_pika.RobustConnection.
+
+    Attributes:
+        server (MemoryServer): The server.
+    """
+
+    def __init__(self, server):
+        """
+        Initializes the MemoryAsyncConnection.
+
+        Args:
+            server (MemoryServer): The server.
+        """
+        self.server = server
+
+    async def channel(self):
+        """
+        Opens a channel.
+
+        Returns:
+            MemoryAsyncChannel: The channel.
+        """
+        await asyncio.sleep(self.server.rtt)
+        return MemoryAsyncChannel(self.server)
+
+    async def close(self):
+        """
+        Closes the connection.
+        """
+
+
+class MemoryAsyncChannel():
+    """
+    An asynchronous channel with the API of aio_pika.RobustChannel with publisher confirms.
+
+    Attributes:
+        server (MemoryServer): The server.
+        default_exchange (MemoryAsyncChannel): The channel publishes to the default exchange itself.
+    """
+
+    def __init__(self, server):
+        """
+        Initializes the MemoryAsyncChannel.
+
+        Args:
+            server (MemoryServer): The server.
+        """
+        self.server = server
+        self.default_exchange = self
+
+    async def set_qos(self, prefetch_count=0):
+        """
+        Sets the prefetch count, waiting for the answer of the server.
+
+        Args:
+            prefetch_count (int, optional): Ignored. Defaults to 0.
+        """
+        await asyncio.sleep(self.server.rtt)
+
+    async def declare_queue(self, name):
+        """
+        Declares a queue, waiting for the answer of the server.
+
+        Args:
+            name (str): Queue name.
+
+        Returns:
+            MemoryAsyncQueue: The queue.
+        """
+        await asyncio.sleep(self.server.rtt)
+        self.server.declare(name)
+        return MemoryAsyncQueue(self.server, name)
+
+    async def publish(self, message, routing_key):
+        """
+        Publishes a message and waits for its confirmation.
+
+        Args:
+            message (aio_pika.Message): The message.
+            routing_key (str): Queue name.
+        """
+        self.server.publish(routing_key, message.body, message.headers, message.content_type)
+        await asyncio.sleep(self.server.rtt)
+
+    async def close(self):
+        """
+        Closes the channel.
+        """
+
+
+class MemoryAsyncMessage():
+    """
+    A delivered message with the API of aio_pika.IncomingMessage.
+
+    Attributes:
+        server (MemoryServer): The server.
+        queue_name (str): Name of the queue the message was taken from.
+        body (bytes|str): Message body.
+        headers (dict or None): Message headers.
+        content_type (str or None): Content type of the body.
+    """
+
+    def __init__(self, server, queue_name, body, headers, content_type):
+        """
+        Initializes the MemoryAsyncMessage.
+
+        Args:
+            server (MemoryServer): The server.
+            queue_name (str): Name of the queue the message was taken from.
+            body (bytes|str): Message body.
+            headers (dict or None): Message headers.
+            content_type (str or None): Content type of the body.
+        """
+        self.server = server
+        self.queue_name = queue_name
+        self.body = body
+        self.headers = headers
+        self.content_type = content_type
+
+    async def ack(self):
+        """
+        Acknowledges the message, the server doesn't answer.
+        """
+
+    async def nack(self, requeue=True):
+        """
+        Rejects the message, the server doesn't answer.
+
+        Args:
+            requeue (bool, optional): If True, the message is returned to the head of its queue. Defaults to True.
+        """
+        if requeue is True:
+            self.server.declare(self.queue_name).appendleft((self.body, self.headers, self.content_type))
+            self.server.get_event(self.queue_name).set()
+
+
+class MemoryAsyncQueue():
+    """
+    An asynchronous queue with the API of aio_pika.Queue, it has one consumer at a time.
+
+    Attributes:
+        server (MemoryServer): The server.
+        name (str): Queue name.
+    """
+
+    def __init__(self, server, name):
+        """
+        Initializes the MemoryAsyncQueue.
+
+        Args:
+            server (MemoryServer): The server.
+            name (str): Queue name.
+        """
+        self.server = server
+        self.name = name
+
+    async def get(self, fail=True):
+        """
+        Takes a message from the queue, waiting for the answer of the server.
+
+        Args:
+            fail (bool, optional): Ignored, None is returned for an empty queue. Defaults to True.
+
+        Returns:
+            MemoryAsyncMessage or None: The message.
+        """
+        await asyncio.sleep(self.server.rtt)
+        messages = self.server.declare(self.name)
+        if len(messages) == 0:
+            return None
+        return MemoryAsyncMessage(self.server, self.name, *messages.popleft())
+
+    def iterator(self):
+        """
+        Returns the consumer of the queue.
+
+        Returns:
+            MemoryAsyncQueue: The queue iterates over pushed messages itself.
+        """
+        return self
+
+    async def __aenter__(self):
+        await asyncio.sleep(self.server.rtt)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        messages = self.server.declare(self.name)
+        event = self.server.get_event(self.name)
+        while len(messages) == 0:
+            event.clear()
+            await event.wait()
+        return MemoryAsyncMessage(self.server, self.name, *messages.popleft())
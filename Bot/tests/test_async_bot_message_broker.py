@@ -0,0 +1,136 @@
+from async_bot_message_broker import AsyncBotMessageBroker
+from memory_amqp import MemoryServer
+from wire_format import decode_message, encode_message
+
+import asyncio
+import pytest
+
+
+def run_with_broker(test_function):
+    async def run():
+        server = MemoryServer(0.0)
+        bot_message_broker = AsyncBotMessageBroker(connect=server.connect, retry_interval=0.0)
+        await bot_message_broker.start()
+        try:
+            await test_function(server, bot_message_broker)
+        finally:
+            await bot_message_broker.close()
+    asyncio.run(run())
+
+
+def publish(server, queue_name, message):
+    body, content_type = encode_message(message, 'json')
+    server.publish(queue_name, body, content_type=content_type)
+
+
+def get_published(server, queue_name):
+    return [decode_message(body, content_type) for body, _, content_type in server.declare(queue_name)]
+
+
+async def consume_until(bot_message_broker, queue_name, callback, is_done):
+    consumer_task = asyncio.create_task(bot_message_broker.consume(queue_name, callback))
+    try:
+        for _ in range(1000):
+            if is_done() is True:
+                break
+            await asyncio.sleep(0)
+    finally:
+        consumer_task.cancel()
+        await asyncio.gather(consumer_task, return_exceptions=True)
+
+
+def test_conditions_and_keyframe_requests_are_published_to_their_queues():
+    async def test(server, bot_message_broker):
+        condition_id = bot_message_broker.send_message2bot2parser_queue([1, 'user_1'], 'BTC', 'USDT', 63000.0, True)
+        bot_message_broker.request_keyframe(5)
+        await bot_message_broker.flush()
+
+        assert get_published(server, 'bot2parser_queue') == [[[1, 'user_1'], 'BTC', 'USDT', 63000.0, True, {"id": condition_id}]]
+        assert get_published(server, 'bot2parser_keyframe_queue') == [{"version": 5}]
+        assert server.declare('bot2parser_queue')[0][1]["sent_at"] > 0
+
+    run_with_broker(test)
+
+
+def test_processed_notification_is_taken_from_the_queue():
+    async def test(server, bot_message_broker):
+        notifications = []
+
+        async def callback(message_data):
+            notifications.append(message_data)
+
+        publish(server, 'parser2bot_queue', [{"id": 'a'}])
+        publish(server, 'parser2bot_queue', [{"id": 'b'}])
+        await consume_until(bot_message_broker, 'parser2bot_queue', callback, lambda: len(notifications) == 2)
+
+        assert notifications == [[{"id": 'a'}], [{"id": 'b'}]]
+        assert len(server.declare('parser2bot_queue')) == 0
+
+    run_with_broker(test)
+
+
+def test_failed_notification_is_retried():
+    async def test(server, bot_message_broker):
+        attempts = []
+
+        async def callback(message_data):
+            attempts.append(message_data)
+            if len(attempts) < 2:
+                raise ConnectionError('Telegram API is down')
+
+        publish(server, 'parser2bot_queue', [{"id": 'a'}])
+        await consume_until(bot_message_broker, 'parser2bot_queue', callback, lambda: len(attempts) == 2)
+
+        assert len(attempts) == 2
+        assert len(server.declare('parser2bot_queue.dead_letter')) == 0
+
+    run_with_broker(test)
+
+
+def test_notification_failing_every_attempt_is_dead_lettered():
+    async def test(server, bot_message_broker):
+        attempts = []
+
+        async def callback(message_data):
+            attempts.append(message_data)
+            raise ConnectionError('Telegram API is down')
+
+        publish(server, 'parser2bot_queue', [{"id": 'a'}])
+        publish(server, 'parser2bot_queue', [{"id": 'b'}])
+        await consume_until(bot_message_broker, 'parser2bot_queue', callback, lambda: len(server.declare('parser2bot_queue.dead_letter')) == 2)
+
+        assert len(attempts) == 2 * bot_message_broker.callback_attempts
+        assert get_published(server, 'parser2bot_queue.dead_letter') == [[{"id": 'a'}], [{"id": 'b'}]]
+
+    run_with_broker(test)
+
+
+def test_undecodable_message_is_dropped():
+    async def test(server, bot_message_broker):
+        notifications = []
+
+        async def callback(message_data):
+            notifications.append(message_data)
+
+        server.publish('parser2bot_queue', b'{"broken', content_type='application/json')
+        publish(server, 'parser2bot_queue', [{"id": 'a'}])
+        await consume_until(bot_message_broker, 'parser2bot_queue', callback, lambda: len(notifications) == 1)
+
+        assert notifications == [[{"id": 'a'}]]
+        assert len(server.declare('parser2bot_queue.dead_letter')) == 0
+
+    run_with_broker(test)
+
+
+def test_read_message_returns_a_failed_message_to_the_queue():
+    async def test(server, bot_message_broker):
+        async def callback(bot, message_data):
+            raise ConnectionError('Telegram API is down')
+
+        publish(server, 'parser2bot_queue', [{"id": 'a'}])
+        with pytest.raises(ConnectionError):
+            await bot_message_broker.read_message_from_parser2bot_queue(callback, None)
+
+        assert get_published(server, 'parser2bot_queue') == [[{"id": 'a'}]]
+
+    run_with_broker(test)
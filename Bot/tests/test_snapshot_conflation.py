@@ -0,0 +1,75 @@
+from snapshot_conflation import conflate_snapshot_deltas
+
+
+def make_delta(version, currencies, removed=(), is_keyframe=False, base_version=None):
+    return {
+        "version": version,
+        "base_version": version - 1 if base_version is None else base_version,
+        "is_keyframe": is_keyframe,
+        "timestamp": float(version),
+        "currencies": dict(currencies),
+        "removed": list(removed)
+    }
+
+
+def apply_deltas(currencies, snapshot_deltas):
+    currencies = dict(currencies)
+    for snapshot_delta in snapshot_deltas:
+        if snapshot_delta["is_keyframe"] is True:
+            currencies = dict(snapshot_delta["currencies"])
+            continue
+        currencies.update(snapshot_delta["currencies"])
+        for currency_name in snapshot_delta["removed"]:
+            currencies.pop(currency_name, None)
+    return currencies
+
+
+def test_no_updates_give_nothing():
+    assert conflate_snapshot_deltas([]) is None
+
+
+def test_merged_deltas_give_the_same_currencies_as_applied_in_order():
+    base = {'BTC': 1.0, 'ETH': 2.0, 'BNB': 3.0}
+    snapshot_deltas = [
+        make_delta(2, {'BTC': 1.5}, removed=['BNB']),
+        make_delta(3, {'BNB': 3.5, 'SOL': 4.0}),
+        make_delta(4, {'ETH': 2.5}, removed=['SOL'])
+    ]
+
+    conflated = conflate_snapshot_deltas(snapshot_deltas)
+
+    assert conflated["version"] == 4
+    assert conflated["base_version"] == 1
+    assert conflated["update_count"] == 3
+    assert apply_deltas(base, [conflated]) == apply_deltas(base, snapshot_deltas)
+
+
+def test_keyframe_replaces_the_updates_before_it():
+    conflated = conflate_snapshot_deltas([
+        make_delta(2, {'BTC': 1.5}),
+        make_delta(3, {'BTC': 2.0, 'ETH': 3.0}, is_keyframe=True),
+        make_delta(4, {'ETH': 3.5}, removed=['BTC'])
+    ])
+
+    assert conflated["is_keyframe"] is True
+    assert conflated["currencies"] == {'ETH': 3.5}
+    assert conflated["removed"] == []
+
+
+def test_redelivered_delta_is_skipped():
+    conflated = conflate_snapshot_deltas([make_delta(2, {'BTC': 1.5}), make_delta(3, {'BTC': 2.0}), make_delta(2, {'BTC': 1.5})])
+
+    assert conflated["currencies"] == {'BTC': 2.0}
+    assert conflated["update_count"] == 2
+
+
+def test_merging_stops_at_a_version_gap():
+    conflated = conflate_snapshot_deltas([make_delta(2, {'BTC': 1.5}), make_delta(5, {'ETH': 3.0})])
+
+    assert conflated["version"] == 5
+    assert conflated["base_version"] == 4
+    assert conflated["currencies"] == {'ETH': 3.0}
+
+
+def test_full_snapshots_of_an_older_parser_are_returned_as_they_are():
+    assert conflate_snapshot_deltas([{'BTC': 1.0}, {'BTC': 2.0}]) == {'BTC': 2.0}
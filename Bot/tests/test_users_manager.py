@@ -0,0 +1,84 @@
+from users_manager import UserManager
+
+import pytest
+
+
+class RecordingBroker():
+    def __init__(self):
+        self.keyframe_requests = []
+
+    def request_keyframe(self, snapshot_version):
+        self.keyframe_requests.append(snapshot_version)
+
+
+def make_delta(version, currencies, removed=(), is_keyframe=False, base_version=None):
+    return {
+        "version": version,
+        "base_version": version - 1 if base_version is None else base_version,
+        "is_keyframe": is_keyframe,
+        "timestamp": float(version),
+        "currencies": dict(currencies),
+        "removed": list(removed)
+    }
+
+
+@pytest.fixture
+def user_manager():
+    return UserManager(None, RecordingBroker())
+
+
+def test_deltas_are_applied_over_the_keyframe(user_manager):
+    user_manager.on_update_currencies(make_delta(1, {'BTC': 63000.0, 'ETH': 3000.0, 'BNB': 500.0}, is_keyframe=True))
+    user_manager.on_update_currencies(make_delta(2, {'BTC': 64000.0}, removed=['BNB']))
+
+    assert user_manager.currencies == {'BTC': 64000.0, 'ETH': 3000.0}
+    assert user_manager.snapshot_version == 2
+    assert user_manager.bot_message_broker.keyframe_requests == []
+
+
+def test_old_delta_is_skipped(user_manager):
+    user_manager.on_update_currencies(make_delta(1, {'BTC': 63000.0}, is_keyframe=True))
+    user_manager.on_update_currencies(make_delta(2, {'BTC': 64000.0}))
+
+    assert user_manager.apply_snapshot_delta(make_delta(2, {'BTC': 64000.0})) is None
+    assert user_manager.currencies == {'BTC': 64000.0}
+
+
+def test_delta_after_a_lost_one_is_discarded_until_a_keyframe(user_manager):
+    user_manager.on_update_currencies(make_delta(1, {'BTC': 63000.0, 'ETH': 3000.0}, is_keyframe=True))
+
+    user_manager.on_update_currencies(make_delta(3, {'ETH': 3100.0}))
+    user_manager.on_update_currencies(make_delta(4, {'BTC': 65000.0}))
+
+    assert user_manager.currencies == {'BTC': 63000.0, 'ETH': 3000.0}
+    assert user_manager.snapshot_version == 1
+    assert user_manager.bot_message_broker.keyframe_requests == [1, 1]
+
+    user_manager.on_update_currencies(make_delta(5, {'BTC': 65000.0, 'ETH': 3200.0}, is_keyframe=True))
+    user_manager.on_update_currencies(make_delta(6, {'ETH': 3300.0}))
+
+    assert user_manager.currencies == {'BTC': 65000.0, 'ETH': 3300.0}
+    assert user_manager.snapshot_version == 6
+
+
+def test_delta_before_the_first_keyframe_is_discarded(user_manager):
+    default_currencies = dict(user_manager.currencies)
+
+    user_manager.on_update_currencies(make_delta(7, {'BTC': 65000.0}))
+
+    assert user_manager.currencies == default_currencies
+    assert user_manager.bot_message_broker.keyframe_requests == [None]
+
+
+def test_restarted_parser_starts_from_a_keyframe(user_manager):
+    user_manager.on_update_currencies(make_delta(60, {'BTC': 63000.0}, is_keyframe=True))
+    user_manager.on_update_currencies(make_delta(1, {'BTC': 61000.0}, is_keyframe=True))
+    user_manager.on_update_currencies(make_delta(2, {'BTC': 62000.0}))
+
+    assert user_manager.currencies == {'BTC': 62000.0}
+
+
+def test_full_snapshot_of_an_older_parser_replaces_the_currencies(user_manager):
+    user_manager.on_update_currencies({'BTC': 63000.0, 'ETH': 3000.0})
+
+    assert user_manager.currencies == {'BTC': 63000.0, 'ETH': 3000.0}
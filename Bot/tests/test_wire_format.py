@@ -0,0 +1,35 @@
+from wire_format import BINARY_CONTENT_TYPE, JSON_CONTENT_TYPE, WireFormatError, decode_message, encode_message
+
+import json
+import pytest
+
+
+def make_snapshot_delta():
+    return {
+        "version": 7,
+        "base_version": 6,
+        "is_keyframe": False,
+        "timestamp": 1700000000.25,
+        "currencies": {'BTC': 63000.5, 'ETH': 3000.0},
+        "removed": ['BNB']
+    }
+
+
+def test_binary_currency_update_is_decoded():
+    body, content_type = encode_message(make_snapshot_delta(), 'binary')
+
+    assert content_type == f'{BINARY_CONTENT_TYPE}; version=1'
+    assert decode_message(body, content_type) == make_snapshot_delta()
+
+
+def test_notifications_are_decoded_from_json():
+    notifications = [{"id": '0123456789abcdef', "user": [1, 'user_1'], "pair1_name": 'BTC', "pair2_name": 'USDT', "check_value": 63000.0, "now_pair_value": 63100.0}]
+
+    assert decode_message(json.dumps(notifications).encode('utf-8'), JSON_CONTENT_TYPE) == notifications
+    assert decode_message(json.dumps(notifications)) == notifications
+
+
+@pytest.mark.parametrize('body', [b'', b'BW', b'XX\x01\x00', b'BW\x02\x00'])
+def test_malformed_binary_message_is_rejected(body):
+    with pytest.raises(WireFormatError):
+        decode_message(body, BINARY_CONTENT_TYPE)
@@ -1,8 +1,32 @@
 from binance_parser import BinanceParser
+from binance_api_parser import BinanceApiParser
+from binance_stream_parser import BinanceStreamParser
+from binance_pages_parser import BinancePagesParser
+from replay_parser import ReplayParser
 from parser_message_broker import ParserMessageBroker
 from parser_logger import ParserLogger
+from snapshot_differ import SnapshotDiffer
+from tick_scheduler import TickScheduler
+from snapshot_recorder import SnapshotRecorder
+from condition_evaluator import ConditionEvaluator
+from sharded_condition_evaluator import ShardedConditionEvaluator, reshard_mq_cache
+from parser_pipeline import ParserPipeline
+from sqlite_condition_store import SqliteConditionStore
+from condition_journal import ConditionJournal, migrate_legacy_cache
+from wire_format import WIRE_FORMATS
+from time import time
 
-from time import sleep
+import argparse
+import asyncio
+
+# Available sources of currency data, selected with the "--source" argument
+CURRENCY_SOURCES = {
+    'selenium': BinanceParser,
+    'api': BinanceApiParser,
+    'stream': BinanceStreamParser,
+    'pages': BinancePagesParser,
+    'replay': ReplayParser
+}
 
 class BinanceMessageProcessor():
     """
@@ -10,183 +34,255 @@ class BinanceMessageProcessor():
 
     Attributes:
         parser_docker_logger (ParserLogger): Logger for recording events.
-        parser (BinanceParser): Parser for retrieving currency pair data.
+        parser (CurrencySource): Source for retrieving currency pair data.
         message_broker (ParserMessageBroker): Message broker for handling message queues.
-        delay (int): Delay between message processing cycles.
+        snapshot_differ (SnapshotDiffer): Differ turning currencies snapshots into versioned deltas.
+        delay (int): Target period of message processing cycles.
+        tick_scheduler (TickScheduler): Scheduler of message processing cycles.
+        condition_evaluator (ConditionEvaluator): Evaluator of user conditions.
+        snapshot_recorder (SnapshotRecorder or None): Recorder of every fetched currencies snapshot.
     """
 
-    def __init__(self, parser_docker_logger, delay=1) -> None:
+    def __init__(self, parser_docker_logger, parser=None, delay=1, tick_scheduler=None, message_broker=None, snapshot_recorder=None, condition_evaluator=None) -> None:
         """
-        Initializes BinanceMessageProcessor with the given logger and delay.
+        Initializes BinanceMessageProcessor with the given logger, currency source and delay.
 
         Args:
             parser_docker_logger (ParserLogger): Logger for recording events.
-            delay (int): Delay between message processing cycles (in seconds).
+            parser (CurrencySource, optional): Source for retrieving currency pair data. Defaults to BinanceParser.
+            delay (int): Target period of message processing cycles (in seconds).
+            tick_scheduler (TickScheduler, optional): Scheduler of message processing cycles. Defaults to a TickScheduler with the `delay` period.
+            message_broker (ParserMessageBroker, optional): Message broker for handling message queues. Defaults to a new ParserMessageBroker.
+            snapshot_recorder (SnapshotRecorder, optional): Recorder of every fetched currencies snapshot. Defaults to None.
+            condition_evaluator (ConditionEvaluator, optional): Evaluator of user conditions. Defaults to a ConditionEvaluator
+                                                                of the conditions of `message_broker`.
         """
         self.parser_docker_logger = parser_docker_logger
-        self.parser = BinanceParser(self.parser_docker_logger)
+        self.parser = parser if parser is not None else BinanceParser(self.parser_docker_logger)
+
+        self.message_broker = message_broker if message_broker is not None else ParserMessageBroker(self.parser_docker_logger)
+        self.snapshot_recorder = snapshot_recorder
 
-        self.message_broker = ParserMessageBroker(self.parser_docker_logger)
+        self.snapshot_differ = SnapshotDiffer()
 
         self.delay = delay
+        self.tick_scheduler = tick_scheduler if tick_scheduler is not None else TickScheduler(period=self.delay)
+
+        if condition_evaluator is None:
+            condition_evaluator = ConditionEvaluator(self.parser_docker_logger, self.message_broker)
+        self.condition_evaluator = condition_evaluator
 
-    @staticmethod
-    def condition_check(condition_flag, value1, value2):
+    def publish_snapshot(self, currencies, timestamp=None, message_broker=None):
         """
-        Checks a condition based on the given flag and values.
+        Stores a currencies snapshot and publishes its delta to the 'parser_info_queue'.
 
         Args:
-            condition_flag (bool): Condition flag.
-            value1 (float): First value for comparison.
-            value2 (float): Second value for comparison.
+            currencies (dict): Currencies snapshot.
+            timestamp (float, optional): Time of the snapshot in seconds. Defaults to the current time.
+            message_broker (ParserMessageBroker, optional): Broker the delta is published with. Defaults to the broker of the processor.
 
         Returns:
-            bool: Result of the condition check.
+            set: Names of currencies whose value changed since the previous snapshot.
         """
-        if condition_flag is True:
-            return value1 > value2
-        return value1 <= value2
-    
-    def update_condition_flag(self, pair1_keys, pair2_keys, pair1_id, pair2_id, condition_id, now_pair_value, check_value):
-        """
-        Updates the condition flag for the current currency pair.
+        if len(currencies) > 0 and self.snapshot_recorder is not None:
+            self.snapshot_recorder.record(currencies, timestamp)
 
-        Args:
-            pair1_keys (list): List of keys for the first currency pair.
-            pair2_keys (list): List of keys for the second currency pair.
-            pair1_id (int): Index of the first currency pair.
-            pair2_id (int): Index of the second currency pair.
-            condition_id (int): Index of the condition.
-            now_pair_value (float): Current value of the currency pair.
-            check_value (float): Value for condition checking.
-        """
-        self.message_broker.mq[pair1_keys[pair1_id]][pair2_keys[pair2_id]][condition_id]["condition_flag"] = self.message_broker.set_condition_flag(
-            self.message_broker.mq[pair1_keys[pair1_id]][pair2_keys[pair2_id]][condition_id]["condition_flag"], 
-            check_value, 
-            now_pair_value
-        )
-    
-    def process_message(self, pair1_keys, pair2_keys, pair1_id, pair2_id, condition_id, now_pair_value):
-        """
-        Processes a message for the current currency pair and condition.
+        if message_broker is None:
+            message_broker = self.message_broker
+
+        # The bot missed a delta, the next one restores all currencies
+        if message_broker.take_keyframe_requests() is True:
+            self.snapshot_differ.request_keyframe()
+
+        snapshot_delta, changed_names = self.snapshot_differ.diff(currencies)
+        if snapshot_delta is not None:
+            self.parser_docker_logger.update_currencies(currencies)
+            message_broker.send_message2parser_info_queue(snapshot_delta)
+
+        return changed_names
+
+    def check_mq(self, currencies=None):
+        """
+        Checks the message queue and processes conditions for currency pairs.
 
         Args:
-            pair1_keys (list): List of keys for the first currency pair.
-            pair2_keys (list): List of keys for the second currency pair.
-            pair1_id (int): Index of the first currency pair.
-            pair2_id (int): Index of the second currency pair.
-            condition_id (int): Index of the condition.
-            now_pair_value (float): Current value of the currency pair.
+            currencies (dict, optional): Currencies to check conditions with. Defaults to fresh currencies of the parser.
 
         Returns:
-            bool: Result of the condition check.
+            bool: True if the tick was idle: there were no conditions or no price changes.
         """
-        check_value = self.message_broker.mq[pair1_keys[pair1_id]][pair2_keys[pair2_id]][condition_id]["check_value"]
+        if currencies is None:
+            currencies = self.parser.get_currencies()
+        timestamp = time()
 
-        self.update_condition_flag(pair1_keys, pair2_keys, pair1_id, pair2_id, condition_id, now_pair_value, check_value)
+        changed_names = self.publish_snapshot(currencies, timestamp)
+        is_idle = self.condition_evaluator.check_conditions(currencies, changed_names, timestamp)
 
-        message = self.message_broker.mq[pair1_keys[pair1_id]][pair2_keys[pair2_id]][condition_id]
-        
-        condition_result = self.condition_check(message["condition_flag"], now_pair_value, check_value)
-        self.parser_docker_logger.add_message_condition(
-            message, 
-            pair1_keys[pair1_id], 
-            pair2_keys[pair2_id], 
-            condition_result, 
-            now_pair_value, 
-            check_value
-        )
-        return condition_result
-    
-    def process_conditions(self, pair1_keys, pair2_keys, pair1_id, pair2_id, currencies):
-        """
-        Processes all conditions for the current currency pair.
+        # Messages routed to shards are stored during the tick, they are acknowledged only now
+        if self.condition_evaluator.get_unstored_message_count() == 0:
+            self.message_broker.ack_bot2parser_queue()
 
-        Args:
-            pair1_keys (list): List of keys for the first currency pair.
-            pair2_keys (list): List of keys for the second currency pair.
-            pair1_id (int): Index of the first currency pair.
-            pair2_id (int): Index of the second currency pair.
-            currencies (dict): Dictionary with currency data.
-        """
-        condition_id = 0
-        now_pair_value = self.parser.get_pair(currencies, pair1_keys[pair1_id], pair2_keys[pair2_id])
-        if now_pair_value is None:
-            self.parser_docker_logger.log_exception(f'Getting pair was unsuccessful. First currency pair name: {pair1_keys[pair1_id]}, second currency pair name: {pair2_keys[pair2_id]}. Process conditions was canceled.')
-            return
-
-        while pair1_id < len(pair1_keys) and pair2_id < len(pair2_keys) and condition_id < len(self.message_broker.mq[pair1_keys[pair1_id]][pair2_keys[pair2_id]]):
-            condition_result = self.process_message(
-                pair1_keys, 
-                pair2_keys, 
-                pair1_id, 
-                pair2_id, 
-                condition_id, 
-                now_pair_value
-            )
-
-            if condition_result is True:
-                pair1_keys, pair2_keys = self.message_broker.send_message2parser2bot_queue(
-                    pair1_keys[pair1_id], 
-                    pair2_keys[pair2_id], 
-                    condition_id, 
-                    now_pair_value, 
-                    pair1_keys, 
-                    pair2_keys
-                )
-            else:
-                condition_id += 1
-    
-    def check_mq(self):
+        self.parser_docker_logger.log()
+        return is_idle
+
+    def read_messages(self):
         """
-        Checks the message queue and processes conditions for currency pairs.
+        Reads all messages waiting in the 'bot2parser_queue' and passes them to the condition evaluator.
+
+        Messages are taken in batches of at most the prefetch count, every batch is acknowledged at once
+        after its conditions are stored. Conditions the evaluator stores later, as the shards do on the
+        next tick, are acknowledged by `check_mq`, so at most the prefetch count of them is read per tick.
+
+        Returns:
+            int: Number of read messages.
         """
-        currencies = self.parser.get_currencies()
+        read_count = 0
+        while True:
+            messages = self.message_broker.get_messages_from_bot2parser_queue()
+            if len(messages) == 0:
+                break
 
-        self.parser_docker_logger.update_currencies(currencies)
+            for message in messages:
+                self.condition_evaluator.add_message(message)
+            read_count += len(messages)
 
-        self.message_broker.send_message2parser_info_queue(currencies)
-        
-        if len(self.message_broker.mq) == 0:
-            self.parser_docker_logger.log()
-            return
-        
+            if self.condition_evaluator.get_unstored_message_count() > 0:
+                break
+            self.message_broker.ack_bot2parser_queue()
 
-        pair1_keys = list(self.message_broker.mq.keys())
-        pair1_id = 0
-        while pair1_id < len(pair1_keys):
-            pair2_keys = list(self.message_broker.mq[pair1_keys[pair1_id]].keys())
-            pair2_id = 0
-            while pair1_id < len(pair1_keys) and pair2_id < len(pair2_keys):
-                self.process_conditions(pair1_keys, pair2_keys, pair1_id, pair2_id, currencies)
-                
-                pair2_id += 1
+        self.parser_docker_logger.add_stats('Intake', self.message_broker.get_intake_stats_string())
+        return read_count
 
-            pair1_id += 1
+    def get_nearest_distance(self):
+        """
+        Finds the relative distance of the closest condition to its threshold.
 
-        self.parser_docker_logger.log()
+        Returns:
+            float or None: The smallest distance among pairs with conditions, or None if there are no evaluated conditions.
+        """
+        return self.condition_evaluator.get_nearest_distance()
 
     def process_messages(self):
         """
         Main loop for processing messages from the queue.
         """
         while True:
-            self.message_broker.read_message_from_bot2parser_queue()
-            self.check_mq()
-            sleep(self.delay)
+            self.tick_scheduler.start_tick()
+            self.parser_docker_logger.add_stats('Scheduler', self.tick_scheduler.get_stats_string())
 
-    def __call__(self):
+            read_count = self.read_messages()
+            is_idle = self.check_mq() and read_count == 0
+            # New conditions cut an idle backoff short, so they aren`t read later than the base period
+            self.tick_scheduler.wait(is_idle, self.get_nearest_distance(), self.message_broker.wait_bot2parser_messages)
+
+    async def process_stream(self):
+        """
+        Main loop for streaming sources: checks conditions every time prices change.
+        """
+        async for currencies, changed_names in self.parser.stream():
+            self.read_messages()
+            self.check_mq(currencies)
+
+    def __call__(self, is_pipelined=False):
         """
         Starts the main message processing loop, handling KeyboardInterrupt.
+
+        The evaluator, the broker and the parser are closed however the loop stops, so no shard process is left behind.
+
+        Args:
+            is_pipelined (bool, optional): If True, runs fetching, reading of new conditions, evaluation
+                                           and cache writes as concurrent pipeline stages. Defaults to False.
         """
+        parser_pipeline = None
         try:
-            self.process_messages()
+            if is_pipelined is True:
+                parser_pipeline = ParserPipeline(self)
+                parser_pipeline.run()
+            elif self.parser.is_streaming is True:
+                asyncio.run(self.process_stream())
+            else:
+                self.process_messages()
         except KeyboardInterrupt:
+            pass
+        finally:
+            if parser_pipeline is not None:
+                parser_pipeline.stop()
+
+            self.condition_evaluator.close()
             self.message_broker.close_connection()
+            self.parser.close()
+
+            if self.snapshot_recorder is not None:
+                self.snapshot_recorder.close()
 
 
 if __name__=='__main__':
+    # Parsing command-line arguments to get the currency source
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--source', choices=list(CURRENCY_SOURCES.keys()), default='selenium', help='Source of currency data')
+    args_parser.add_argument('--url', default=None, help='Overrides the URL of the currency source')
+    args_parser.add_argument('--page-count', type=int, default=5, help='Number of market segments fetched by the "pages" source')
+    args_parser.add_argument('--max-workers', type=int, default=5, help='Number of segments fetched at the same time by the "pages" source')
+    args_parser.add_argument('--max-page-age', type=float, default=10.0, help='Maximum age of prices the "pages" source reuses for a failed segment in seconds')
+    args_parser.add_argument('--record', default=None, help='Path to a file every fetched currencies snapshot is appended to')
+    args_parser.add_argument('--replay-path', default='snapshots.rec', help='Path to the records file replayed by the "replay" source')
+    args_parser.add_argument('--replay-speed', type=float, default=1.0, help='Replay speed of the "replay" source, 0 replays as fast as possible')
+    args_parser.add_argument('--period', type=float, default=1.0, help='Target period between processing ticks in seconds')
+    args_parser.add_argument('--min-period', type=float, default=0.25, help='Tick period while some condition is close to its threshold')
+    args_parser.add_argument('--max-period', type=float, default=10.0, help='Upper bound of the tick period while the parser is idle')
+    args_parser.add_argument('--mq-cache', default='mq_cache.bpcs', help='Path to the cache file of user conditions')
+    args_parser.add_argument('--shards', type=int, default=1, help='Number of processes evaluating conditions, each owns a hash partition of the pairs')
+    args_parser.add_argument('--pipeline', action='store_true', help='Runs fetching, reading of new conditions, evaluation and cache writes concurrently')
+    args_parser.add_argument('--store', choices=['memory', 'sqlite'], default='memory', help='Store of user conditions: in memory with the --mq-cache file or a SQLite database')
+    args_parser.add_argument('--sqlite-path', default='conditions.db', help='Path to the database of the "sqlite" store')
+    args_parser.add_argument('--prefetch', type=int, default=1000, help='Number of new conditions taken from the queue before they are acknowledged')
+    args_parser.add_argument('--info-ttl', type=float, default=300.0, help='Time a currency update waits for the bot in the queue before it expires in seconds')
+    args_parser.add_argument('--wire-format', choices=WIRE_FORMATS, default='json', help='Format of currency updates sent to the bot, "binary" for bots reading the binary format')
+    args = args_parser.parse_args()
+
+    if args.store == 'sqlite' and args.shards > 1:
+        args_parser.error('the "sqlite" store can`t be used with several shards')
+
     parser_docker_logger = ParserLogger()
-    binance_message_processor = BinanceMessageProcessor(parser_docker_logger)
 
-    binance_message_processor()
\ No newline at end of file
+    args.mq_cache = migrate_legacy_cache(args.mq_cache, parser_docker_logger)
+
+    source_kwargs = {} if args.url is None else {'url': args.url}
+    if args.source == 'pages':
+        source_kwargs.update(page_count=args.page_count, max_workers=args.max_workers, max_page_age=args.max_page_age)
+    if args.source == 'replay':
+        source_kwargs = {'path_to_records': args.replay_path, 'speed': args.replay_speed}
+    parser = CURRENCY_SOURCES[args.source](parser_docker_logger, **source_kwargs)
+
+    tick_scheduler = TickScheduler(period=args.period, min_period=args.min_period, max_period=args.max_period)
+
+    snapshot_recorder = SnapshotRecorder(args.record) if args.record is not None else None
+
+    if args.shards > 1:
+        # Shards own the conditions and their cache files, the main process only routes messages
+        message_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=None, prefetch_count=args.prefetch, wire_format=args.wire_format, info_ttl=args.info_ttl)
+        condition_evaluator = ShardedConditionEvaluator(parser_docker_logger, args.shards, path_to_mq_cache=args.mq_cache)
+    elif args.store == 'sqlite':
+        condition_store = SqliteConditionStore(args.sqlite_path)
+        if len(condition_store) == 0:
+            # The first start with the database takes over the conditions of the cache file
+            condition_store.load_dict(ConditionJournal(args.mq_cache).recover())
+
+        message_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=None, condition_store=condition_store, prefetch_count=args.prefetch, wire_format=args.wire_format, info_ttl=args.info_ttl)
+        condition_evaluator = None
+    else:
+        reshard_mq_cache(args.mq_cache, 1)
+        message_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=args.mq_cache, prefetch_count=args.prefetch, wire_format=args.wire_format, info_ttl=args.info_ttl)
+        condition_evaluator = None
+
+    binance_message_processor = BinanceMessageProcessor(
+        parser_docker_logger,
+        parser=parser,
+        delay=args.period,
+        tick_scheduler=tick_scheduler,
+        message_broker=message_broker,
+        snapshot_recorder=snapshot_recorder,
+        condition_evaluator=condition_evaluator
+    )
+
+    binance_message_processor(is_pipelined=args.pipeline)
\ No newline at end of file
@@ -0,0 +1,101 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+from currency_source import CurrencySource
+
+class BinanceApiParser(CurrencySource):
+    """
+    A lightweight parser that reads currency data from the Binance JSON ticker endpoint.
+
+    Unlike `BinanceParser` it doesn`t need a browser: every tick is a single request
+    over a pooled keep-alive HTTP session.
+
+    Attributes:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        url (str): URL of the JSON ticker endpoint.
+        quote_asset (str): Asset all prices are quoted in, its own value is 1.0.
+        timeout (float): Request timeout in seconds.
+        session (requests.Session): Pooled HTTP session.
+    """
+
+    def __init__(self, parser_docker_logger, url='https://api.binance.com/api/v3/ticker/price', quote_asset='USDT', timeout=5.0, pool_size=4) -> None:
+        """
+        Initializes the BinanceApiParser with a logger and sets up the HTTP session.
+
+        Args:
+            parser_docker_logger (ParserLogger): Logger for recording events.
+            url (str, optional): URL of the JSON ticker endpoint. Defaults to 'https://api.binance.com/api/v3/ticker/price'.
+            quote_asset (str, optional): Asset all prices are quoted in. Defaults to 'USDT'.
+            timeout (float, optional): Request timeout in seconds. Defaults to 5.0.
+            pool_size (int, optional): Maximum number of kept-alive connections. Defaults to 4.
+        """
+        super().__init__(parser_docker_logger)
+        self.url = url
+        self.quote_asset = quote_asset
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def parse_tickers(self, tickers):
+        """
+        Converts the ticker list returned by the endpoint into a currencies dictionary.
+
+        Args:
+            tickers (list): List of dictionaries with "symbol" and "price" keys.
+
+        Returns:
+            dict: A dictionary with currency names as keys and their values in the quote asset as values.
+        """
+        currencies = {self.quote_asset: 1.0}
+        quote_asset_length = len(self.quote_asset)
+
+        for ticker in tickers:
+            symbol = ticker["symbol"]
+            if symbol.endswith(self.quote_asset) is False or len(symbol) == quote_asset_length:
+                continue
+
+            currencies[symbol[:-quote_asset_length]] = float(ticker["price"])
+
+        return currencies
+
+    def get_currencies(self):
+        """
+        Fetches currency data from the JSON ticker endpoint.
+
+        Tries to fetch the data multiple times in case of failures.
+
+        Returns:
+            dict: A dictionary with currency names as keys and their values in the quote asset as values.
+        """
+        is_excepted = False
+
+        max_retries = 5
+        retries = 0
+
+        while retries < max_retries:
+            try:
+                response = self.session.get(self.url, timeout=self.timeout)
+                response.raise_for_status()
+
+                currencies = self.parse_tickers(response.json())
+
+                if is_excepted is True:
+                    self.parser_docker_logger.log_info(f'The parser problem was solved!')
+                return currencies
+            except (requests.RequestException, ValueError, KeyError, TypeError) as error:
+                is_excepted = True
+                self.parser_docker_logger.log_exception(f'The parser had a problem with this url: "{self.url}". Exception: "{error}". Retrying {retries}/{max_retries}...')
+                retries += 1
+
+        self.parser_docker_logger.log_exception(f'The parser could not resolve the problem after {max_retries} attempts. The result currencies was empty.')
+
+        return {}
+
+    def close(self):
+        """
+        Closes the HTTP session and its pooled connections.
+        """
+        self.session.close()
@@ -0,0 +1,184 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+import json
+import requests
+
+from binance_api_parser import BinanceApiParser
+
+class BinancePagesParser(BinanceApiParser):
+    """
+    A parser that covers the whole market by fetching its segments concurrently.
+
+    The markets overview page is rendered by scripts, so its pages can`t be
+    fetched as HTML. The parser takes the listed symbols quoted in the quote
+    asset from the exchange info endpoint instead, splits them into `page_count`
+    segments and fetches the prices of every segment from the JSON ticker
+    endpoint with its "symbols" parameter. Segments are fetched concurrently
+    through a bounded worker pool over one pooled HTTP session and merged into
+    a single currencies snapshot, so a tick takes about as long as the slowest
+    segment instead of the sum of all segments.
+
+    If a segment fails, its last parsed prices are reused while they are younger
+    than `max_page_age`, older ones are dropped, so conditions are never checked
+    against stale prices. The list of symbols is taken again every `symbols_ttl`.
+
+    Attributes:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        url (str): URL of the JSON ticker endpoint.
+        symbols_url (str): URL of the exchange info endpoint listing the symbols.
+        quote_asset (str): Asset all prices are quoted in, its own value is 1.0.
+        timeout (float): Request timeout in seconds.
+        session (requests.Session): Pooled HTTP session shared by the workers.
+        page_count (int): Number of segments the symbols are split into.
+        max_retries (int): Number of attempts per segment.
+        max_page_age (float): Maximum age of reused prices of a failed segment in seconds.
+        symbols_ttl (float): Time the list of symbols is kept in seconds.
+        executor (ThreadPoolExecutor): Bounded pool of segment fetching workers.
+        pages (list): Lists of symbols of the segments.
+        symbols_time (float or None): Monotonic time the list of symbols was taken at.
+        page_currencies (dict): Segment numbers and tuples (monotonic time, currencies) of their last parsed prices.
+        completeness (dict): Completeness of the last tick.
+    """
+
+    def __init__(self, parser_docker_logger, url='https://api.binance.com/api/v3/ticker/price', symbols_url='https://api.binance.com/api/v3/exchangeInfo', quote_asset='USDT', page_count=5, max_workers=5, timeout=5.0, max_retries=3, max_page_age=10.0, symbols_ttl=3600.0) -> None:
+        """
+        Initializes the BinancePagesParser with a logger and sets up the worker pool.
+
+        Args:
+            parser_docker_logger (ParserLogger): Logger for recording events.
+            url (str, optional): URL of the JSON ticker endpoint. Defaults to 'https://api.binance.com/api/v3/ticker/price'.
+            symbols_url (str, optional): URL of the exchange info endpoint. Defaults to 'https://api.binance.com/api/v3/exchangeInfo'.
+            quote_asset (str, optional): Asset all prices are quoted in. Defaults to 'USDT'.
+            page_count (int, optional): Number of segments the symbols are split into. Defaults to 5.
+            max_workers (int, optional): Maximum number of segments fetched at the same time. Defaults to 5.
+            timeout (float, optional): Request timeout in seconds. Defaults to 5.0.
+            max_retries (int, optional): Number of attempts per segment. Defaults to 3.
+            max_page_age (float, optional): Maximum age of reused prices of a failed segment in seconds. Defaults to 10.0.
+            symbols_ttl (float, optional): Time the list of symbols is kept in seconds. Defaults to 3600.0.
+        """
+        super().__init__(parser_docker_logger, url=url, quote_asset=quote_asset, timeout=timeout, pool_size=max_workers)
+        self.symbols_url = symbols_url
+        self.page_count = page_count
+        self.max_retries = max_retries
+        self.max_page_age = max_page_age
+        self.symbols_ttl = symbols_ttl
+
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        self.pages = []
+        self.symbols_time = None
+        self.page_currencies = {}
+        self.completeness = {}
+
+    def update_pages(self):
+        """
+        Takes the listed symbols and splits them into segments once the list is older than `symbols_ttl`.
+
+        The previous segments are kept if the exchange info endpoint fails.
+        """
+        if self.symbols_time is not None and monotonic() - self.symbols_time < self.symbols_ttl:
+            return
+
+        try:
+            response = self.session.get(self.symbols_url, timeout=self.timeout)
+            response.raise_for_status()
+
+            symbols = [
+                symbol_info["symbol"]
+                for symbol_info in response.json()["symbols"]
+                if symbol_info["quoteAsset"] == self.quote_asset and symbol_info.get("status", 'TRADING') == 'TRADING'
+            ]
+        except (requests.RequestException, ValueError, KeyError, TypeError) as error:
+            self.parser_docker_logger.log_exception(f'The parser had a problem with this url: "{self.symbols_url}". Exception: "{error}". The previous symbols were kept.')
+            return
+
+        page_size = max(-(-len(symbols) // self.page_count), 1)
+        pages = [symbols[page_start:page_start + page_size] for page_start in range(0, len(symbols), page_size)]
+
+        # Reused prices belong to the segments they were fetched for
+        if pages != self.pages:
+            self.page_currencies = {}
+        self.pages = pages
+        self.symbols_time = monotonic()
+
+    def get_page_currencies(self, page):
+        """
+        Fetches and parses the prices of one segment.
+
+        Args:
+            page (int): Segment number starting from 1.
+
+        Returns:
+            dict or None: Currencies of the segment, or None if all attempts failed.
+        """
+        symbols = json.dumps(self.pages[page - 1], separators=(',', ':'))
+
+        for retries in range(self.max_retries):
+            try:
+                response = self.session.get(self.url, params={'symbols': symbols}, timeout=self.timeout)
+                response.raise_for_status()
+
+                return self.parse_tickers(response.json())
+            except (requests.RequestException, ValueError, KeyError, TypeError) as error:
+                self.parser_docker_logger.log_exception(f'The parser had a problem with this url: "{self.url}" (segment {page}). Exception: "{error}". Retrying {retries}/{self.max_retries}...')
+
+        return None
+
+    def get_currencies(self):
+        """
+        Fetches all segments concurrently and merges them into one snapshot.
+
+        Returns:
+            dict: A dictionary with currency names as keys and their values in the quote asset as values.
+        """
+        self.update_pages()
+
+        pages = list(range(1, len(self.pages) + 1))
+        fresh_pages = 0
+        stale_pages = 0
+        expired_pages = 0
+
+        now = monotonic()
+        for page, page_currencies in zip(pages, self.executor.map(self.get_page_currencies, pages)):
+            if page_currencies is not None:
+                self.page_currencies[page] = (now, page_currencies)
+                fresh_pages += 1
+            elif page in self.page_currencies:
+                if now - self.page_currencies[page][0] <= self.max_page_age:
+                    stale_pages += 1
+                else:
+                    del self.page_currencies[page]
+                    expired_pages += 1
+
+        currencies = {}
+        for page in pages:
+            if page in self.page_currencies:
+                currencies.update(self.page_currencies[page][1])
+
+        self.completeness = {
+            "fresh_pages": fresh_pages,
+            "stale_pages": stale_pages,
+            "expired_pages": expired_pages,
+            "page_count": len(pages),
+            "currency_count": len(currencies)
+        }
+        self.parser_docker_logger.add_stats(
+            'Completeness',
+            f'{fresh_pages}/{len(pages)} segments fresh, {stale_pages} stale, {expired_pages} expired, {len(currencies)} currencies'
+        )
+
+        if fresh_pages < len(pages):
+            self.parser_docker_logger.log_exception(
+                f'The parser could not fetch {len(pages) - fresh_pages} of {len(pages)} segments. ' \
+                f'{stale_pages} of them were taken from the previous ticks, prices of {len(pages) - fresh_pages - stale_pages} are missing.'
+            )
+
+        return currencies
+
+    def close(self):
+        """
+        Stops the worker pool and closes the HTTP session.
+        """
+        self.executor.shutdown()
+        super().close()
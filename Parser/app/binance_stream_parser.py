@@ -0,0 +1,153 @@
+import websockets
+
+from currency_source import CurrencySource
+
+import asyncio
+import json
+
+class BinanceStreamParser(CurrencySource):
+    """
+    A streaming parser that keeps one WebSocket subscribed to Binance ticker updates.
+
+    Instead of being polled, the parser pushes every batch of price changes
+    into the processor as soon as it arrives. The connection is re-opened and
+    the streams are re-subscribed after any disconnect.
+
+    Attributes:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        url (str): URL of the WebSocket endpoint.
+        streams (list): Names of the subscribed streams.
+        quote_asset (str): Asset all prices are quoted in, its own value is 1.0.
+        reconnect_delay (float): First delay before reconnecting in seconds, doubled after every failed attempt.
+        max_reconnect_delay (float): Upper bound of the reconnect delay in seconds.
+        currencies (dict): Last known values of all currencies.
+        reconnects (int): Number of reconnections since start.
+    """
+
+    is_streaming = True
+
+    def __init__(self, parser_docker_logger, url='wss://stream.binance.com:9443/ws', streams=('!miniTicker@arr',), quote_asset='USDT', reconnect_delay=1.0, max_reconnect_delay=30.0) -> None:
+        """
+        Initializes the BinanceStreamParser with a logger and stream settings.
+
+        Args:
+            parser_docker_logger (ParserLogger): Logger for recording events.
+            url (str, optional): URL of the WebSocket endpoint. Defaults to 'wss://stream.binance.com:9443/ws'.
+            streams (tuple, optional): Names of the streams to subscribe. Defaults to ('!miniTicker@arr',).
+            quote_asset (str, optional): Asset all prices are quoted in. Defaults to 'USDT'.
+            reconnect_delay (float, optional): First delay before reconnecting in seconds. Defaults to 1.0.
+            max_reconnect_delay (float, optional): Upper bound of the reconnect delay in seconds. Defaults to 30.0.
+        """
+        super().__init__(parser_docker_logger)
+        self.url = url
+        self.streams = list(streams)
+        self.quote_asset = quote_asset
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+        self.currencies = {self.quote_asset: 1.0}
+        self.reconnects = 0
+        self.subscribe_id = 0
+
+    def get_currencies(self):
+        """
+        Returns the last known values of all currencies.
+
+        Returns:
+            dict: A dictionary with currency names as keys and their values in the quote asset as values.
+        """
+        return dict(self.currencies)
+
+    def update_currencies(self, tickers):
+        """
+        Applies a batch of ticker updates to the known currencies.
+
+        Args:
+            tickers (list): List of ticker events with "s" (symbol) and "c" (last price) keys.
+
+        Returns:
+            list: Names of currencies whose value changed.
+        """
+        changed_names = []
+        quote_asset_length = len(self.quote_asset)
+
+        for ticker in tickers:
+            symbol = ticker.get("s", "")
+            if symbol.endswith(self.quote_asset) is False or len(symbol) == quote_asset_length:
+                continue
+
+            currency_name = symbol[:-quote_asset_length]
+            currency_value = float(ticker["c"])
+            if self.currencies.get(currency_name) != currency_value:
+                self.currencies[currency_name] = currency_value
+                changed_names.append(currency_name)
+
+        return changed_names
+
+    async def subscribe(self, websocket):
+        """
+        Subscribes the connection to the configured streams.
+
+        Args:
+            websocket (websockets.WebSocketClientProtocol): Open connection.
+        """
+        self.subscribe_id += 1
+        await websocket.send(json.dumps({
+            "method": "SUBSCRIBE",
+            "params": self.streams,
+            "id": self.subscribe_id
+        }))
+
+    @staticmethod
+    def get_tickers(message):
+        """
+        Extracts ticker events from a stream message.
+
+        Args:
+            message (dict|list): Decoded stream message.
+
+        Returns:
+            list: Ticker events, empty for service messages.
+        """
+        if isinstance(message, dict) and "data" in message:
+            message = message["data"]
+        if isinstance(message, dict):
+            return [message] if "s" in message else []
+        return message
+
+    async def stream(self):
+        """
+        Yields currencies every time a stream message changes some of them.
+
+        Reconnects with an exponential backoff and re-subscribes after every disconnect.
+
+        Yields:
+            tuple: A dictionary with the last known values of all currencies and a list of changed currency names.
+        """
+        reconnect_delay = self.reconnect_delay
+
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as websocket:
+                    await self.subscribe(websocket)
+
+                    if self.reconnects > 0:
+                        self.parser_docker_logger.log_info(f'The stream parser reconnected to "{self.url}" and re-subscribed to {self.streams}.')
+                    reconnect_delay = self.reconnect_delay
+
+                    async for raw_message in websocket:
+                        try:
+                            tickers = self.get_tickers(json.loads(raw_message))
+                            changed_names = self.update_currencies(tickers)
+                        except (ValueError, KeyError, TypeError, AttributeError) as error:
+                            self.parser_docker_logger.log_exception(f'The stream parser received a broken message: "{raw_message[:200]}". Exception: "{error}". Message skipped.')
+                            continue
+
+                        if len(changed_names) > 0:
+                            yield self.currencies, changed_names
+            except (websockets.WebSocketException, OSError, asyncio.TimeoutError) as error:
+                self.parser_docker_logger.log_exception(f'The stream parser lost the connection to "{self.url}". Exception: "{error}". Reconnecting in {reconnect_delay} seconds...')
+
+            self.reconnects += 1
+            await asyncio.sleep(reconnect_delay)
+            reconnect_delay = min(reconnect_delay * 2, self.max_reconnect_delay)
@@ -0,0 +1,410 @@
+from bisect import bisect_left
+from time import time
+from window_conditions import WindowConditionGroup, get_window_key
+
+# Second item of a threshold key. Conditions of the bucket pair keep the bound of their direction: "bigger than"
+# is met by a bigger value only, "lower than" by an equal value too. Conditions set on the inverted pair keep the
+# bound of their own order, which is the opposite one, so they sort on the other side of an equal value.
+INVERTED_BOUND = 0
+DIRECT_BOUND = 1
+
+def get_bucket_condition(message_data):
+    """
+    Returns the direction and the threshold of a threshold condition in the order of its bucket pair.
+
+    A condition set on the inverted pair is turned around: A/B > x is the same as B/A < 1/x.
+
+    Args:
+        message_data (dict): The condition with "user", "check_value", "condition_flag" and optional "is_inverted" keys.
+
+    Returns:
+        tuple: The condition flag and the check value of the bucket pair.
+    """
+    condition_flag = message_data["condition_flag"]
+    check_value = message_data["check_value"]
+
+    if message_data.get("is_inverted") is True:
+        condition_flag = None if condition_flag is None else not condition_flag
+        check_value = 1.0 / check_value if check_value != 0 else float('inf')
+
+    return condition_flag, check_value
+
+
+def resolve_pending_flag(message_data, now_pair_value):
+    """
+    Decides the direction of a "will cross" condition by the current value of its bucket pair.
+
+    The condition waits for the side of its threshold the pair is not on: it is "bigger than"
+    if its threshold is bigger than the value. A condition set on the inverted pair is decided
+    in its own order, so a value equal to its threshold gives the same direction in both orders.
+
+    Args:
+        message_data (dict): The condition.
+        now_pair_value (float): The current value of the bucket pair.
+
+    Returns:
+        bool: The condition flag in the order the condition was set for.
+    """
+    _, check_value = get_bucket_condition(message_data)
+    if message_data.get("is_inverted") is True:
+        # x > B/A of the inverted pair is 1/x < A/B of the bucket pair
+        return check_value < now_pair_value
+    return check_value > now_pair_value
+
+
+def get_threshold_bound(message_data):
+    """
+    Returns the bound of a threshold condition, the second item of its threshold key.
+
+    Args:
+        message_data (dict): The condition.
+
+    Returns:
+        int: `INVERTED_BOUND` for a condition set on the inverted pair, otherwise `DIRECT_BOUND`.
+    """
+    return INVERTED_BOUND if message_data.get("is_inverted") is True else DIRECT_BOUND
+
+
+class ConditionBucket():
+    """
+    Conditions of one currency pair indexed by their thresholds.
+
+    "Bigger than" and "lower than" thresholds are kept in two sorted lists of
+    distinct threshold keys, every key holds the group of conditions subscribed
+    to it, so identical conditions of many users are evaluated once. The groups
+    met by a pair value are always a prefix of the first list and a suffix of
+    the second one: a tick only bisects both lists and cuts the met ranges off
+    instead of checking every condition. A threshold key is a tuple (check value,
+    bound): conditions set on the inverted pair share the lists with the others,
+    turned to the bucket order, and their bound keeps the strictness of their own
+    order. B/A <= x is met at the equality, so its threshold A/B >= 1/x is met by
+    an equal value, unlike A/B > 1/x, and B/A > x is not, unlike A/B <= 1/x.
+    Keys of the same check value sort by the bound, so bisecting both lists for
+    (pair value, `DIRECT_BOUND`) cuts every condition at its own edge. "Will cross"
+    conditions wait in a pending list until the first pair value decides their direction.
+    Windowed conditions are kept in groups sharing one rolling window per
+    condition kind and window length. A cancelled condition is only marked,
+    it is dropped when its group is met or when marked conditions make up
+    half of the bucket and the bucket is rebuilt, so a cancellation doesn't
+    search the lists.
+
+    Attributes:
+        above_keys (list): Sorted distinct threshold keys of "bigger than" conditions.
+        above_groups (list): Lists of "bigger than" conditions in the order of `above_keys`.
+        below_keys (list): Sorted distinct threshold keys of "lower than" conditions.
+        below_groups (list): Lists of "lower than" conditions in the order of `below_keys`.
+        threshold_count (int): Number of conditions in the lists of groups.
+        pending_messages (list): "Will cross" conditions without a direction yet.
+        window_groups (dict): Tuples (kind, window) and their WindowConditionGroup.
+        cancelled_messages (set): Ids of cancelled condition objects still kept in the lists.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty ConditionBucket.
+        """
+        self.above_keys = []
+        self.above_groups = []
+        self.below_keys = []
+        self.below_groups = []
+        self.threshold_count = 0
+        self.pending_messages = []
+        self.window_groups = {}
+        self.cancelled_messages = set()
+
+    def __len__(self):
+        """
+        Returns the number of conditions in the bucket.
+
+        Returns:
+            int: Number of conditions.
+        """
+        window_count = sum(len(window_group) for window_group in self.window_groups.values())
+        return self.threshold_count + len(self.pending_messages) + window_count - len(self.cancelled_messages)
+
+    def has_window_conditions(self):
+        """
+        Checks if the bucket has windowed conditions.
+
+        Returns:
+            bool: True if there is at least one windowed condition.
+        """
+        return len(self.window_groups) > 0
+
+    @staticmethod
+    def resolve_condition_flag(condition_flag, check_value, now_pair_value):
+        """
+        Determine the condition flag based on the given values.
+
+        Args:
+            condition_flag (bool or None): The initial condition flag.
+            check_value (float): The value to check against.
+            now_pair_value (float): The current value of the pair.
+
+        Returns:
+            bool: The determined condition flag.
+        """
+        return check_value > now_pair_value if condition_flag is None else condition_flag
+
+    @staticmethod
+    def _insert(keys, groups, threshold_key, message_data):
+        """
+        Adds a condition to the group of its threshold key, creating the group if needed.
+
+        Args:
+            keys (list): Sorted distinct threshold keys.
+            groups (list): Lists of conditions in the order of `keys`.
+            threshold_key (tuple): The check value of the condition in the order of the bucket pair and its bound.
+            message_data (dict): The condition.
+        """
+        insert_id = bisect_left(keys, threshold_key)
+        if insert_id < len(keys) and keys[insert_id] == threshold_key:
+            groups[insert_id].append(message_data)
+            return
+
+        keys.insert(insert_id, threshold_key)
+        groups.insert(insert_id, [message_data])
+
+    def _get_threshold_lists(self, condition_flag):
+        """
+        Returns the lists a threshold condition is kept in.
+
+        Args:
+            condition_flag (bool): The condition flag in the order of the bucket pair.
+
+        Returns:
+            tuple: The sorted threshold keys and the groups of conditions.
+        """
+        if condition_flag is True:
+            return self.above_keys, self.above_groups
+        return self.below_keys, self.below_groups
+
+    def _get_threshold_messages(self):
+        """
+        Returns the conditions of all threshold groups.
+
+        Returns:
+            list: The conditions.
+        """
+        all_groups = self.above_groups + self.below_groups
+        return [message_data for group in all_groups for message_data in group]
+
+    def add(self, message_data):
+        """
+        Adds a condition to the bucket.
+
+        Args:
+            message_data (dict): The condition with "user", "check_value" and "condition_flag" keys,
+                                 windowed conditions also have "kind" and "window" keys,
+                                 conditions set on the inverted pair have "is_inverted" key.
+        """
+        window_key = get_window_key(message_data)
+        if window_key is not None:
+            if window_key not in self.window_groups:
+                self.window_groups[window_key] = WindowConditionGroup(*window_key)
+            self.window_groups[window_key].add(message_data)
+            return
+
+        condition_flag, check_value = get_bucket_condition(message_data)
+        if condition_flag is None:
+            self.pending_messages.append(message_data)
+            return
+
+        self._insert(*self._get_threshold_lists(condition_flag), (check_value, get_threshold_bound(message_data)), message_data)
+        self.threshold_count += 1
+
+    def add_many(self, messages):
+        """
+        Adds many conditions at once, sorting the lists a single time.
+
+        Args:
+            messages (list): Conditions with "user", "check_value" and "condition_flag" keys.
+        """
+        # Sorted lists are rebuilt once, from groups of the lists the messages are added to
+        list_groups = {}
+        for message_data in messages:
+            if get_window_key(message_data) is not None:
+                self.add(message_data)
+                continue
+
+            condition_flag, check_value = get_bucket_condition(message_data)
+            if condition_flag is None:
+                self.pending_messages.append(message_data)
+                continue
+
+            if condition_flag not in list_groups:
+                keys, groups = self._get_threshold_lists(condition_flag)
+                list_groups[condition_flag] = (keys, groups, dict(zip(keys, groups)))
+            list_groups[condition_flag][2].setdefault((check_value, get_threshold_bound(message_data)), []).append(message_data)
+            self.threshold_count += 1
+
+        for keys, groups, key_groups in list_groups.values():
+            keys[:] = sorted(key_groups)
+            groups[:] = [key_groups[threshold_key] for threshold_key in keys]
+
+    def cancel(self, message_data):
+        """
+        Marks a condition of the bucket as cancelled.
+
+        Args:
+            message_data (dict): The stored condition object.
+        """
+        self.cancelled_messages.add(id(message_data))
+
+        if len(self.cancelled_messages) * 2 >= len(self) + len(self.cancelled_messages):
+            self._drop_all_cancelled()
+
+    def _drop_all_cancelled(self):
+        """
+        Rebuilds the lists without cancelled conditions, rolling windows are kept.
+        """
+        threshold_messages = self._get_threshold_messages()
+        messages = [message_data for message_data in threshold_messages + self.pending_messages if id(message_data) not in self.cancelled_messages]
+
+        self.above_keys = []
+        self.above_groups = []
+        self.below_keys = []
+        self.below_groups = []
+        self.threshold_count = 0
+        self.pending_messages = []
+        self.add_many(messages)
+
+        for window_key in list(self.window_groups.keys()):
+            self.window_groups[window_key].drop_messages(self.cancelled_messages)
+            if len(self.window_groups[window_key]) == 0:
+                del self.window_groups[window_key]
+
+        self.cancelled_messages = set()
+
+    def _drop_cancelled(self, triggered_groups):
+        """
+        Removes cancelled conditions from met groups.
+
+        Args:
+            triggered_groups (list): Groups of met conditions.
+
+        Returns:
+            list: The groups without cancelled conditions, empty groups are left out.
+        """
+        if len(self.cancelled_messages) == 0:
+            return triggered_groups
+
+        kept_groups = []
+        for triggered_group in triggered_groups:
+            kept_group = []
+            for message_data in triggered_group:
+                if id(message_data) in self.cancelled_messages:
+                    self.cancelled_messages.discard(id(message_data))
+                else:
+                    kept_group.append(message_data)
+
+            if len(kept_group) > 0:
+                kept_groups.append(kept_group)
+        return kept_groups
+
+    def resolve_pending(self, now_pair_value):
+        """
+        Decides the direction of "will cross" conditions by the current pair value.
+
+        Args:
+            now_pair_value (float): The current value of the pair.
+
+        Returns:
+            list: The conditions whose direction was decided.
+        """
+        if len(self.pending_messages) == 0:
+            return []
+
+        pending_messages = self.pending_messages
+        self.pending_messages = []
+        for message_data in pending_messages:
+            message_data["condition_flag"] = resolve_pending_flag(message_data, now_pair_value)
+            self.add(message_data)
+        return pending_messages
+
+    def pop_triggered(self, now_pair_value, timestamp=None):
+        """
+        Removes and returns the conditions met by the pair value.
+
+        "Bigger than" conditions are met when the value is bigger than the check value,
+        "lower than" conditions when it is lower than or equal to the check value.
+        Conditions set on the inverted pair are met as in their own order: their
+        "bigger than" thresholds by an equal value too, their "lower than" ones only by a lower value.
+        Both are found by one bisection of each list, see the class description. The value is also appended to the rolling windows of windowed conditions.
+
+        Args:
+            now_pair_value (float): The current value of the pair.
+            timestamp (float, optional): Time of the value in seconds. Defaults to the current time.
+
+        Returns:
+            list: Groups of met conditions, conditions of a threshold group share the direction and the threshold key.
+        """
+        self.resolve_pending(now_pair_value)
+
+        triggered_groups = []
+        now_key = (now_pair_value, DIRECT_BOUND)
+
+        above_end = bisect_left(self.above_keys, now_key)
+        if above_end > 0:
+            triggered_groups += self.above_groups[:above_end]
+            del self.above_keys[:above_end]
+            del self.above_groups[:above_end]
+
+        below_start = bisect_left(self.below_keys, now_key)
+        if below_start < len(self.below_keys):
+            triggered_groups += self.below_groups[below_start:]
+            del self.below_keys[below_start:]
+            del self.below_groups[below_start:]
+
+        self.threshold_count -= sum(len(triggered_group) for triggered_group in triggered_groups)
+
+        if len(self.window_groups) > 0:
+            if timestamp is None:
+                timestamp = time()
+
+            for window_key in list(self.window_groups.keys()):
+                window_group = self.window_groups[window_key]
+                triggered_groups += [[message_data] for message_data in window_group.pop_triggered(now_pair_value, timestamp)]
+
+                if len(window_group) == 0:
+                    del self.window_groups[window_key]
+
+        return self._drop_cancelled(triggered_groups)
+
+    def get_nearest_distance(self, now_pair_value):
+        """
+        Calculates the relative distance of the closest waiting condition to its threshold.
+
+        Args:
+            now_pair_value (float): The current value of the pair.
+
+        Returns:
+            float or None: The smallest distance, or None if no condition has a finite non-zero threshold.
+        """
+        nearest_values = []
+        if len(self.above_keys) > 0:
+            nearest_values.append(self.above_keys[0][0])
+        if len(self.below_keys) > 0:
+            nearest_values.append(self.below_keys[-1][0])
+
+        distances = [
+            abs(now_pair_value - check_value) / abs(check_value)
+            for check_value in nearest_values
+            if check_value != 0 and check_value != float('inf')
+        ]
+        return min(distances, default=None)
+
+    def get_messages(self):
+        """
+        Returns all conditions of the bucket.
+
+        Returns:
+            list: The conditions.
+        """
+        threshold_messages = self._get_threshold_messages()
+        window_messages = [message_data for window_group in self.window_groups.values() for message_data in window_group.get_messages()]
+        messages = threshold_messages + self.pending_messages + window_messages
+
+        if len(self.cancelled_messages) > 0:
+            messages = [message_data for message_data in messages if id(message_data) not in self.cancelled_messages]
+        return messages
@@ -0,0 +1,159 @@
+from currency_snapshot import CurrencySnapshot
+
+class ConditionEvaluator():
+    """
+    Evaluates user conditions of the message broker store against currencies snapshots.
+
+    Attributes:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        message_broker (ParserMessageBroker): Message broker owning the conditions and publishing met ones.
+        pair_distances (dict): Relative distance of the closest condition to its threshold for every evaluated pair.
+    """
+
+    def __init__(self, parser_docker_logger, message_broker) -> None:
+        """
+        Initializes the ConditionEvaluator.
+
+        Args:
+            parser_docker_logger (ParserLogger): Logger for recording events.
+            message_broker (ParserMessageBroker): Message broker owning the conditions and publishing met ones.
+        """
+        self.parser_docker_logger = parser_docker_logger
+        self.message_broker = message_broker
+
+        self.pair_distances = {}
+
+    def add_message(self, message):
+        """
+        Adds the condition of a 'bot2parser_queue' message.
+
+        Args:
+            message (list): The message.
+        """
+        self.message_broker.add_message(message)
+
+    def process_conditions(self, pair1_name, pair2_name, snapshot, timestamp=None):
+        """
+        Processes all conditions for the current currency pair.
+
+        Only the conditions met by the current pair value are taken from the
+        threshold index of the pair, the rest of them are not visited.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+            snapshot (CurrencySnapshot): Snapshot of currency data with cross rates.
+            timestamp (float, optional): Time of the snapshot in seconds, used by windowed conditions. Defaults to the current time.
+        """
+        pair_key = (pair1_name, pair2_name)
+        self.pair_distances.pop(pair_key, None)
+
+        now_pair_value = snapshot.get_rate(pair1_name, pair2_name)
+        if now_pair_value is None:
+            self.parser_docker_logger.log_exception(f'Getting pair was unsuccessful. First currency pair name: {pair1_name}, second currency pair name: {pair2_name}, known currencies: {snapshot.currency_names}. Process conditions was canceled.')
+            return
+
+        resolved_messages = []
+        triggered_groups = self.message_broker.mq.pop_triggered(pair1_name, pair2_name, now_pair_value, timestamp, resolved_messages)
+        if len(resolved_messages) > 0:
+            self.message_broker.journal_resolved_conditions(pair1_name, pair2_name, resolved_messages)
+
+        triggered_messages = []
+        for triggered_group in triggered_groups:
+            message = triggered_group[0]
+            user_pair1_name, user_pair2_name, user_pair_value = self.message_broker.mq.get_user_pair(pair1_name, pair2_name, message, now_pair_value)
+
+            self.parser_docker_logger.add_message_condition(
+                message,
+                user_pair1_name,
+                user_pair2_name,
+                True,
+                user_pair_value,
+                message["check_value"],
+                subscriber_count=len(triggered_group)
+            )
+            triggered_messages += triggered_group
+
+        if len(triggered_messages) > 0:
+            # Notifications of all pairs are published in one batch at the end of the tick
+            self.message_broker.add_notifications(pair1_name, pair2_name, triggered_messages, now_pair_value)
+
+        bucket = self.message_broker.mq.get_bucket(pair1_name, pair2_name)
+        if bucket is not None:
+            nearest_distance = bucket.get_nearest_distance(now_pair_value)
+            if nearest_distance is not None:
+                self.pair_distances[pair_key] = nearest_distance
+    
+    def check_conditions(self, currencies, changed_names, timestamp=None):
+        """
+        Processes conditions of the pairs affected by the currencies snapshot and publishes the met ones.
+
+        Args:
+            currencies (dict): Currencies snapshot.
+            changed_names (set): Names of currencies whose value changed since the previous snapshot.
+            timestamp (float, optional): Time of the snapshot in seconds. Defaults to the current time.
+
+        Returns:
+            bool: True if the tick was idle: there were no conditions or no price changes and no notifications wait.
+        """
+        # Changes journaled since the previous tick are made durable once per tick
+        self.message_broker.sync_mq_cache(is_forced=True)
+
+        new_condition_pairs = self.message_broker.new_condition_pairs
+        self.message_broker.new_condition_pairs = set()
+
+        # Windows of windowed conditions take a value every tick, even an unchanged one
+        window_pairs = self.message_broker.mq.get_window_pairs() if len(currencies) > 0 else set()
+
+        if len(self.message_broker.mq) == 0 or (len(changed_names) == 0 and len(new_condition_pairs) == 0 and len(window_pairs) == 0):
+            # Notifications the broker didn`t confirm are published again even on an idle tick
+            if len(self.message_broker.pending_notifications) > 0:
+                self.message_broker.send_message2parser2bot_queue()
+                self.message_broker.sync_mq_cache(is_forced=True)
+            return len(self.message_broker.pending_notifications) == 0
+
+        snapshot = CurrencySnapshot(currencies)
+
+        # Only pairs with a changed price or new conditions can change their condition results
+        checked_pairs = self.message_broker.mq.get_dependent_pairs(changed_names) | new_condition_pairs | window_pairs
+        pair_count = len(self.message_broker.mq)
+
+        for pair1_name, pair2_name in checked_pairs:
+            if self.message_broker.mq.get_bucket(pair1_name, pair2_name) is not None:
+                self.process_conditions(pair1_name, pair2_name, snapshot, timestamp)
+        self.message_broker.send_message2parser2bot_queue()
+        self.message_broker.sync_mq_cache(is_forced=True)
+
+        self.parser_docker_logger.add_stats(
+            'Buckets',
+            f'checked: {len(checked_pairs)}, skipped: {max(pair_count - len(checked_pairs), 0)}, total: {pair_count}'
+        )
+
+        return len(changed_names) == 0 and len(self.message_broker.pending_notifications) == 0
+
+    def get_unstored_message_count(self):
+        """
+        Returns the number of added messages whose conditions aren`t stored yet.
+
+        Returns:
+            int: Always 0, conditions are stored and journaled by `add_message`.
+        """
+        return 0
+
+    def get_nearest_distance(self):
+        """
+        Finds the relative distance of the closest condition to its threshold.
+
+        Returns:
+            float or None: The smallest distance among pairs with conditions, or None if there are no evaluated conditions.
+        """
+        for pair_key in list(self.pair_distances.keys()):
+            if self.message_broker.mq.get_bucket(*pair_key) is None:
+                del self.pair_distances[pair_key]
+
+        return min(self.pair_distances.values(), default=None)
+
+    def close(self):
+        """
+        Releases resources of the evaluator, the message broker is closed by its owner.
+        """
@@ -0,0 +1,474 @@
+from condition_snapshot import LEGACY_CACHE_EXTENSION, SNAPSHOT_EXTENSION, encode_snapshot, read_legacy_cache, read_snapshot
+from condition_store import CONDITION_ID_KEY, get_condition_id, paused_garbage_collection
+from time import perf_counter
+from write_behind_persister import WriteBehindPersister, write_atomically
+
+import glob
+import json
+import os
+import threading
+
+def get_journal_paths(path_to_mq_cache):
+    """
+    Returns the paths to the journal files of a cache file.
+
+    Args:
+        path_to_mq_cache (str): Path to the message queue cache file.
+
+    Returns:
+        tuple: Path to the current journal and to the journal waiting for the end of a compaction.
+    """
+    root, _ = os.path.splitext(path_to_mq_cache)
+    return f'{root}.journal', f'{root}.journal.old'
+
+
+def migrate_legacy_cache(path_to_mq_cache, parser_docker_logger=None):
+    """
+    Moves cache files with the legacy ".json" extension to snapshots with their own extension.
+
+    The parser wrote its cache as JSON to `mq_cache.json` and later wrote binary
+    snapshots under the same name. Every legacy cache file of the path, and of
+    its shards, is read in either format and written as a snapshot with the
+    extension of the path, `SNAPSHOT_EXTENSION` if the path itself is a legacy one.
+    A legacy file is then renamed with the ".migrated" suffix, so it is migrated
+    once. Journals are named after the root of the cache file and are kept.
+    A snapshot that already exists is never overwritten.
+
+    Args:
+        path_to_mq_cache (str or None): Path to the message queue cache file, None if conditions are kept only in memory.
+        parser_docker_logger (ParserLogger, optional): Logger of migrated files. Defaults to None.
+
+    Returns:
+        str or None: Path to the cache file to use.
+    """
+    if path_to_mq_cache is None:
+        return None
+
+    root, extension = os.path.splitext(path_to_mq_cache)
+    if extension == LEGACY_CACHE_EXTENSION:
+        extension = SNAPSHOT_EXTENSION
+        if parser_docker_logger is not None:
+            parser_docker_logger.log_info(f'The cache file "{path_to_mq_cache}" has the legacy extension, "{root}{extension}" is used instead.')
+
+    legacy_paths = [f'{root}{LEGACY_CACHE_EXTENSION}'] + sorted(glob.glob(f'{glob.escape(root)}.shard*of*{LEGACY_CACHE_EXTENSION}'))
+    for legacy_path in legacy_paths:
+        if os.path.exists(legacy_path) is False:
+            continue
+
+        snapshot_path = os.path.splitext(legacy_path)[0] + extension
+        if os.path.exists(snapshot_path) is False:
+            mq = read_legacy_cache(legacy_path)
+            # Conditions written before they had ids get the ids the journal knows them by
+            for pair1_name in mq:
+                for pair2_name in mq[pair1_name]:
+                    for message_data in mq[pair1_name][pair2_name]:
+                        if CONDITION_ID_KEY not in message_data:
+                            message_data[CONDITION_ID_KEY] = get_condition_id(pair1_name, pair2_name, message_data)
+            write_atomically(snapshot_path, encode_snapshot(mq))
+
+        os.replace(legacy_path, f'{legacy_path}.migrated')
+        if parser_docker_logger is not None:
+            parser_docker_logger.log_info(f'The cache file "{legacy_path}" was migrated to "{snapshot_path}".')
+
+    return f'{root}{extension}'
+
+
+class ConditionJournal():
+    """
+    Persists user conditions as a snapshot and an append-only journal of changes.
+
+    The snapshot is the message queue cache file in the binary format of
+    `encode_snapshot`, legacy cache files are moved to snapshots by
+    `migrate_legacy_cache` before the journal is used. Every
+    added or removed condition appends one line to the journal, so a change
+    costs the same however many conditions are stored. Lines are fsynced in
+    batches by a WriteBehindPersister thread: at most once per `fsync_interval`
+    and right after the end of every tick. When the journal grows longer than
+    the number of stored conditions, it is compacted: the journal is set aside
+    and a background thread replays it over the snapshot, atomically rewrites
+    the snapshot, then removes the old journal. The store is never copied for a
+    compaction, only appending, fsyncing and setting the journal aside hold a lock.
+
+    Journal lines are `["add", condition_id, pair1_name, pair2_name, message_data]`,
+    `["resolve", condition_id, condition_flag]` for the decided direction of a
+    "will cross" condition and `["remove", condition_id]`, where the id is the
+    stable id of the condition (see `get_condition_id`). Recovery replays the snapshot, the old journal and
+    the current one, a condition id is kept once, so replaying a journal already
+    included in the snapshot changes nothing.
+
+    Attributes:
+        path_to_mq_cache (str): Path to the snapshot file.
+        journal_path (str): Path to the current journal.
+        old_journal_path (str): Path to the journal waiting for the end of a compaction.
+        fsync_interval (float): Minimum time between fsyncs of the journal in seconds.
+        compaction_min_operations (int): Journal length below which it is never compacted.
+        parser_docker_logger (ParserLogger or None): Logger of failed fsyncs.
+        journal_fp (file): The current journal opened for appending.
+        lock (threading.Lock): Lock of the journal file.
+        operation_count (int): Number of lines in the current journal.
+        pending_bytes (int): Number of bytes written since the last fsync.
+        persister (WriteBehindPersister or None): Thread fsyncing the journal, it is started by `reset`.
+        snapshot_bytes (int): Size of the last written snapshot in bytes.
+        compaction_thread (threading.Thread or None): Thread of the running compaction.
+        compaction_count (int): Number of finished compactions.
+        compaction_duration (float): Duration of the last compaction in seconds.
+    """
+
+    def __init__(self, path_to_mq_cache, fsync_interval=0.05, compaction_min_operations=1000, parser_docker_logger=None) -> None:
+        """
+        Initializes the ConditionJournal, the journal is opened by `reset`.
+
+        Args:
+            path_to_mq_cache (str): Path to the snapshot file.
+            fsync_interval (float, optional): Minimum time between fsyncs of the journal in seconds. Defaults to 0.05.
+            compaction_min_operations (int, optional): Journal length below which it is never compacted. Defaults to 1000.
+            parser_docker_logger (ParserLogger, optional): Logger of failed fsyncs. Defaults to None.
+        """
+        self.path_to_mq_cache = path_to_mq_cache
+        self.parser_docker_logger = parser_docker_logger
+        self.journal_path, self.old_journal_path = get_journal_paths(path_to_mq_cache)
+        self.fsync_interval = fsync_interval
+        self.compaction_min_operations = compaction_min_operations
+
+        self.journal_fp = None
+        self.lock = threading.Lock()
+        self.operation_count = 0
+        self.pending_bytes = 0
+        self.persister = None
+        self.snapshot_bytes = 0
+
+        self.compaction_thread = None
+        self.compaction_count = 0
+        self.compaction_duration = 0.0
+
+    def recover(self):
+        """
+        Reads the snapshot and replays both journals over it.
+
+        Returns:
+            dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+        """
+        return self._replay((self.old_journal_path, self.journal_path))
+
+    def _replay(self, journal_paths):
+        """
+        Reads the snapshot and replays the given journals over it, in their order.
+
+        Only conditions the journals name are indexed by their ids, the rest of
+        the snapshot is returned as it was decoded.
+
+        Args:
+            journal_paths (tuple): Paths to the journals, missing ones are skipped.
+
+        Returns:
+            dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+        """
+        with paused_garbage_collection():
+            mq = read_snapshot(self.path_to_mq_cache) if os.path.exists(self.path_to_mq_cache) else {}
+
+            operations = []
+            for journal_path in journal_paths:
+                if os.path.exists(journal_path) is False:
+                    continue
+
+                with open(journal_path, 'r', encoding="utf-8") as journal_fp:
+                    for line in journal_fp:
+                        try:
+                            operations.append(json.loads(line))
+                        except json.JSONDecodeError:
+                            # The last line of a journal can be cut by a crash
+                            break
+
+            journal_ids = {operation[1] for operation in operations}
+            snapshot_conditions = {}
+            for pair1_name in mq:
+                for pair2_name in mq[pair1_name]:
+                    for message_data in mq[pair1_name][pair2_name]:
+                        # Conditions written before they had ids get the ids the journal knows them by
+                        if CONDITION_ID_KEY not in message_data:
+                            message_data[CONDITION_ID_KEY] = get_condition_id(pair1_name, pair2_name, message_data)
+                        if message_data[CONDITION_ID_KEY] in journal_ids:
+                            snapshot_conditions.setdefault(message_data[CONDITION_ID_KEY], (pair1_name, pair2_name, message_data))
+
+            conditions = dict(snapshot_conditions)
+            for operation in operations:
+                if operation[0] == 'add':
+                    operation[4].setdefault(CONDITION_ID_KEY, operation[1])
+                    conditions.setdefault(operation[1], tuple(operation[2:]))
+                elif operation[0] == 'resolve':
+                    if operation[1] in conditions:
+                        conditions[operation[1]][2]["condition_flag"] = operation[2]
+                else:
+                    conditions.pop(operation[1], None)
+
+            # Removed conditions are cut out of the snapshot, conditions added by the journals are appended to it
+            removed_ids = {
+                condition_id for condition_id, condition in snapshot_conditions.items()
+                if conditions.get(condition_id) is not condition
+            }
+            if len(removed_ids) > 0:
+                for pair1_name in mq:
+                    for pair2_name, messages in mq[pair1_name].items():
+                        messages[:] = [message_data for message_data in messages if message_data[CONDITION_ID_KEY] not in removed_ids]
+
+            for condition_id, (pair1_name, pair2_name, message_data) in conditions.items():
+                if condition_id not in snapshot_conditions or condition_id in removed_ids:
+                    mq.setdefault(pair1_name, {}).setdefault(pair2_name, []).append(message_data)
+        return mq
+
+    def remove_files(self):
+        """
+        Removes the journals, the snapshot is left in place.
+        """
+        self.wait_compaction()
+
+        with self.lock:
+            if self.journal_fp is not None:
+                self.journal_fp.close()
+                self.journal_fp = None
+
+        for journal_path in (self.journal_path, self.old_journal_path):
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+
+    def reset(self, condition_store):
+        """
+        Writes the snapshot of the store and starts an empty journal.
+
+        Args:
+            condition_store (ConditionStore): The store of conditions.
+        """
+        self.wait_compaction()
+        with self.lock:
+            if self.journal_fp is not None:
+                self.journal_fp.close()
+                self.journal_fp = None
+
+        # The journals are removed only once the snapshot replaced the old one, a crash in between replays them again
+        self._write_snapshot(self._copy_store(condition_store))
+        self.remove_files()
+
+        with self.lock:
+            self.journal_fp = open(self.journal_path, 'a', encoding="utf-8")
+            self.operation_count = 0
+            self.pending_bytes = 0
+
+        if self.persister is None:
+            self.persister = WriteBehindPersister(self._flush, flush_interval=self.fsync_interval, parser_docker_logger=self.parser_docker_logger)
+            self.persister.start()
+
+    def _copy_store(self, condition_store):
+        """
+        Copies conditions of the store, so the copy can be written while the store changes.
+
+        Args:
+            condition_store (ConditionStore): The store of conditions.
+
+        Returns:
+            dict: Nested dictionary of copied conditions in the cache file format.
+        """
+        mq = {}
+        for pair1_name, pair2_name, bucket in condition_store.get_buckets():
+            mq.setdefault(pair1_name, {})[pair2_name] = [dict(message_data) for message_data in bucket.get_messages()]
+        return mq
+
+    def _write_snapshot(self, mq):
+        """
+        Writes the snapshot to a temporary file and replaces the old one with it.
+
+        Args:
+            mq (dict): Nested dictionary of conditions in the cache file format.
+        """
+        self.snapshot_bytes = write_atomically(self.path_to_mq_cache, encode_snapshot(mq))
+
+    def _append(self, operation):
+        """
+        Appends an operation to the journal, it is fsynced with the next batch.
+
+        Args:
+            operation (list): The operation.
+        """
+        line = json.dumps(operation) + '\n'
+        self.journal_fp.write(line)
+        self.operation_count += 1
+        self.pending_bytes += len(line)
+
+    def append_add(self, pair1_name, pair2_name, message_data):
+        """
+        Journals an added condition.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            message_data (dict): The condition as it is stored.
+        """
+        with self.lock:
+            self._append(['add', message_data[CONDITION_ID_KEY], pair1_name, pair2_name, message_data])
+        self.persister.mark_dirty()
+
+    def append_resolve(self, pair1_name, pair2_name, message_data):
+        """
+        Journals the decided direction of a "will cross" condition.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            message_data (dict): The condition as it is stored.
+        """
+        with self.lock:
+            self._append(['resolve', message_data[CONDITION_ID_KEY], message_data["condition_flag"]])
+        self.persister.mark_dirty()
+
+    def append_remove(self, pair1_name, pair2_name, message_data):
+        """
+        Journals a removed condition.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            message_data (dict): The condition removed from the store.
+        """
+        with self.lock:
+            self._append(['remove', message_data[CONDITION_ID_KEY]])
+        self.persister.mark_dirty()
+
+    def sync(self, is_forced=False):
+        """
+        Asks the persister to fsync the journal, the fsync runs in its thread.
+
+        Args:
+            is_forced (bool, optional): If True, written operations are fsynced without waiting for `fsync_interval`. Defaults to False.
+        """
+        if is_forced is True:
+            self.persister.request_flush()
+
+    def flush(self):
+        """
+        Fsyncs written operations in the calling thread and waits for it.
+        """
+        self.persister.flush()
+
+    def _flush(self):
+        """
+        Fsyncs the journal, it is the flush function of the persister.
+
+        Returns:
+            int: Number of fsynced bytes.
+        """
+        with self.lock:
+            return self._flush_journal()
+
+    def _flush_journal(self):
+        """
+        Fsyncs the journal, the lock must be held.
+
+        Returns:
+            int: Number of fsynced bytes.
+        """
+        if self.pending_bytes == 0 or self.journal_fp is None:
+            return 0
+
+        self.journal_fp.flush()
+        os.fsync(self.journal_fp.fileno())
+
+        pending_bytes = self.pending_bytes
+        self.pending_bytes = 0
+        return pending_bytes
+
+    def is_compaction_needed(self, condition_count):
+        """
+        Checks if the journal is long enough to be compacted.
+
+        Args:
+            condition_count (int): Number of stored conditions.
+
+        Returns:
+            bool: True if the journal should be compacted and no compaction is running.
+        """
+        if self.compaction_thread is not None and self.compaction_thread.is_alive():
+            return False
+        return self.operation_count >= max(self.compaction_min_operations, condition_count)
+
+    def compact(self, is_background=True):
+        """
+        Sets the current journal aside and rewrites the snapshot with the journal replayed over it.
+
+        Only the rotation of the journal holds the lock, the snapshot is built from the files, not
+        from the store: the journal set aside fences the changes included in the new snapshot, later
+        ones go to the new journal. The old journal stays valid until the new snapshot replaces the
+        old one, so a crash at any point recovers the same conditions.
+
+        Args:
+            is_background (bool, optional): If True, the snapshot is written in a background thread. Defaults to True.
+        """
+        self.wait_compaction()
+        with self.lock:
+            self._rotate()
+
+        self.compaction_thread = threading.Thread(target=self._finish_compaction, daemon=True)
+        self.compaction_thread.start()
+        if is_background is False:
+            self.wait_compaction()
+
+    def _rotate(self):
+        """
+        Sets the current journal aside and starts a new one, the lock must be held.
+        """
+        self._flush_journal()
+        self.journal_fp.close()
+
+        if os.path.exists(self.old_journal_path):
+            # The previous compaction failed, its journal is still needed until the new snapshot is written
+            with open(self.old_journal_path, 'a', encoding="utf-8") as old_journal_fp, open(self.journal_path, 'r', encoding="utf-8") as journal_fp:
+                old_journal_fp.write(journal_fp.read())
+            os.remove(self.journal_path)
+        else:
+            os.replace(self.journal_path, self.old_journal_path)
+
+        self.journal_fp = open(self.journal_path, 'a', encoding="utf-8")
+        self.operation_count = 0
+
+    def _finish_compaction(self):
+        """
+        Replays the old journal over the snapshot, writes the new snapshot and removes the old journal included in it.
+        """
+        start_time = perf_counter()
+        self._write_snapshot(self._replay((self.old_journal_path,)))
+        os.remove(self.old_journal_path)
+
+        self.compaction_duration = perf_counter() - start_time
+        self.compaction_count += 1
+
+    def wait_compaction(self):
+        """
+        Waits for the running compaction to finish.
+        """
+        if self.compaction_thread is not None:
+            self.compaction_thread.join()
+            self.compaction_thread = None
+
+    def close(self, condition_store):
+        """
+        Writes the snapshot of the store, removes the journals included in it and closes the journal.
+
+        Args:
+            condition_store (ConditionStore): The store of conditions.
+        """
+        self.reset(condition_store)
+
+        self.persister.close()
+        self.persister = None
+
+        with self.lock:
+            self.journal_fp.close()
+            self.journal_fp = None
+
+    def get_stats_string(self):
+        """
+        Returns the statistics of the journal.
+
+        Returns:
+            str: Journal length, fsync statistics, number of compactions, duration and size of the last one.
+        """
+        return f'journal: {self.operation_count} operations, {self.persister.get_stats_string()}, ' \
+            f'compactions: {self.compaction_count} (last {self.compaction_duration * 1000:.1f} ms, {self.snapshot_bytes} bytes)'
@@ -0,0 +1,313 @@
+from array import array
+
+import json
+import mmap
+import re
+import struct
+import sys
+
+SNAPSHOT_MAGIC = b'BPCS'
+SNAPSHOT_EXTENSION = '.bpcs'
+# Cache files were written as JSON and then as snapshots with this extension
+LEGACY_CACHE_EXTENSION = '.json'
+# Version 2 added the column of condition ids
+SNAPSHOT_VERSION = 2
+SUPPORTED_SNAPSHOT_VERSIONS = (1, 2)
+
+# Magic, version, reserved, number of pairs, number of conditions, length of the tables
+HEADER_STRUCT = struct.Struct('<4sHHIII')
+SECTION_ALIGNMENT = 8
+
+CONDITION_FLAGS = (False, True, None)
+# Set in the flag column if the condition id is kept in the id column
+ID_COLUMN_FLAG = 4
+COLUMN_KEYS = ("user", "check_value", "condition_flag", "id")
+ID_LENGTH = 16
+CONDITION_ID_PATTERN = re.compile('[0-9a-f]{16}')
+
+
+def get_aligned_offset(offset):
+    """
+    Returns the offset of the next section aligned to `SECTION_ALIGNMENT` bytes.
+
+    Args:
+        offset (int): Offset of the end of the previous section.
+
+    Returns:
+        int: Aligned offset.
+    """
+    return (offset + SECTION_ALIGNMENT - 1) // SECTION_ALIGNMENT * SECTION_ALIGNMENT
+
+
+def get_condition_flag_code(condition_flag):
+    """
+    Returns the code of a condition flag in the flag column.
+
+    Args:
+        condition_flag (bool or None): The condition flag.
+
+    Returns:
+        int or None: Index of the flag in `CONDITION_FLAGS`, or None if the flag isn't a bool or None.
+    """
+    for flag_code, flag_value in enumerate(CONDITION_FLAGS):
+        if condition_flag is flag_value:
+            return flag_code
+    return None
+
+
+def encode_snapshot(mq):
+    """
+    Encodes conditions into the binary snapshot format.
+
+    The snapshot starts with a header (magic, version, number of pairs and
+    conditions), followed by JSON tables of currency names, distinct users and
+    distinct extra keys of conditions ("kind", "window", "is_inverted"). Then
+    come a pair directory (names and number of conditions of every pair) and
+    the columns of all conditions in the order of the pairs: check values as
+    float64, user and extra ids as uint32, condition ids as uint64 and
+    condition flags as uint8. Numbers are little-endian, sections are aligned
+    to 8 bytes. Check values, flags and condition ids of an unusual type are
+    kept in the extra table, so a decoded condition is identical to the
+    encoded one.
+
+    Args:
+        mq (dict): Nested dictionary pair1_name -> pair2_name -> list of conditions.
+
+    Returns:
+        bytes: The snapshot.
+    """
+    name_ids = {}
+    users = []
+    user_ids = {}
+    extras = [{}]
+    extra_ids = {'{}': 0}
+
+    pair_directory = array('I')
+    check_values = array('d')
+    user_column = array('I')
+    extra_column = array('I')
+    id_column = array('Q')
+    flag_column = array('B')
+
+    for pair1_name in mq:
+        for pair2_name in mq[pair1_name]:
+            messages = mq[pair1_name][pair2_name]
+            for pair_name in (pair1_name, pair2_name):
+                name_ids.setdefault(pair_name, len(name_ids))
+            pair_directory.extend((name_ids[pair1_name], name_ids[pair2_name], len(messages)))
+
+            for message_data in messages:
+                extra_data = {key: value for key, value in message_data.items() if key not in COLUMN_KEYS}
+
+                check_value = message_data["check_value"]
+                if type(check_value) is not float:
+                    extra_data["check_value"] = check_value
+                    check_value = float(check_value) if type(check_value) is int else 0.0
+
+                flag_code = get_condition_flag_code(message_data["condition_flag"])
+                if flag_code is None:
+                    extra_data["condition_flag"] = message_data["condition_flag"]
+                    flag_code = CONDITION_FLAGS.index(None)
+
+                condition_id = message_data.get("id")
+                if isinstance(condition_id, str) and CONDITION_ID_PATTERN.fullmatch(condition_id) is not None:
+                    id_column.append(int(condition_id, 16))
+                    flag_code |= ID_COLUMN_FLAG
+                else:
+                    if "id" in message_data:
+                        extra_data["id"] = condition_id
+                    id_column.append(0)
+
+                user_string = json.dumps(message_data["user"])
+                if user_string not in user_ids:
+                    user_ids[user_string] = len(users)
+                    users.append(message_data["user"])
+
+                extra_string = json.dumps(extra_data, sort_keys=True)
+                if extra_string not in extra_ids:
+                    extra_ids[extra_string] = len(extras)
+                    extras.append(extra_data)
+
+                check_values.append(check_value)
+                user_column.append(user_ids[user_string])
+                extra_column.append(extra_ids[extra_string])
+                flag_column.append(flag_code)
+
+    if sys.byteorder == 'big':
+        for column in (pair_directory, check_values, user_column, extra_column, id_column):
+            column.byteswap()
+
+    tables = json.dumps({"names": list(name_ids), "users": users, "extras": extras}).encode('utf-8')
+    header = HEADER_STRUCT.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(pair_directory) // 3, len(check_values), len(tables))
+
+    snapshot = bytearray(header)
+    for section in (tables, pair_directory, check_values, user_column, extra_column, id_column, flag_column):
+        snapshot += section.tobytes() if isinstance(section, array) else section
+        snapshot += bytes(get_aligned_offset(len(snapshot)) - len(snapshot))
+    return bytes(snapshot)
+
+
+def read_column(view, offset, typecode, count):
+    """
+    Reads a column of numbers from the snapshot without copying it before the conversion.
+
+    Args:
+        view (memoryview): The snapshot.
+        offset (int): Offset of the column.
+        typecode (str): Type code of the numbers: 'd', 'Q', 'I' or 'B'.
+        count (int): Number of numbers.
+
+    Returns:
+        tuple: Numbers of the column and the aligned offset of the next section.
+    """
+    end = offset + count * array(typecode).itemsize
+    if end > len(view):
+        raise ValueError('The snapshot is truncated')
+
+    if sys.byteorder == 'little':
+        with view[offset:end] as column_bytes, column_bytes.cast(typecode) as column:
+            values = column.tolist()
+    else:
+        column = array(typecode)
+        with view[offset:end] as column_bytes:
+            column.frombytes(column_bytes)
+        column.byteswap()
+        values = column.tolist()
+
+    return values, get_aligned_offset(end)
+
+
+def read_id_column(view, offset, count):
+    """
+    Reads the column of condition ids from the snapshot as hexadecimal strings.
+
+    The whole column is turned into one hexadecimal string at once and cut into
+    ids, which is several times faster than formatting every id on its own.
+
+    Args:
+        view (memoryview): The snapshot.
+        offset (int): Offset of the column.
+        count (int): Number of ids.
+
+    Returns:
+        tuple: Ids of the column and the aligned offset of the next section.
+    """
+    end = offset + count * ID_LENGTH // 2
+    if end > len(view):
+        raise ValueError('The snapshot is truncated')
+
+    # Ids are little-endian uint64, their hexadecimal strings are big-endian
+    id_column = array('Q')
+    with view[offset:end] as column_bytes:
+        id_column.frombytes(column_bytes)
+    id_column.byteswap()
+    column_hex = id_column.tobytes().hex()
+
+    return [column_hex[id_start:id_start + ID_LENGTH] for id_start in range(0, count * ID_LENGTH, ID_LENGTH)], get_aligned_offset(end)
+
+
+def decode_snapshot(buffer):
+    """
+    Decodes conditions from the binary snapshot format, see `encode_snapshot`.
+
+    Args:
+        buffer (bytes or mmap.mmap): The snapshot.
+
+    Returns:
+        dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+    """
+    with memoryview(buffer) as view:
+        if len(view) < HEADER_STRUCT.size:
+            raise ValueError('The snapshot is truncated')
+
+        magic, version, _, pair_count, condition_count, tables_length = HEADER_STRUCT.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError('The file isn`t a condition snapshot')
+        if version not in SUPPORTED_SNAPSHOT_VERSIONS:
+            raise ValueError(f'Snapshot version {version} isn`t supported')
+
+        offset = HEADER_STRUCT.size
+        with view[offset:offset + tables_length] as tables_view:
+            tables = json.loads(tables_view.tobytes())
+        offset = get_aligned_offset(offset + tables_length)
+
+        pair_directory, offset = read_column(view, offset, 'I', pair_count * 3)
+        check_values, offset = read_column(view, offset, 'd', condition_count)
+        user_column, offset = read_column(view, offset, 'I', condition_count)
+        extra_column, offset = read_column(view, offset, 'I', condition_count)
+        id_column, offset = read_id_column(view, offset, condition_count) if version >= 2 else ([None] * condition_count, offset)
+        flag_column, offset = read_column(view, offset, 'B', condition_count)
+
+    names = tables["names"]
+    users = tables["users"]
+    extras = tables["extras"]
+
+    mq = {}
+    condition_start = 0
+    for pair_id in range(pair_count):
+        pair1_id, pair2_id, pair_condition_count = pair_directory[pair_id * 3:pair_id * 3 + 3]
+        condition_end = condition_start + pair_condition_count
+
+        messages = []
+        for check_value, user_id, extra_id, condition_id, flag_code in zip(
+            check_values[condition_start:condition_end],
+            user_column[condition_start:condition_end],
+            extra_column[condition_start:condition_end],
+            id_column[condition_start:condition_end],
+            flag_column[condition_start:condition_end]
+        ):
+            message_data = {"user": users[user_id], "check_value": check_value, "condition_flag": CONDITION_FLAGS[flag_code & ~ID_COLUMN_FLAG]}
+            if flag_code & ID_COLUMN_FLAG != 0:
+                message_data["id"] = condition_id
+            if extra_id != 0:
+                message_data.update(extras[extra_id])
+            messages.append(message_data)
+
+        mq.setdefault(names[pair1_id], {}).setdefault(names[pair2_id], []).extend(messages)
+        condition_start = condition_end
+    return mq
+
+
+def read_snapshot(path):
+    """
+    Reads conditions from a snapshot file, the file is memory-mapped where possible.
+
+    Args:
+        path (str): Path to the snapshot file.
+
+    Returns:
+        dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+    """
+    with open(path, 'rb') as snapshot_fp:
+        try:
+            snapshot_map = mmap.mmap(snapshot_fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return decode_snapshot(snapshot_fp.read())
+
+    try:
+        return decode_snapshot(snapshot_map)
+    finally:
+        snapshot_map.close()
+
+
+def read_legacy_cache(path):
+    """
+    Reads conditions from a cache file with the legacy extension.
+
+    Such files hold either the pretty-printed JSON the parser wrote first or a
+    snapshot, which was later written under the same name.
+
+    Args:
+        path (str): Path to the cache file.
+
+    Returns:
+        dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+    """
+    with open(path, 'rb') as cache_fp:
+        is_snapshot = cache_fp.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+        cache_fp.seek(0)
+        cache_bytes = cache_fp.read()
+
+    if is_snapshot is True:
+        return decode_snapshot(cache_bytes)
+    return json.loads(cache_bytes.decode('utf-8'))
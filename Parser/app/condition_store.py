@@ -0,0 +1,421 @@
+from condition_bucket import ConditionBucket
+from contextlib import contextmanager
+from window_conditions import get_window_key
+
+import gc
+import hashlib
+import json
+
+CONDITION_ID_KEY = "id"
+
+def get_condition_id(*condition_values):
+    """
+    Returns a stable id derived from the content of a condition.
+
+    Conditions get ids from the bot when they are set, the id is derived from
+    the content for messages and cached conditions without one, so the same
+    condition always gets the same id.
+
+    Args:
+        *condition_values: Values describing the condition, e.g. a 'bot2parser_queue' message
+                           or the bucket pair names and the condition.
+
+    Returns:
+        str: 16 hex digits.
+    """
+    condition_string = json.dumps(condition_values, sort_keys=True)
+    return hashlib.blake2b(condition_string.encode('utf-8'), digest_size=8).hexdigest()
+
+
+@contextmanager
+def paused_garbage_collection():
+    """
+    Pauses the cyclic garbage collector while conditions are loaded in bulk.
+
+    Loading allocates a dictionary per condition and none of them is garbage,
+    yet every few hundred allocations start a collection walking all of them.
+    The collector is resumed afterwards only if it was running before.
+    """
+    is_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if is_enabled is True:
+            gc.enable()
+
+
+class ConditionStore():
+    """
+    In-memory store of user conditions grouped by currency pair.
+
+    Every pair (pair1_name, pair2_name) owns a ConditionBucket with a sorted
+    threshold index, empty buckets are removed right away. A reverse index
+    maps every currency to the pairs that use it as the first or the second
+    currency, so a tick can find the pairs affected by a price change without
+    visiting the others.
+
+    Threshold conditions are stored in the canonical order of the pair
+    (currency names in ascending order): a condition set on B/A is stored in
+    the bucket of A/B with the "is_inverted" key, so identical and inverse
+    conditions share one evaluation.
+
+    Every condition has a stable id (the "id" key), the id map makes adding a
+    condition twice a no-op and finds a condition to remove without a search.
+
+    Attributes:
+        buckets (dict): Nested dictionary pair1_name -> pair2_name -> ConditionBucket.
+        currency_pairs (dict): Currency names and sets of pairs (pair1_name, pair2_name) depending on them.
+        window_pairs (set): Pairs (pair1_name, pair2_name) with windowed conditions, their windows need every tick.
+        conditions (dict): Condition ids and tuples (pair1_name, pair2_name, message_data) of the bucket pair.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes an empty ConditionStore.
+        """
+        self.buckets = {}
+        self.currency_pairs = {}
+        self.window_pairs = set()
+        self.conditions = {}
+
+    def __len__(self):
+        """
+        Returns the number of pairs with conditions.
+
+        Returns:
+            int: Number of pairs.
+        """
+        return sum(len(pair2_buckets) for pair2_buckets in self.buckets.values())
+
+    def get_condition_count(self):
+        """
+        Returns the number of stored conditions.
+
+        Returns:
+            int: Number of conditions.
+        """
+        return len(self.conditions)
+
+    def has_condition(self, condition_id):
+        """
+        Checks if a condition is stored.
+
+        Args:
+            condition_id (str): Id of the condition.
+
+        Returns:
+            bool: True if the condition is stored.
+        """
+        return condition_id in self.conditions
+
+    def get_bucket(self, pair1_name, pair2_name):
+        """
+        Returns the bucket of a pair.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+
+        Returns:
+            ConditionBucket or None: The bucket, or None if the pair has no conditions.
+        """
+        return self.buckets.get(pair1_name, {}).get(pair2_name)
+
+    def _get_or_create_bucket(self, pair1_name, pair2_name):
+        """
+        Returns the bucket of a pair, creating it if needed.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+
+        Returns:
+            ConditionBucket: The bucket.
+        """
+        pair2_buckets = self.buckets.setdefault(pair1_name, {})
+        if pair2_name not in pair2_buckets:
+            pair2_buckets[pair2_name] = ConditionBucket()
+
+            self.currency_pairs.setdefault(pair1_name, set()).add((pair1_name, pair2_name))
+            self.currency_pairs.setdefault(pair2_name, set()).add((pair1_name, pair2_name))
+        return pair2_buckets[pair2_name]
+
+    def _remove_empty_bucket(self, pair1_name, pair2_name):
+        """
+        Removes the bucket of a pair if it has no conditions left.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+        """
+        if len(self.buckets[pair1_name][pair2_name]) == 0:
+            del self.buckets[pair1_name][pair2_name]
+
+            if len(self.buckets[pair1_name]) == 0:
+                del self.buckets[pair1_name]
+
+            for currency_name in (pair1_name, pair2_name):
+                dependent_pairs = self.currency_pairs.get(currency_name)
+                if dependent_pairs is None:
+                    continue
+
+                dependent_pairs.discard((pair1_name, pair2_name))
+                if len(dependent_pairs) == 0:
+                    del self.currency_pairs[currency_name]
+
+    def _update_window_pairs(self, pair1_name, pair2_name):
+        """
+        Adds a pair to or removes it from the pairs with windowed conditions.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+        """
+        bucket = self.get_bucket(pair1_name, pair2_name)
+        if bucket is not None and bucket.has_window_conditions() is True:
+            self.window_pairs.add((pair1_name, pair2_name))
+        else:
+            self.window_pairs.discard((pair1_name, pair2_name))
+
+    @staticmethod
+    def get_canonical_pair(pair1_name, pair2_name, message_data):
+        """
+        Turns a threshold condition to the canonical order of its pair.
+
+        Windowed conditions keep the order they were set for.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+            message_data (dict): The condition, its "is_inverted" key is updated in place.
+
+        Returns:
+            tuple: The first and the second currency of the bucket pair.
+        """
+        if pair1_name <= pair2_name or get_window_key(message_data) is not None:
+            return pair1_name, pair2_name
+
+        if message_data.get("is_inverted") is True:
+            del message_data["is_inverted"]
+        else:
+            message_data["is_inverted"] = True
+        return pair2_name, pair1_name
+
+    @staticmethod
+    def get_user_pair(pair1_name, pair2_name, message_data, now_pair_value):
+        """
+        Returns the pair and its value in the order the condition was set for.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            message_data (dict): The condition.
+            now_pair_value (float): The current value of the bucket pair.
+
+        Returns:
+            tuple: The first and the second currency and the value of the user pair.
+        """
+        if message_data.get("is_inverted") is True:
+            return pair2_name, pair1_name, 1.0 / now_pair_value if now_pair_value != 0 else float('inf')
+        return pair1_name, pair2_name, now_pair_value
+
+    @staticmethod
+    def assign_condition_id(pair1_name, pair2_name, message_data):
+        """
+        Gives a condition without an id the id derived from its content.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            message_data (dict): The condition, its "id" key is set in place.
+
+        Returns:
+            str: Id of the condition.
+        """
+        if CONDITION_ID_KEY not in message_data:
+            message_data[CONDITION_ID_KEY] = get_condition_id(pair1_name, pair2_name, message_data)
+        return message_data[CONDITION_ID_KEY]
+
+    def add(self, pair1_name, pair2_name, message_data):
+        """
+        Adds a condition of a pair, a condition with the id of a stored one is skipped.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+            message_data (dict): The condition with "user", "check_value" and "condition_flag" keys,
+                                 windowed conditions also have "kind" and "window" keys.
+                                 A condition without the "id" key gets the id derived from its content.
+
+        Returns:
+            tuple or None: The bucket pair (pair1_name, pair2_name) the condition was added to, or None if it is already stored.
+        """
+        pair1_name, pair2_name = self.get_canonical_pair(pair1_name, pair2_name, message_data)
+
+        condition_id = self.assign_condition_id(pair1_name, pair2_name, message_data)
+        if condition_id in self.conditions:
+            return None
+        self.conditions[condition_id] = (pair1_name, pair2_name, message_data)
+
+        self._get_or_create_bucket(pair1_name, pair2_name).add(message_data)
+        self._update_window_pairs(pair1_name, pair2_name)
+        return pair1_name, pair2_name
+
+    def remove(self, condition_id):
+        """
+        Removes a condition by its id.
+
+        Args:
+            condition_id (str): Id of the condition.
+
+        Returns:
+            tuple or None: The bucket pair names and the removed condition, or None if there is no such condition.
+        """
+        condition = self.conditions.pop(condition_id, None)
+        if condition is None:
+            return None
+
+        pair1_name, pair2_name, message_data = condition
+        self.buckets[pair1_name][pair2_name].cancel(message_data)
+        self._remove_empty_bucket(pair1_name, pair2_name)
+        self._update_window_pairs(pair1_name, pair2_name)
+        return condition
+
+    def get_pairs(self):
+        """
+        Returns all pairs with conditions.
+
+        Returns:
+            list: Tuples (pair1_name, pair2_name).
+        """
+        return [
+            (pair1_name, pair2_name)
+            for pair1_name, pair2_buckets in self.buckets.items()
+            for pair2_name in pair2_buckets
+        ]
+
+    def get_dependent_pairs(self, currency_names):
+        """
+        Returns pairs that use any of the currencies as the first or the second currency.
+
+        Args:
+            currency_names (iterable): Names of currencies.
+
+        Returns:
+            set: Tuples (pair1_name, pair2_name).
+        """
+        dependent_pairs = set()
+        for currency_name in currency_names:
+            dependent_pairs |= self.currency_pairs.get(currency_name, set())
+        return dependent_pairs
+
+    def get_window_pairs(self):
+        """
+        Returns pairs with windowed conditions.
+
+        Returns:
+            set: Tuples (pair1_name, pair2_name).
+        """
+        return set(self.window_pairs)
+
+    def get_buckets(self):
+        """
+        Returns all buckets with their pairs.
+
+        Returns:
+            list: Tuples (pair1_name, pair2_name, ConditionBucket).
+        """
+        return [
+            (pair1_name, pair2_name, bucket)
+            for pair1_name, pair2_buckets in self.buckets.items()
+            for pair2_name, bucket in pair2_buckets.items()
+        ]
+
+    def pop_triggered(self, pair1_name, pair2_name, now_pair_value, timestamp=None, resolved_messages=None):
+        """
+        Removes and returns the conditions of a pair met by its current value.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+            now_pair_value (float): The current value of the pair.
+            timestamp (float, optional): Time of the value in seconds. Defaults to the current time.
+            resolved_messages (list, optional): Gets the "will cross" conditions whose direction was decided by the value,
+                                                the in-memory store doesn`t persist it. Defaults to None.
+
+        Returns:
+            list: Groups of met conditions sharing the direction and the threshold key.
+        """
+        bucket = self.get_bucket(pair1_name, pair2_name)
+        if bucket is None:
+            return []
+
+        pending_messages = bucket.resolve_pending(now_pair_value)
+        if resolved_messages is not None:
+            resolved_messages += pending_messages
+
+        triggered_groups = bucket.pop_triggered(now_pair_value, timestamp)
+        for triggered_group in triggered_groups:
+            for message_data in triggered_group:
+                del self.conditions[message_data[CONDITION_ID_KEY]]
+
+        if len(triggered_groups) > 0:
+            self._remove_empty_bucket(pair1_name, pair2_name)
+            self._update_window_pairs(pair1_name, pair2_name)
+        return triggered_groups
+
+    def commit(self):
+        """
+        Makes added and removed conditions durable, the in-memory store is persisted by the message broker.
+        """
+        pass
+
+    def to_dict(self):
+        """
+        Converts the store into the nested dictionary format of the cache file.
+
+        Returns:
+            dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+        """
+        return {
+            pair1_name: {
+                pair2_name: bucket.get_messages()
+                for pair2_name, bucket in pair2_buckets.items()
+            }
+            for pair1_name, pair2_buckets in self.buckets.items()
+        }
+
+    def load_dict(self, mq, is_merge=False):
+        """
+        Loads conditions from the nested dictionary format of the cache file.
+
+        Args:
+            mq (dict): Nested dictionary pair1_name -> pair2_name -> list of conditions.
+            is_merge (bool, optional): If True, conditions missing in the store are added to it,
+                                       otherwise the store is replaced. Defaults to False.
+                                       Conditions are told apart by their ids in both cases.
+        """
+        if is_merge is False:
+            self.buckets = {}
+            self.currency_pairs = {}
+            self.window_pairs = set()
+            self.conditions = {}
+
+        with paused_garbage_collection():
+            pairs_messages = {}
+            for pair1_name in mq:
+                for pair2_name in mq[pair1_name]:
+                    for message_data in mq[pair1_name][pair2_name]:
+                        pair_key = self.get_canonical_pair(pair1_name, pair2_name, message_data)
+
+                        condition_id = self.assign_condition_id(*pair_key, message_data)
+                        if condition_id in self.conditions:
+                            continue
+                        self.conditions[condition_id] = (*pair_key, message_data)
+
+                        pairs_messages.setdefault(pair_key, []).append(message_data)
+
+            for (pair1_name, pair2_name), messages in pairs_messages.items():
+                self._get_or_create_bucket(pair1_name, pair2_name).add_many(messages)
+                self._update_window_pairs(pair1_name, pair2_name)
@@ -0,0 +1,124 @@
+from lxml import etree
+
+import json
+import re
+
+class CurrencyExtractor():
+    """
+    Extracts currencies from the markets overview page by parsing only the currency table.
+
+    The page source is cut at the opening tag of the table and fed to an
+    incremental lxml parser chunk by chunk, parsing stops as soon as the table
+    is closed. Currency names and values are then taken from the table subtree
+    with precompiled XPath selectors. All selectors live in a JSON config, so a
+    change of the site markup doesn`t need a code edit.
+
+    Attributes:
+        path_to_config (str): Path to the selectors config file.
+        table_class (str): Class of the element that contains the currency table.
+        table_tag_regex (re.Pattern): Compiled pattern of the opening tag of the table.
+        name_xpath (etree.XPath): Compiled selector of currency names relative to the table.
+        value_xpath (etree.XPath): Compiled selector of currency values relative to the table.
+        value_strip (str): Characters stripped from both sides of a value.
+        thousands_separator (str): Thousands separator removed from a value.
+        chunk_size (int): Size of page chunks fed to the parser.
+    """
+
+    def __init__(self, path_to_config='extractor_config.json') -> None:
+        """
+        Initializes the CurrencyExtractor and compiles the selectors from the config.
+
+        Args:
+            path_to_config (str, optional): Path to the selectors config file. Defaults to 'extractor_config.json'.
+        """
+        self.path_to_config = path_to_config
+
+        with open(self.path_to_config, 'r', encoding="utf-8") as config_fp:
+            config = json.load(config_fp)
+
+        self.table_class = config["table_class"]
+        self.table_tag_regex = re.compile(r'<[^<>]*\sclass="[^"]*(?<![\w-])' + re.escape(self.table_class) + r'(?![\w-])')
+        self.name_xpath = etree.XPath(config["name_xpath"])
+        self.value_xpath = etree.XPath(config["value_xpath"])
+        self.value_strip = config.get("value_strip", "$")
+        self.thousands_separator = config.get("thousands_separator", ",")
+        self.chunk_size = config.get("chunk_size", 16384)
+
+    def _is_table(self, element):
+        """
+        Checks if the element is the currency table.
+
+        Args:
+            element (etree._Element): Parsed element.
+
+        Returns:
+            bool: True if the element has the table class.
+        """
+        return self.table_class in (element.get('class') or '').split()
+
+    def find_table(self, page_source):
+        """
+        Parses the currency table subtree of the page.
+
+        Args:
+            page_source (str): Source of the whole page.
+
+        Returns:
+            etree._Element or None: The currency table element, or None if it wasn`t found.
+        """
+        table_tag = self.table_tag_regex.search(page_source)
+        if table_tag is None:
+            return None
+        table_start = table_tag.start()
+
+        parser = etree.HTMLPullParser(events=('end',), tag='div')
+        for chunk_start in range(table_start, len(page_source), self.chunk_size):
+            parser.feed(page_source[chunk_start:chunk_start + self.chunk_size])
+
+            for _, element in parser.read_events():
+                if self._is_table(element):
+                    return element
+
+        parser.close()
+        for _, element in parser.read_events():
+            if self._is_table(element):
+                return element
+        return None
+
+    def parse_value(self, value_text):
+        """
+        Converts a value string like "$63,012.50" into a float.
+
+        Args:
+            value_text (str): Value string.
+
+        Returns:
+            float: The value.
+        """
+        return float(value_text.strip().strip(self.value_strip).replace(self.thousands_separator, ''))
+
+    def extract(self, page_source):
+        """
+        Extracts currencies from the page source.
+
+        Args:
+            page_source (str): Source of the whole page.
+
+        Returns:
+            dict: A dictionary with currency names as keys and their dollar values as values.
+
+        Raises:
+            ValueError: If the currency table wasn`t found or a value couldn`t be parsed.
+        """
+        table = self.find_table(page_source)
+        if table is None:
+            raise ValueError(f'The currency table with class "{self.table_class}" wasn`t found')
+
+        currency_names = self.name_xpath(table)
+        currency_values = self.value_xpath(table)
+
+        currencies = {}
+        for currency_name, currency_value in zip(currency_names, currency_values):
+            currencies[currency_name.strip()] = self.parse_value(currency_value)
+
+        return currencies
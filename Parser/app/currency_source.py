@@ -0,0 +1,64 @@
+class CurrencySource():
+    """
+    Base class for all sources of currency data used by the parser.
+
+    A source only has to implement `get_currencies`, the rest of the parser
+    works with the returned dictionary and doesn`t know where it came from.
+
+    Attributes:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        is_streaming (bool): True if the source pushes updates with an async `stream` generator instead of being polled.
+    """
+
+    is_streaming = False
+
+    def __init__(self, parser_docker_logger) -> None:
+        """
+        Initializes the CurrencySource with a logger.
+
+        Args:
+            parser_docker_logger (ParserLogger): Logger for recording events.
+        """
+        self.parser_docker_logger = parser_docker_logger
+
+    def get_currencies(self):
+        """
+        Fetches currency data from the source.
+
+        Returns:
+            dict: A dictionary with currency names as keys and their dollar values as values.
+        """
+        raise NotImplementedError(f'{type(self).__name__} must implement "get_currencies"')
+
+    def get_pair(self, currencies, first_el_name, second_el_name=None):
+        """
+        Calculates the value ratio between two currencies.
+
+        Args:
+            currencies (dict): Dictionary of currencies and their values.
+            first_el_name (str): The name of the first currency.
+            second_el_name (str, optional): The name of the second currency. Defaults to None.
+
+        Returns:
+            float or None: The value ratio between the two currencies, or None if an error occurred.
+        """
+        if first_el_name not in currencies:
+            self.parser_docker_logger.log_exception(f'The first currency pair name ({first_el_name}) isn`t in currencies dict ({currencies.keys()}). The result was empty. ')
+            return None
+        first_currency = currencies[first_el_name]
+
+        if second_el_name is None:
+            second_currency = 1
+        else:
+            if second_el_name not in currencies:
+                self.parser_docker_logger.log_exception(f'The second currency pair name ({second_el_name}) isn`t in currencies dict ({currencies.keys()}). The result was empty.')
+                return None
+            second_currency = currencies[second_el_name]
+
+        return first_currency / second_currency
+
+    def close(self):
+        """
+        Releases resources held by the source.
+        """
+        pass
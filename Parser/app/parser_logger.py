@@ -1,24 +1,29 @@
 from utils import try_get_stable_coin_dollar_value
 import logging
+import threading
 
 class ParserLogger():
     """
     A class for logging parser-related information.
 
+    Stages of the parser pipeline share the logger from their threads, the collected logs are guarded by a lock.
+
     Args:
         is_print (bool): Flag indicating whether log messages should be printed in addition to being logged.
     """
 
-    def __init__(self, is_print=False):
+    def __init__(self, is_print=False, name='PARSER'):
         """
         Initializes the ParserLogger object.
 
         Args:
             is_print (bool): Flag indicating whether log messages should be printed in addition to being logged.
+            name (str, optional): Name of the logger shown in every record. Defaults to 'PARSER'.
         """
         self.is_print = is_print
+        self.lock = threading.RLock()
 
-        self.logger = logging.getLogger('PARSER')
+        self.logger = logging.getLogger(name)
         handler = logging.StreamHandler()
         formatter = logging.Formatter(
             '%(asctime)s [%(name)-6s] %(levelname)-4s: %(message)s'
@@ -37,6 +42,7 @@ class ParserLogger():
         self.message_from_queue_logs = []
         self.message_conditions_logs = []
         self.message_to_queue_logs = []
+        self.stats_logs = []
 
     def update_currencies(self, currencies):
         """
@@ -45,7 +51,7 @@ class ParserLogger():
         Args:
             currencies (dict): A dictionary containing currency information.
         """
-        self.currency_logs = []
+        currency_logs = []
 
         stable_coin_value, stable_coin_name = try_get_stable_coin_dollar_value(currencies, 'USDC')
 
@@ -56,9 +62,12 @@ class ParserLogger():
             if stable_coin_name == '$':
                 pair_name = currency_name
                 
-            self.currency_logs.append(
+            currency_logs.append(
                 f'    {pair_name}: {pair_value} {stable_coin_name}'
             )
+
+        with self.lock:
+            self.currency_logs = currency_logs
     
     @staticmethod
     def _get_condition_type_string(message):
@@ -71,6 +80,10 @@ class ParserLogger():
         Returns:
             str: The condition type string.
         """
+        if message.get('kind') == 'percent_move':
+            return f'moved by {message["check_value"]}% within {message["window"]} s'
+        if message.get('kind') == 'ma_cross':
+            return f'crossed its moving average over {message["window"]} s'
         if message['condition_flag'] is True:
             return 'bigger'
         return 'lower'
@@ -82,7 +95,8 @@ class ParserLogger():
         pair2_name, 
         condition_result, 
         now_pair_value, 
-        check_value
+        check_value,
+        subscriber_count=1
     ):
         """
         Adds a message condition to the log.
@@ -94,14 +108,17 @@ class ParserLogger():
             condition_result (bool): The condition result.
             now_pair_value (float): The current pair value.
             check_value (float): The check value.
+            subscriber_count (int, optional): Number of users with the same condition. Defaults to 1.
         """
         condition_type_string = self._get_condition_type_string(message)
-        self.message_conditions_logs.append(
-            f'    {message["user"][1]} ({message["user"][0]}): ' \
-            f'now value of {pair1_name} is {now_pair_value} {pair2_name}, ' \
-            f'is {condition_type_string}: {condition_result}, ' \
-            f'check value: {check_value} {pair2_name}'
-        )
+        subscribers_string = f' and {subscriber_count - 1} more users' if subscriber_count > 1 else ''
+        with self.lock:
+            self.message_conditions_logs.append(
+                f'    {message["user"][1]} ({message["user"][0]}){subscribers_string}: ' \
+                f'now value of {pair1_name} is {now_pair_value} {pair2_name}, ' \
+                f'is {condition_type_string}: {condition_result}, ' \
+                f'check value: {check_value} {pair2_name}'
+            )
     
     def add_message_from_queue(self, message, condition_flag):
         """
@@ -111,10 +128,11 @@ class ParserLogger():
             message (tuple): The message tuple.
             condition_flag (bool): The condition flag.
         """
-        self.message_from_queue_logs.append(
-            f'    {message[0][1]} ({message[0][0]}) send message: ' \
-            f'check {message[1]} is {condition_flag}: {message[3]} {message[2]}'
-        )
+        with self.lock:
+            self.message_from_queue_logs.append(
+                f'    {message[0][1]} ({message[0][0]}) send message: ' \
+                f'check {message[1]} is {condition_flag}: {message[3]} {message[2]}'
+            )
     
 
     def add_message_to_queue(self, message):
@@ -126,13 +144,36 @@ class ParserLogger():
         """
         condition_type_string = self._get_condition_type_string(message)
 
-        self.message_to_queue_logs.append(
-            f'    {message["user"][1]} ({message["user"][0]}), ' \
-            f'The {message["pair1_name"]} is {condition_type_string} ' \
-            f'than {message["check_value"]} {message["pair2_name"]} ' \
-            f'and equals {message["now_pair_value"]} {message["pair2_name"]}'
-        )
+        if 'kind' in message:
+            with self.lock:
+                self.message_to_queue_logs.append(
+                    f'    {message["user"][1]} ({message["user"][0]}), ' \
+                    f'The {message["pair1_name"]} {condition_type_string} ' \
+                    f'and equals {message["now_pair_value"]} {message["pair2_name"]}'
+                )
+            return
+
+        with self.lock:
+            self.message_to_queue_logs.append(
+                f'    {message["user"][1]} ({message["user"][0]}), ' \
+                f'The {message["pair1_name"]} is {condition_type_string} ' \
+                f'than {message["check_value"]} {message["pair2_name"]} ' \
+                f'and equals {message["now_pair_value"]} {message["pair2_name"]}'
+            )
+
+
+    def add_stats(self, stats_name, stats):
+        """
+        Adds statistics of the current tick to the log.
 
+        Args:
+            stats_name (str): The name of the statistics.
+            stats (str): The statistics string.
+        """
+        with self.lock:
+            self.stats_logs.append(
+                f'    {stats_name}: {stats}'
+            )
 
     def _log_string(self, log_message):
         """
@@ -151,40 +192,72 @@ class ParserLogger():
         """
         Logs the collected information.
         """
+        # Logs added by other threads while logging go to the next record
+        with self.lock:
+            currency_logs = self.currency_logs
+            message_from_queue_logs = self.message_from_queue_logs
+            message_conditions_logs = self.message_conditions_logs
+            message_to_queue_logs = self.message_to_queue_logs
+            stats_logs = self.stats_logs
+            self.clear_logs()
+
         self._log_string('#################################################')
 
         self._log_string('Now currencies: [')
-        for currency_log in self.currency_logs:
+        for currency_log in currency_logs:
             self._log_string(currency_log)
         self._log_string(']')
 
         self._log_string('')
 
         self._log_string('Gated messages: [')
-        for message_from_queue_log in self.message_from_queue_logs:
+        for message_from_queue_log in message_from_queue_logs:
             self._log_string(message_from_queue_log)
         self._log_string(']')
 
         self._log_string('')
         
         self._log_string('Now user`s conditions: [')
-        for message_condition_log in self.message_conditions_logs:
+        for message_condition_log in message_conditions_logs:
             self._log_string(message_condition_log)
         self._log_string(']')
 
         self._log_string('')
         
         self._log_string('Sended messages: [')
-        for message_to_queue_log in self.message_to_queue_logs:
+        for message_to_queue_log in message_to_queue_logs:
             self._log_string(message_to_queue_log)
         self._log_string(']')
 
+        self._log_string('')
+
+        self._log_string('Stats: [')
+        for stats_log in stats_logs:
+            self._log_string(stats_log)
+        self._log_string(']')
+
         self._log_string('#################################################')
         self._log_string('')
 
-        self.message_from_queue_logs = []
-        self.message_conditions_logs = []
-        self.message_to_queue_logs = []
+    def has_message_logs(self):
+        """
+        Checks if any message was gated, checked or sent since the last log.
+
+        Returns:
+            bool: True if there are message logs.
+        """
+        with self.lock:
+            return len(self.message_from_queue_logs) + len(self.message_conditions_logs) + len(self.message_to_queue_logs) > 0
+
+    def clear_logs(self):
+        """
+        Drops the collected message and statistics logs without logging them.
+        """
+        with self.lock:
+            self.message_from_queue_logs = []
+            self.message_conditions_logs = []
+            self.message_to_queue_logs = []
+            self.stats_logs = []
     
     def log_exception(self, exception_message):
         """
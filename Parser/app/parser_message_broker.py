@@ -1,18 +1,53 @@
+from collections import deque
+from condition_journal import ConditionJournal
+from condition_store import CONDITION_ID_KEY, ConditionStore, get_condition_id
+from time import sleep, time
+from window_conditions import WINDOW_CONDITION_KINDS, PERCENT_MOVE_KIND
+from wire_format import decode_message, encode_message
+
 import pika
-import json
-import os
+
+def open_rabbit_connection():
+    """
+    Opens a connection to the 'rabbit-1' RabbitMQ server.
+
+    Returns:
+        pika.BlockingConnection: The connection.
+    """
+    return pika.BlockingConnection(pika.ConnectionParameters(host='rabbit-1'))
+
 
 class ParserMessageBroker():
     """
     A class to handle message brokering between different components using RabbitMQ.
     It handles reading from and writing to queues, as well as managing a cache of message queues.
+    The cache is a snapshot file with an append-only journal of changes, see ConditionJournal.
+    New conditions are consumed from the 'bot2parser_queue' with a prefetch limit and acknowledged in batches.
 
     Attributes:
         parser_docker_logger (ParserLogger): Logger for recording events.
-        path_to_mq_cache (str): Path to the message queue cache file.
+        path_to_mq_cache (str or None): Path to the message queue cache file, None if conditions are kept only in memory.
         connection (pika.BlockingConnection): RabbitMQ connection.
         channel (pika.BlockingConnection.channel): RabbitMQ channel.
-        mq (dict): In-memory message queue.
+        mq (ConditionStore or SqliteConditionStore): Store of user conditions.
+        new_condition_pairs (set): Pairs (pair1_name, pair2_name) that received conditions since the last check.
+        condition_journal (ConditionJournal or None): Journal of condition changes, None if conditions are kept only in memory.
+        prefetch_count (int): Maximum number of consumed 'bot2parser_queue' messages waiting for an acknowledgement.
+        is_consuming (bool): True once the consumer of the 'bot2parser_queue' is started.
+        bot2parser_deliveries (deque): Delivered 'bot2parser_queue' messages: tuples (delivery_tag, properties, body).
+        last_delivery_tag (int or None): Tag of the last taken message that isn't acknowledged yet.
+        intake_count (int): Number of taken 'bot2parser_queue' messages.
+        intake_batches (deque): Times and sizes of the last batches of taken messages.
+        intake_lags (deque): Times between sending and taking the last messages in seconds.
+        wire_format (str): Format of currency updates of the 'parser_info_queue', "json" or "binary". Notifications are JSON,
+                           received messages are decoded by their content type.
+        info_ttl (float or None): Time a currency update waits in the 'parser_info_queue' before it expires in seconds.
+        notification_channel (pika.BlockingConnection.channel or None): Channel publishing notifications with publisher confirms.
+        notification_batch_size (int): Maximum number of notifications in one 'parser2bot_queue' message.
+        pending_notifications (dict): Condition ids and their notifications waiting to be published or confirmed:
+                                      tuples (pair1_name, pair2_name, message_data, out_message).
+        restored_condition_ids (set): Ids of conditions put back into the store while their notifications wait.
+        connection_factory (callable or None): Creates a new connection if the connection is closed, None doesn`t reconnect.
     """
 
     condition_flag = {
@@ -21,180 +56,561 @@ class ParserMessageBroker():
         None: "will cross"
     }
 
-    def __init__(self, parser_docker_logger, path_to_mq_cache='mq_cache.json') -> None:
+    window_condition_flag = {
+        True: "up",
+        False: "down",
+        None: "in any direction"
+    }
+
+    def get_condition_string(self, condition_flag, condition_options):
+        """
+        Describes a condition for the log.
+
+        Args:
+            condition_flag (bool or None): The condition flag.
+            condition_options (dict): Options of the condition with optional "kind" and "window" keys.
+
+        Returns:
+            str: Description of the condition.
+        """
+        if condition_options.get("kind") == PERCENT_MOVE_KIND:
+            return f'moving {self.window_condition_flag[condition_flag]} within {condition_options["window"]} s by percent'
+        if condition_options.get("kind") in WINDOW_CONDITION_KINDS:
+            return f'crossing {self.window_condition_flag[condition_flag]} its moving average over {condition_options["window"]} s'
+        return self.condition_flag[condition_flag]
+
+    def __init__(self, parser_docker_logger, path_to_mq_cache='mq_cache.bpcs', connection=None, condition_store=None, prefetch_count=1000, stats_window=100, wire_format='json', info_ttl=300.0, notification_batch_size=1000, connection_factory=None) -> None:
         """
         Initialize the ParserMessageBroker with a logger and optional path to the cache file.
 
         Args:
             parser_docker_logger (ParserLogger): Logger for recording events.
-            path_to_mq_cache (str, optional): Path to the message queue cache file. Defaults to 'mq_cache.json'.
+            path_to_mq_cache (str or None, optional): Path to the message queue cache file, None keeps conditions only in memory. Defaults to 'mq_cache.bpcs'.
+            connection (pika.BlockingConnection, optional): An open RabbitMQ connection. Defaults to a new connection of `connection_factory`.
+            condition_store (SqliteConditionStore, optional): A store persisting conditions on its own, `path_to_mq_cache`
+                                                              must be None then. Defaults to an in-memory ConditionStore.
+            prefetch_count (int, optional): Maximum number of consumed 'bot2parser_queue' messages waiting for an acknowledgement. Defaults to 1000.
+            stats_window (int, optional): Number of last batches and messages the intake statistics are calculated from. Defaults to 100.
+            wire_format (str, optional): Format of currency updates, "binary" for bots reading the binary format. Defaults to "json".
+            info_ttl (float or None, optional): Time a currency update waits in the 'parser_info_queue' before it expires in seconds,
+                                                so the queue doesn't grow while the bot is down. None keeps updates until they are read.
+                                                Defaults to 300.0.
+            notification_batch_size (int, optional): Maximum number of notifications in one 'parser2bot_queue' message. Defaults to 1000.
+            connection_factory (callable, optional): Creates a RabbitMQ connection, it is called again if the connection is closed.
+                                                     Defaults to new connections to 'rabbit-1' without `connection`, no reconnecting with it.
         """
         self.parser_docker_logger = parser_docker_logger
-        connection_params = pika.ConnectionParameters(
-            host='rabbit-1'
-        )
 
-        self.connection = pika.BlockingConnection(connection_params)
+        if connection is None and connection_factory is None:
+            connection_factory = open_rabbit_connection
+        self.connection_factory = connection_factory
+
+        self.connection = connection if connection is not None else self.connection_factory()
 
         self.path_to_mq_cache = path_to_mq_cache
+        self.condition_journal = ConditionJournal(path_to_mq_cache, parser_docker_logger=parser_docker_logger) if path_to_mq_cache is not None else None
 
         self.channel = self.connection.channel()
 
         self.channel.queue_declare(queue='bot2parser_queue')
         self.channel.queue_declare(queue='parser2bot_queue')
         self.channel.queue_declare(queue='parser_info_queue')
+        self.channel.queue_declare(queue='bot2parser_keyframe_queue')
 
+        self.mq = condition_store if condition_store is not None else ConditionStore()
         self.load_mq_cache(is_width_auto_update=False)
 
+        self.new_condition_pairs = set(self.mq.get_pairs())
+
+        # The consumer starts on the first read, brokers that only publish never take messages
+        self.prefetch_count = prefetch_count
+        self.is_consuming = False
+        self.bot2parser_deliveries = deque()
+        self.last_delivery_tag = None
+
+        self.intake_count = 0
+        self.intake_batches = deque(maxlen=stats_window)
+        self.intake_lags = deque(maxlen=stats_window)
+
+        self.wire_format = wire_format
+        self.info_ttl = info_ttl
+
+        # Opened on the first publish of notifications, brokers that don`t evaluate conditions never open it
+        self.notification_channel = None
+        self.notification_batch_size = notification_batch_size
+        self.pending_notifications = {}
+        self.restored_condition_ids = set()
+
     def load_mq_cache(self, is_width_auto_update=True):
         """
-        Load the message queue cache from a file. Optionally update the in-memory queue with the loaded data.
+        Load the message queue cache from the snapshot and its journal. Optionally update the in-memory queue with the loaded data.
+
+        Without merging the snapshot is rewritten with the loaded conditions and the journal starts empty.
 
         Args:
             is_width_auto_update (bool, optional): If True, merge loaded data with in-memory queue. Defaults to True.
         """
-        if os.path.exists(self.path_to_mq_cache):
-            with open(self.path_to_mq_cache, 'r', encoding="utf-8") as cash_fp:
-                mq = json.load(cash_fp)
-
-            if is_width_auto_update is True:
-                for pair1_name in mq:
-                    if pair1_name not in self.mq:
-                        self.mq[pair1_name] = {}
-
-                    for pair2_name in mq[pair1_name]:
-                        if pair2_name not in self.mq[pair1_name]:
-                            self.mq[pair1_name][pair2_name] = []
+        if self.condition_journal is None:
+            return
 
-                        for condition_id in mq[pair1_name][pair2_name]:
-                            if mq[pair1_name][pair2_name][condition_id] not in self.mq[pair1_name][pair2_name]:
-                                self.mq[pair1_name][pair2_name].append(mq[pair1_name][pair2_name][condition_id])
+        self.mq.load_dict(self.condition_journal.recover(), is_merge=is_width_auto_update)
 
-                return
-            
-            self.mq = mq
-            return
-        
-        self.mq = {}
+        if is_width_auto_update is False:
+            self.condition_journal.reset(self.mq)
     
     def write_2_mq_cache(self, is_with_load=False):
         """
-        Write the in-memory message queue to a cache file. Optionally load the cache before writing.
+        Write the in-memory message queue to the snapshot file and start an empty journal. Optionally load the cache before writing.
 
         Args:
             is_with_load (bool, optional): If True, load the cache before writing. Defaults to False.
         """
+        if self.condition_journal is None:
+            return
+
         if is_with_load is True:
             self.load_mq_cache()
 
-        with open(self.path_to_mq_cache, 'w', encoding="utf-8") as cash_fp:
-            json.dump(self.mq, cash_fp, indent=4)
+        self.condition_journal.reset(self.mq)
 
-    def read_message_from_bot2parser_queue(self):
+    def sync_mq_cache(self, is_forced=False):
         """
-        Read a message from the 'bot2parser_queue', log it, and add it to the in-memory queue.
+        Request an fsync of journaled changes and compact the journal once it outgrows the conditions.
+        Stores persisting conditions on their own commit their changes on forced calls.
+
+        Args:
+            is_forced (bool, optional): If True, written changes are fsynced right away and the journal length is checked,
+                                        the end of a tick is forced. Defaults to False.
         """
-        method_frame, header_frame, body = self.channel.basic_get('bot2parser_queue')
-        if method_frame:
-            message = json.loads(body)
+        if self.condition_journal is None:
+            if is_forced is True:
+                self.mq.commit()
+            return
 
-            self.parser_docker_logger.add_message_from_queue(message, self.condition_flag[message[4]])
-            
-            message_data = {
-                "user": message[0],
-                "check_value": message[3],
-                "condition_flag": message[4]
-            }
-            if message[1] in self.mq:
-                if message[2] not in self.mq[message[1]]:
-                    self.mq[message[1]][message[2]] = []
+        self.condition_journal.sync(is_forced)
 
-                self.mq[message[1]][message[2]].append(message_data)
-            else:
-                self.mq[message[1]] = {message[2]: [message_data]}
-                
-            self.channel.basic_ack(method_frame.delivery_tag)
+        if is_forced is True:
+            if self.condition_journal.is_compaction_needed(self.mq.get_condition_count()) is True:
+                self.condition_journal.compact()
+            self.parser_docker_logger.add_stats('Journal', self.condition_journal.get_stats_string())
 
-            self.write_2_mq_cache()
-    
-    def set_condition_flag(self, condition_flag, check_value, now_pair_value):
+    def _on_bot2parser_message(self, channel, method_frame, properties, body):
         """
-        Determine the condition flag based on the given values.
+        Keep a message delivered by the consumer of the 'bot2parser_queue' until it is taken.
 
         Args:
-            condition_flag (bool or None): The initial condition flag.
-            check_value (float): The value to check against.
-            now_pair_value (float): The current value of the pair.
+            channel (pika.channel.Channel): The channel.
+            method_frame (pika.spec.Basic.Deliver): The method frame with the delivery tag.
+            properties (pika.BasicProperties): Properties of the message.
+            body (bytes): Body of the message.
+        """
+        self.bot2parser_deliveries.append((method_frame.delivery_tag, properties, body))
+
+    def get_messages_from_bot2parser_queue(self, timeout=0):
+        """
+        Take all delivered messages of the 'bot2parser_queue' without adding them to the in-memory queue.
+
+        The messages are acknowledged by `ack_bot2parser_queue` once they are processed.
+        Malformed messages are logged and skipped, they are acknowledged with the rest.
+
+        Args:
+            timeout (float, optional): Time to wait for a delivery if there is none in seconds. Defaults to 0.
 
         Returns:
-            bool: The determined condition flag.
+            list: The messages, at most `prefetch_count` of them.
+        """
+        if self.is_consuming is False:
+            self.channel.basic_qos(prefetch_count=self.prefetch_count)
+            self.channel.basic_consume(queue='bot2parser_queue', on_message_callback=self._on_bot2parser_message)
+            self.is_consuming = True
+
+        self.connection.process_data_events(time_limit=timeout)
+        if len(self.bot2parser_deliveries) == 0:
+            return []
+
+        take_time = time()
+        messages = []
+        while len(self.bot2parser_deliveries) > 0:
+            delivery_tag, properties, body = self.bot2parser_deliveries.popleft()
+            self.last_delivery_tag = delivery_tag
+
+            headers = getattr(properties, 'headers', None) or {}
+            if isinstance(headers.get("sent_at"), (int, float)):
+                self.intake_lags.append(max(take_time - headers["sent_at"], 0.0))
+
+            try:
+                messages.append(decode_message(body, getattr(properties, 'content_type', None)))
+            except ValueError as exception:
+                self.parser_docker_logger.log_exception(f'Message {body} of the "bot2parser_queue" isn`t decoded: {exception} The message was skipped.')
+
+        self.intake_count += len(messages)
+        self.intake_batches.append((take_time, len(messages)))
+        return messages
+
+    def wait_bot2parser_messages(self, timeout):
+        """
+        Wait for messages delivered to the consumer of the 'bot2parser_queue' without taking them.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds.
+
+        Returns:
+            bool: True if delivered messages wait to be taken.
+        """
+        if len(self.bot2parser_deliveries) > 0:
+            return True
+
+        if self.is_consuming is False:
+            # Nothing is delivered before the first read starts the consumer
+            sleep(timeout)
+            return False
+
+        self.connection.process_data_events(time_limit=timeout)
+        return len(self.bot2parser_deliveries) > 0
+
+    def ack_bot2parser_queue(self, delivery_tag=None):
+        """
+        Acknowledge taken messages of the 'bot2parser_queue' at once.
+
+        Args:
+            delivery_tag (int, optional): Tag of the last acknowledged message, messages taken after it stay unacknowledged.
+                                          Defaults to the tag of the last taken message.
         """
-        return check_value > now_pair_value if condition_flag is None else condition_flag
+        if delivery_tag is None:
+            delivery_tag = self.last_delivery_tag
+        if delivery_tag is None:
+            return
 
-    def send_message2parser2bot_queue(self, pair1_name, pair2_name, condition_id, now_pair_value, pair1_keys, pair2_keys):
+        self.channel.basic_ack(delivery_tag=delivery_tag, multiple=True)
+        if self.last_delivery_tag is not None and self.last_delivery_tag <= delivery_tag:
+            self.last_delivery_tag = None
+
+    def get_intake_stats_string(self):
         """
-        Send a message to the 'parser2bot_queue' and update the in-memory queue accordingly.
+        Describe the intake of the 'bot2parser_queue' for the statistics.
+
+        Returns:
+            str: Number of taken messages, recent throughput and the time messages waited in the queue.
+        """
+        stats_string = f'{self.intake_count} messages'
+        if len(self.intake_batches) > 1:
+            batches_duration = self.intake_batches[-1][0] - self.intake_batches[0][0]
+            batches_count = sum(batch_size for _, batch_size in list(self.intake_batches)[1:])
+            if batches_duration > 0:
+                stats_string += f', {batches_count / batches_duration:.1f} messages/s'
+
+        intake_lags = list(self.intake_lags)
+        if len(intake_lags) > 0:
+            stats_string += f', lag {sum(intake_lags) / len(intake_lags) * 1000:.1f} ms (max {max(intake_lags) * 1000:.1f} ms)'
+        return stats_string
+
+    def add_message(self, message):
+        """
+        Log a message of the 'bot2parser_queue' and add its condition to the in-memory queue.
+
+        The message is a list [user, pair1_name, pair2_name, check_value, condition_flag] with an optional
+        options dictionary at the end. Windowed conditions set its "kind" ("percent_move" or "ma_cross")
+        and "window" (window length in seconds) keys, "percent_move" conditions use check_value as the percent.
+        The "id" key is the id the bot gave the condition, messages without it get an id derived from
+        their content. A redelivered message has the id of a stored condition and is skipped.
 
         Args:
-            pair1_name (str): The first currency in the pair.
-            pair2_name (str): The second currency in the pair.
-            condition_id (int): The ID of the condition to check.
-            now_pair_value (float): The current value of the currency pair.
-            pair1_keys (list): List of first currency keys.
-            pair2_keys (list): List of second currency keys.
+            message (list): The message.
 
         Returns:
-            tuple: Updated pair1_keys and pair2_keys.
-        """
-        message_data = self.mq[pair1_name][pair2_name][condition_id]
-        out_message = {
-            "user": message_data["user"],
-            "pair1_name": pair1_name,
-            "pair2_name": pair2_name,
-            "condition_flag": message_data["condition_flag"],
-            "check_value": message_data["check_value"],
-            "now_pair_value": now_pair_value
+            bool: True if the condition was added.
+        """
+        condition_options = message[5] if len(message) > 5 else {}
+
+        condition_id = condition_options.get(CONDITION_ID_KEY)
+        message_data = {
+            "user": message[0],
+            "check_value": message[3],
+            "condition_flag": message[4],
+            CONDITION_ID_KEY: condition_id if isinstance(condition_id, str) and len(condition_id) > 0 else get_condition_id(*message[:5])
         }
+
+        if "kind" in condition_options:
+            window = condition_options.get("window")
+            if condition_options["kind"] not in WINDOW_CONDITION_KINDS or isinstance(window, (int, float)) is False or window <= 0:
+                self.parser_docker_logger.log_exception(f'Condition options {condition_options} of message {message} aren`t supported. The message was skipped.')
+                return False
+
+            message_data["kind"] = condition_options["kind"]
+            message_data["window"] = window
+
+        self.parser_docker_logger.add_message_from_queue(message, self.get_condition_string(message[4], condition_options))
+
+        pair_key = self.mq.add(message[1], message[2], message_data)
+        if pair_key is None:
+            self.parser_docker_logger.log_info(f'Condition {message_data[CONDITION_ID_KEY]} of message {message} is already stored. The message was skipped.')
+            return False
+        self.new_condition_pairs.add(pair_key)
+
+        if self.condition_journal is not None:
+            self.condition_journal.append_add(*pair_key, message_data)
+        self.sync_mq_cache()
+        return True
+
+    def cancel_condition(self, condition_id):
+        """
+        Remove a condition from the in-memory queue by its id and journal the removal.
+
+        Args:
+            condition_id (str): Id of the condition.
+
+        Returns:
+            bool: True if the condition was removed.
+        """
+        condition = self.mq.remove(condition_id)
+        if condition is None:
+            return False
+
+        if self.condition_journal is not None:
+            self.condition_journal.append_remove(*condition)
+        self.sync_mq_cache()
+        return True
+
+    def journal_resolved_conditions(self, pair1_name, pair2_name, messages):
+        """
+        Journal the directions of "will cross" conditions decided by the current pair value.
+
+        Without it a restart would decide them again by the price of that moment.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            messages (list): The conditions with decided directions.
+        """
+        if self.condition_journal is None:
+            return
+
+        for message_data in messages:
+            self.condition_journal.append_resolve(pair1_name, pair2_name, message_data)
+
+    def read_messages_from_bot2parser_queue(self):
+        """
+        Read all delivered messages of the 'bot2parser_queue', log them, add them to the in-memory queue and acknowledge them.
+
+        Returns:
+            int: Number of read messages.
+        """
+        messages = self.get_messages_from_bot2parser_queue()
+        for message in messages:
+            self.add_message(message)
+        self.ack_bot2parser_queue()
+
+        return len(messages)
+    
+    def publish(self, queue_name, message, ttl=None, wire_format='json'):
+        """
+        Encode a message in a wire format and publish it with its content type.
+
+        Args:
+            queue_name (str): Name of the queue.
+            message: A JSON-like message.
+            ttl (float, optional): Time the message waits in the queue before it expires in seconds. Defaults to None.
+            wire_format (str, optional): "json" or "binary". Defaults to "json".
+        """
+        body, content_type = encode_message(message, wire_format)
         self.channel.basic_publish(
             exchange='',
-            routing_key='parser2bot_queue',
-            body=json.dumps(out_message)
+            routing_key=queue_name,
+            body=body,
+            properties=pika.BasicProperties(
+                content_type=content_type,
+                expiration=str(int(ttl * 1000)) if ttl is not None else None
+            )
         )
 
-        self.parser_docker_logger.add_message_to_queue(out_message)
+    def add_notifications(self, pair1_name, pair2_name, messages, now_pair_value):
+        """
+        Add notifications of met conditions of a pair to the notifications waiting to be published.
+
+        They are published by `send_message2parser2bot_queue`, every notification is in the pair order its condition
+        was set for. The conditions must be already removed from the in-memory store, their removal is journaled once
+        the notifications are confirmed. A condition whose notification is already waiting isn`t notified twice.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            messages (list): The met conditions.
+            now_pair_value (float): The current value of the bucket pair.
+        """
+        for message_data in messages:
+            if message_data[CONDITION_ID_KEY] in self.pending_notifications:
+                # Met again while its notification waits, the condition stays in the store until the confirmation
+                self.restore_notifications([(pair1_name, pair2_name, message_data, None)])
+                continue
+
+            user_pair1_name, user_pair2_name, user_pair_value = self.mq.get_user_pair(pair1_name, pair2_name, message_data, now_pair_value)
+
+            out_message = {
+                CONDITION_ID_KEY: message_data[CONDITION_ID_KEY],
+                "user": message_data["user"],
+                "pair1_name": user_pair1_name,
+                "pair2_name": user_pair2_name,
+                "condition_flag": message_data["condition_flag"],
+                "check_value": message_data["check_value"],
+                "now_pair_value": user_pair_value
+            }
+            if "kind" in message_data:
+                out_message["kind"] = message_data["kind"]
+                out_message["window"] = message_data["window"]
+
+            self.pending_notifications[message_data[CONDITION_ID_KEY]] = (pair1_name, pair2_name, message_data, out_message)
+
+    def reconnect(self):
+        """
+        Open a new connection and channel instead of closed ones, the queues are declared again.
+
+        Taken 'bot2parser_queue' messages that weren`t acknowledged are redelivered by the broker
+        to the new consumer, stored conditions skip them by their ids.
+
+        Returns:
+            bool: True if the broker reconnected, False if it has no connection factory.
+        """
+        if self.connection_factory is None:
+            return False
+
+        self.connection = self.connection_factory()
+        self.channel = self.connection.channel()
+        self.channel.queue_declare(queue='bot2parser_queue')
+        self.channel.queue_declare(queue='parser2bot_queue')
+        self.channel.queue_declare(queue='parser_info_queue')
+        self.channel.queue_declare(queue='bot2parser_keyframe_queue')
+
+        self.notification_channel = None
+        self.is_consuming = False
+        self.bot2parser_deliveries.clear()
+        self.last_delivery_tag = None
+
+        self.parser_docker_logger.log_info('The RabbitMQ connection was closed, the broker reconnected.')
+        return True
+
+    def get_notification_channel(self):
+        """
+        Return the channel publishing notifications, it is opened in the publisher confirms mode on the first call.
+
+        A closed connection is opened again first.
+
+        Returns:
+            pika.BlockingConnection.channel: The channel.
+        """
+        if self.connection.is_closed is True and self.reconnect() is False:
+            raise pika.exceptions.ConnectionWrongStateError('The connection is closed and the broker has no connection factory.')
+
+        if self.notification_channel is None:
+            notification_channel = self.connection.channel()
+            notification_channel.confirm_delivery()
+            self.notification_channel = notification_channel
+        return self.notification_channel
 
-        del self.mq[pair1_name][pair2_name][condition_id]
+    def send_message2parser2bot_queue(self):
+        """
+        Publish the waiting notifications to the 'parser2bot_queue' with publisher confirms and update the cache accordingly.
 
+        Every message is a list of at most `notification_batch_size` notifications, so a price spike costs a few round trips
+        to the broker instead of one per pair. The removal of a condition is journaled only after the broker confirms its
+        notification. Notifications the broker didn`t confirm keep waiting and are published again on the next tick with
+        the value the condition was met at, their conditions are put back into the store until then, so the cache keeps
+        them. A hiccup of the broker doesn`t lose alerts, but a message lost after the broker took it may be delivered twice.
 
-        if len(self.mq[pair1_name][pair2_name]) == 0:
-            del self.mq[pair1_name][pair2_name]
-            del pair2_keys[pair2_keys.index(pair2_name)]
+        Returns:
+            int: Number of confirmed notifications.
+        """
+        confirmed_count = 0
+        notifications = list(self.pending_notifications.values())
+
+        for batch_start in range(0, len(notifications), self.notification_batch_size):
+            batch = notifications[batch_start:batch_start + self.notification_batch_size]
+            # Notifications are small, the binary format doesn`t make them smaller
+            body, content_type = encode_message([out_message for _, _, _, out_message in batch], 'json')
+
+            try:
+                # In the confirms mode the call returns once the broker confirms the message
+                self.get_notification_channel().basic_publish(
+                    exchange='',
+                    routing_key='parser2bot_queue',
+                    body=body,
+                    properties=pika.BasicProperties(content_type=content_type),
+                    mandatory=True
+                )
+            except pika.exceptions.AMQPError as exception:
+                if isinstance(exception, (pika.exceptions.NackError, pika.exceptions.UnroutableError)) is False:
+                    # The channel is closed, the next tick opens a new one and reconnects if the connection is closed too
+                    self.notification_channel = None
+
+                self.restore_notifications(notifications[batch_start:])
+                self.parser_docker_logger.log_exception(
+                    f'Notifications to the "parser2bot_queue" aren`t confirmed: {exception!r}. ' \
+                    f'{len(notifications) - batch_start} notifications will be published again on the next tick.'
+                )
+                break
+
+            for pair1_name, pair2_name, message_data, out_message in batch:
+                condition_id = message_data[CONDITION_ID_KEY]
+                del self.pending_notifications[condition_id]
+                if condition_id in self.restored_condition_ids:
+                    self.restored_condition_ids.remove(condition_id)
+                    self.mq.remove(condition_id)
+
+                self.parser_docker_logger.add_message_to_queue(out_message)
+                if self.condition_journal is not None:
+                    self.condition_journal.append_remove(pair1_name, pair2_name, message_data)
+            confirmed_count += len(batch)
+
+        self.sync_mq_cache()
+        return confirmed_count
+
+    def restore_notifications(self, notifications):
+        """
+        Put the conditions of unconfirmed notifications back into the store until they are confirmed.
 
-            if len(self.mq[pair1_name]) == 0:
-                del self.mq[pair1_name]
-                del pair1_keys[pair1_keys.index(pair1_name)]
-        
-        self.write_2_mq_cache()
+        The conditions keep their ids and their removal was never journaled, so the cache keeps them if the parser
+        stops before the confirmation. Met again, they don`t add a second notification.
 
-        return pair1_keys, pair2_keys
+        Args:
+            notifications (list): Tuples (pair1_name, pair2_name, message_data, out_message) of the notifications.
+        """
+        for pair1_name, pair2_name, message_data, _ in notifications:
+            if self.mq.add(pair1_name, pair2_name, message_data) is not None:
+                self.restored_condition_ids.add(message_data[CONDITION_ID_KEY])
 
-    def send_message2parser_info_queue(self, currencies):
+    def send_message2parser_info_queue(self, snapshot_delta):
         """
         Send currency information to the 'parser_info_queue'.
 
+        Updates expire after `info_ttl`, the bot merges the updates it takes at once. A delta based on
+        an expired one is discarded by the bot, it requests a keyframe that restores all currencies.
+
         Args:
-            currencies (dict): A dictionary of currency data.
+            snapshot_delta (dict): A versioned delta of currency data made by SnapshotDiffer.
         """
-        self.channel.basic_publish(
-            exchange='',
-            routing_key='parser_info_queue',
-            body=json.dumps(currencies)
-        )
+        self.publish('parser_info_queue', snapshot_delta, ttl=self.info_ttl, wire_format=self.wire_format)
     
+    def take_keyframe_requests(self):
+        """
+        Take all keyframe requests the bot sent to the 'bot2parser_keyframe_queue'.
+
+        The bot requests a keyframe when a delta of the 'parser_info_queue' expired before it was read.
+
+        Returns:
+            bool: True if a keyframe was requested since the last call.
+        """
+        is_requested = False
+        while True:
+            method_frame, _, _ = self.channel.basic_get(queue='bot2parser_keyframe_queue', auto_ack=True)
+            if method_frame is None:
+                return is_requested
+            is_requested = True
+
     def close_connection(self):
         """
         Close the RabbitMQ connection after writing the in-memory queue to the cache.
         """
-        self.write_2_mq_cache()
+        if self.condition_journal is not None:
+            self.condition_journal.close(self.mq)
+        self.mq.commit()
 
         self.connection.close()
\ No newline at end of file
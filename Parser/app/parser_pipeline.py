@@ -0,0 +1,393 @@
+from collections import deque
+from parser_message_broker import ParserMessageBroker
+from queue import Queue, Empty
+from time import perf_counter, time
+
+import asyncio
+import threading
+
+class PipelineStage(threading.Thread):
+    """
+    Base class of a parser pipeline stage running in its own thread.
+
+    Attributes:
+        stage_name (str): Name of the stage in the statistics.
+        is_running (bool): The stage works while it is True.
+        latencies (deque): Latencies of the last processed items in seconds.
+    """
+
+    def __init__(self, stage_name, stats_window=100) -> None:
+        """
+        Initializes the PipelineStage.
+
+        Args:
+            stage_name (str): Name of the stage in the statistics.
+            stats_window (int, optional): Number of last latencies the statistics are calculated from. Defaults to 100.
+        """
+        super().__init__(name=stage_name, daemon=True)
+        self.stage_name = stage_name
+        self.is_running = True
+        self.latencies = deque(maxlen=stats_window)
+
+    def add_latency(self, latency):
+        """
+        Records the latency of a processed item.
+
+        Args:
+            latency (float): Latency in seconds.
+        """
+        self.latencies.append(latency)
+
+    def get_stats_string(self):
+        """
+        Returns the latency statistics of the stage.
+
+        Returns:
+            str: Mean and maximum latency of the last items.
+        """
+        latencies = list(self.latencies)
+        if len(latencies) == 0:
+            return f'{self.stage_name}: -'
+        return f'{self.stage_name}: {sum(latencies) / len(latencies) * 1000:.1f} ms (max {max(latencies) * 1000:.1f} ms)'
+
+    def stop(self):
+        """
+        Asks the stage to stop after the current item.
+        """
+        self.is_running = False
+
+
+class IngestionStage(PipelineStage):
+    """
+    Fetches currencies snapshots, publishes their deltas and passes them to the evaluation stage.
+
+    Its latency is the time of fetching and publishing a snapshot.
+
+    Attributes:
+        binance_message_processor (BinanceMessageProcessor): Processor owning the currency source and the scheduler.
+        message_broker (ParserMessageBroker): Message broker of the stage used for the 'parser_info_queue'.
+        evaluation_queue (Queue): Input queue of the evaluation stage.
+        evaluation_stage (EvaluationStage): The evaluation stage, its nearest condition distance drives the scheduler.
+    """
+
+    def __init__(self, binance_message_processor, message_broker, evaluation_queue, evaluation_stage) -> None:
+        """
+        Initializes the IngestionStage.
+
+        Args:
+            binance_message_processor (BinanceMessageProcessor): Processor owning the currency source and the scheduler.
+            message_broker (ParserMessageBroker): Message broker of the stage used for the 'parser_info_queue'.
+            evaluation_queue (Queue): Input queue of the evaluation stage.
+            evaluation_stage (EvaluationStage): The evaluation stage, its nearest condition distance drives the scheduler.
+        """
+        super().__init__('ingestion')
+        self.binance_message_processor = binance_message_processor
+        self.message_broker = message_broker
+        self.evaluation_queue = evaluation_queue
+        self.evaluation_stage = evaluation_stage
+
+    def ingest(self, currencies, start_time):
+        """
+        Publishes a snapshot and passes it to the evaluation stage.
+
+        Args:
+            currencies (dict): Currencies snapshot.
+            start_time (float): `perf_counter` time the fetching of the snapshot started at.
+
+        Returns:
+            set: Names of currencies whose value changed since the previous snapshot.
+        """
+        timestamp = time()
+        changed_names = self.binance_message_processor.publish_snapshot(currencies, timestamp, message_broker=self.message_broker)
+        self.add_latency(perf_counter() - start_time)
+
+        # Blocks while the evaluation stage is behind, so snapshots don`t pile up
+        self.evaluation_queue.put(('snapshot', (currencies, changed_names, timestamp), perf_counter()))
+        return changed_names
+
+    async def stream(self):
+        """
+        Ingests snapshots of a streaming currency source.
+        """
+        start_time = perf_counter()
+        async for currencies, _ in self.binance_message_processor.parser.stream():
+            if self.is_running is False:
+                break
+
+            self.ingest(dict(currencies), start_time)
+            start_time = perf_counter()
+
+    def run(self):
+        """
+        Main loop of the stage.
+        """
+        if self.binance_message_processor.parser.is_streaming is True:
+            asyncio.run(self.stream())
+            return
+
+        tick_scheduler = self.binance_message_processor.tick_scheduler
+        while self.is_running is True:
+            tick_scheduler.start_tick()
+            self.binance_message_processor.parser_docker_logger.add_stats('Scheduler', tick_scheduler.get_stats_string())
+
+            start_time = perf_counter()
+            changed_names = self.ingest(self.binance_message_processor.parser.get_currencies(), start_time)
+            tick_scheduler.wait(len(changed_names) == 0, self.evaluation_stage.nearest_distance)
+
+
+class IntakeStage(PipelineStage):
+    """
+    Reads new conditions from the 'bot2parser_queue' and passes them to the evaluation stage.
+
+    Delivered messages are taken in batches with the delivery tag of their last message. A batch is
+    acknowledged at once after the evaluation stage stores its conditions, the acknowledgement is sent
+    by the thread of this stage, which owns the connection. Its latency is the time from reading a
+    message to adding its condition to the store.
+
+    Attributes:
+        message_broker (ParserMessageBroker): Message broker of the stage used for the 'bot2parser_queue'.
+        evaluation_queue (Queue): Input queue of the evaluation stage.
+        poll_interval (float): Time to wait for a delivery while the queue is empty in seconds.
+        passed_delivery_tag (int or None): Tag of the last message passed to the evaluation stage.
+        stored_delivery_tag (int or None): Tag of the last message with stored conditions that isn`t acknowledged yet.
+        lock (threading.Lock): Lock of `stored_delivery_tag`, it is set by the evaluation stage.
+    """
+
+    def __init__(self, message_broker, evaluation_queue, poll_interval=0.01) -> None:
+        """
+        Initializes the IntakeStage.
+
+        Args:
+            message_broker (ParserMessageBroker): Message broker of the stage used for the 'bot2parser_queue'.
+            evaluation_queue (Queue): Input queue of the evaluation stage.
+            poll_interval (float, optional): Time to wait for a delivery while the queue is empty in seconds. Defaults to 0.01.
+        """
+        super().__init__('intake')
+        self.message_broker = message_broker
+        self.evaluation_queue = evaluation_queue
+        self.poll_interval = poll_interval
+
+        self.passed_delivery_tag = None
+        self.stored_delivery_tag = None
+        self.lock = threading.Lock()
+
+    def set_stored(self, delivery_tag):
+        """
+        Marks the messages up to a delivery tag as stored, they are acknowledged by the thread of the stage.
+
+        Args:
+            delivery_tag (int): Tag of the last message with stored conditions.
+        """
+        with self.lock:
+            self.stored_delivery_tag = delivery_tag
+
+    def ack_stored(self):
+        """
+        Acknowledges the messages marked as stored.
+        """
+        with self.lock:
+            delivery_tag = self.stored_delivery_tag
+            self.stored_delivery_tag = None
+
+        if delivery_tag is not None:
+            self.message_broker.ack_bot2parser_queue(delivery_tag)
+
+    def run(self):
+        """
+        Main loop of the stage.
+        """
+        while self.is_running is True:
+            messages = self.message_broker.get_messages_from_bot2parser_queue(timeout=self.poll_interval)
+
+            # A batch of malformed messages is passed on empty, so it is acknowledged in order too
+            delivery_tag = self.message_broker.last_delivery_tag
+            if delivery_tag is not None and delivery_tag != self.passed_delivery_tag:
+                self.evaluation_queue.put(('messages', (messages, delivery_tag), perf_counter()))
+                self.passed_delivery_tag = delivery_tag
+
+            self.ack_stored()
+
+    def get_stats_string(self):
+        """
+        Returns the latency statistics of the stage with the intake statistics of its broker.
+
+        Returns:
+            str: Name, mean and maximum latency, number of messages, throughput and queue lag.
+        """
+        return f'{super().get_stats_string()}, {self.message_broker.get_intake_stats_string()}'
+
+
+class EvaluationStage(PipelineStage):
+    """
+    Adds new conditions and evaluates conditions for every snapshot, it is the only stage touching the store.
+
+    Its latency is the time from fetching a snapshot to the end of its evaluation.
+
+    Attributes:
+        binance_message_processor (BinanceMessageProcessor): Processor owning the condition evaluator.
+        evaluation_queue (Queue): Input queue of the stage.
+        intake_stage (IntakeStage): The intake stage, latencies of new conditions are recorded to it.
+        pipeline_stages (list): All stages of the pipeline, their statistics are logged after every snapshot.
+        nearest_distance (float or None): Relative distance of the closest condition to its threshold after the last snapshot.
+        unstored_delivery_tag (int or None): Tag of the last added message whose condition the evaluator hasn`t stored yet.
+    """
+
+    def __init__(self, binance_message_processor, evaluation_queue) -> None:
+        """
+        Initializes the EvaluationStage.
+
+        Args:
+            binance_message_processor (BinanceMessageProcessor): Processor owning the condition evaluator.
+            evaluation_queue (Queue): Input queue of the stage.
+        """
+        super().__init__('evaluation')
+        self.binance_message_processor = binance_message_processor
+        self.evaluation_queue = evaluation_queue
+
+        self.intake_stage = None
+        self.pipeline_stages = []
+        self.nearest_distance = None
+        self.unstored_delivery_tag = None
+
+    def run(self):
+        """
+        Main loop of the stage.
+        """
+        condition_evaluator = self.binance_message_processor.condition_evaluator
+        parser_docker_logger = self.binance_message_processor.parser_docker_logger
+
+        while self.is_running is True or self.evaluation_queue.empty() is False:
+            try:
+                item_type, item, put_time = self.evaluation_queue.get(timeout=0.1)
+            except Empty:
+                continue
+
+            if item_type == 'messages':
+                messages, self.unstored_delivery_tag = item
+                for message in messages:
+                    condition_evaluator.add_message(message)
+                    if self.intake_stage is not None:
+                        self.intake_stage.add_latency(perf_counter() - put_time)
+                self.mark_stored()
+                continue
+
+            start_time = perf_counter()
+            condition_evaluator.check_conditions(*item)
+            self.nearest_distance = condition_evaluator.get_nearest_distance()
+            self.add_latency(perf_counter() - start_time)
+            # Messages routed to shards are stored during the tick
+            self.mark_stored()
+
+            parser_docker_logger.add_stats('Pipeline', ', '.join(stage.get_stats_string() for stage in self.pipeline_stages))
+            parser_docker_logger.log()
+
+
+    def mark_stored(self):
+        """
+        Passes the tag of the added messages to the intake stage once the evaluator stored their conditions.
+        """
+        if self.unstored_delivery_tag is None or self.binance_message_processor.condition_evaluator.get_unstored_message_count() > 0:
+            return
+
+        if self.intake_stage is not None:
+            self.intake_stage.set_stored(self.unstored_delivery_tag)
+        self.unstored_delivery_tag = None
+
+
+class ParserPipeline():
+    """
+    Runs the parser as a pipeline of concurrent stages connected by bounded queues.
+
+    Ingestion (fetching and publishing snapshots), command intake (reading the
+    'bot2parser_queue'), evaluation of conditions and persistence of the cache
+    work in their own threads, so a slow page load doesn`t delay new conditions
+    and a slow cache write doesn`t delay the next snapshot. Every stage uses its
+    own broker connection, as pika connections can`t be shared between threads.
+    The persistence stage is the WriteBehindPersister of the condition journal,
+    it lives as long as the journal.
+
+    Attributes:
+        binance_message_processor (BinanceMessageProcessor): Processor owning the source, the broker and the evaluator.
+        evaluation_queue (Queue): Bounded input queue of the evaluation stage.
+        persistence_stage (WriteBehindPersister or None): Stage fsyncing the condition journal, None if conditions aren`t journaled.
+        evaluation_stage (EvaluationStage): Stage evaluating conditions.
+        intake_stage (IntakeStage): Stage reading new conditions.
+        ingestion_stage (IngestionStage): Stage fetching snapshots.
+    """
+
+    def __init__(self, binance_message_processor, connection_factory=None, queue_size=100) -> None:
+        """
+        Initializes the ParserPipeline.
+
+        Args:
+            binance_message_processor (BinanceMessageProcessor): Processor owning the source, the broker and the evaluator.
+            connection_factory (callable, optional): Creates the RabbitMQ connections of the ingestion and the intake stages.
+                                                     Defaults to new connections to 'rabbit-1'.
+            queue_size (int, optional): Maximum number of items waiting for the evaluation stage. Defaults to 100.
+        """
+        self.binance_message_processor = binance_message_processor
+        parser_docker_logger = binance_message_processor.parser_docker_logger
+
+        self.evaluation_queue = Queue(maxsize=queue_size)
+
+        condition_journal = binance_message_processor.message_broker.condition_journal
+        self.persistence_stage = condition_journal.persister if condition_journal is not None else None
+        self.evaluation_stage = EvaluationStage(binance_message_processor, self.evaluation_queue)
+        self.intake_stage = IntakeStage(
+            ParserMessageBroker(
+                parser_docker_logger,
+                path_to_mq_cache=None,
+                connection=connection_factory() if connection_factory is not None else None,
+                prefetch_count=binance_message_processor.message_broker.prefetch_count
+            ),
+            self.evaluation_queue
+        )
+        self.ingestion_stage = IngestionStage(
+            binance_message_processor,
+            ParserMessageBroker(
+                parser_docker_logger,
+                path_to_mq_cache=None,
+                connection=connection_factory() if connection_factory is not None else None,
+                wire_format=binance_message_processor.message_broker.wire_format,
+                info_ttl=binance_message_processor.message_broker.info_ttl
+            ),
+            self.evaluation_queue,
+            self.evaluation_stage
+        )
+
+        self.evaluation_stage.intake_stage = self.intake_stage
+        self.evaluation_stage.pipeline_stages = [self.ingestion_stage, self.intake_stage, self.evaluation_stage]
+        if self.persistence_stage is not None:
+            self.evaluation_stage.pipeline_stages.append(self.persistence_stage)
+
+    def start(self):
+        """
+        Starts the stages, the persistence stage is already running with the journal.
+        """
+        for pipeline_stage in (self.evaluation_stage, self.intake_stage, self.ingestion_stage):
+            pipeline_stage.start()
+
+    def stop(self, timeout=10.0):
+        """
+        Stops the stages in the order of the data flow, waiting queues are processed before stopping.
+
+        Args:
+            timeout (float, optional): Maximum time to wait for every stage in seconds. Defaults to 10.0.
+        """
+        for pipeline_stage in (self.ingestion_stage, self.intake_stage, self.evaluation_stage):
+            pipeline_stage.stop()
+            pipeline_stage.join(timeout=timeout)
+
+        # The intake thread is stopped, the connection can be used by this one
+        self.intake_stage.ack_stored()
+        self.intake_stage.message_broker.close_connection()
+        self.ingestion_stage.message_broker.close_connection()
+
+    def run(self):
+        """
+        Runs the pipeline until the ingestion stage finishes.
+        """
+        self.start()
+        while self.ingestion_stage.is_alive() is True:
+            self.ingestion_stage.join(timeout=1.0)
+        self.stop()
@@ -0,0 +1,90 @@
+from currency_source import CurrencySource
+from snapshot_recorder import read_snapshot_records
+from time import monotonic, sleep
+
+class ReplayParser(CurrencySource):
+    """
+    A parser that replays currencies snapshots recorded by SnapshotRecorder.
+
+    Snapshots are returned in the recorded order with the recorded time gaps
+    divided by `speed`, a speed of 0 replays them as fast as possible.
+
+    Attributes:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        path_to_records (str): Path to the records file.
+        speed (float): Replay speed, 1.0 is real time, 0 is as fast as possible.
+        is_loop (bool): If True, the replay starts over after the last snapshot.
+        is_finished (bool): True if all snapshots were replayed.
+        replayed_count (int): Number of replayed snapshots.
+    """
+
+    def __init__(self, parser_docker_logger, path_to_records, speed=1.0, is_loop=False) -> None:
+        """
+        Initializes the ReplayParser.
+
+        Args:
+            parser_docker_logger (ParserLogger): Logger for recording events.
+            path_to_records (str): Path to the records file.
+            speed (float, optional): Replay speed, 1.0 is real time, 0 is as fast as possible. Defaults to 1.0.
+            is_loop (bool, optional): If True, the replay starts over after the last snapshot. Defaults to False.
+        """
+        super().__init__(parser_docker_logger)
+        self.path_to_records = path_to_records
+        self.speed = speed
+        self.is_loop = is_loop
+
+        self.is_finished = False
+        self.replayed_count = 0
+        self._start_replay()
+
+    def _start_replay(self):
+        """
+        Starts reading the records file from the beginning.
+        """
+        self.records = read_snapshot_records(self.path_to_records)
+        self.first_timestamp = None
+        self.replay_start = None
+
+    def _wait_for(self, timestamp):
+        """
+        Sleeps until the recorded time of a snapshot is reached on the replay clock.
+
+        Args:
+            timestamp (float): Recorded time of the snapshot.
+        """
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+            self.replay_start = monotonic()
+            return
+
+        if self.speed <= 0:
+            return
+
+        delay = self.replay_start + (timestamp - self.first_timestamp) / self.speed - monotonic()
+        if delay > 0:
+            sleep(delay)
+
+    def get_currencies(self):
+        """
+        Returns the next recorded snapshot.
+
+        Returns:
+            dict: A dictionary with currency names as keys and their dollar values as values,
+                  empty after the last snapshot unless the replay is looped.
+        """
+        record = next(self.records, None)
+        if record is None and self.is_loop is True and self.replayed_count > 0:
+            self._start_replay()
+            record = next(self.records, None)
+
+        if record is None:
+            if self.is_finished is False:
+                self.parser_docker_logger.log_info(f'The replay of "{self.path_to_records}" finished after {self.replayed_count} snapshots.')
+            self.is_finished = True
+            return {}
+
+        timestamp, currencies = record
+        self._wait_for(timestamp)
+        self.replayed_count += 1
+
+        return currencies
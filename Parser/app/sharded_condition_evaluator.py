@@ -0,0 +1,357 @@
+from condition_evaluator import ConditionEvaluator
+from condition_journal import ConditionJournal, get_journal_paths
+from condition_snapshot import encode_snapshot
+from condition_store import ConditionStore
+from parser_logger import ParserLogger
+from parser_message_broker import ParserMessageBroker
+from queue import Empty
+from time import perf_counter, time
+from write_behind_persister import write_atomically
+
+import glob
+import multiprocessing
+import os
+import zlib
+
+def get_shard_id(pair1_name, pair2_name, shard_count):
+    """
+    Returns the shard owning the conditions of a pair.
+
+    Both orders of a pair belong to the same shard, so inverse conditions stay together.
+    A stable hash is used instead of `hash`, which is salted differently in every process.
+
+    Args:
+        pair1_name (str): The first currency in the pair.
+        pair2_name (str): The second currency in the pair.
+        shard_count (int): Number of shards.
+
+    Returns:
+        int: Id of the shard.
+    """
+    pair_string = '/'.join(sorted((pair1_name, pair2_name)))
+    return zlib.crc32(pair_string.encode('utf-8')) % shard_count
+
+
+def get_shard_cache_path(path_to_mq_cache, shard_id, shard_count):
+    """
+    Returns the path to the cache file of a shard.
+
+    Args:
+        path_to_mq_cache (str or None): Path to the message queue cache file of the unsharded parser.
+        shard_id (int): Id of the shard.
+        shard_count (int): Number of shards.
+
+    Returns:
+        str or None: Path to the cache file, the unsharded one if there is a single shard,
+                     None if conditions are kept only in memory.
+    """
+    if path_to_mq_cache is None or shard_count == 1:
+        return path_to_mq_cache
+
+    root, extension = os.path.splitext(path_to_mq_cache)
+    return f'{root}.shard{shard_id}of{shard_count}{extension}'
+
+
+def reshard_mq_cache(path_to_mq_cache, shard_count):
+    """
+    Redistributes conditions of all cache files and their journals between the cache files of `shard_count` shards.
+
+    Nothing is rewritten if the cache files already belong to `shard_count` shards.
+
+    Args:
+        path_to_mq_cache (str or None): Path to the message queue cache file of the unsharded parser,
+                                        None if conditions are kept only in memory.
+        shard_count (int): Number of shards.
+    """
+    if path_to_mq_cache is None:
+        return
+
+    root, extension = os.path.splitext(path_to_mq_cache)
+    cache_paths = [path_to_mq_cache] + sorted(glob.glob(f'{glob.escape(root)}.shard*of*{glob.escape(extension)}'))
+    cache_paths = [
+        cache_path for cache_path in cache_paths
+        if os.path.exists(cache_path) or any(os.path.exists(journal_path) for journal_path in get_journal_paths(cache_path))
+    ]
+
+    shard_cache_paths = [get_shard_cache_path(path_to_mq_cache, shard_id, shard_count) for shard_id in range(shard_count)]
+    if set(cache_paths) <= set(shard_cache_paths):
+        return
+
+    condition_store = ConditionStore()
+    for cache_path in cache_paths:
+        condition_store.load_dict(ConditionJournal(cache_path).recover(), is_merge=True)
+
+    shard_mqs = [{} for _ in range(shard_count)]
+    for pair1_name, pair2_name, bucket in condition_store.get_buckets():
+        shard_mq = shard_mqs[get_shard_id(pair1_name, pair2_name, shard_count)]
+        shard_mq.setdefault(pair1_name, {})[pair2_name] = bucket.get_messages()
+
+    for shard_cache_path, shard_mq in zip(shard_cache_paths, shard_mqs):
+        write_atomically(shard_cache_path, encode_snapshot(shard_mq))
+
+    # The new cache files hold all conditions, so every journal is obsolete
+    for cache_path in set(cache_paths) | set(shard_cache_paths):
+        ConditionJournal(cache_path).remove_files()
+        if cache_path not in shard_cache_paths and os.path.exists(cache_path):
+            os.remove(cache_path)
+
+
+def run_evaluation_shard(shard_id, shard_count, path_to_mq_cache, task_queue, result_queue, log_level, connection_factory=None):
+    """
+    Main loop of a shard process: evaluates the conditions of its pairs for every snapshot it gets.
+
+    Every task is a tuple (tick_id, currencies, changed_names, timestamp, messages) where `messages` are new
+    'bot2parser_queue' messages of the shard, None stops the process. Met conditions are published
+    by the shard itself, a tuple (tick_id, shard_id, is_idle, nearest_distance, duration, condition_count, stored_count)
+    is put to `result_queue` after every task, `stored_count` messages were added and journaled by then.
+
+    Args:
+        shard_id (int): Id of the shard.
+        shard_count (int): Number of shards.
+        path_to_mq_cache (str or None): Path to the message queue cache file of the unsharded parser,
+                                        None keeps conditions only in memory.
+        task_queue (multiprocessing.Queue): Queue of tasks of the shard.
+        result_queue (multiprocessing.Queue): Queue of results of all shards.
+        log_level (int): Level of the shard logger.
+        connection_factory (callable, optional): Creates the RabbitMQ connection of the shard, also after it is closed.
+                                                 Defaults to a new connection to 'rabbit-1'.
+    """
+    parser_docker_logger = ParserLogger(name=f'SHARD{shard_id}')
+    parser_docker_logger.logger.setLevel(log_level)
+
+    message_broker = ParserMessageBroker(
+        parser_docker_logger,
+        path_to_mq_cache=get_shard_cache_path(path_to_mq_cache, shard_id, shard_count),
+        connection_factory=connection_factory
+    )
+    condition_evaluator = ConditionEvaluator(parser_docker_logger, message_broker)
+
+    try:
+        while True:
+            task = task_queue.get()
+            if task is None:
+                break
+
+            tick_id, currencies, changed_names, timestamp, messages = task
+
+            start_time = perf_counter()
+            for message in messages:
+                condition_evaluator.add_message(message)
+            is_idle = condition_evaluator.check_conditions(currencies, changed_names, timestamp)
+            duration = perf_counter() - start_time
+
+            if parser_docker_logger.has_message_logs() is True:
+                parser_docker_logger.log()
+            else:
+                parser_docker_logger.clear_logs()
+
+            result_queue.put((tick_id, shard_id, is_idle, condition_evaluator.get_nearest_distance(), duration, message_broker.mq.get_condition_count(), len(messages)))
+    except KeyboardInterrupt:
+        # Ctrl+C reaches the whole process group, the main process stops the parser
+        pass
+
+    message_broker.close_connection()
+
+
+class ShardedConditionEvaluator():
+    """
+    Evaluates user conditions in several processes, each owning a hash partition of the pairs.
+
+    The main process keeps fetching snapshots and reading 'bot2parser_queue', every
+    snapshot is sent to all shard processes together with the new conditions of the shard.
+    Shards evaluate and publish met conditions independently, the main process only waits
+    for all of them to finish the tick. It has the same interface as ConditionEvaluator.
+    New messages are stored by the shards during the next tick, so they must not be
+    acknowledged before `get_unstored_message_count` drops to 0.
+
+    A shard that doesn`t finish a tick in `result_timeout` seconds, or dies, is
+    terminated and started again: it recovers its conditions from its cache file
+    and its journal, and the new messages it didn`t confirm are sent to it again
+    with the next tick, a message it had already stored is skipped by its id.
+    Results carry the id of their tick, so a late result of a stalled tick is ignored.
+
+    Attributes:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        shard_count (int): Number of shard processes.
+        path_to_mq_cache (str or None): Path to the message queue cache file of the unsharded parser.
+        connection_factory (callable or None): Creates the RabbitMQ connection of a shard.
+        result_timeout (float): Maximum time to wait for a shard to finish a tick in seconds.
+        task_queues (list): Task queue of every shard.
+        result_queue (multiprocessing.Queue): Queue of results of all shards.
+        shard_processes (list): Shard processes.
+        tick_id (int): Id of the last tick sent to the shards.
+        restart_count (int): Number of restarted shards.
+        shard_messages (list): New 'bot2parser_queue' messages of every shard since the last tick.
+        shard_distances (list): Relative distance of the closest condition to its threshold of every shard.
+        condition_count (int): Number of conditions of all shards after the last tick.
+        unstored_message_count (int): Number of added messages the shards haven`t stored yet.
+    """
+
+    def __init__(self, parser_docker_logger, shard_count, path_to_mq_cache='mq_cache.bpcs', connection_factory=None, result_timeout=60.0) -> None:
+        """
+        Initializes the ShardedConditionEvaluator and starts the shard processes.
+
+        Args:
+            parser_docker_logger (ParserLogger): Logger for recording events.
+            shard_count (int): Number of shard processes.
+            path_to_mq_cache (str or None, optional): Path to the message queue cache file of the unsharded parser,
+                                                      None keeps conditions only in memory. Defaults to 'mq_cache.bpcs'.
+            connection_factory (callable, optional): Creates the RabbitMQ connection of a shard. Defaults to a new connection to 'rabbit-1'.
+            result_timeout (float, optional): Maximum time to wait for a shard to finish a tick in seconds. Defaults to 60.0.
+        """
+        self.parser_docker_logger = parser_docker_logger
+        self.shard_count = shard_count
+        self.path_to_mq_cache = path_to_mq_cache
+        self.connection_factory = connection_factory
+        self.result_timeout = result_timeout
+
+        reshard_mq_cache(path_to_mq_cache, shard_count)
+
+        self.task_queues = [None] * shard_count
+        self.result_queue = multiprocessing.Queue()
+        self.shard_processes = [None] * shard_count
+        for shard_id in range(shard_count):
+            self._start_shard(shard_id)
+
+        self.tick_id = 0
+        self.restart_count = 0
+        self.shard_messages = [[] for _ in range(shard_count)]
+        self.shard_distances = [None] * shard_count
+        self.condition_count = 0
+        self.unstored_message_count = 0
+
+    def _start_shard(self, shard_id):
+        """
+        Starts the process of a shard with a new task queue.
+
+        Args:
+            shard_id (int): Id of the shard.
+        """
+        self.task_queues[shard_id] = multiprocessing.Queue()
+        self.shard_processes[shard_id] = multiprocessing.Process(
+            target=run_evaluation_shard,
+            args=(shard_id, self.shard_count, self.path_to_mq_cache, self.task_queues[shard_id], self.result_queue, self.parser_docker_logger.logger.level, self.connection_factory),
+            daemon=True
+        )
+        self.shard_processes[shard_id].start()
+
+    def _restart_shard(self, shard_id):
+        """
+        Terminates the process of a stalled or dead shard and starts it again.
+
+        Args:
+            shard_id (int): Id of the shard.
+        """
+        shard_process = self.shard_processes[shard_id]
+        if shard_process.is_alive() is True:
+            shard_process.terminate()
+        shard_process.join(timeout=self.result_timeout)
+
+        self._start_shard(shard_id)
+        self.shard_distances[shard_id] = None
+        self.restart_count += 1
+
+    def add_message(self, message):
+        """
+        Routes the condition of a 'bot2parser_queue' message to the shard owning its pair.
+
+        Args:
+            message (list): The message.
+        """
+        self.shard_messages[get_shard_id(message[1], message[2], self.shard_count)].append(message)
+        self.unstored_message_count += 1
+
+    def get_unstored_message_count(self):
+        """
+        Returns the number of added messages the shards haven`t stored yet.
+
+        Returns:
+            int: The number, they are stored by the next `check_conditions`.
+        """
+        return self.unstored_message_count
+
+    def check_conditions(self, currencies, changed_names, timestamp=None):
+        """
+        Sends the currencies snapshot to all shards and waits for them to process their conditions.
+
+        Args:
+            currencies (dict): Currencies snapshot.
+            changed_names (set): Names of currencies whose value changed since the previous snapshot.
+            timestamp (float, optional): Time of the snapshot in seconds. Defaults to the current time.
+
+        Shards that don`t finish the tick in `result_timeout` seconds are restarted, the tick goes on without them.
+
+        Returns:
+            bool: True if the tick was idle in every shard, False if a shard was restarted.
+        """
+        if timestamp is None:
+            timestamp = time()
+
+        start_time = perf_counter()
+        self.tick_id += 1
+        tick_messages = self.shard_messages
+        for shard_id, task_queue in enumerate(self.task_queues):
+            task_queue.put((self.tick_id, currencies, changed_names, timestamp, tick_messages[shard_id]))
+        self.shard_messages = [[] for _ in range(self.shard_count)]
+
+        results = {}
+        deadline = perf_counter() + self.result_timeout
+        while len(results) < self.shard_count:
+            try:
+                result = self.result_queue.get(timeout=max(deadline - perf_counter(), 0.0))
+            except Empty:
+                break
+            # A late result of a tick the shard was restarted in
+            if result[0] == self.tick_id:
+                results[result[1]] = result[1:]
+        tick_duration = perf_counter() - start_time
+
+        stalled_shard_ids = [shard_id for shard_id in range(self.shard_count) if shard_id not in results]
+        if len(stalled_shard_ids) > 0:
+            dead_shard_ids = [shard_id for shard_id in stalled_shard_ids if self.shard_processes[shard_id].is_alive() is False]
+            self.parser_docker_logger.log_exception(
+                f'Shards {stalled_shard_ids} didn`t finish the tick in {self.result_timeout} s, dead shards: {dead_shard_ids}. ' \
+                f'The shards were restarted, their new conditions will be sent again.'
+            )
+            for shard_id in stalled_shard_ids:
+                self._restart_shard(shard_id)
+                self.shard_messages[shard_id] = tick_messages[shard_id]
+
+        is_idle = len(stalled_shard_ids) == 0
+        self.condition_count = 0
+        for shard_id, is_shard_idle, nearest_distance, _, shard_condition_count, stored_count in results.values():
+            is_idle = is_idle and is_shard_idle
+            self.shard_distances[shard_id] = nearest_distance
+            self.condition_count += shard_condition_count
+            self.unstored_message_count -= stored_count
+
+        self.parser_docker_logger.add_stats(
+            'Shards',
+            f'shards: {self.shard_count}, tick: {tick_duration * 1000:.1f} ms, ' \
+            f'slowest shard: {max((result[3] for result in results.values()), default=0.0) * 1000:.1f} ms, conditions: {self.condition_count}, ' \
+            f'restarts: {self.restart_count}'
+        )
+
+        return is_idle
+
+    def get_nearest_distance(self):
+        """
+        Finds the relative distance of the closest condition to its threshold among all shards.
+
+        Returns:
+            float or None: The smallest distance, or None if no shard has evaluated conditions.
+        """
+        return min((distance for distance in self.shard_distances if distance is not None), default=None)
+
+    def close(self):
+        """
+        Stops the shard processes, every shard writes its conditions to its cache file.
+
+        A shard that doesn`t stop in `result_timeout` seconds is terminated.
+        """
+        for task_queue in self.task_queues:
+            task_queue.put(None)
+        for shard_process in self.shard_processes:
+            shard_process.join(timeout=self.result_timeout)
+            if shard_process.is_alive() is True:
+                shard_process.terminate()
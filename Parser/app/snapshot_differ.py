@@ -0,0 +1,101 @@
+from time import time
+
+import hashlib
+import json
+
+class SnapshotDiffer():
+    """
+    Turns consecutive currencies snapshots into versioned deltas.
+
+    Identical snapshots are detected by a content hash and skipped entirely,
+    other snapshots are reduced to the currencies that changed since the
+    previous one. Every delta names the version it is based on, so a consumer
+    that missed a delta detects the gap. Every `keyframe_interval` versions a
+    full keyframe is sent instead, so a consumer that missed deltas or just
+    started catches up. A consumer that detected a gap can request a keyframe
+    instead of waiting for the next one.
+
+    Attributes:
+        keyframe_interval (int): Number of versions between two keyframes.
+        version (int): Version of the last snapshot.
+        previous_currencies (dict): The last snapshot.
+        previous_hash (str): Content hash of the last snapshot.
+        is_keyframe_requested (bool): True if the next snapshot is sent as a keyframe.
+    """
+
+    def __init__(self, keyframe_interval=60) -> None:
+        """
+        Initializes the SnapshotDiffer.
+
+        Args:
+            keyframe_interval (int, optional): Number of versions between two keyframes. Defaults to 60.
+        """
+        self.keyframe_interval = keyframe_interval
+
+        self.version = 0
+        self.previous_currencies = {}
+        self.previous_hash = None
+        self.is_keyframe_requested = False
+
+    @staticmethod
+    def get_hash(currencies):
+        """
+        Calculates the content hash of a snapshot.
+
+        Args:
+            currencies (dict): Currencies snapshot.
+
+        Returns:
+            str: Hex digest of the snapshot content.
+        """
+        return hashlib.blake2b(json.dumps(currencies, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+    def request_keyframe(self):
+        """
+        Makes the next snapshot a keyframe, even if it is identical to the previous one.
+        """
+        self.is_keyframe_requested = True
+
+    def diff(self, currencies):
+        """
+        Compares a new snapshot with the previous one.
+
+        Args:
+            currencies (dict): New currencies snapshot.
+
+        Returns:
+            tuple: The delta message (None if the snapshot is empty or identical to the previous one)
+                   and a set of names of currencies whose value changed or which were removed.
+        """
+        if len(currencies) == 0:
+            return None, set()
+
+        currencies_hash = self.get_hash(currencies)
+        if currencies_hash == self.previous_hash and self.is_keyframe_requested is False:
+            return None, set()
+
+        changed_currencies = {
+            currency_name: currency_value
+            for currency_name, currency_value in currencies.items()
+            if self.previous_currencies.get(currency_name) != currency_value
+        }
+        removed_names = [currency_name for currency_name in self.previous_currencies if currency_name not in currencies]
+
+        base_version = self.version
+        self.version += 1
+        is_keyframe = self.version % self.keyframe_interval == 1 or self.keyframe_interval == 1 or self.is_keyframe_requested is True
+        self.is_keyframe_requested = False
+
+        delta = {
+            "version": self.version,
+            "base_version": base_version,
+            "is_keyframe": is_keyframe,
+            "timestamp": time(),
+            "currencies": dict(currencies) if is_keyframe is True else changed_currencies,
+            "removed": [] if is_keyframe is True else removed_names
+        }
+
+        self.previous_currencies = dict(currencies)
+        self.previous_hash = currencies_hash
+
+        return delta, set(changed_currencies) | set(removed_names)
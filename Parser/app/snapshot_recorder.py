@@ -0,0 +1,81 @@
+from time import time
+
+import json
+import struct
+import zlib
+
+# Record header: timestamp (float64) and length of the compressed snapshot (uint32)
+RECORD_HEADER = struct.Struct('<dI')
+
+
+class SnapshotRecorder():
+    """
+    Persists currencies snapshots with timestamps to a compact append-only file.
+
+    Every record is a fixed header followed by the zlib-compressed compact JSON
+    of the snapshot. Records are only appended, so a crash can at most leave a
+    truncated last record, which readers skip.
+
+    Attributes:
+        path_to_records (str): Path to the records file.
+        records_fp (file): Records file opened for appending.
+        records_count (int): Number of records written by this recorder.
+    """
+
+    def __init__(self, path_to_records) -> None:
+        """
+        Initializes the SnapshotRecorder and opens the records file for appending.
+
+        Args:
+            path_to_records (str): Path to the records file.
+        """
+        self.path_to_records = path_to_records
+        self.records_fp = open(self.path_to_records, 'ab')
+        self.records_count = 0
+
+    def record(self, currencies, timestamp=None):
+        """
+        Appends a snapshot to the records file.
+
+        Args:
+            currencies (dict): Currencies snapshot.
+            timestamp (float, optional): Time of the snapshot. Defaults to the current time.
+        """
+        if timestamp is None:
+            timestamp = time()
+
+        payload = zlib.compress(json.dumps(currencies, separators=(',', ':')).encode('utf-8'))
+        self.records_fp.write(RECORD_HEADER.pack(timestamp, len(payload)) + payload)
+        self.records_fp.flush()
+
+        self.records_count += 1
+
+    def close(self):
+        """
+        Closes the records file.
+        """
+        self.records_fp.close()
+
+
+def read_snapshot_records(path_to_records):
+    """
+    Reads snapshots from a records file.
+
+    Args:
+        path_to_records (str): Path to the records file.
+
+    Yields:
+        tuple: Time of the snapshot and the currencies snapshot.
+    """
+    with open(path_to_records, 'rb') as records_fp:
+        while True:
+            header = records_fp.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+
+            timestamp, payload_length = RECORD_HEADER.unpack(header)
+            payload = records_fp.read(payload_length)
+            if len(payload) < payload_length:
+                return
+
+            yield timestamp, json.loads(zlib.decompress(payload))
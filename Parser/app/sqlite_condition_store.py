@@ -0,0 +1,591 @@
+from condition_bucket import DIRECT_BOUND, get_bucket_condition, get_threshold_bound, resolve_pending_flag
+from condition_store import CONDITION_ID_KEY, ConditionStore
+from window_conditions import get_window_key
+
+import json
+import sqlite3
+
+# Values of the "direction" column, windowed conditions and "will cross" conditions without a direction keep NULL.
+# The "bound" column keeps the bound of the threshold key of ConditionBucket, so conditions set on the inverted pair
+# share the directions and keep the strictness of their own order
+ABOVE_DIRECTION = 1
+BELOW_DIRECTION = 0
+
+# Version of the table layout kept in "PRAGMA user_version"
+SCHEMA_VERSION = 2
+
+def get_direction(condition_flag):
+    """
+    Returns the value of the "direction" column of a threshold condition.
+
+    Args:
+        condition_flag (bool): The condition flag in the order of the bucket pair.
+
+    Returns:
+        int: The direction.
+    """
+    return ABOVE_DIRECTION if condition_flag is True else BELOW_DIRECTION
+
+
+class SqliteConditionBucket():
+    """
+    View of the conditions of one pair in a SqliteConditionStore, it mirrors ConditionBucket.
+
+    Attributes:
+        condition_store (SqliteConditionStore): The store.
+        pair1_name (str): The first currency of the bucket pair.
+        pair2_name (str): The second currency of the bucket pair.
+    """
+
+    def __init__(self, condition_store, pair1_name, pair2_name) -> None:
+        """
+        Initializes the SqliteConditionBucket.
+
+        Args:
+            condition_store (SqliteConditionStore): The store.
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+        """
+        self.condition_store = condition_store
+        self.pair1_name = pair1_name
+        self.pair2_name = pair2_name
+
+    def __len__(self):
+        """
+        Returns the number of conditions of the pair.
+
+        Returns:
+            int: Number of conditions.
+        """
+        return self.condition_store.pair_counts.get((self.pair1_name, self.pair2_name), 0)
+
+    def has_window_conditions(self):
+        """
+        Checks if the pair has windowed conditions.
+
+        Returns:
+            bool: True if there is at least one windowed condition.
+        """
+        return (self.pair1_name, self.pair2_name) in self.condition_store.window_store.window_pairs
+
+    def get_nearest_distance(self, now_pair_value):
+        """
+        Calculates the relative distance of the closest waiting condition to its threshold.
+
+        Args:
+            now_pair_value (float): The current value of the pair.
+
+        Returns:
+            float or None: The smallest distance, or None if no condition has a finite non-zero threshold.
+        """
+        nearest_values = self.condition_store.connection.execute(
+            'SELECT '
+            '(SELECT MIN(threshold) FROM conditions WHERE pair1 = ? AND pair2 = ? AND direction = ?), '
+            '(SELECT MAX(threshold) FROM conditions WHERE pair1 = ? AND pair2 = ? AND direction = ?)',
+            (self.pair1_name, self.pair2_name, ABOVE_DIRECTION, self.pair1_name, self.pair2_name, BELOW_DIRECTION)
+        ).fetchone()
+
+        distances = [
+            abs(now_pair_value - check_value) / abs(check_value)
+            for check_value in nearest_values
+            if check_value is not None and check_value != 0 and check_value != float('inf')
+        ]
+        return min(distances, default=None)
+
+    def get_messages(self):
+        """
+        Returns all conditions of the pair.
+
+        Returns:
+            list: The conditions.
+        """
+        rows = self.condition_store.connection.execute(
+            'SELECT message FROM conditions WHERE pair1 = ? AND pair2 = ? ORDER BY id',
+            (self.pair1_name, self.pair2_name)
+        )
+        return [json.loads(message) for message, in rows]
+
+
+class SqliteConditionStore():
+    """
+    Store of user conditions in a SQLite database, it has the interface of ConditionStore.
+
+    Every condition is a row of the "conditions" table in the canonical order of its
+    pair, the unique index on "condition_id" skips conditions added twice. Threshold conditions are found with range queries over the index on
+    (pair1, pair2, direction, threshold, bound), the index on "user_id" serves queries of
+    one user. Rows are inserted and deleted in a transaction that is committed once
+    per tick with `commit`, the database runs in WAL mode, so a commit appends to
+    the write-ahead log instead of rewriting the file.
+
+    The number of conditions of every pair and the reverse index of currencies are
+    kept in memory. Windowed conditions need their rolling windows in memory anyway:
+    they are evaluated by an in-memory ConditionStore and mirrored to the table.
+
+    Attributes:
+        path_to_database (str): Path to the database file.
+        connection (sqlite3.Connection): Connection to the database.
+        pair_counts (dict): Pairs (pair1_name, pair2_name) and their numbers of conditions.
+        currency_pairs (dict): Currency names and sets of pairs (pair1_name, pair2_name) depending on them.
+        window_store (ConditionStore): Store evaluating windowed conditions.
+        window_row_ids (dict): Condition ids of windowed conditions and ids of their rows.
+    """
+
+    get_canonical_pair = staticmethod(ConditionStore.get_canonical_pair)
+    get_user_pair = staticmethod(ConditionStore.get_user_pair)
+    assign_condition_id = staticmethod(ConditionStore.assign_condition_id)
+
+    def __init__(self, path_to_database='conditions.db') -> None:
+        """
+        Opens the database, creating its table and indexes if needed.
+
+        Args:
+            path_to_database (str, optional): Path to the database file. Defaults to 'conditions.db'.
+        """
+        self.path_to_database = path_to_database
+
+        # The pipeline evaluates conditions in another thread than the one creating the store
+        self.connection = sqlite3.connect(path_to_database, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS conditions ('
+            'id INTEGER PRIMARY KEY, '
+            'pair1 TEXT NOT NULL, '
+            'pair2 TEXT NOT NULL, '
+            'direction INTEGER, '
+            'threshold REAL, '
+            'bound INTEGER, '
+            'kind TEXT, '
+            'user_id INTEGER, '
+            'message TEXT NOT NULL, '
+            'condition_id TEXT)'
+        )
+        self._add_condition_ids()
+        self._add_threshold_bounds()
+        self.connection.execute('CREATE INDEX IF NOT EXISTS conditions_threshold_bound ON conditions (pair1, pair2, direction, threshold, bound)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS conditions_user ON conditions (user_id)')
+        self.connection.execute('CREATE UNIQUE INDEX IF NOT EXISTS conditions_id ON conditions (condition_id)')
+        self.connection.commit()
+
+        self._load_metadata()
+
+    def _add_condition_ids(self):
+        """
+        Adds the "condition_id" column to a database created before conditions had ids.
+
+        Rows get the ids derived from their content, rows with the same content are kept once.
+        """
+        column_names = [column[1] for column in self.connection.execute('PRAGMA table_info(conditions)')]
+        if 'condition_id' in column_names:
+            return
+
+        self.connection.execute('ALTER TABLE conditions ADD COLUMN condition_id TEXT')
+
+        updates = []
+        duplicate_row_ids = []
+        condition_ids = set()
+        for row_id, pair1_name, pair2_name, message in self.connection.execute('SELECT id, pair1, pair2, message FROM conditions ORDER BY id').fetchall():
+            message_data = json.loads(message)
+            condition_id = self.assign_condition_id(pair1_name, pair2_name, message_data)
+            if condition_id in condition_ids:
+                duplicate_row_ids.append((row_id,))
+                continue
+
+            condition_ids.add(condition_id)
+            updates.append((condition_id, json.dumps(message_data), row_id))
+
+        self.connection.executemany('DELETE FROM conditions WHERE id = ?', duplicate_row_ids)
+        self.connection.executemany('UPDATE conditions SET condition_id = ?, message = ? WHERE id = ?', updates)
+
+    def _add_threshold_bounds(self):
+        """
+        Adds the "bound" column to a database of an older layout.
+
+        Directions and bounds of threshold conditions are derived from their messages again, which also
+        moves conditions set on the inverted pair out of the separate directions of the previous layout.
+        """
+        if self.connection.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+            return
+
+        column_names = [column[1] for column in self.connection.execute('PRAGMA table_info(conditions)')]
+        if 'bound' not in column_names:
+            self.connection.execute('ALTER TABLE conditions ADD COLUMN bound INTEGER')
+
+        updates = []
+        for row_id, message in self.connection.execute('SELECT id, message FROM conditions WHERE direction IS NOT NULL').fetchall():
+            message_data = json.loads(message)
+            condition_flag, _ = get_bucket_condition(message_data)
+            updates.append((get_direction(condition_flag), get_threshold_bound(message_data), row_id))
+
+        self.connection.executemany('UPDATE conditions SET direction = ?, bound = ? WHERE id = ?', updates)
+        self.connection.execute('DROP INDEX IF EXISTS conditions_threshold')
+        self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def _load_metadata(self):
+        """
+        Rebuilds the in-memory pair counts, the currency index and the windowed conditions from the table.
+        """
+        self.pair_counts = {}
+        self.currency_pairs = {}
+        self.window_store = ConditionStore()
+        self.window_row_ids = {}
+
+        for pair1_name, pair2_name, condition_count in self.connection.execute('SELECT pair1, pair2, COUNT(*) FROM conditions GROUP BY pair1, pair2'):
+            self._change_pair_count(pair1_name, pair2_name, condition_count)
+
+        for row_id, pair1_name, pair2_name, message in self.connection.execute('SELECT id, pair1, pair2, message FROM conditions WHERE kind IS NOT NULL'):
+            message_data = json.loads(message)
+            self.window_store.add(pair1_name, pair2_name, message_data)
+            self.window_row_ids[message_data[CONDITION_ID_KEY]] = row_id
+
+    def _change_pair_count(self, pair1_name, pair2_name, count_change):
+        """
+        Changes the number of conditions of a pair, updating the currency index.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            count_change (int): Number of added (positive) or removed (negative) conditions.
+        """
+        pair_key = (pair1_name, pair2_name)
+        condition_count = self.pair_counts.get(pair_key, 0) + count_change
+
+        if condition_count > 0:
+            if pair_key not in self.pair_counts:
+                self.currency_pairs.setdefault(pair1_name, set()).add(pair_key)
+                self.currency_pairs.setdefault(pair2_name, set()).add(pair_key)
+            self.pair_counts[pair_key] = condition_count
+            return
+
+        self.pair_counts.pop(pair_key, None)
+        for currency_name in (pair1_name, pair2_name):
+            dependent_pairs = self.currency_pairs.get(currency_name)
+            if dependent_pairs is None:
+                continue
+
+            dependent_pairs.discard(pair_key)
+            if len(dependent_pairs) == 0:
+                del self.currency_pairs[currency_name]
+
+    def __len__(self):
+        """
+        Returns the number of pairs with conditions.
+
+        Returns:
+            int: Number of pairs.
+        """
+        return len(self.pair_counts)
+
+    def get_condition_count(self):
+        """
+        Returns the number of stored conditions.
+
+        Returns:
+            int: Number of conditions.
+        """
+        return sum(self.pair_counts.values())
+
+    def has_condition(self, condition_id):
+        """
+        Checks if a condition is stored.
+
+        Args:
+            condition_id (str): Id of the condition.
+
+        Returns:
+            bool: True if the condition is stored.
+        """
+        return self.connection.execute('SELECT 1 FROM conditions WHERE condition_id = ?', (condition_id,)).fetchone() is not None
+
+    def get_bucket(self, pair1_name, pair2_name):
+        """
+        Returns the bucket of a pair.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+
+        Returns:
+            SqliteConditionBucket or None: View of the conditions of the pair, or None if the pair has no conditions.
+        """
+        if (pair1_name, pair2_name) not in self.pair_counts:
+            return None
+        return SqliteConditionBucket(self, pair1_name, pair2_name)
+
+    @staticmethod
+    def _get_row(pair1_name, pair2_name, message_data):
+        """
+        Converts a condition in the bucket pair order into a row of the table.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            message_data (dict): The condition.
+
+        Returns:
+            tuple: Values of the pair1, pair2, direction, threshold, bound, kind, user_id, message and condition_id columns.
+        """
+        direction = None
+        bound = None
+        check_value = message_data["check_value"]
+        window_key = get_window_key(message_data)
+        if window_key is None:
+            condition_flag, check_value = get_bucket_condition(message_data)
+            bound = get_threshold_bound(message_data)
+            if condition_flag is not None:
+                direction = get_direction(condition_flag)
+
+        user = message_data["user"]
+        user_id = user[0] if isinstance(user, list) and len(user) > 0 and isinstance(user[0], int) else None
+        kind = window_key[0] if window_key is not None else None
+        return pair1_name, pair2_name, direction, check_value, bound, kind, user_id, json.dumps(message_data), message_data[CONDITION_ID_KEY]
+
+    def _insert_many(self, pairs_messages):
+        """
+        Inserts conditions in the bucket pair order, conditions with the id of a stored one are skipped.
+
+        Args:
+            pairs_messages (list): Tuples (pair1_name, pair2_name, message_data).
+
+        Returns:
+            int: Number of inserted conditions.
+        """
+        inserted_count = 0
+        for pair1_name, pair2_name, message_data in pairs_messages:
+            self.assign_condition_id(pair1_name, pair2_name, message_data)
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO conditions (pair1, pair2, direction, threshold, bound, kind, user_id, message, condition_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                self._get_row(pair1_name, pair2_name, message_data)
+            )
+            if cursor.rowcount == 0:
+                continue
+
+            inserted_count += 1
+            self._change_pair_count(pair1_name, pair2_name, 1)
+
+            if get_window_key(message_data) is not None:
+                self.window_store.add(pair1_name, pair2_name, message_data)
+                self.window_row_ids[message_data[CONDITION_ID_KEY]] = cursor.lastrowid
+        return inserted_count
+
+    def add(self, pair1_name, pair2_name, message_data):
+        """
+        Adds a condition of a pair, a condition with the id of a stored one is skipped.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+            message_data (dict): The condition with "user", "check_value" and "condition_flag" keys,
+                                 windowed conditions also have "kind" and "window" keys.
+                                 A condition without the "id" key gets the id derived from its content.
+
+        Returns:
+            tuple or None: The bucket pair (pair1_name, pair2_name) the condition was added to, or None if it is already stored.
+        """
+        pair1_name, pair2_name = self.get_canonical_pair(pair1_name, pair2_name, message_data)
+        if self._insert_many([(pair1_name, pair2_name, message_data)]) == 0:
+            return None
+        return pair1_name, pair2_name
+
+    def remove(self, condition_id):
+        """
+        Removes a condition by its id, the removal is committed with the next `commit`.
+
+        Args:
+            condition_id (str): Id of the condition.
+
+        Returns:
+            tuple or None: The bucket pair names and the removed condition, or None if there is no such condition.
+        """
+        row = self.connection.execute('SELECT id, pair1, pair2, kind, message FROM conditions WHERE condition_id = ?', (condition_id,)).fetchone()
+        if row is None:
+            return None
+
+        row_id, pair1_name, pair2_name, kind, message = row
+        self.connection.execute('DELETE FROM conditions WHERE id = ?', (row_id,))
+        self._change_pair_count(pair1_name, pair2_name, -1)
+
+        if kind is not None:
+            self.window_store.remove(condition_id)
+            self.window_row_ids.pop(condition_id, None)
+        return pair1_name, pair2_name, json.loads(message)
+
+    def get_pairs(self):
+        """
+        Returns all pairs with conditions.
+
+        Returns:
+            list: Tuples (pair1_name, pair2_name).
+        """
+        return list(self.pair_counts.keys())
+
+    def get_dependent_pairs(self, currency_names):
+        """
+        Returns pairs that use any of the currencies as the first or the second currency.
+
+        Args:
+            currency_names (iterable): Names of currencies.
+
+        Returns:
+            set: Tuples (pair1_name, pair2_name).
+        """
+        dependent_pairs = set()
+        for currency_name in currency_names:
+            dependent_pairs |= self.currency_pairs.get(currency_name, set())
+        return dependent_pairs
+
+    def get_window_pairs(self):
+        """
+        Returns pairs with windowed conditions.
+
+        Returns:
+            set: Tuples (pair1_name, pair2_name).
+        """
+        return self.window_store.get_window_pairs()
+
+    def get_buckets(self):
+        """
+        Returns all buckets with their pairs.
+
+        Returns:
+            list: Tuples (pair1_name, pair2_name, SqliteConditionBucket).
+        """
+        return [(pair1_name, pair2_name, SqliteConditionBucket(self, pair1_name, pair2_name)) for pair1_name, pair2_name in self.pair_counts]
+
+    def get_user_messages(self, user_id):
+        """
+        Returns all conditions of a user.
+
+        Args:
+            user_id (int): Telegram id of the user.
+
+        Returns:
+            list: Tuples (pair1_name, pair2_name, message_data) in the bucket pair order.
+        """
+        rows = self.connection.execute('SELECT pair1, pair2, message FROM conditions WHERE user_id = ? ORDER BY id', (user_id,))
+        return [(pair1_name, pair2_name, json.loads(message)) for pair1_name, pair2_name, message in rows]
+
+    def _resolve_pending(self, pair1_name, pair2_name, now_pair_value):
+        """
+        Decides the direction of "will cross" conditions of a pair by the current pair value.
+
+        Args:
+            pair1_name (str): The first currency of the bucket pair.
+            pair2_name (str): The second currency of the bucket pair.
+            now_pair_value (float): The current value of the pair.
+        """
+        rows = self.connection.execute(
+            'SELECT id, message FROM conditions WHERE pair1 = ? AND pair2 = ? AND direction IS NULL AND kind IS NULL',
+            (pair1_name, pair2_name)
+        ).fetchall()
+
+        updates = []
+        for row_id, message in rows:
+            message_data = json.loads(message)
+            message_data["condition_flag"] = resolve_pending_flag(message_data, now_pair_value)
+            condition_flag, _ = get_bucket_condition(message_data)
+            updates.append((get_direction(condition_flag), get_threshold_bound(message_data), json.dumps(message_data), row_id))
+
+        if len(updates) > 0:
+            self.connection.executemany('UPDATE conditions SET direction = ?, bound = ?, message = ? WHERE id = ?', updates)
+
+    def pop_triggered(self, pair1_name, pair2_name, now_pair_value, timestamp=None, resolved_messages=None):
+        """
+        Removes and returns the conditions of a pair met by its current value.
+
+        The removal is committed with the next `commit`.
+
+        Args:
+            pair1_name (str): The first currency in the pair.
+            pair2_name (str): The second currency in the pair.
+            now_pair_value (float): The current value of the pair.
+            timestamp (float, optional): Time of the value in seconds. Defaults to the current time.
+            resolved_messages (list, optional): Not filled, decided directions of "will cross" conditions are
+                                                committed with the table. Defaults to None.
+
+        Returns:
+            list: Groups of met conditions sharing the direction and the threshold key.
+        """
+        if (pair1_name, pair2_name) not in self.pair_counts:
+            return []
+
+        self._resolve_pending(pair1_name, pair2_name, now_pair_value)
+
+        rows = self.connection.execute(
+            'SELECT id, direction, threshold, bound, message FROM conditions WHERE pair1 = ? AND pair2 = ? AND direction = ? AND (threshold, bound) < (?, ?) '
+            'UNION ALL '
+            'SELECT id, direction, threshold, bound, message FROM conditions WHERE pair1 = ? AND pair2 = ? AND direction = ? AND (threshold, bound) >= (?, ?) '
+            'ORDER BY direction DESC, threshold, bound, id',
+            (
+                pair1_name, pair2_name, ABOVE_DIRECTION, now_pair_value, DIRECT_BOUND,
+                pair1_name, pair2_name, BELOW_DIRECTION, now_pair_value, DIRECT_BOUND
+            )
+        ).fetchall()
+
+        triggered_groups = []
+        group_key = None
+        row_ids = []
+        for row_id, direction, check_value, bound, message in rows:
+            if (direction, check_value, bound) != group_key:
+                group_key = (direction, check_value, bound)
+                triggered_groups.append([])
+            triggered_groups[-1].append(json.loads(message))
+            row_ids.append((row_id,))
+
+        for triggered_group in self.window_store.pop_triggered(pair1_name, pair2_name, now_pair_value, timestamp):
+            triggered_groups.append(triggered_group)
+            row_ids += [(self.window_row_ids.pop(message_data[CONDITION_ID_KEY]),) for message_data in triggered_group]
+
+        if len(row_ids) > 0:
+            self.connection.executemany('DELETE FROM conditions WHERE id = ?', row_ids)
+            self._change_pair_count(pair1_name, pair2_name, -len(row_ids))
+        return triggered_groups
+
+    def commit(self):
+        """
+        Commits the conditions added and removed since the last commit in one transaction.
+        """
+        self.connection.commit()
+
+    def to_dict(self):
+        """
+        Converts the store into the nested dictionary format of the cache file.
+
+        Returns:
+            dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+        """
+        mq = {}
+        for pair1_name, pair2_name, message in self.connection.execute('SELECT pair1, pair2, message FROM conditions ORDER BY id'):
+            mq.setdefault(pair1_name, {}).setdefault(pair2_name, []).append(json.loads(message))
+        return mq
+
+    def load_dict(self, mq, is_merge=False):
+        """
+        Loads conditions from the nested dictionary format of the cache file.
+
+        Args:
+            mq (dict): Nested dictionary pair1_name -> pair2_name -> list of conditions.
+            is_merge (bool, optional): If True, conditions missing in the store are added to it,
+                                       otherwise the store is replaced. Defaults to False.
+                                       Conditions are told apart by their ids in both cases.
+        """
+        if is_merge is False:
+            self.connection.execute('DELETE FROM conditions')
+            self._load_metadata()
+
+        pairs_messages = []
+        for pair1_name in mq:
+            for pair2_name in mq[pair1_name]:
+                for message_data in mq[pair1_name][pair2_name]:
+                    pair_key = self.get_canonical_pair(pair1_name, pair2_name, message_data)
+                    pairs_messages.append((*pair_key, message_data))
+
+        self._insert_many(pairs_messages)
+        self.commit()
+
+    def close(self):
+        """
+        Commits the last changes and closes the database.
+        """
+        self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,144 @@
+from collections import deque
+from statistics import mean, pstdev
+from time import monotonic, sleep
+
+class TickScheduler():
+    """
+    Schedules processing ticks with an adaptive period.
+
+    The time spent on a tick is subtracted from the period, so a slow scrape
+    doesn`t get an extra full delay on top. The period grows while the parser
+    is idle (no conditions or no price changes) and drops to the minimum
+    while some condition is close to its threshold. A backed off wait can
+    watch for new work, which resets the period, so a new condition never
+    waits longer than the base period.
+
+    Attributes:
+        period (float): Target period between tick starts in seconds.
+        min_period (float): Period used while some condition is close to its threshold.
+        max_period (float): Upper bound of the period while the parser is idle.
+        backoff_factor (float): Factor the period is multiplied by after every idle tick.
+        near_distance (float): Relative distance to a threshold considered close.
+        current_period (float): Period of the current tick.
+        tick_start (float or None): Monotonic start time of the current tick.
+        intervals (deque): Intervals between the last tick starts.
+    """
+
+    def __init__(self, period=1.0, min_period=0.25, max_period=10.0, backoff_factor=1.5, near_distance=0.005, stats_window=60) -> None:
+        """
+        Initializes the TickScheduler.
+
+        Args:
+            period (float, optional): Target period between tick starts in seconds. Defaults to 1.0.
+            min_period (float, optional): Period used while some condition is close to its threshold. Defaults to 0.25.
+            max_period (float, optional): Upper bound of the period while the parser is idle. Defaults to 10.0.
+            backoff_factor (float, optional): Factor the period is multiplied by after every idle tick. Defaults to 1.5.
+            near_distance (float, optional): Relative distance to a threshold considered close. Defaults to 0.005.
+            stats_window (int, optional): Number of last ticks used for statistics. Defaults to 60.
+        """
+        self.period = period
+        self.min_period = min(min_period, period)
+        self.max_period = max(max_period, period)
+        self.backoff_factor = backoff_factor
+        self.near_distance = near_distance
+
+        self.current_period = period
+        self.tick_start = None
+        self.intervals = deque(maxlen=stats_window)
+
+    def start_tick(self):
+        """
+        Marks the start of a tick.
+        """
+        now = monotonic()
+        if self.tick_start is not None:
+            self.intervals.append(now - self.tick_start)
+        self.tick_start = now
+
+    def update_period(self, is_idle, nearest_distance=None):
+        """
+        Adapts the period to the result of the tick.
+
+        Args:
+            is_idle (bool): True if the tick had no conditions or no price changes.
+            nearest_distance (float, optional): Relative distance of the closest condition to its threshold. Defaults to None.
+
+        Returns:
+            float: The period of the next tick.
+        """
+        if nearest_distance is not None and nearest_distance <= self.near_distance:
+            self.current_period = self.min_period
+        elif is_idle is True:
+            self.current_period = min(self.current_period * self.backoff_factor, self.max_period)
+        else:
+            self.current_period = self.period
+
+        return self.current_period
+
+    def get_sleep_time(self):
+        """
+        Calculates the time left until the next tick.
+
+        Returns:
+            float: Time to sleep in seconds.
+        """
+        if self.tick_start is None:
+            return self.current_period
+        return max(0.0, self.current_period - (monotonic() - self.tick_start))
+
+    def wait(self, is_idle, nearest_distance=None, wait_function=None):
+        """
+        Adapts the period and sleeps until the next tick.
+
+        Args:
+            is_idle (bool): True if the tick had no conditions or no price changes.
+            nearest_distance (float, optional): Relative distance of the closest condition to its threshold. Defaults to None.
+            wait_function (callable, optional): Waits up to the given time in seconds for new work and returns True if there is some.
+                                                It is used instead of sleeping while the period is backed off. Defaults to None.
+        """
+        self.update_period(is_idle, nearest_distance)
+        if wait_function is None or self.current_period <= self.period:
+            sleep(self.get_sleep_time())
+            return
+
+        while True:
+            sleep_time = self.get_sleep_time()
+            if sleep_time <= 0:
+                return
+
+            if wait_function(sleep_time) is True:
+                # New work is taken by the tick of the base period
+                self.current_period = self.period
+                sleep(self.get_sleep_time())
+                return
+
+    def get_tick_rate(self):
+        """
+        Calculates the achieved tick rate.
+
+        Returns:
+            float: Ticks per second over the statistics window, 0.0 if unknown.
+        """
+        if len(self.intervals) == 0:
+            return 0.0
+        return 1.0 / mean(self.intervals)
+
+    def get_jitter(self):
+        """
+        Calculates the jitter of tick intervals.
+
+        Returns:
+            float: Standard deviation of intervals over the statistics window in seconds.
+        """
+        if len(self.intervals) < 2:
+            return 0.0
+        return pstdev(self.intervals)
+
+    def get_stats_string(self):
+        """
+        Formats the scheduler statistics.
+
+        Returns:
+            str: The statistics string.
+        """
+        return f'period: {self.current_period:.3f} s, rate: {self.get_tick_rate():.3f} ticks/s, jitter: {self.get_jitter() * 1000:.1f} ms'
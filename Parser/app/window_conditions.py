@@ -0,0 +1,337 @@
+from bisect import bisect_right
+from collections import deque
+
+PERCENT_MOVE_KIND = 'percent_move'
+MA_CROSS_KIND = 'ma_cross'
+WINDOW_CONDITION_KINDS = (PERCENT_MOVE_KIND, MA_CROSS_KIND)
+
+class RollingWindow():
+    """
+    Pair values of the last `window` seconds with incrementally updated aggregates.
+
+    The sum of values is kept as a running sum, the minimum and the maximum
+    as monotonic deques, so appending a value and evicting old ones is O(1)
+    amortized and reading the mean, the minimum or the maximum is O(1).
+
+    Attributes:
+        window (float): Window length in seconds.
+        values (deque): Tuples (append_id, timestamp, value) inside the window.
+        value_sum (float): Sum of values inside the window.
+        min_values (deque): Tuples (append_id, value) with increasing values, the first one is the minimum.
+        max_values (deque): Tuples (append_id, value) with decreasing values, the first one is the maximum.
+        append_count (int): Number of appended values, used as the id of the next value.
+    """
+
+    def __init__(self, window) -> None:
+        """
+        Initializes the RollingWindow.
+
+        Args:
+            window (float): Window length in seconds.
+        """
+        self.window = window
+
+        self.values = deque()
+        self.value_sum = 0.0
+        self.min_values = deque()
+        self.max_values = deque()
+        self.append_count = 0
+
+    def __len__(self):
+        """
+        Returns the number of values inside the window.
+
+        Returns:
+            int: Number of values.
+        """
+        return len(self.values)
+
+    def append(self, timestamp, value):
+        """
+        Appends a value and evicts values older than the window.
+
+        Args:
+            timestamp (float): Time of the value in seconds.
+            value (float): The pair value.
+        """
+        append_id = self.append_count
+        self.append_count += 1
+
+        self.values.append((append_id, timestamp, value))
+        self.value_sum += value
+
+        while len(self.min_values) > 0 and self.min_values[-1][1] >= value:
+            self.min_values.pop()
+        self.min_values.append((append_id, value))
+
+        while len(self.max_values) > 0 and self.max_values[-1][1] <= value:
+            self.max_values.pop()
+        self.max_values.append((append_id, value))
+
+        while self.values[0][1] < timestamp - self.window:
+            evicted_id, _, evicted_value = self.values.popleft()
+            self.value_sum -= evicted_value
+
+            if self.min_values[0][0] == evicted_id:
+                self.min_values.popleft()
+            if self.max_values[0][0] == evicted_id:
+                self.max_values.popleft()
+
+    def get_span(self):
+        """
+        Returns the time between the oldest and the newest value.
+
+        Returns:
+            float: Span in seconds.
+        """
+        if len(self.values) == 0:
+            return 0.0
+        return self.values[-1][1] - self.values[0][1]
+
+    def get_mean(self):
+        """
+        Returns the mean of values inside the window.
+
+        Returns:
+            float or None: The mean, or None if the window is empty.
+        """
+        if len(self.values) == 0:
+            return None
+        return self.value_sum / len(self.values)
+
+    def get_min(self):
+        """
+        Returns the minimum of values inside the window.
+
+        Returns:
+            float or None: The minimum, or None if the window is empty.
+        """
+        if len(self.min_values) == 0:
+            return None
+        return self.min_values[0][1]
+
+    def get_max(self):
+        """
+        Returns the maximum of values inside the window.
+
+        Returns:
+            float or None: The maximum, or None if the window is empty.
+        """
+        if len(self.max_values) == 0:
+            return None
+        return self.max_values[0][1]
+
+
+class WindowConditionGroup():
+    """
+    Conditions of one pair that share a condition kind and a window.
+
+    All conditions of the group read the same RollingWindow, so a tick costs
+    one append no matter how many conditions use the window.
+
+    "percent_move" conditions are met when the pair value moved by at least
+    `check_value` percent from the window minimum ("condition_flag" True),
+    from the window maximum (False) or from any of them (None). They are kept
+    sorted by percent, so the met ones are a prefix found with bisection.
+
+    "ma_cross" conditions are met when the pair value crosses its moving
+    average over the window upwards (True), downwards (False) or in any
+    direction (None). Crosses are only detected once the window has filled
+    its whole length, conditions added during a tick start watching from the
+    next one.
+
+    Attributes:
+        kind (str): The condition kind, "percent_move" or "ma_cross".
+        rolling_window (RollingWindow): Pair values of the window.
+        percent_values (dict): Condition flags and sorted percents of "percent_move" conditions.
+        flag_messages (dict): Condition flags and conditions in the order of `percent_values`
+                              for "percent_move", in the order of adding for "ma_cross".
+        pending_messages (list): "ma_cross" conditions added since the last tick.
+        previous_side (bool or None): Whether the previous pair value was above the moving average.
+    """
+
+    def __init__(self, kind, window) -> None:
+        """
+        Initializes the WindowConditionGroup.
+
+        Args:
+            kind (str): The condition kind, "percent_move" or "ma_cross".
+            window (float): Window length in seconds.
+        """
+        self.kind = kind
+        self.rolling_window = RollingWindow(window)
+
+        self.percent_values = {True: [], False: [], None: []}
+        self.flag_messages = {True: [], False: [], None: []}
+        self.pending_messages = []
+        self.previous_side = None
+
+    def __len__(self):
+        """
+        Returns the number of conditions in the group.
+
+        Returns:
+            int: Number of conditions.
+        """
+        return sum(len(messages) for messages in self.flag_messages.values()) + len(self.pending_messages)
+
+    def add(self, message_data):
+        """
+        Adds a condition to the group.
+
+        Args:
+            message_data (dict): The condition with "user", "check_value", "condition_flag", "kind" and "window" keys.
+        """
+        if self.kind == MA_CROSS_KIND:
+            self.pending_messages.append(message_data)
+            return
+
+        percent_values = self.percent_values[message_data["condition_flag"]]
+        insert_id = bisect_right(percent_values, message_data["check_value"])
+        percent_values.insert(insert_id, message_data["check_value"])
+        self.flag_messages[message_data["condition_flag"]].insert(insert_id, message_data)
+
+    def _pop_percent_prefix(self, condition_flag, move_percent):
+        """
+        Removes and returns "percent_move" conditions with a percent not bigger than the move.
+
+        Args:
+            condition_flag (bool or None): The direction of the conditions.
+            move_percent (float): The move of the pair value in percent.
+
+        Returns:
+            list: The met conditions.
+        """
+        prefix_end = bisect_right(self.percent_values[condition_flag], move_percent)
+        if prefix_end == 0:
+            return []
+
+        triggered_messages = self.flag_messages[condition_flag][:prefix_end]
+        del self.percent_values[condition_flag][:prefix_end]
+        del self.flag_messages[condition_flag][:prefix_end]
+        return triggered_messages
+
+    def _pop_all(self, condition_flag):
+        """
+        Removes and returns all conditions with the flag.
+
+        Args:
+            condition_flag (bool or None): The direction of the conditions.
+
+        Returns:
+            list: The conditions.
+        """
+        triggered_messages = self.flag_messages[condition_flag]
+        self.flag_messages[condition_flag] = []
+        return triggered_messages
+
+    def pop_triggered(self, now_pair_value, timestamp):
+        """
+        Appends the pair value to the window, removes and returns the met conditions.
+
+        Args:
+            now_pair_value (float): The current value of the pair.
+            timestamp (float): Time of the value in seconds.
+
+        Returns:
+            list: The met conditions.
+        """
+        self.rolling_window.append(timestamp, now_pair_value)
+
+        if self.kind == PERCENT_MOVE_KIND:
+            return self._pop_percent_move(now_pair_value)
+        return self._pop_ma_cross(now_pair_value)
+
+    def _pop_percent_move(self, now_pair_value):
+        """
+        Removes and returns "percent_move" conditions met by the pair value.
+
+        Args:
+            now_pair_value (float): The current value of the pair.
+
+        Returns:
+            list: The met conditions.
+        """
+        min_value = self.rolling_window.get_min()
+        max_value = self.rolling_window.get_max()
+        if min_value <= 0:
+            return []
+
+        up_percent = (now_pair_value / min_value - 1.0) * 100.0
+        down_percent = (1.0 - now_pair_value / max_value) * 100.0
+
+        triggered_messages = self._pop_percent_prefix(True, up_percent)
+        triggered_messages += self._pop_percent_prefix(False, down_percent)
+        triggered_messages += self._pop_percent_prefix(None, max(up_percent, down_percent))
+        return triggered_messages
+
+    def _pop_ma_cross(self, now_pair_value):
+        """
+        Removes and returns "ma_cross" conditions met by the pair value.
+
+        Args:
+            now_pair_value (float): The current value of the pair.
+
+        Returns:
+            list: The met conditions.
+        """
+        triggered_messages = []
+
+        if self.rolling_window.get_span() >= self.rolling_window.window:
+            moving_average = self.rolling_window.get_mean()
+            side = self.previous_side if now_pair_value == moving_average else now_pair_value > moving_average
+
+            if self.previous_side is not None and side is not self.previous_side:
+                triggered_messages = self._pop_all(side) + self._pop_all(None)
+            self.previous_side = side
+
+        for message_data in self.pending_messages:
+            self.flag_messages[message_data["condition_flag"]].append(message_data)
+        self.pending_messages = []
+
+        return triggered_messages
+
+    def get_messages(self):
+        """
+        Returns all conditions of the group.
+
+        Returns:
+            list: The conditions.
+        """
+        return [message_data for messages in self.flag_messages.values() for message_data in messages] + self.pending_messages
+
+    def drop_messages(self, message_ids):
+        """
+        Removes conditions from the group, the rolling window is kept.
+
+        Args:
+            message_ids (set): Ids of the removed condition objects.
+        """
+        for condition_flag, messages in self.flag_messages.items():
+            if self.kind == MA_CROSS_KIND:
+                self.flag_messages[condition_flag] = [message_data for message_data in messages if id(message_data) not in message_ids]
+                continue
+
+            kept_conditions = [
+                (percent_value, message_data)
+                for percent_value, message_data in zip(self.percent_values[condition_flag], messages)
+                if id(message_data) not in message_ids
+            ]
+            self.percent_values[condition_flag] = [percent_value for percent_value, _ in kept_conditions]
+            self.flag_messages[condition_flag] = [message_data for _, message_data in kept_conditions]
+        self.pending_messages = [message_data for message_data in self.pending_messages if id(message_data) not in message_ids]
+
+
+def get_window_key(message_data):
+    """
+    Returns the key of the window group of a condition.
+
+    Args:
+        message_data (dict): The condition.
+
+    Returns:
+        tuple or None: Tuple (kind, window), or None for threshold conditions.
+    """
+    if message_data.get("kind") not in WINDOW_CONDITION_KINDS:
+        return None
+    return message_data["kind"], message_data["window"]
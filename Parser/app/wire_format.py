@@ -0,0 +1,372 @@
+from array import array
+
+import json
+import struct
+import sys
+
+JSON_CONTENT_TYPE = 'application/json'
+BINARY_CONTENT_TYPE = 'application/x-binance-parser'
+WIRE_FORMATS = ('binary', 'json')
+
+WIRE_MAGIC = b'BW'
+WIRE_VERSION = 1
+SUPPORTED_WIRE_VERSIONS = (1,)
+
+# Magic and version, the length of the symbol table follows as a varint
+HEADER_STRUCT = struct.Struct('<2sB')
+FLOAT_STRUCT = struct.Struct('<d')
+
+NONE_TAG = 0
+FALSE_TAG = 1
+TRUE_TAG = 2
+INT_TAG = 3
+FLOAT_TAG = 4
+STRING_TAG = 5
+LIST_TAG = 6
+DICT_TAG = 7
+# A dictionary of float values, such as currencies: a column of key symbols and a column of float64 values
+FLOAT_DICT_TAG = 8
+
+# Key symbols of float dictionaries are packed as uint16
+MAX_SYMBOL_COUNT = 2 ** 16
+
+
+class WireFormatError(ValueError):
+    """
+    Raised when a message can`t be encoded or decoded in the binary wire format.
+    """
+
+
+def get_content_type(wire_format):
+    """
+    Returns the content type of messages in a wire format.
+
+    Args:
+        wire_format (str): "binary" or "json".
+
+    Returns:
+        str: The content type, the binary one carries the format version.
+    """
+    if wire_format == 'binary':
+        return f'{BINARY_CONTENT_TYPE}; version={WIRE_VERSION}'
+    return JSON_CONTENT_TYPE
+
+
+class BinaryEncoder():
+    """
+    Encodes a JSON-like value into the binary wire format.
+
+    A message is a header (magic, version), a JSON list of the distinct
+    strings of the message (the symbol table) and one tagged value. Strings,
+    including dictionary keys, are referenced by their index in the table, so
+    the keys of repeated records and repeated currency and user names are
+    written once. Counts, indexes and ints are varints, floats are float64.
+    Dictionaries of floats are packed into a uint16 column of key indexes and
+    a float64 column.
+
+    Attributes:
+        buffer (bytearray): The encoded value.
+        symbols (list): Strings of the symbol table in the order of their indexes.
+        symbol_ids (dict): Strings and their indexes in the symbol table.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the BinaryEncoder.
+        """
+        self.buffer = bytearray()
+        self.symbols = []
+        self.symbol_ids = {}
+
+    @staticmethod
+    def write_varint(buffer, value):
+        """
+        Appends an unsigned varint (7 bits per byte, the high bit marks a following byte).
+
+        Args:
+            buffer (bytearray): The buffer.
+            value (int): A non-negative int.
+        """
+        while value >= 0x80:
+            buffer.append(value & 0x7f | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+    def get_symbol_id(self, string):
+        """
+        Returns the index of a string in the symbol table, adding it if needed.
+
+        Args:
+            string (str): The string.
+
+        Returns:
+            int: Index of the string.
+        """
+        symbol_id = self.symbol_ids.get(string)
+        if symbol_id is None:
+            if len(self.symbols) >= MAX_SYMBOL_COUNT:
+                raise WireFormatError(f'A message can`t have more than {MAX_SYMBOL_COUNT} distinct strings.')
+            symbol_id = self.symbol_ids[string] = len(self.symbols)
+            self.symbols.append(string)
+        return symbol_id
+
+    def encode_value(self, value):
+        """
+        Appends an encoded value to the buffer.
+
+        Args:
+            value: None, bool, int, float, str, list, tuple or dict with str keys.
+        """
+        buffer = self.buffer
+        if value is None:
+            buffer.append(NONE_TAG)
+        elif value is True:
+            buffer.append(TRUE_TAG)
+        elif value is False:
+            buffer.append(FALSE_TAG)
+        elif isinstance(value, int):
+            buffer.append(INT_TAG)
+            # Zigzag: small negative ints are short too
+            self.write_varint(buffer, value * 2 if value >= 0 else -value * 2 - 1)
+        elif isinstance(value, float):
+            buffer.append(FLOAT_TAG)
+            buffer += FLOAT_STRUCT.pack(value)
+        elif isinstance(value, str):
+            buffer.append(STRING_TAG)
+            self.write_varint(buffer, self.get_symbol_id(value))
+        elif isinstance(value, (list, tuple)):
+            buffer.append(LIST_TAG)
+            self.write_varint(buffer, len(value))
+            for item in value:
+                self.encode_value(item)
+        elif isinstance(value, dict):
+            self.encode_dict(value)
+        else:
+            raise WireFormatError(f'Values of type "{type(value).__name__}" can`t be encoded.')
+
+    def encode_dict(self, value):
+        """
+        Appends an encoded dictionary to the buffer.
+
+        Args:
+            value (dict): Dictionary with str keys.
+        """
+        if any(isinstance(key, str) is False for key in value):
+            raise WireFormatError('Only dictionaries with str keys can be encoded.')
+
+        buffer = self.buffer
+        if len(value) > 0 and all(type(item) is float for item in value.values()):
+            buffer.append(FLOAT_DICT_TAG)
+            self.write_varint(buffer, len(value))
+            key_ids = array('H', [self.get_symbol_id(key) for key in value])
+            values = array('d', value.values())
+            if sys.byteorder == 'big':
+                key_ids.byteswap()
+                values.byteswap()
+            buffer += key_ids.tobytes()
+            buffer += values.tobytes()
+            return
+
+        buffer.append(DICT_TAG)
+        self.write_varint(buffer, len(value))
+        for key, item in value.items():
+            self.write_varint(buffer, self.get_symbol_id(key))
+            self.encode_value(item)
+
+    def encode(self, value):
+        """
+        Encodes a value with the header and the symbol table.
+
+        Args:
+            value: The value.
+
+        Returns:
+            bytes: The encoded message.
+        """
+        self.encode_value(value)
+
+        # The table is read with one call of the C JSON decoder instead of a Python loop over strings
+        symbols_bytes = json.dumps(self.symbols, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        message = bytearray(HEADER_STRUCT.pack(WIRE_MAGIC, WIRE_VERSION))
+        self.write_varint(message, len(symbols_bytes))
+        message += symbols_bytes
+        message += self.buffer
+        return bytes(message)
+
+
+class BinaryDecoder():
+    """
+    Decodes a message in the binary wire format, see BinaryEncoder.
+
+    Attributes:
+        body (bytes): The message.
+        offset (int): Offset of the next item.
+        symbols (list): Strings of the symbol table.
+    """
+
+    def __init__(self, body) -> None:
+        """
+        Initializes the BinaryDecoder and reads the header and the symbol table.
+
+        Args:
+            body (bytes): The message.
+        """
+        self.body = bytes(body)
+        magic, version = HEADER_STRUCT.unpack_from(self.body, 0)
+        if magic != WIRE_MAGIC:
+            raise WireFormatError('The message isn`t in the binary wire format.')
+        if version not in SUPPORTED_WIRE_VERSIONS:
+            raise WireFormatError(f'Version {version} of the binary wire format isn`t supported.')
+
+        self.offset = HEADER_STRUCT.size
+        symbols_end = self.read_varint() + self.offset
+        if symbols_end > len(self.body):
+            raise WireFormatError('The message is truncated.')
+        self.symbols = json.loads(self.body[self.offset:symbols_end])
+        if isinstance(self.symbols, list) is False or any(isinstance(symbol, str) is False for symbol in self.symbols):
+            raise WireFormatError('The symbol table of the message isn`t a list of strings.')
+        self.offset = symbols_end
+
+    def read_varint(self):
+        """
+        Reads an unsigned varint.
+
+        Returns:
+            int: The value.
+        """
+        body = self.body
+        offset = self.offset
+        byte = body[offset]
+        value = byte & 0x7f
+        shift = 7
+        while byte & 0x80:
+            offset += 1
+            byte = body[offset]
+            value |= (byte & 0x7f) << shift
+            shift += 7
+        self.offset = offset + 1
+        return value
+
+    def read_column(self, typecode, count):
+        """
+        Reads a column of numbers.
+
+        Args:
+            typecode (str): Array typecode of the numbers.
+            count (int): Number of the numbers.
+
+        Returns:
+            array: The column.
+        """
+        column = array(typecode)
+        end = self.offset + count * column.itemsize
+        if end > len(self.body):
+            raise WireFormatError('The message is truncated.')
+        column.frombytes(self.body[self.offset:end])
+        if sys.byteorder == 'big':
+            column.byteswap()
+        self.offset = end
+        return column
+
+    def decode_value(self):
+        """
+        Reads the next value.
+
+        Returns:
+            The value.
+        """
+        tag = self.body[self.offset]
+        self.offset += 1
+
+        if tag == STRING_TAG:
+            return self.symbols[self.read_varint()]
+        if tag == FLOAT_TAG:
+            value, = FLOAT_STRUCT.unpack_from(self.body, self.offset)
+            self.offset += FLOAT_STRUCT.size
+            return value
+        if tag == DICT_TAG:
+            value = {}
+            for _ in range(self.read_varint()):
+                key = self.symbols[self.read_varint()]
+                value[key] = self.decode_value()
+            return value
+        if tag == LIST_TAG:
+            return [self.decode_value() for _ in range(self.read_varint())]
+        if tag == INT_TAG:
+            value = self.read_varint()
+            return value >> 1 if value & 1 == 0 else -(value >> 1) - 1
+        if tag == TRUE_TAG:
+            return True
+        if tag == FALSE_TAG:
+            return False
+        if tag == NONE_TAG:
+            return None
+        if tag == FLOAT_DICT_TAG:
+            count = self.read_varint()
+            key_ids = self.read_column('H', count)
+            values = self.read_column('d', count)
+            symbols = self.symbols
+            return dict(zip([symbols[key_id] for key_id in key_ids], values))
+        raise WireFormatError(f'Tag {tag} of the binary wire format isn`t known.')
+
+    def decode(self):
+        """
+        Reads the value of the message.
+
+        Returns:
+            The value.
+        """
+        value = self.decode_value()
+        if self.offset != len(self.body):
+            raise WireFormatError('The message has trailing bytes.')
+        return value
+
+
+def encode_message(message, wire_format='binary'):
+    """
+    Encodes a message for a queue.
+
+    A message the binary format can`t represent is sent as JSON, receivers tell the formats apart by the content type.
+
+    Args:
+        message: A JSON-like message.
+        wire_format (str, optional): "binary" or "json". Defaults to "binary".
+
+    Returns:
+        tuple: The body and its content type.
+    """
+    if wire_format == 'binary':
+        try:
+            return BinaryEncoder().encode(message), get_content_type('binary')
+        except WireFormatError:
+            pass
+    return json.dumps(message).encode('utf-8'), JSON_CONTENT_TYPE
+
+
+def decode_message(body, content_type=None):
+    """
+    Decodes a message of a queue by its content type.
+
+    Messages without a content type are JSON, as older services send them.
+
+    Args:
+        body (bytes|str): The body.
+        content_type (str, optional): The content type of the message. Defaults to None.
+
+    Returns:
+        The message.
+
+    Raises:
+        WireFormatError: If the body can`t be decoded, it is a ValueError like json.JSONDecodeError.
+    """
+    if content_type is not None and content_type.split(';')[0].strip() == BINARY_CONTENT_TYPE:
+        try:
+            return BinaryDecoder(body).decode()
+        except (struct.error, IndexError, UnicodeDecodeError, json.JSONDecodeError) as exception:
+            raise WireFormatError(f'The message is malformed: {exception}.') from exception
+
+    try:
+        return json.loads(body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as exception:
+        raise WireFormatError(f'The message isn`t JSON: {exception}.') from exception
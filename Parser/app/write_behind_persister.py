@@ -0,0 +1,232 @@
+from collections import deque
+from time import perf_counter
+
+import os
+import threading
+
+def write_atomically(path, data):
+    """
+    Writes a file through a temporary file replacing it at once, so a crash never leaves a truncated file.
+
+    The directory is fsynced after the replacement, otherwise a crash could bring the old file back.
+
+    Args:
+        path (str): Path to the file.
+        data (str or bytes): Content of the file, strings are written in UTF-8.
+
+    Returns:
+        int: Number of written bytes.
+    """
+    encoded_data = data.encode('utf-8') if isinstance(data, str) else data
+
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'wb') as temp_fp:
+        temp_fp.write(encoded_data)
+        temp_fp.flush()
+        os.fsync(temp_fp.fileno())
+    os.replace(temp_path, path)
+    fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+    return len(encoded_data)
+
+
+def fsync_directory(directory_path):
+    """
+    Fsyncs a directory, so renames and removals of its files survive a crash.
+
+    Args:
+        directory_path (str): Path to the directory.
+    """
+    # Directories can`t be opened on Windows, renames are durable there without it
+    if os.name == 'nt':
+        return
+
+    directory_fd = os.open(directory_path, os.O_RDONLY)
+    try:
+        os.fsync(directory_fd)
+    finally:
+        os.close(directory_fd)
+
+
+class WriteBehindPersister(threading.Thread):
+    """
+    Runs a flush function in a background thread after changes are marked.
+
+    Changes only mark the persister dirty, every mark made before a flush
+    starts is covered by it: a burst of changes costs one flush. Flushes run
+    at most once per `flush_interval`, `request_flush` (the end of a tick)
+    flushes right away. A failed flush is logged and its changes stay marked,
+    so they are flushed again after the interval. Flush timing and written
+    bytes are kept for the statistics.
+
+    Attributes:
+        flush_function (callable): Function persisting the changes, it returns the number of written bytes.
+        flush_interval (float): Minimum time between flushes in seconds.
+        parser_docker_logger (ParserLogger or None): Logger of failed flushes.
+        condition (threading.Condition): Condition guarding the dirty state.
+        is_running (bool): The thread works while it is True.
+        is_dirty (bool): True if there are changes since the last flush.
+        is_urgent (bool): True if the changes should be flushed without waiting for the interval.
+        mark_count (int): Number of changes since the last flush.
+        last_flush_time (float): `perf_counter` time the last flush started at.
+        flush_count (int): Number of flushes.
+        flushed_mark_count (int): Number of changes covered by all flushes.
+        bytes_written (int): Number of bytes written by all flushes.
+        flush_durations (deque): Durations of the last flushes in seconds.
+        last_error (str or None): Error of the last failed flush.
+        failed_flush_count (int): Number of failed flushes.
+    """
+
+    def __init__(self, flush_function, flush_interval=0.05, name='persistence', stats_window=100, parser_docker_logger=None) -> None:
+        """
+        Initializes the WriteBehindPersister, the thread is started with `start`.
+
+        Args:
+            flush_function (callable): Function persisting the changes, it returns the number of written bytes.
+            flush_interval (float, optional): Minimum time between flushes in seconds. Defaults to 0.05.
+            name (str, optional): Name of the thread and of the statistics. Defaults to 'persistence'.
+            stats_window (int, optional): Number of last flushes the timing is calculated from. Defaults to 100.
+            parser_docker_logger (ParserLogger, optional): Logger of failed flushes. Defaults to None.
+        """
+        super().__init__(name=name, daemon=True)
+        self.flush_function = flush_function
+        self.flush_interval = flush_interval
+        self.parser_docker_logger = parser_docker_logger
+
+        self.condition = threading.Condition()
+        self.is_running = True
+        self.is_dirty = False
+        self.is_urgent = False
+        self.mark_count = 0
+        self.last_flush_time = perf_counter()
+
+        self.flush_count = 0
+        self.flushed_mark_count = 0
+        self.bytes_written = 0
+        self.flush_durations = deque(maxlen=stats_window)
+        self.last_error = None
+        self.failed_flush_count = 0
+
+    def mark_dirty(self):
+        """
+        Marks a change to be flushed.
+        """
+        with self.condition:
+            self.is_dirty = True
+            self.mark_count += 1
+            self.condition.notify()
+
+    def request_flush(self):
+        """
+        Asks for marked changes to be flushed without waiting for the interval.
+        """
+        with self.condition:
+            if self.is_dirty is True:
+                self.is_urgent = True
+                self.condition.notify()
+
+    def _take_marks(self):
+        """
+        Clears the dirty state, the condition must be held.
+
+        Returns:
+            int: Number of changes covered by the flush.
+        """
+        mark_count = self.mark_count
+        self.is_dirty = False
+        self.is_urgent = False
+        self.mark_count = 0
+        self.last_flush_time = perf_counter()
+        return mark_count
+
+    def _flush(self, mark_count):
+        """
+        Runs the flush function and records its statistics.
+
+        Args:
+            mark_count (int): Number of changes covered by the flush.
+        """
+        start_time = perf_counter()
+        try:
+            self.bytes_written += self.flush_function()
+        except OSError as error:
+            self.last_error = str(error)
+            self.failed_flush_count += 1
+
+            # The changes are flushed again after the interval, the flush function keeps what it didn`t write
+            with self.condition:
+                self.is_dirty = True
+                self.mark_count += mark_count
+                self.condition.notify()
+
+            if self.parser_docker_logger is not None:
+                self.parser_docker_logger.log_exception(
+                    f'Changes aren`t flushed by the {self.name} thread: {error!r}. {mark_count} changes will be flushed again.'
+                )
+            return
+
+        self.flush_durations.append(perf_counter() - start_time)
+        self.flush_count += 1
+        self.flushed_mark_count += mark_count
+
+    def run(self):
+        """
+        Main loop of the thread.
+        """
+        while True:
+            with self.condition:
+                while self.is_running is True:
+                    if self.is_dirty is True:
+                        remaining_time = self.flush_interval - (perf_counter() - self.last_flush_time)
+                        if self.is_urgent is True or remaining_time <= 0:
+                            break
+                        self.condition.wait(remaining_time)
+                    else:
+                        self.condition.wait()
+
+                if self.is_running is False:
+                    return
+                mark_count = self._take_marks()
+
+            self._flush(mark_count)
+
+    def flush(self):
+        """
+        Flushes marked changes in the calling thread and waits for it.
+        """
+        with self.condition:
+            if self.is_dirty is False:
+                return
+            mark_count = self._take_marks()
+
+        self._flush(mark_count)
+
+    def close(self):
+        """
+        Stops the thread and flushes the changes left.
+        """
+        with self.condition:
+            self.is_running = False
+            self.condition.notify()
+
+        if self.is_alive():
+            self.join()
+        self.flush()
+
+    def get_stats_string(self):
+        """
+        Returns the statistics of the persister.
+
+        Returns:
+            str: Number of flushes and changes, flush timing and written bytes.
+        """
+        flush_durations = list(self.flush_durations)
+        if len(flush_durations) == 0:
+            return f'{self.name}: -'
+
+        stats_string = f'{self.name}: {self.flush_count} flushes of {self.flushed_mark_count} changes, ' \
+            f'{sum(flush_durations) / len(flush_durations) * 1000:.1f} ms (max {max(flush_durations) * 1000:.1f} ms), ' \
+            f'{self.bytes_written} bytes'
+        if self.last_error is not None:
+            stats_string += f', {self.failed_flush_count} failed, last error: {self.last_error}'
+        return stats_string
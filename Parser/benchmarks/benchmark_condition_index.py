@@ -0,0 +1,179 @@
+"""
+Compares the per-tick cost of the sorted threshold index of ConditionStore
+with a linear scan over all conditions of the same pairs.
+
+Conditions wait in a steady state: prices move within a band and no threshold
+is crossed, so a tick costs only the lookup, which should stay flat while the
+alert count grows from 1k to 1M. The cost of taking met conditions out is
+measured apart, by a spike that crosses a share of the thresholds, per met
+condition. The benchmark fails if the lookup cost grows more than `--max-growth`
+times from the smallest to the largest alert count:
+    $ python benchmark_condition_index.py
+    $ python benchmark_condition_index.py --alerts 1000 10000 100000 1000000 --pairs 10
+"""
+from random import Random
+from time import perf_counter
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from condition_bucket import ConditionBucket
+from condition_store import ConditionStore
+
+
+def generate_conditions(alert_count, pair_count, margin, spread, seed=0):
+    """
+    Generates "bigger than" conditions above a price of 1.0 and "lower than" conditions below it.
+
+    Args:
+        alert_count (int): Number of conditions.
+        pair_count (int): Number of pairs the conditions are spread over.
+        margin (float): Minimum relative distance of a threshold from the price.
+        spread (float): Maximum relative distance of a threshold beyond the margin.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict: Pairs and lists of their conditions.
+    """
+    random = Random(seed)
+    pairs_conditions = {(f'COIN{pair_id}', 'USDT'): [] for pair_id in range(pair_count)}
+    pair_keys = list(pairs_conditions.keys())
+
+    for alert_id in range(alert_count):
+        condition_flag = random.choice([True, False])
+        distance = margin + random.uniform(0.0, spread)
+        pairs_conditions[pair_keys[alert_id % pair_count]].append({
+            "user": [alert_id, f'user_{alert_id}'],
+            "check_value": 1.0 + distance if condition_flag is True else 1.0 - distance,
+            "condition_flag": condition_flag
+        })
+    return pairs_conditions
+
+
+def linear_scan(messages, now_pair_value):
+    """
+    Finds met conditions by checking every condition, like the parser did before the index.
+
+    Args:
+        messages (list): Conditions of a pair.
+        now_pair_value (float): The current value of the pair.
+
+    Returns:
+        tuple: Met and not met conditions.
+    """
+    triggered_messages = []
+    waiting_messages = []
+    for message_data in messages:
+        condition_flag = ConditionBucket.resolve_condition_flag(message_data["condition_flag"], message_data["check_value"], now_pair_value)
+        if (now_pair_value > message_data["check_value"]) is condition_flag:
+            triggered_messages.append(message_data)
+        else:
+            waiting_messages.append(message_data)
+    return triggered_messages, waiting_messages
+
+
+def generate_ticks(pair_keys, tick_count, margin, volatility, seed=1):
+    """
+    Generates a random walk of pair values kept within half of the margin around 1.0, so no threshold is crossed.
+
+    Args:
+        pair_keys (list): Pairs.
+        tick_count (int): Number of ticks.
+        margin (float): Minimum relative distance of a threshold from the price.
+        volatility (float): Relative standard deviation of a price move per tick.
+        seed (int, optional): Seed of the random generator. Defaults to 1.
+
+    Returns:
+        list: Dictionaries of pair values of every tick.
+    """
+    random = Random(seed)
+    pair_values = {pair_key: 1.0 for pair_key in pair_keys}
+    ticks = []
+    for _ in range(tick_count):
+        for pair_key in pair_values:
+            pair_value = pair_values[pair_key] * (1.0 + random.gauss(0.0, volatility))
+            pair_values[pair_key] = min(max(pair_value, 1.0 - margin / 2), 1.0 + margin / 2)
+        ticks.append(dict(pair_values))
+    return ticks
+
+
+def run(alert_count, pair_count, tick_count, scan_tick_count, margin, spread, volatility, spike):
+    """
+    Runs both evaluations over the same steady walk of pair values, then a spike through the index.
+
+    Args:
+        alert_count (int): Number of conditions.
+        pair_count (int): Number of pairs.
+        tick_count (int): Number of ticks.
+        scan_tick_count (int): Number of the first ticks evaluated by the linear scan too.
+        margin (float): Minimum relative distance of a threshold from the price.
+        spread (float): Maximum relative distance of a threshold beyond the margin.
+        volatility (float): Relative standard deviation of a price move per tick.
+        spike (float): Relative move of all pairs of the spike tick.
+
+    Returns:
+        tuple: Mean steady tick duration of the index and of the linear scan in seconds,
+               duration of the spike tick in seconds and the number of conditions it met.
+    """
+    pairs_conditions = generate_conditions(alert_count, pair_count, margin, spread)
+
+    condition_store = ConditionStore()
+    linear_mq = {}
+    for (pair1_name, pair2_name), messages in pairs_conditions.items():
+        condition_store.load_dict({pair1_name: {pair2_name: messages}}, is_merge=True)
+        linear_mq[(pair1_name, pair2_name)] = list(messages)
+
+    ticks = generate_ticks(list(pairs_conditions.keys()), tick_count, margin, volatility)
+
+    # The scans run apart, so they don`t evict the index from the caches between its ticks
+    start_time = perf_counter()
+    for tick in ticks:
+        for (pair1_name, pair2_name), now_pair_value in tick.items():
+            if len(condition_store.pop_triggered(pair1_name, pair2_name, now_pair_value)) > 0:
+                raise RuntimeError('A condition was met in the steady state, the margin is too small for the volatility.')
+    index_duration = perf_counter() - start_time
+
+    start_time = perf_counter()
+    for tick in ticks[:scan_tick_count]:
+        for pair_key, now_pair_value in tick.items():
+            _, linear_mq[pair_key] = linear_scan(linear_mq[pair_key], now_pair_value)
+    linear_duration = perf_counter() - start_time
+
+    start_time = perf_counter()
+    spike_count = 0
+    for pair1_name, pair2_name in pairs_conditions:
+        spike_count += sum(len(triggered_group) for triggered_group in condition_store.pop_triggered(pair1_name, pair2_name, 1.0 + spike))
+    spike_duration = perf_counter() - start_time
+
+    return index_duration / len(ticks), linear_duration / min(scan_tick_count, len(ticks)), spike_duration, spike_count
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--alerts', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    args_parser.add_argument('--pairs', type=int, default=10)
+    args_parser.add_argument('--ticks', type=int, default=200)
+    args_parser.add_argument('--scan-ticks', type=int, default=5, help='Number of ticks evaluated by the linear scan too')
+    args_parser.add_argument('--margin', type=float, default=0.05, help='Minimum relative distance of a threshold from the price')
+    args_parser.add_argument('--spread', type=float, default=0.2, help='Maximum relative distance of a threshold beyond the margin')
+    args_parser.add_argument('--volatility', type=float, default=0.001)
+    args_parser.add_argument('--spike', type=float, default=0.1, help='Relative move of the spike tick')
+    args_parser.add_argument('--max-growth', type=float, default=3.0, help='Allowed growth of the steady tick cost from the smallest to the largest alert count')
+    args = args_parser.parse_args()
+
+    index_ticks = []
+    for alert_count in sorted(args.alerts):
+        index_tick, linear_tick, spike_duration, spike_count = run(alert_count, args.pairs, args.ticks, args.scan_ticks, args.margin, args.spread, args.volatility, args.spike)
+        index_ticks.append(index_tick)
+        print(
+            f'{alert_count:>8} alerts: steady tick index {index_tick * 1000:.4f} ms, ' \
+            f'linear scan {linear_tick * 1000:.3f} ms ({linear_tick / max(index_tick, 1e-9):.0f}x); ' \
+            f'spike {spike_duration * 1000:.1f} ms for {spike_count} met, {spike_duration / max(spike_count, 1) * 1e6:.2f} us per met condition'
+        )
+
+    growth = index_ticks[-1] / max(index_ticks[0], 1e-9)
+    print(f'steady tick cost grew {growth:.2f}x from {min(args.alerts)} to {max(args.alerts)} alerts (bound {args.max_growth:.2f}x)')
+    assert growth <= args.max_growth, f'The steady tick cost grew {growth:.2f}x, more than {args.max_growth:.2f}x'
@@ -0,0 +1,91 @@
+"""
+Compares the per-tick parse cost of the old full-page BeautifulSoup parsing
+with the subtree-targeted CurrencyExtractor over saved page snapshots.
+
+Without arguments snapshots are rendered by the fixture market:
+    $ python benchmark_extraction.py --repeat 50
+    $ python benchmark_extraction.py path/to/overview_1.html path/to/overview_2.html
+"""
+from binance_fixture_server import FixtureMarket
+from bs4 import BeautifulSoup
+from statistics import mean
+from time import perf_counter
+
+import argparse
+import os
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app')
+sys.path.insert(0, APP_PATH)
+
+from currency_extractor import CurrencyExtractor
+
+
+def extract_with_soup(page_source):
+    """
+    Extracts currencies the way the parser did before CurrencyExtractor.
+
+    Args:
+        page_source (str): Source of the whole page.
+
+    Returns:
+        dict: A dictionary with currency names as keys and their dollar values as values.
+    """
+    soup = BeautifulSoup(page_source, 'lxml')
+
+    currencies_table = soup.find("div", {"class": "css-1pysja1"})
+    currency_names = currencies_table.find_all("div", {"class": "subtitle3 text-t-primary css-vurnku"})
+    currency_values = currencies_table.find_all("div", {"class": "body2 items-center css-18yakpx"})
+
+    currencies = {}
+    for currency_name, currency_value in zip(currency_names, currency_values):
+        currencies[currency_name.text] = float(currency_value.text.strip('$').replace(',', ''))
+    return currencies
+
+
+def measure(extract, page_sources, repeat):
+    """
+    Measures the mean duration of an extraction function over all snapshots.
+
+    Args:
+        extract (function): Extraction function.
+        page_sources (list): Page snapshots.
+        repeat (int): Number of passes over the snapshots.
+
+    Returns:
+        tuple: Mean duration in seconds and the number of currencies in the last snapshot.
+    """
+    durations = []
+    currencies = {}
+    for _ in range(repeat):
+        for page_source in page_sources:
+            start_time = perf_counter()
+            currencies = extract(page_source)
+            durations.append(perf_counter() - start_time)
+    return mean(durations), len(currencies)
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('snapshots', nargs='*', help='Saved page snapshots')
+    args_parser.add_argument('--repeat', type=int, default=20)
+    args_parser.add_argument('--symbols', type=int, default=400)
+    args = args_parser.parse_args()
+
+    if len(args.snapshots) > 0:
+        page_sources = []
+        for snapshot_path in args.snapshots:
+            with open(snapshot_path, 'r', encoding="utf-8") as snapshot_fp:
+                page_sources.append(snapshot_fp.read())
+    else:
+        market = FixtureMarket(args.symbols)
+        page_sources = [market.render_page(market.tick()) for _ in range(5)]
+
+    extractor = CurrencyExtractor(os.path.join(APP_PATH, 'extractor_config.json'))
+
+    soup_duration, soup_count = measure(extract_with_soup, page_sources, args.repeat)
+    extractor_duration, extractor_count = measure(extractor.extract, page_sources, args.repeat)
+
+    print(f'BeautifulSoup: {soup_duration * 1000:.2f} ms per tick, currencies: {soup_count}')
+    print(f'    Extractor: {extractor_duration * 1000:.2f} ms per tick, currencies: {extractor_count}')
+    print(f'      Speedup: {soup_duration / extractor_duration:.1f}x')
@@ -0,0 +1,213 @@
+"""
+Measures publishing of notifications during a price spike that meets the
+conditions of many pairs at once.
+
+Notifications are published with publisher confirms, every confirmation waits
+for a simulated network round trip. Publishing every pair in a message of its
+own is compared with publishing all notifications of the tick in batches.
+Then the broker rejects the first messages, or the connection is lost, and the
+parser keeps ticking until every alert is delivered:
+    $ python benchmark_fanout.py --alerts 20000 --pairs 500 --rtt 0.0005 --nacks 3
+"""
+from memory_broker import MemoryChannel, MemoryConnection
+from time import perf_counter, sleep
+
+import argparse
+import logging
+import os
+import sys
+
+import pika
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from condition_evaluator import ConditionEvaluator
+from parser_logger import ParserLogger
+from parser_message_broker import ParserMessageBroker
+from wire_format import decode_message
+
+
+class ConfirmingChannel(MemoryChannel):
+    """
+    A MemoryChannel waiting for a round trip on every confirmed publish, it rejects the first messages
+    or loses the connection on them.
+
+    Attributes:
+        rtt (float): Round trip time in seconds.
+        nack_count (int): Number of the next messages the broker rejects.
+        is_connection_lost (bool): Whether the next message closes the connection.
+        connection (MemoryConnection or None): The connection the channel was opened on.
+        round_trip_count (int): Number of round trips.
+    """
+
+    def __init__(self, rtt, nack_count=0, is_connection_lost=False):
+        """
+        Initializes the ConfirmingChannel.
+
+        Args:
+            rtt (float): Round trip time in seconds.
+            nack_count (int, optional): Number of the first messages the broker rejects. Defaults to 0.
+            is_connection_lost (bool, optional): Whether the first message closes the connection. Defaults to False.
+        """
+        super().__init__()
+        self.rtt = rtt
+        self.nack_count = nack_count
+        self.is_connection_lost = is_connection_lost
+        self.connection = None
+        self.round_trip_count = 0
+
+    def open_connection(self):
+        """
+        Opens a new connection to the channel, the channel keeps its queues.
+
+        Returns:
+            MemoryConnection: The connection.
+        """
+        self.connection = MemoryConnection(self)
+        return self.connection
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        if self.is_confirming is False:
+            super().basic_publish(exchange, routing_key, body, properties, mandatory)
+            return
+
+        self.round_trip_count += 1
+        sleep(self.rtt)
+        if self.is_connection_lost is True:
+            self.is_connection_lost = False
+            self.connection.close()
+            raise pika.exceptions.StreamLostError('Stream connection lost')
+        if self.nack_count > 0:
+            self.nack_count -= 1
+            raise pika.exceptions.NackError([body])
+        super().basic_publish(exchange, routing_key, body, properties, mandatory)
+
+
+class PerPairMessageBroker(ParserMessageBroker):
+    """
+    A ParserMessageBroker publishing the notifications of every pair in a confirmed message of its own.
+    """
+
+    def add_notifications(self, pair1_name, pair2_name, messages, now_pair_value):
+        super().add_notifications(pair1_name, pair2_name, messages, now_pair_value)
+        self.send_message2parser2bot_queue()
+
+
+def create_evaluator(parser_docker_logger, broker_class, args, nack_count=0, is_connection_lost=False):
+    """
+    Creates an evaluator with `--alerts` conditions spread over `--pairs` pairs, every tenth of them is a window condition.
+
+    Args:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        broker_class (type): ParserMessageBroker or a subclass.
+        args (argparse.Namespace): Arguments of the benchmark.
+        nack_count (int, optional): Number of the first notification messages the broker rejects. Defaults to 0.
+        is_connection_lost (bool, optional): Whether the first notification message closes the connection. Defaults to False.
+
+    Returns:
+        tuple: The evaluator and the channel.
+    """
+    channel = ConfirmingChannel(args.rtt, nack_count, is_connection_lost)
+
+    # Conditions are kept only in memory, so the benchmark measures publishing instead of cache writes
+    message_broker = broker_class(
+        parser_docker_logger,
+        path_to_mq_cache=None,
+        notification_batch_size=args.batch_size,
+        connection_factory=channel.open_connection
+    )
+    condition_evaluator = ConditionEvaluator(parser_docker_logger, message_broker)
+
+    for alert_id in range(args.alerts):
+        if alert_id % 10 == 0:
+            condition_evaluator.add_message([[alert_id, f'user_{alert_id}'], f'COIN{alert_id % args.pairs}', 'USDT', 10.0, True, {"kind": "percent_move", "window": 60}])
+        else:
+            condition_evaluator.add_message([[alert_id, f'user_{alert_id}'], f'COIN{alert_id % args.pairs}', 'USDT', 1.0 + (alert_id % 100) / 1000, True])
+    return condition_evaluator, channel
+
+
+def get_notification_ids(channel):
+    """
+    Returns the condition ids of the published notifications.
+
+    Args:
+        channel (MemoryChannel): The channel.
+
+    Returns:
+        list: The ids in the order of publishing.
+    """
+    return [
+        notification["id"]
+        for properties, body in channel.queues.get('parser2bot_queue', ())
+        for notification in decode_message(body, properties.content_type)
+    ]
+
+
+def get_currencies(pair_count, price):
+    """
+    Returns a snapshot with every coin at the same price.
+
+    Args:
+        pair_count (int): Number of coins.
+        price (float): Price of the coins in USDT.
+
+    Returns:
+        dict: The snapshot.
+    """
+    currencies = {f'COIN{pair_id}': price for pair_id in range(pair_count)}
+    currencies["USDT"] = 1.0
+    return currencies
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--alerts', type=int, default=20000)
+    args_parser.add_argument('--pairs', type=int, default=500)
+    args_parser.add_argument('--batch-size', type=int, default=1000, help='Maximum number of notifications in one message')
+    args_parser.add_argument('--rtt', type=float, default=0.0005, help='Round trip of a publisher confirm in seconds')
+    args_parser.add_argument('--nacks', type=int, default=3, help='Number of the first messages the broker rejects')
+    args = args_parser.parse_args()
+
+    parser_docker_logger = ParserLogger()
+    parser_docker_logger.logger.setLevel(logging.CRITICAL)
+
+    quiet_currencies = get_currencies(args.pairs, 0.9)
+    spike_currencies = get_currencies(args.pairs, 1.2)
+
+    print(f'{args.alerts} alerts on {args.pairs} pairs, rtt {args.rtt * 1000:.2f} ms')
+    for mode_name, broker_class in (('per pair', PerPairMessageBroker), ('batched', ParserMessageBroker)):
+        condition_evaluator, channel = create_evaluator(parser_docker_logger, broker_class, args)
+        condition_evaluator.check_conditions(quiet_currencies, set(quiet_currencies))
+
+        start_time = perf_counter()
+        condition_evaluator.check_conditions(spike_currencies, set(spike_currencies))
+        duration = perf_counter() - start_time
+        parser_docker_logger.clear_logs()
+
+        notification_count = len(get_notification_ids(channel))
+        print(
+            f'{mode_name:>9}: spike tick {duration * 1000:.1f} ms, {notification_count} notifications in ' \
+            f'{channel.published_count} messages, {channel.round_trip_count} confirms, {notification_count / duration:.0f} notifications/s'
+        )
+
+    for scenario_name, nack_count, is_connection_lost in ((f'{args.nacks} rejected messages', args.nacks, False), ('lost connection', 0, True)):
+        condition_evaluator, channel = create_evaluator(parser_docker_logger, ParserMessageBroker, args, nack_count, is_connection_lost)
+        message_broker = condition_evaluator.message_broker
+        condition_evaluator.check_conditions(quiet_currencies, set(quiet_currencies))
+
+        tick_count = 0
+        changed_names = set(spike_currencies)
+        while tick_count == 0 or len(message_broker.pending_notifications) > 0:
+            condition_evaluator.check_conditions(spike_currencies, changed_names)
+            parser_docker_logger.clear_logs()
+            changed_names = set()
+            tick_count += 1
+            if tick_count == 1:
+                stored_count = message_broker.mq.get_condition_count()
+
+        notification_ids = get_notification_ids(channel)
+        print(
+            f'{scenario_name}: {stored_count} conditions kept after the first tick, ' \
+            f'{len(set(notification_ids))}/{args.alerts} alerts delivered in {tick_count} ticks, ' \
+            f'{len(notification_ids) - len(set(notification_ids))} duplicates, {message_broker.mq.get_condition_count()} conditions left'
+        )
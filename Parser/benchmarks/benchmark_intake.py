@@ -0,0 +1,157 @@
+"""
+Compares the intake of new conditions from 'bot2parser_queue' with one
+basic_get and one ack per message, as the parser did before, and with the
+consumer taking every delivered message and acknowledging it in batches.
+
+Every call to the broker waits for a simulated network round trip, the old
+parser also took only one message per tick:
+    $ python benchmark_intake.py --alerts 10000 --prefetch 1000 --rtt 0.0005
+"""
+from memory_broker import MemoryChannel, MemoryConnection
+from random import Random
+from time import perf_counter, sleep, time
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from parser_logger import ParserLogger
+from parser_message_broker import ParserMessageBroker
+
+
+class RemoteChannel(MemoryChannel):
+    """
+    A MemoryChannel waiting for a round trip on every call that needs an answer of the broker.
+
+    Attributes:
+        rtt (float): Round trip time in seconds.
+        round_trip_count (int): Number of round trips.
+    """
+
+    def __init__(self, rtt):
+        """
+        Initializes the RemoteChannel.
+
+        Args:
+            rtt (float): Round trip time in seconds.
+        """
+        super().__init__()
+        self.rtt = rtt
+        self.round_trip_count = 0
+
+    def _round_trip(self):
+        """
+        Waits for a round trip.
+        """
+        self.round_trip_count += 1
+        sleep(self.rtt)
+
+    def basic_get(self, queue, auto_ack=False):
+        self._round_trip()
+        return super().basic_get(queue, auto_ack)
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        self._round_trip()
+        super().basic_ack(delivery_tag, multiple)
+
+    def deliver(self):
+        delivered_count = super().deliver()
+        if delivered_count > 0:
+            # Deliveries of a batch are streamed by the broker in one go
+            self._round_trip()
+        return delivered_count
+
+
+class SentProperties():
+    """
+    Message properties with the sending time header set by the bot.
+
+    Attributes:
+        headers (dict): Headers of the message.
+    """
+
+    def __init__(self):
+        """
+        Initializes the SentProperties with the current time.
+        """
+        self.headers = {"sent_at": time()}
+
+
+def publish_alerts(channel, alert_count, seed=0):
+    """
+    Publishes random user alerts to 'bot2parser_queue'.
+
+    Args:
+        channel (MemoryChannel): The channel.
+        alert_count (int): Number of alerts.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+    """
+    random = Random(seed)
+    for alert_id in range(alert_count):
+        message = [[alert_id, f'user_{alert_id}'], f'COIN{random.randrange(50)}', 'USDT', random.uniform(0.5, 1.5), random.choice([True, False]), {"id": f'{alert_id:016x}'}]
+        channel.basic_publish(exchange='', routing_key='bot2parser_queue', body=json.dumps(message), properties=SentProperties())
+
+
+def create_broker(parser_docker_logger, rtt, prefetch_count):
+    """
+    Creates a broker on a channel with a simulated round trip.
+
+    Args:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        rtt (float): Round trip time in seconds.
+        prefetch_count (int): Prefetch count of the consumer.
+
+    Returns:
+        ParserMessageBroker: The broker.
+    """
+    connection = MemoryConnection()
+    connection.memory_channel = RemoteChannel(rtt)
+    return ParserMessageBroker(parser_docker_logger, path_to_mq_cache=None, connection=connection, prefetch_count=prefetch_count)
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--alerts', type=int, default=10000)
+    args_parser.add_argument('--prefetch', type=int, default=1000)
+    args_parser.add_argument('--rtt', type=float, default=0.0005)
+    args_parser.add_argument('--period', type=float, default=1.0, help='Tick period of the parser in seconds')
+    args = args_parser.parse_args()
+
+    parser_docker_logger = ParserLogger()
+    parser_docker_logger.logger.setLevel(logging.WARNING)
+
+    message_broker = create_broker(parser_docker_logger, args.rtt, args.prefetch)
+    publish_alerts(message_broker.channel, args.alerts)
+    start_time = perf_counter()
+    while True:
+        method_frame, _, body = message_broker.channel.basic_get('bot2parser_queue')
+        if not method_frame:
+            break
+        message_broker.channel.basic_ack(method_frame.delivery_tag)
+        message_broker.add_message(json.loads(body))
+    get_duration = perf_counter() - start_time
+    get_round_trips = message_broker.channel.round_trip_count
+
+    message_broker = create_broker(parser_docker_logger, args.rtt, args.prefetch)
+    publish_alerts(message_broker.channel, args.alerts)
+    start_time = perf_counter()
+    while message_broker.read_messages_from_bot2parser_queue() > 0:
+        pass
+    consume_duration = perf_counter() - start_time
+    consume_round_trips = message_broker.channel.round_trip_count
+    parser_docker_logger.clear_logs()
+
+    print(
+        f'basic_get: {args.alerts} alerts in {get_duration:.3f} s ({args.alerts / get_duration:.0f} alerts/s), ' \
+        f'{get_round_trips} round trips, {args.alerts} ticks ({args.alerts * args.period / 3600:.1f} h at {args.period} s per tick)'
+    )
+    print(
+        f'consume:   {args.alerts} alerts in {consume_duration:.3f} s ({args.alerts / consume_duration:.0f} alerts/s), ' \
+        f'{consume_round_trips} round trips, {math.ceil(args.alerts / args.prefetch)} batches'
+    )
+    print(f'intake: {message_broker.get_intake_stats_string()}')
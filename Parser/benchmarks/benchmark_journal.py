@@ -0,0 +1,97 @@
+"""
+Compares the cost of persisting one new alert with the condition journal and
+with rewriting the whole cache file, as the parser did before the journal.
+
+Journal lines are fsynced by a write-behind thread, a burst of alerts costs a
+few fsyncs. The journal cost should stay flat while the number of stored alerts grows:
+    $ python benchmark_journal.py --alerts 1000 10000 100000 --added 1000
+"""
+from memory_broker import MemoryConnection
+from random import Random
+from time import perf_counter
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from parser_logger import ParserLogger
+from parser_message_broker import ParserMessageBroker
+
+
+def generate_message(random, alert_id):
+    """
+    Generates a 'bot2parser_queue' message.
+
+    Args:
+        random (Random): Random generator.
+        alert_id (int): Id of the alert.
+
+    Returns:
+        list: The message.
+    """
+    return [[alert_id, f'user_{alert_id}'], f'COIN{random.randrange(50)}', 'USDT', random.uniform(0.5, 1.5), random.choice([True, False])]
+
+
+def run(alert_count, added_count, directory, parser_docker_logger):
+    """
+    Adds alerts to a store of `alert_count` alerts with both ways of persistence.
+
+    Args:
+        alert_count (int): Number of stored alerts.
+        added_count (int): Number of added alerts.
+        directory (str): Directory of the cache files.
+        parser_docker_logger (ParserLogger): Logger for recording events.
+
+    Returns:
+        tuple: Mean cost of an added alert with the journal and with the full rewrite in seconds, statistics of the journal.
+    """
+    random = Random(0)
+    path_to_mq_cache = os.path.join(directory, f'mq_cache_{alert_count}.bpcs')
+    message_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=path_to_mq_cache, connection=MemoryConnection())
+    for alert_id in range(alert_count):
+        message_broker.add_message(generate_message(random, alert_id))
+    message_broker.write_2_mq_cache()
+
+    start_time = perf_counter()
+    for alert_id in range(alert_count, alert_count + added_count):
+        message_broker.add_message(generate_message(random, alert_id))
+        message_broker.sync_mq_cache(is_forced=True)
+    journal_duration = (perf_counter() - start_time) / added_count
+    message_broker.condition_journal.wait_compaction()
+    message_broker.condition_journal.flush()
+    journal_stats = message_broker.condition_journal.get_stats_string()
+
+    rewrite_count = max(added_count // 100, 1)
+    start_time = perf_counter()
+    for _ in range(rewrite_count):
+        with open(path_to_mq_cache + '.rewrite', 'w', encoding="utf-8") as cash_fp:
+            json.dump(message_broker.mq.to_dict(), cash_fp, indent=4)
+    rewrite_duration = (perf_counter() - start_time) / rewrite_count
+
+    message_broker.close_connection()
+    parser_docker_logger.clear_logs()
+    return journal_duration, rewrite_duration, journal_stats
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--alerts', type=int, nargs='+', default=[1000, 10000, 100000])
+    args_parser.add_argument('--added', type=int, default=1000)
+    args = args_parser.parse_args()
+
+    parser_docker_logger = ParserLogger()
+    parser_docker_logger.logger.setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for alert_count in args.alerts:
+            journal_duration, rewrite_duration, journal_stats = run(alert_count, args.added, directory, parser_docker_logger)
+            print(
+                f'{alert_count:>7} alerts: journal {journal_duration * 1000:.3f} ms per alert, ' \
+                f'full rewrite {rewrite_duration * 1000:.3f} ms per alert ({rewrite_duration / max(journal_duration, 1e-9):.0f}x)'
+            )
+            print(f'    {journal_stats}')
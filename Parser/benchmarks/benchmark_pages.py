@@ -0,0 +1,77 @@
+"""
+Compares the wall time of fetching the whole market segment by segment,
+sequentially and through the concurrent worker pool. Then the ticker endpoint
+fails for longer than the maximum age of reused prices and the prices of the
+failed segments are dropped:
+
+    $ python benchmark_pages.py --symbols 500 --page-count 5 --latency 0.2
+"""
+from binance_fixture_server import start_fixture_server
+from statistics import mean
+from time import perf_counter
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from binance_pages_parser import BinancePagesParser
+from parser_logger import ParserLogger
+
+
+def benchmark_parser(parser, ticks):
+    """
+    Measures the mean wall time of `get_currencies`.
+
+    Args:
+        parser (BinancePagesParser): The parser to benchmark.
+        ticks (int): Number of calls.
+
+    Returns:
+        tuple: Mean duration in seconds and the number of currencies of the last call.
+    """
+    durations = []
+    currencies = {}
+    for _ in range(ticks):
+        start_time = perf_counter()
+        currencies = parser.get_currencies()
+        durations.append(perf_counter() - start_time)
+    return mean(durations), len(currencies)
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--ticks', type=int, default=5)
+    args_parser.add_argument('--symbols', type=int, default=500)
+    args_parser.add_argument('--page-count', type=int, default=5)
+    args_parser.add_argument('--latency', type=float, default=0.2)
+    args = args_parser.parse_args()
+
+    server, base_url = start_fixture_server(symbol_count=args.symbols, latency=args.latency)
+    parser_docker_logger = ParserLogger()
+    parser_docker_logger.logger.setLevel(logging.CRITICAL)
+
+    urls = dict(url=f'{base_url}/api/v3/ticker/price', symbols_url=f'{base_url}/api/v3/exchangeInfo')
+
+    configurations = {
+        'all segments, 1 worker': dict(page_count=args.page_count, max_workers=1),
+        f'all segments, {args.page_count} workers': dict(page_count=args.page_count, max_workers=args.page_count)
+    }
+    for configuration_name, parser_kwargs in configurations.items():
+        parser = BinancePagesParser(parser_docker_logger, **urls, **parser_kwargs)
+        duration, currency_count = benchmark_parser(parser, args.ticks)
+        print(f'{configuration_name:>25}: {duration * 1000:.1f} ms per tick, currencies: {currency_count}/{args.symbols}')
+        parser.close()
+
+    parser = BinancePagesParser(parser_docker_logger, **urls, page_count=args.page_count, max_workers=1, max_retries=1, max_page_age=args.latency * args.page_count * 1.5)
+    parser.get_currencies()
+    for tick in range(4):
+        # The first segment fails on every tick
+        server.failing_paths['/api/v3/ticker/price'] = 1
+        currency_count = len(parser.get_currencies())
+        print(f'failing segment, tick {tick + 1}: {parser.completeness}, currencies: {currency_count}/{args.symbols}')
+    parser.close()
+
+    server.shutdown()
@@ -0,0 +1,137 @@
+"""
+Measures how long a new alert waits before the parser registers it while fetching is slow.
+
+The sequential loop reads at most one alert per tick, so an alert waits for the
+page load and the scheduler sleep. The pipeline reads alerts in its own stage,
+so registration should take milliseconds regardless of the scrape time:
+    $ python benchmark_pipeline.py --scrape-time 1.0 --alerts 20
+"""
+from binance_fixture_server import FixtureMarket
+from memory_broker import MemoryConnection
+from threading import Thread
+from time import perf_counter, sleep
+
+import argparse
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from app import BinanceMessageProcessor
+from parser_logger import ParserLogger
+from parser_message_broker import ParserMessageBroker
+from parser_pipeline import ParserPipeline
+from tick_scheduler import TickScheduler
+
+
+class SlowSource():
+    """
+    A polling currency source taking `scrape_time` seconds per snapshot, like a page load.
+
+    Attributes:
+        market (FixtureMarket): Market the prices come from.
+        scrape_time (float): Duration of fetching a snapshot in seconds.
+        is_streaming (bool): Always False.
+    """
+
+    is_streaming = False
+
+    def __init__(self, market, scrape_time) -> None:
+        """
+        Initializes the SlowSource.
+
+        Args:
+            market (FixtureMarket): Market the prices come from.
+            scrape_time (float): Duration of fetching a snapshot in seconds.
+        """
+        self.market = market
+        self.scrape_time = scrape_time
+
+    def get_currencies(self):
+        """
+        Waits for `scrape_time` seconds and returns the next prices.
+
+        Returns:
+            dict: Current prices of all currencies.
+        """
+        sleep(self.scrape_time)
+        return self.market.tick()
+
+    def close(self):
+        """
+        Closes the source, nothing to do.
+        """
+        pass
+
+
+def run(is_pipelined, market, alert_count, scrape_time, alert_interval):
+    """
+    Sends alerts one by one and measures the time until each of them is in the condition store.
+
+    Args:
+        is_pipelined (bool): If True, runs the parser pipeline instead of the sequential loop.
+        market (FixtureMarket): Market the prices come from.
+        alert_count (int): Number of alerts.
+        scrape_time (float): Duration of fetching a snapshot in seconds.
+        alert_interval (float): Pause between the alerts in seconds.
+
+    Returns:
+        list: Registration delay of every alert in seconds.
+    """
+    parser_docker_logger = ParserLogger()
+    parser_docker_logger.logger.setLevel(logging.WARNING)
+
+    # All stages share one in-memory connection, so they see the same queues
+    connection = MemoryConnection()
+    message_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=None, connection=connection)
+    binance_message_processor = BinanceMessageProcessor(
+        parser_docker_logger,
+        parser=SlowSource(market, scrape_time),
+        tick_scheduler=TickScheduler(period=scrape_time),
+        message_broker=message_broker
+    )
+
+    if is_pipelined is True:
+        parser_pipeline = ParserPipeline(binance_message_processor, connection_factory=lambda: connection)
+        parser_pipeline.start()
+    else:
+        Thread(target=binance_message_processor.process_messages, daemon=True).start()
+
+    symbols = list(market.prices.keys())
+    delays = []
+    for alert_id in range(alert_count):
+        condition_count = message_broker.mq.get_condition_count()
+        message = [[alert_id, f'user_{alert_id}'], symbols[alert_id % len(symbols)], 'USDT', 1e12, True]
+
+        start_time = perf_counter()
+        connection.channel().basic_publish(exchange='', routing_key='bot2parser_queue', body=json.dumps(message))
+        while message_broker.mq.get_condition_count() == condition_count:
+            sleep(0.0005)
+        delays.append(perf_counter() - start_time)
+
+        sleep(alert_interval)
+
+    if is_pipelined is True:
+        parser_pipeline.stop()
+        print(f'    {", ".join(stage.get_stats_string() for stage in parser_pipeline.evaluation_stage.pipeline_stages)}')
+
+    return delays
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--scrape-time', type=float, default=1.0)
+    args_parser.add_argument('--alerts', type=int, default=20)
+    args_parser.add_argument('--alert-interval', type=float, default=0.1)
+    args_parser.add_argument('--symbols', type=int, default=100)
+    args = args_parser.parse_args()
+
+    market = FixtureMarket(args.symbols)
+    for is_pipelined in (False, True):
+        delays = sorted(run(is_pipelined, market, args.alerts, args.scrape_time, args.alert_interval))
+        print(
+            f'{"pipeline" if is_pipelined is True else "sequential":>10}: alert registration ' \
+            f'median {delays[len(delays) // 2] * 1000:.1f} ms, max {delays[-1] * 1000:.1f} ms'
+        )
@@ -0,0 +1,126 @@
+"""
+Drives BinanceMessageProcessor with recorded snapshots and measures the
+throughput of condition checks and notification fan-out end to end.
+
+Without "--records" a market day is generated by the fixture market:
+    $ python benchmark_replay.py --alerts 1000 --snapshots 300
+    $ python benchmark_replay.py --records path/to/snapshots.rec --speed 0
+"""
+from binance_fixture_server import FixtureMarket
+from memory_broker import MemoryConnection
+from random import Random
+from time import perf_counter, time
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from app import BinanceMessageProcessor
+from parser_logger import ParserLogger
+from parser_message_broker import ParserMessageBroker
+from replay_parser import ReplayParser
+from snapshot_recorder import SnapshotRecorder, read_snapshot_records
+from wire_format import decode_message
+
+
+def generate_records(path_to_records, snapshot_count, symbol_count, volatility):
+    """
+    Records snapshots of the fixture market one second apart.
+
+    Args:
+        path_to_records (str): Path to the records file.
+        snapshot_count (int): Number of snapshots.
+        symbol_count (int): Number of listed currencies.
+        volatility (float): Relative standard deviation of a price move per snapshot.
+    """
+    market = FixtureMarket(symbol_count, volatility=volatility)
+    snapshot_recorder = SnapshotRecorder(path_to_records)
+
+    start_time = time()
+    for snapshot_id in range(snapshot_count):
+        snapshot_recorder.record(market.tick(), timestamp=start_time + snapshot_id)
+    snapshot_recorder.close()
+
+
+def publish_alerts(channel, currencies, alert_count, spread, seed=0):
+    """
+    Publishes random user alerts around the current prices to 'bot2parser_queue'.
+
+    Args:
+        channel (MemoryChannel): Channel to publish to.
+        currencies (dict): Currencies snapshot the thresholds are based on.
+        alert_count (int): Number of alerts.
+        spread (float): Maximum relative distance of a threshold from the current price.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+    """
+    random = Random(seed)
+    currency_names = list(currencies.keys())
+
+    for alert_id in range(alert_count):
+        pair1_name, pair2_name = random.sample(currency_names, 2)
+        pair_value = currencies[pair1_name] / currencies[pair2_name]
+
+        channel.basic_publish(
+            exchange='',
+            routing_key='bot2parser_queue',
+            body=json.dumps([
+                [alert_id, f'user_{alert_id}'],
+                pair1_name,
+                pair2_name,
+                pair_value * (1.0 + random.uniform(-spread, spread)),
+                random.choice([True, False, None])
+            ])
+        )
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--records', default=None, help='Records file made with "app.py --record"')
+    args_parser.add_argument('--speed', type=float, default=0.0, help='Replay speed, 0 replays as fast as possible')
+    args_parser.add_argument('--snapshots', type=int, default=300)
+    args_parser.add_argument('--symbols', type=int, default=100)
+    args_parser.add_argument('--volatility', type=float, default=0.002)
+    args_parser.add_argument('--alerts', type=int, default=1000)
+    args_parser.add_argument('--spread', type=float, default=0.05)
+    args = args_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    path_to_records = args.records
+    if path_to_records is None:
+        path_to_records = os.path.join(work_dir, 'snapshots.rec')
+        generate_records(path_to_records, args.snapshots, args.symbols, args.volatility)
+
+    parser_docker_logger = ParserLogger()
+    parser_docker_logger.logger.setLevel(logging.WARNING)
+
+    connection = MemoryConnection()
+    message_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=os.path.join(work_dir, 'mq_cache.bpcs'), connection=connection)
+
+    _, first_currencies = next(read_snapshot_records(path_to_records))
+    publish_alerts(connection.channel(), first_currencies, args.alerts, args.spread)
+
+    start_time = perf_counter()
+    while message_broker.read_messages_from_bot2parser_queue() > 0:
+        pass
+    intake_duration = perf_counter() - start_time
+
+    parser = ReplayParser(parser_docker_logger, path_to_records, speed=args.speed)
+    binance_message_processor = BinanceMessageProcessor(parser_docker_logger, parser=parser, message_broker=message_broker)
+
+    start_time = perf_counter()
+    while parser.is_finished is False:
+        binance_message_processor.check_mq()
+    replay_duration = perf_counter() - start_time
+
+    notification_count = sum(len(decode_message(body, properties.content_type)) for properties, body in connection.channel().queues['parser2bot_queue'])
+    print(f'intake: {args.alerts} alerts in {intake_duration:.3f} s ({args.alerts / intake_duration:.0f} alerts/s)')
+    print(
+        f'replay: {parser.replayed_count} snapshots in {replay_duration:.3f} s ' \
+        f'({parser.replayed_count / replay_duration:.1f} snapshots/s, {replay_duration / max(parser.replayed_count, 1) * 1000:.2f} ms per snapshot)'
+    )
+    print(f'fan-out: {notification_count} notifications ({notification_count / replay_duration:.0f} notifications/s)')
@@ -0,0 +1,120 @@
+"""
+Measures the tick latency of condition evaluation split between shard processes.
+
+One shard evaluates in the main process like the unsharded parser, more shards
+start ShardedConditionEvaluator processes. Tick latency should go down as shards
+are added, as long as the machine has a free core for every shard:
+    $ python benchmark_shards.py --shards 1 2 4 --alerts 200000 --symbols 200
+"""
+from binance_fixture_server import FixtureMarket
+from memory_broker import MemoryConnection
+from random import Random
+from time import perf_counter
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from condition_evaluator import ConditionEvaluator
+from parser_logger import ParserLogger
+from parser_message_broker import ParserMessageBroker
+from sharded_condition_evaluator import ShardedConditionEvaluator
+from snapshot_differ import SnapshotDiffer
+
+
+def generate_messages(currencies, alert_count, spread, seed=0):
+    """
+    Generates 'bot2parser_queue' messages with thresholds around the current prices.
+
+    Args:
+        currencies (dict): Currencies snapshot the thresholds are based on.
+        alert_count (int): Number of messages.
+        spread (float): Maximum relative distance of a threshold from the current price.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        list: The messages.
+    """
+    random = Random(seed)
+    currency_names = list(currencies.keys())
+
+    messages = []
+    for alert_id in range(alert_count):
+        pair1_name, pair2_name = random.sample(currency_names, 2)
+        pair_value = currencies[pair1_name] / currencies[pair2_name]
+        messages.append([
+            [alert_id, f'user_{alert_id}'],
+            pair1_name,
+            pair2_name,
+            pair_value * (1.0 + random.uniform(-spread, spread)),
+            random.choice([True, False])
+        ])
+    return messages
+
+
+def run(shard_count, snapshots, messages, parser_docker_logger):
+    """
+    Evaluates the messages over the snapshots with the given number of shards.
+
+    Args:
+        shard_count (int): Number of shards, 1 evaluates in the current process.
+        snapshots (list): Currencies snapshots.
+        messages (list): 'bot2parser_queue' messages added before the first snapshot.
+        parser_docker_logger (ParserLogger): Logger for recording events.
+
+    Returns:
+        tuple: Mean tick duration in seconds (without the first tick, which adds the conditions) and the number of left conditions.
+    """
+    # Conditions are kept only in memory, so the benchmark measures evaluation instead of cache writes
+    if shard_count == 1:
+        message_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=None, connection=MemoryConnection())
+        condition_evaluator = ConditionEvaluator(parser_docker_logger, message_broker)
+    else:
+        condition_evaluator = ShardedConditionEvaluator(parser_docker_logger, shard_count, path_to_mq_cache=None, connection_factory=MemoryConnection)
+
+    for message in messages:
+        condition_evaluator.add_message(message)
+
+    snapshot_differ = SnapshotDiffer()
+    tick_durations = []
+    for currencies in snapshots:
+        _, changed_names = snapshot_differ.diff(currencies)
+
+        start_time = perf_counter()
+        condition_evaluator.check_conditions(currencies, changed_names)
+        tick_durations.append(perf_counter() - start_time)
+        parser_docker_logger.clear_logs()
+
+    if shard_count == 1:
+        condition_count = message_broker.mq.get_condition_count()
+    else:
+        condition_count = condition_evaluator.condition_count
+    condition_evaluator.close()
+
+    return sum(tick_durations[1:]) / max(len(tick_durations) - 1, 1), condition_count
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--shards', type=int, nargs='+', default=[1, 2, 4])
+    args_parser.add_argument('--alerts', type=int, default=200000)
+    args_parser.add_argument('--symbols', type=int, default=200)
+    args_parser.add_argument('--snapshots', type=int, default=30)
+    args_parser.add_argument('--volatility', type=float, default=0.002)
+    args_parser.add_argument('--spread', type=float, default=0.1)
+    args = args_parser.parse_args()
+
+    parser_docker_logger = ParserLogger()
+    parser_docker_logger.logger.setLevel(logging.WARNING)
+
+    market = FixtureMarket(args.symbols, volatility=args.volatility)
+    snapshots = [market.tick() for _ in range(args.snapshots)]
+    messages = generate_messages(snapshots[0], args.alerts, args.spread)
+
+    print(f'{os.cpu_count()} cores, {args.alerts} alerts, {args.symbols} currencies, {args.snapshots} snapshots')
+    for shard_count in args.shards:
+        tick_duration, condition_count = run(shard_count, snapshots, messages, parser_docker_logger)
+        print(f'{shard_count:>3} shards: {tick_duration * 1000:.2f} ms per tick, {condition_count} conditions left')
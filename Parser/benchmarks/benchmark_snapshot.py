@@ -0,0 +1,142 @@
+"""
+Compares the cold start of the parser from the binary condition snapshot and
+from the pretty-printed JSON cache file it used to write: reading the file,
+loading the conditions into the store and merging the same file into it again.
+The snapshot is read the way the parser starts, through the journal recovery.
+The one-time migration of the JSON file to a snapshot is timed too.
+
+    $ python benchmark_snapshot.py --alerts 10000 100000 --pairs 50
+"""
+from random import Random
+from time import perf_counter
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from condition_journal import ConditionJournal, migrate_legacy_cache
+from condition_snapshot import encode_snapshot
+from condition_store import ConditionStore
+
+
+def generate_mq(alert_count, pair_count, user_count, seed=0):
+    """
+    Generates conditions in the cache file format.
+
+    Args:
+        alert_count (int): Number of conditions.
+        pair_count (int): Number of pairs the conditions are spread over.
+        user_count (int): Number of users setting the conditions.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+    """
+    random = Random(seed)
+    mq = {}
+    for alert_id in range(alert_count):
+        user_id = random.randrange(user_count)
+        message_data = {
+            "user": [user_id, f'user_{user_id}'],
+            "check_value": random.uniform(0.5, 1.5),
+            "condition_flag": random.choice([True, False]),
+            "id": f'{random.getrandbits(64):016x}'
+        }
+        if alert_id % 10 == 0:
+            message_data.update({"kind": "percent_move", "window": 3600})
+        mq.setdefault(f'COIN{alert_id % pair_count:03d}', {}).setdefault('USDT', []).append(message_data)
+    return mq
+
+
+def measure_cold_start(read_function, path):
+    """
+    Reads a cache file, loads it into a store and merges it into the store again.
+
+    Args:
+        read_function (callable): Function reading the cache file.
+        path (str): Path to the cache file.
+
+    Returns:
+        tuple: Durations of the read, the load and the merge in seconds.
+    """
+    start_time = perf_counter()
+    mq = read_function(path)
+    read_duration = perf_counter() - start_time
+
+    start_time = perf_counter()
+    condition_store = ConditionStore()
+    condition_store.load_dict(mq)
+    load_duration = perf_counter() - start_time
+
+    start_time = perf_counter()
+    condition_store.load_dict(read_function(path), is_merge=True)
+    merge_duration = perf_counter() - start_time
+
+    return read_duration, load_duration, merge_duration
+
+
+def read_json(path):
+    """
+    Reads a JSON cache file.
+
+    Args:
+        path (str): Path to the cache file.
+
+    Returns:
+        dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+    """
+    with open(path, 'r', encoding="utf-8") as cash_fp:
+        return json.load(cash_fp)
+
+
+def recover_snapshot(path):
+    """
+    Reads a snapshot file through the journal recovery, like the parser on startup.
+
+    Args:
+        path (str): Path to the snapshot file.
+
+    Returns:
+        dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+    """
+    return ConditionJournal(path).recover()
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--alerts', type=int, nargs='+', default=[10000, 100000])
+    args_parser.add_argument('--pairs', type=int, default=50)
+    args_parser.add_argument('--users', type=int, default=5000)
+    args = args_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for alert_count in args.alerts:
+            mq = generate_mq(alert_count, args.pairs, args.users)
+
+            json_path = os.path.join(directory, f'mq_cache_{alert_count}.json')
+            with open(json_path, 'w', encoding="utf-8") as cash_fp:
+                json.dump(mq, cash_fp, indent=4)
+
+            binary_path = os.path.join(directory, f'mq_cache_{alert_count}.bpcs')
+            with open(binary_path, 'wb') as snapshot_fp:
+                snapshot_fp.write(encode_snapshot(mq))
+
+            for format_name, read_function, path in (('json', read_json, json_path), ('binary', recover_snapshot, binary_path)):
+                read_duration, load_duration, merge_duration = measure_cold_start(read_function, path)
+                print(
+                    f'{alert_count:>7} alerts, {format_name:>6}: {os.path.getsize(path) / 1024:.0f} KiB, ' \
+                    f'read {read_duration * 1000:.1f} ms, load {load_duration * 1000:.1f} ms, ' \
+                    f'cold start {(read_duration + load_duration) * 1000:.1f} ms, merge {merge_duration * 1000:.1f} ms'
+                )
+
+            migration_root = os.path.join(directory, f'migrated_{alert_count}')
+            os.rename(json_path, f'{migration_root}.json')
+            start_time = perf_counter()
+            migrated_path = migrate_legacy_cache(f'{migration_root}.json')
+            migration_duration = perf_counter() - start_time
+            assert recover_snapshot(migrated_path) == recover_snapshot(binary_path)
+            print(f'{alert_count:>7} alerts, one-time migration of the JSON file: {migration_duration * 1000:.1f} ms')
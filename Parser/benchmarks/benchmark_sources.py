@@ -0,0 +1,98 @@
+"""
+Benchmarks currency sources side by side against the local fixture server.
+
+    $ python benchmark_sources.py --ticks 50 --symbols 400
+"""
+from binance_fixture_server import start_fixture_server
+from statistics import mean, median
+from time import perf_counter
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from parser_logger import ParserLogger
+
+
+def benchmark_source(source, ticks):
+    """
+    Measures the duration of `get_currencies` calls.
+
+    Args:
+        source (CurrencySource): The source to benchmark.
+        ticks (int): Number of calls.
+
+    Returns:
+        tuple: Durations of all calls in seconds and the number of currencies of the last call.
+    """
+    durations = []
+    currencies = {}
+    for _ in range(ticks):
+        start_time = perf_counter()
+        currencies = source.get_currencies()
+        durations.append(perf_counter() - start_time)
+
+    return durations, len(currencies)
+
+
+def print_report(source_name, durations, currency_count):
+    """
+    Prints timing statistics of a source.
+
+    Args:
+        source_name (str): Name of the source.
+        durations (list): Durations of calls in seconds.
+        currency_count (int): Number of currencies returned by the source.
+    """
+    durations = sorted(durations)
+    p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+    print(
+        f'{source_name:>10}: currencies: {currency_count}, ' \
+        f'mean: {mean(durations) * 1000:.2f} ms, median: {median(durations) * 1000:.2f} ms, p95: {p95 * 1000:.2f} ms'
+    )
+
+
+def create_sources(parser_docker_logger, base_url):
+    """
+    Creates every available source pointed at the fixture server.
+
+    Sources whose dependencies are not available are reported and skipped.
+
+    Args:
+        parser_docker_logger (ParserLogger): Logger for recording events.
+        base_url (str): Base URL of the fixture server.
+
+    Returns:
+        dict: Source names and instances.
+    """
+    sources = {}
+
+    from binance_api_parser import BinanceApiParser
+    sources['api'] = BinanceApiParser(parser_docker_logger, url=f'{base_url}/api/v3/ticker/price')
+
+    try:
+        from binance_parser import BinanceParser
+        sources['selenium'] = BinanceParser(parser_docker_logger, url=f'{base_url}/en/markets/overview')
+    except Exception as exception:
+        print(f'  selenium: skipped, the browser could not be started: "{exception}"')
+
+    return sources
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--ticks', type=int, default=50)
+    args_parser.add_argument('--symbols', type=int, default=400)
+    args = args_parser.parse_args()
+
+    server, base_url = start_fixture_server(symbol_count=args.symbols)
+    parser_docker_logger = ParserLogger()
+
+    for source_name, source in create_sources(parser_docker_logger, base_url).items():
+        durations, currency_count = benchmark_source(source, args.ticks)
+        print_report(source_name, durations, currency_count)
+        source.close()
+
+    server.shutdown()
@@ -0,0 +1,118 @@
+"""
+Compares the SQLite condition store with the in-memory one: cold start,
+per-tick evaluation with one commit per tick and the cost of adding an alert.
+
+    $ python benchmark_sqlite_store.py --alerts 10000 100000 --pairs 50
+"""
+from random import Random
+from time import perf_counter
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from condition_journal import ConditionJournal
+from condition_store import ConditionStore
+from sqlite_condition_store import SqliteConditionStore
+
+
+def generate_mq(alert_count, pair_count, spread, seed=0):
+    """
+    Generates conditions around a price of 1.0 in the cache file format.
+
+    Args:
+        alert_count (int): Number of conditions.
+        pair_count (int): Number of pairs the conditions are spread over.
+        spread (float): Maximum relative distance of a threshold from the price.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict: Nested dictionary pair1_name -> pair2_name -> list of conditions.
+    """
+    random = Random(seed)
+    mq = {}
+    for alert_id in range(alert_count):
+        mq.setdefault(f'COIN{alert_id % pair_count:03d}', {}).setdefault('USDT', []).append({
+            "user": [alert_id, f'user_{alert_id}'],
+            "check_value": 1.0 + random.uniform(-spread, spread),
+            "condition_flag": random.choice([True, False])
+        })
+    return mq
+
+
+def run_ticks(condition_store, pair_names, tick_count, volatility):
+    """
+    Evaluates a random walk of pair values and commits after every tick.
+
+    Args:
+        condition_store (ConditionStore or SqliteConditionStore): The store.
+        pair_names (list): Pairs (pair1_name, pair2_name).
+        tick_count (int): Number of ticks.
+        volatility (float): Relative standard deviation of a price move per tick.
+
+    Returns:
+        tuple: Mean tick duration in seconds and the number of met conditions.
+    """
+    random = Random(1)
+    pair_values = {pair_key: 1.0 for pair_key in pair_names}
+
+    triggered_count = 0
+    start_time = perf_counter()
+    for _ in range(tick_count):
+        for pair_key in pair_values:
+            pair_values[pair_key] *= 1.0 + random.gauss(0.0, volatility)
+            triggered_groups = condition_store.pop_triggered(*pair_key, pair_values[pair_key])
+            triggered_count += sum(len(triggered_group) for triggered_group in triggered_groups)
+        condition_store.commit()
+    return (perf_counter() - start_time) / tick_count, triggered_count
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--alerts', type=int, nargs='+', default=[10000, 100000])
+    args_parser.add_argument('--pairs', type=int, default=50)
+    args_parser.add_argument('--ticks', type=int, default=20)
+    args_parser.add_argument('--spread', type=float, default=0.2)
+    args_parser.add_argument('--volatility', type=float, default=0.002)
+    args = args_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for alert_count in args.alerts:
+            mq = generate_mq(alert_count, args.pairs, args.spread)
+            pair_names = [(pair1_name, 'USDT') for pair1_name in mq]
+
+            path_to_mq_cache = os.path.join(directory, f'mq_cache_{alert_count}.bpcs')
+            path_to_database = os.path.join(directory, f'conditions_{alert_count}.db')
+
+            memory_store = ConditionStore()
+            memory_store.load_dict(mq)
+            ConditionJournal(path_to_mq_cache).reset(memory_store)
+            SqliteConditionStore(path_to_database).load_dict(generate_mq(alert_count, args.pairs, args.spread))
+
+            start_time = perf_counter()
+            memory_store = ConditionStore()
+            memory_store.load_dict(ConditionJournal(path_to_mq_cache).recover())
+            memory_start = perf_counter() - start_time
+
+            start_time = perf_counter()
+            sqlite_store = SqliteConditionStore(path_to_database)
+            sqlite_start = perf_counter() - start_time
+
+            memory_tick, memory_triggered = run_ticks(memory_store, pair_names, args.ticks, args.volatility)
+            sqlite_tick, sqlite_triggered = run_ticks(sqlite_store, pair_names, args.ticks, args.volatility)
+
+            start_time = perf_counter()
+            for alert_id in range(1000):
+                sqlite_store.add('COIN000', 'USDT', {"user": [alert_id, 'user'], "check_value": 2.0, "condition_flag": True})
+                sqlite_store.commit()
+            sqlite_add = (perf_counter() - start_time) / 1000
+            sqlite_store.close()
+
+            print(
+                f'{alert_count:>7} alerts: cold start memory {memory_start * 1000:.1f} ms, sqlite {sqlite_start * 1000:.1f} ms; ' \
+                f'tick memory {memory_tick * 1000:.2f} ms, sqlite {sqlite_tick * 1000:.2f} ms ' \
+                f'({memory_triggered}/{sqlite_triggered} met); sqlite add with commit {sqlite_add * 1000:.3f} ms'
+            )
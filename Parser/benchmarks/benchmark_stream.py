@@ -0,0 +1,72 @@
+"""
+Runs the stream parser against the local WebSocket stand-in and measures
+the delay from an event being sent to it reaching the parser, including
+reconnects forced by the server.
+
+    $ python benchmark_stream.py --updates 500 --drop-every 100
+"""
+from binance_fixture_server import FixtureMarket
+from binance_stream_fixture_server import FixtureStream, serve_fixture_stream
+from statistics import mean, median
+from time import time
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from binance_stream_parser import BinanceStreamParser
+from parser_logger import ParserLogger
+
+
+async def benchmark_stream(args):
+    """
+    Consumes the fixture stream and reports latency and reconnect statistics.
+
+    Args:
+        args (argparse.Namespace): Benchmark arguments.
+    """
+    fixture_stream = FixtureStream(FixtureMarket(args.symbols), interval=args.interval, drop_every=args.drop_every)
+    server_task = asyncio.create_task(serve_fixture_stream(fixture_stream, port=args.port))
+    await asyncio.sleep(0.2)
+
+    parser = BinanceStreamParser(ParserLogger(), url=f'ws://127.0.0.1:{args.port}/ws', reconnect_delay=0.05)
+
+    # Keep the event time of every update to measure the delivery delay
+    event_times = {}
+    original_update_currencies = parser.update_currencies
+
+    def update_currencies(tickers):
+        for ticker in tickers:
+            event_times[ticker["s"][:-4]] = ticker["E"] / 1000
+        return original_update_currencies(tickers)
+    parser.update_currencies = update_currencies
+
+    delays = []
+    async for currencies, changed_names in parser.stream():
+        now = time()
+        delays.extend(now - event_times[currency_name] for currency_name in changed_names)
+        if len(delays) >= args.updates:
+            break
+
+    server_task.cancel()
+
+    print(
+        f'updates: {len(delays)}, currencies: {len(parser.currencies)}, ' \
+        f'connections: {fixture_stream.connections}, reconnects: {parser.reconnects}, ' \
+        f'delay mean: {mean(delays) * 1000:.2f} ms, median: {median(delays) * 1000:.2f} ms, max: {max(delays) * 1000:.2f} ms'
+    )
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--port', type=int, default=8766)
+    args_parser.add_argument('--symbols', type=int, default=100)
+    args_parser.add_argument('--interval', type=float, default=0.05)
+    args_parser.add_argument('--drop-every', type=int, default=50)
+    args_parser.add_argument('--updates', type=int, default=2000)
+    args = args_parser.parse_args()
+
+    asyncio.run(benchmark_stream(args))
@@ -0,0 +1,107 @@
+"""
+Compares the size and the encode and decode cost of messages between the bot
+and the parser in JSON and in the binary wire format: a new condition of
+'bot2parser_queue', a batch of notifications of 'parser2bot_queue', a keyframe
+and a delta of currencies of 'parser_info_queue'.
+
+    $ python benchmark_wire_format.py --symbols 600 --notifications 20
+"""
+from random import Random
+from time import perf_counter, time
+
+import argparse
+import os
+import secrets
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app'))
+
+from wire_format import decode_message, encode_message
+
+
+def generate_messages(symbol_count, notification_count, changed_percent, seed=0):
+    """
+    Generates typical messages of every queue.
+
+    Args:
+        symbol_count (int): Number of currencies.
+        notification_count (int): Number of notifications in a batch.
+        changed_percent (float): Percent of currencies changed in a delta.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict: Message names and messages.
+    """
+    random = Random(seed)
+    currencies = {f'COIN{symbol_id}': random.uniform(0.0001, 70000.0) for symbol_id in range(symbol_count)}
+    changed_names = random.sample(list(currencies), max(1, int(symbol_count * changed_percent / 100)))
+
+    condition = [
+        [random.randrange(10 ** 9), 'user_name'], 'BTC', 'USDT', 65000.5, True, {"id": secrets.token_hex(8)}
+    ]
+    notifications = [
+        {
+            "id": secrets.token_hex(8),
+            "user": [random.randrange(10 ** 9), f'user_{notification_id}'],
+            "pair1_name": 'BTC',
+            "pair2_name": 'USDT',
+            "condition_flag": random.choice([True, False]),
+            "check_value": random.uniform(60000.0, 70000.0),
+            "now_pair_value": 65000.5
+        }
+        for notification_id in range(notification_count)
+    ]
+    keyframe = {"version": 61, "is_keyframe": True, "timestamp": time(), "currencies": currencies, "removed": []}
+    delta = {
+        "version": 62,
+        "is_keyframe": False,
+        "timestamp": time(),
+        "currencies": {currency_name: currencies[currency_name] * 1.001 for currency_name in changed_names},
+        "removed": []
+    }
+    return {"condition": condition, "notifications": notifications, "keyframe": keyframe, "delta": delta}
+
+
+def measure(message, wire_format, repeat):
+    """
+    Measures the size of a message and the average time to encode and to decode it.
+
+    Args:
+        message: The message.
+        wire_format (str): "binary" or "json".
+        repeat (int): Number of repetitions.
+
+    Returns:
+        tuple: Size in bytes, encode and decode durations in seconds.
+    """
+    start_time = perf_counter()
+    for _ in range(repeat):
+        body, content_type = encode_message(message, wire_format)
+    encode_duration = (perf_counter() - start_time) / repeat
+
+    start_time = perf_counter()
+    for _ in range(repeat):
+        decoded_message = decode_message(body, content_type)
+    decode_duration = (perf_counter() - start_time) / repeat
+
+    assert decoded_message == decode_message(*encode_message(message, 'json'))
+    return len(body), encode_duration, decode_duration
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--symbols', type=int, default=600)
+    args_parser.add_argument('--notifications', type=int, default=20)
+    args_parser.add_argument('--changed', type=float, default=10.0, help='Percent of currencies changed in a delta')
+    args_parser.add_argument('--repeat', type=int, default=2000)
+    args = args_parser.parse_args()
+
+    messages = generate_messages(args.symbols, args.notifications, args.changed)
+    for message_name, message in messages.items():
+        repeat = max(10, args.repeat // (100 if message_name == 'keyframe' else 1))
+        for wire_format in ('json', 'binary'):
+            size, encode_duration, decode_duration = measure(message, wire_format, repeat)
+            print(
+                f'{message_name:>13}, {wire_format:>6}: {size:>6} bytes, ' \
+                f'encode {encode_duration * 1e6:8.1f} us, decode {decode_duration * 1e6:8.1f} us'
+            )
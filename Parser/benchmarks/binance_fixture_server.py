@@ -0,0 +1,233 @@
+"""
+A local HTTP server that stands in for Binance.
+
+It serves a markets overview page with the same markup the scrapers expect,
+a JSON ticker endpoint in the format of "/api/v3/ticker/price" (with the optional
+"symbols" parameter) and the list of symbols of "/api/v3/exchangeInfo", so every
+currency source can be run and benchmarked offline.
+
+Run it directly:
+    $ python binance_fixture_server.py --port 8765 --symbols 400
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import urlparse, parse_qs
+from random import Random
+from time import sleep
+
+import argparse
+import json
+
+KNOWN_SYMBOLS = [
+    'BTC', 'ETH', 'BNB', 'SOL', 'XRP', 'USDC', 'DOGE', 'ADA', 'TRX', 'AVAX',
+    'SHIB', 'DOT', 'LINK', 'BCH', 'NEAR', 'LTC', 'MATIC', 'UNI', 'ICP', 'DAI'
+]
+
+
+class FixtureMarket():
+    """
+    A fake market with random-walk prices quoted in USDT.
+
+    Attributes:
+        symbols (list): Names of all listed currencies.
+        prices (dict): Current price of every currency.
+        volatility (float): Relative standard deviation of a price move per tick.
+    """
+
+    def __init__(self, symbol_count=100, volatility=0.001, seed=0):
+        """
+        Initializes the FixtureMarket with generated symbols and prices.
+
+        Args:
+            symbol_count (int, optional): Number of listed currencies. Defaults to 100.
+            volatility (float, optional): Relative standard deviation of a price move per tick. Defaults to 0.001.
+            seed (int, optional): Seed of the random generator. Defaults to 0.
+        """
+        self.random = Random(seed)
+        self.volatility = volatility
+        self.lock = Lock()
+
+        self.symbols = KNOWN_SYMBOLS[:symbol_count]
+        self.symbols += [f'C{symbol_id:04d}' for symbol_id in range(len(self.symbols), symbol_count)]
+
+        self.prices = {
+            symbol: 1.0 if symbol in ['USDC', 'DAI'] else round(10 ** self.random.uniform(-3, 5), 6)
+            for symbol in self.symbols
+        }
+
+    def tick(self):
+        """
+        Moves every price by a random step and returns a copy of the prices.
+
+        Returns:
+            dict: Current prices of all currencies.
+        """
+        with self.lock:
+            for symbol in self.symbols:
+                self.prices[symbol] *= 1.0 + self.random.gauss(0.0, self.volatility)
+            return dict(self.prices)
+
+    @staticmethod
+    def get_symbols_prices(prices, symbols):
+        """
+        Takes prices of the requested ticker symbols.
+
+        Args:
+            prices (dict): Prices of currencies.
+            symbols (list or None): Ticker symbols like "BTCUSDT", None takes all prices.
+
+        Returns:
+            dict: Prices of the requested currencies.
+        """
+        if symbols is None:
+            return prices
+
+        names = {symbol[:-len('USDT')] for symbol in symbols}
+        return {name: price for name, price in prices.items() if name in names}
+
+    def render_exchange_info(self):
+        """
+        Renders the listed symbols in the format of the Binance exchange info endpoint.
+
+        Returns:
+            str: JSON object with the list of symbols.
+        """
+        return json.dumps({"symbols": [
+            {"symbol": f'{symbol}USDT', "status": 'TRADING', "baseAsset": symbol, "quoteAsset": 'USDT'}
+            for symbol in self.symbols
+        ]})
+
+    def render_tickers(self, prices):
+        """
+        Renders prices in the format of the Binance JSON ticker endpoint.
+
+        Args:
+            prices (dict): Prices of currencies.
+
+        Returns:
+            str: JSON list of tickers.
+        """
+        return json.dumps([
+            {"symbol": f'{symbol}USDT', "price": f'{price:.8f}'}
+            for symbol, price in prices.items()
+        ])
+
+    def render_page(self, prices, padding_size=200000):
+        """
+        Renders prices as a markets overview page with the Binance markup.
+
+        Args:
+            prices (dict): Prices of currencies.
+            padding_size (int, optional): Size of the page head imitating Binance scripts and styles. Defaults to 200000.
+
+        Returns:
+            str: HTML page.
+        """
+        rows = []
+        for symbol, price in prices.items():
+            rows.append(
+                '<div class="css-1ap5wc6"><div class="css-1x8dg53">' \
+                f'<div class="subtitle3 text-t-primary css-vurnku">{symbol}</div></div>' \
+                f'<div class="body2 items-center css-18yakpx">${price:,.8f}</div></div>'
+            )
+
+        return '<!DOCTYPE html><html><head><title>Markets Overview</title>' \
+            f'<script>window.__APP_DATA = "{"x" * padding_size}";</script></head>' \
+            '<body><div id="__APP"><header class="css-header"></header>' \
+            f'<div class="css-1pysja1">{"".join(rows)}</div>' \
+            '<footer class="css-footer"></footer></div></body></html>'
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler serving the fixture market.
+    """
+
+    def do_GET(self):
+        """
+        Serves the markets overview page and the JSON ticker endpoint.
+        """
+        url = urlparse(self.path)
+        market = self.server.market
+
+        if self.server.latency > 0:
+            sleep(self.server.latency)
+
+        if self.server.failing_paths.get(url.path, 0) > 0:
+            self.server.failing_paths[url.path] -= 1
+            self.send_error(503)
+        elif url.path == '/api/v3/ticker/price':
+            symbols = parse_qs(url.query).get('symbols')
+            symbols = json.loads(symbols[0]) if symbols is not None else None
+            self._send(market.render_tickers(market.get_symbols_prices(market.tick(), symbols)), 'application/json')
+        elif url.path == '/api/v3/exchangeInfo':
+            self._send(market.render_exchange_info(), 'application/json')
+        elif url.path == '/en/markets/overview':
+            self._send(market.render_page(market.tick()), 'text/html')
+        else:
+            self.send_error(404)
+
+    def _send(self, body, content_type):
+        """
+        Sends a response body.
+
+        Args:
+            body (str): Response body.
+            content_type (str): Content type of the body.
+        """
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """
+        Silences per-request logging.
+        """
+        pass
+
+
+def start_fixture_server(host='127.0.0.1', port=0, symbol_count=100, latency=0.0):
+    """
+    Starts the fixture server in a background thread.
+
+    Args:
+        host (str, optional): Host to bind. Defaults to '127.0.0.1'.
+        port (int, optional): Port to bind, 0 picks a free one. Defaults to 0.
+        symbol_count (int, optional): Number of listed currencies. Defaults to 100.
+        latency (float, optional): Artificial delay of every response in seconds. Defaults to 0.0.
+
+    Returns:
+        tuple: The server and its base URL. Requests to a path of `server.failing_paths` fail with 503 that many times.
+    """
+    server = ThreadingHTTPServer((host, port), FixtureRequestHandler)
+    server.daemon_threads = True
+    server.market = FixtureMarket(symbol_count)
+    server.latency = latency
+    server.failing_paths = {}
+
+    Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--host', default='127.0.0.1')
+    args_parser.add_argument('--port', type=int, default=8765)
+    args_parser.add_argument('--symbols', type=int, default=100)
+    args_parser.add_argument('--latency', type=float, default=0.0)
+    args = args_parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), FixtureRequestHandler)
+    server.market = FixtureMarket(args.symbols)
+    server.latency = args.latency
+    server.failing_paths = {}
+
+    print(f'Fixture server: http://{args.host}:{args.port}/en/markets/overview, http://{args.host}:{args.port}/api/v3/ticker/price')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,134 @@
+"""
+A local WebSocket server that stands in for the Binance market streams.
+
+It answers "SUBSCRIBE" requests like Binance does and pushes "!miniTicker@arr"
+batches generated by the fixture market. The connection can be dropped every
+N messages to exercise the reconnect and re-subscribe path of the stream parser.
+
+Run it directly:
+    $ python binance_stream_fixture_server.py --port 8766 --interval 0.1 --drop-every 100
+"""
+from binance_fixture_server import FixtureMarket
+from time import time
+
+import argparse
+import asyncio
+import json
+
+import websockets
+
+
+class FixtureStream():
+    """
+    Serves fixture market updates over WebSocket connections.
+
+    Attributes:
+        market (FixtureMarket): The fake market producing prices.
+        interval (float): Delay between pushed batches in seconds.
+        drop_every (int): Number of pushed batches after which the connection is closed, 0 never closes.
+        changed_ratio (float): Share of symbols included in every batch.
+        connections (int): Number of accepted connections.
+    """
+
+    def __init__(self, market, interval=0.1, drop_every=0, changed_ratio=0.2):
+        """
+        Initializes the FixtureStream.
+
+        Args:
+            market (FixtureMarket): The fake market producing prices.
+            interval (float, optional): Delay between pushed batches in seconds. Defaults to 0.1.
+            drop_every (int, optional): Number of pushed batches after which the connection is closed. Defaults to 0.
+            changed_ratio (float, optional): Share of symbols included in every batch. Defaults to 0.2.
+        """
+        self.market = market
+        self.interval = interval
+        self.drop_every = drop_every
+        self.changed_ratio = changed_ratio
+        self.connections = 0
+
+    def render_batch(self):
+        """
+        Renders a "!miniTicker@arr" batch of a random part of the market.
+
+        Returns:
+            str: JSON list of mini ticker events.
+        """
+        prices = self.market.tick()
+        event_time = int(time() * 1000)
+        symbols = self.market.random.sample(self.market.symbols, max(1, int(len(self.market.symbols) * self.changed_ratio)))
+
+        return json.dumps([
+            {"e": "24hrMiniTicker", "E": event_time, "s": f'{symbol}USDT', "c": f'{prices[symbol]:.8f}'}
+            for symbol in symbols
+        ])
+
+    async def push_batches(self, websocket):
+        """
+        Pushes batches to a subscribed connection until it is dropped or closed.
+
+        Args:
+            websocket (websockets.WebSocketServerProtocol): Subscribed connection.
+        """
+        pushed = 0
+        while self.drop_every == 0 or pushed < self.drop_every:
+            await websocket.send(self.render_batch())
+            pushed += 1
+            await asyncio.sleep(self.interval)
+
+        await websocket.close()
+
+    async def handler(self, websocket, path=None):
+        """
+        Handles a client connection: answers subscriptions and pushes batches.
+
+        Args:
+            websocket (websockets.WebSocketServerProtocol): Client connection.
+            path (str, optional): Request path. Defaults to None.
+        """
+        self.connections += 1
+        push_task = None
+        try:
+            async for raw_message in websocket:
+                request = json.loads(raw_message)
+                if request.get("method") != "SUBSCRIBE":
+                    continue
+
+                await websocket.send(json.dumps({"result": None, "id": request.get("id")}))
+                if push_task is None and '!miniTicker@arr' in request.get("params", []):
+                    push_task = asyncio.create_task(self.push_batches(websocket))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            if push_task is not None:
+                push_task.cancel()
+
+
+async def serve_fixture_stream(fixture_stream, host='127.0.0.1', port=8766):
+    """
+    Serves the fixture stream until cancelled.
+
+    Args:
+        fixture_stream (FixtureStream): The stream to serve.
+        host (str, optional): Host to bind. Defaults to '127.0.0.1'.
+        port (int, optional): Port to bind. Defaults to 8766.
+    """
+    async with websockets.serve(fixture_stream.handler, host, port):
+        await asyncio.Future()
+
+
+if __name__ == '__main__':
+    args_parser = argparse.ArgumentParser()
+    args_parser.add_argument('--host', default='127.0.0.1')
+    args_parser.add_argument('--port', type=int, default=8766)
+    args_parser.add_argument('--symbols', type=int, default=100)
+    args_parser.add_argument('--interval', type=float, default=0.1)
+    args_parser.add_argument('--drop-every', type=int, default=0)
+    args = args_parser.parse_args()
+
+    fixture_stream = FixtureStream(FixtureMarket(args.symbols), interval=args.interval, drop_every=args.drop_every)
+
+    print(f'Fixture stream: ws://{args.host}:{args.port}/ws')
+    try:
+        asyncio.run(serve_fixture_stream(fixture_stream, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,193 @@
+"""
+An in-process stand-in for a RabbitMQ connection used by the benchmarks.
+
+It implements the small part of the pika blocking API the services use,
+so message processing can be measured without a running broker.
+"""
+from collections import deque
+from time import sleep
+from types import SimpleNamespace
+
+
+class MemoryChannel():
+    """
+    A channel keeping every queue in memory.
+
+    Attributes:
+        queues (dict): Queue names and deques of (properties, body) tuples.
+        published_count (int): Number of published messages.
+        delivery_tag (int): Tag of the last delivered message.
+        consumers (dict): Queue names and callbacks of their consumers.
+        prefetch_count (int): Maximum number of unacknowledged consumed messages, 0 is unlimited.
+        unacked_tags (deque): Tags of consumed messages waiting for an acknowledgement.
+        ack_count (int): Number of basic_ack calls.
+        is_confirming (bool): True once publisher confirms are enabled.
+    """
+
+    def __init__(self):
+        """
+        Initializes the MemoryChannel.
+        """
+        self.queues = {}
+        self.published_count = 0
+        self.delivery_tag = 0
+
+        self.consumers = {}
+        self.prefetch_count = 0
+        self.unacked_tags = deque()
+        self.ack_count = 0
+        self.is_confirming = False
+
+    def queue_declare(self, queue, **kwargs):
+        """
+        Declares a queue.
+
+        Args:
+            queue (str): Queue name.
+
+        Returns:
+            SimpleNamespace: Frame with the number of messages in the queue.
+        """
+        self.queues.setdefault(queue, deque())
+        return SimpleNamespace(method=SimpleNamespace(queue=queue, message_count=len(self.queues[queue])))
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        """
+        Appends a message to a queue.
+
+        Args:
+            exchange (str): Exchange name, ignored.
+            routing_key (str): Queue name.
+            body (str|bytes): Message body.
+            properties (pika.BasicProperties, optional): Message properties. Defaults to None.
+            mandatory (bool, optional): Ignored. Defaults to False.
+        """
+        self.queues.setdefault(routing_key, deque()).append((properties, body))
+        self.published_count += 1
+
+    def confirm_delivery(self):
+        """
+        Enables publisher confirms, every message is confirmed as soon as it is appended.
+        """
+        self.is_confirming = True
+
+    def basic_get(self, queue, auto_ack=False):
+        """
+        Takes a message from a queue.
+
+        Args:
+            queue (str): Queue name.
+            auto_ack (bool, optional): Ignored. Defaults to False.
+
+        Returns:
+            tuple: Method frame, properties and body, or three None values if the queue is empty.
+        """
+        if len(self.queues.get(queue, ())) == 0:
+            return None, None, None
+
+        properties, body = self.queues[queue].popleft()
+        self.delivery_tag += 1
+        return SimpleNamespace(delivery_tag=self.delivery_tag), properties, body
+
+    def basic_qos(self, prefetch_count=0, **kwargs):
+        """
+        Limits the number of unacknowledged consumed messages.
+
+        Args:
+            prefetch_count (int, optional): The limit, 0 is unlimited. Defaults to 0.
+        """
+        self.prefetch_count = prefetch_count
+
+    def basic_consume(self, queue, on_message_callback, auto_ack=False, **kwargs):
+        """
+        Starts a consumer of a queue, messages are delivered by `deliver`.
+
+        Args:
+            queue (str): Queue name.
+            on_message_callback (callable): Called with the channel, the method frame, properties and body of every message.
+            auto_ack (bool, optional): Ignored. Defaults to False.
+
+        Returns:
+            str: Consumer tag.
+        """
+        self.queues.setdefault(queue, deque())
+        self.consumers[queue] = on_message_callback
+        return f'consumer-{queue}'
+
+    def deliver(self):
+        """
+        Delivers waiting messages to the consumers up to the prefetch limit.
+
+        Returns:
+            int: Number of delivered messages.
+        """
+        delivered_count = 0
+        for queue, on_message_callback in self.consumers.items():
+            while len(self.queues[queue]) > 0 and (self.prefetch_count == 0 or len(self.unacked_tags) < self.prefetch_count):
+                properties, body = self.queues[queue].popleft()
+                self.delivery_tag += 1
+                self.unacked_tags.append(self.delivery_tag)
+                on_message_callback(self, SimpleNamespace(delivery_tag=self.delivery_tag, routing_key=queue), properties, body)
+                delivered_count += 1
+        return delivered_count
+
+    def basic_ack(self, delivery_tag=0, multiple=False):
+        """
+        Acknowledges one consumed message or, with `multiple`, all of them up to the tag.
+
+        Args:
+            delivery_tag (int, optional): Tag of the message. Defaults to 0.
+            multiple (bool, optional): If True, all messages up to the tag are acknowledged. Defaults to False.
+        """
+        self.ack_count += 1
+        if multiple is True:
+            while len(self.unacked_tags) > 0 and self.unacked_tags[0] <= delivery_tag:
+                self.unacked_tags.popleft()
+        elif delivery_tag in self.unacked_tags:
+            self.unacked_tags.remove(delivery_tag)
+
+
+class MemoryConnection():
+    """
+    A connection with a single MemoryChannel.
+
+    Attributes:
+        memory_channel (MemoryChannel): The channel of the connection.
+        is_closed (bool): True once the connection is closed.
+    """
+
+    def __init__(self, memory_channel=None):
+        """
+        Initializes the MemoryConnection.
+
+        Args:
+            memory_channel (MemoryChannel, optional): The channel, a reopened connection keeps the queues of the old one. Defaults to a new MemoryChannel.
+        """
+        self.memory_channel = memory_channel if memory_channel is not None else MemoryChannel()
+        self.is_closed = False
+
+    def channel(self):
+        """
+        Returns the channel of the connection.
+
+        Returns:
+            MemoryChannel: The channel.
+        """
+        return self.memory_channel
+
+    def process_data_events(self, time_limit=0):
+        """
+        Delivers waiting messages to the consumers, waiting up to `time_limit` for the first one.
+
+        Args:
+            time_limit (float, optional): Time to wait if there is nothing to deliver in seconds. Defaults to 0.
+        """
+        if self.memory_channel.deliver() == 0 and time_limit > 0:
+            sleep(time_limit)
+            self.memory_channel.deliver()
+
+    def close(self):
+        """
+        Closes the connection, the queues are kept in memory.
+        """
+        self.is_closed = True
@@ -0,0 +1,80 @@
+from condition_store import ConditionStore
+from sqlite_condition_store import SqliteConditionStore
+
+import pytest
+
+
+def make_condition(check_value, condition_flag, user_id=1):
+    return {"user": [user_id, f'user_{user_id}'], "check_value": check_value, "condition_flag": condition_flag}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def condition_store(request, tmp_path):
+    if request.param == 'memory':
+        return ConditionStore()
+    return SqliteConditionStore(str(tmp_path / 'conditions.db'))
+
+
+def get_met_values(triggered_groups):
+    return sorted((message_data["check_value"], message_data["condition_flag"]) for group in triggered_groups for message_data in group)
+
+
+def test_bigger_than_is_strict_and_lower_than_is_met_at_equality(condition_store):
+    condition_store.add('BTC', 'USDT', make_condition(2.0, True))
+    condition_store.add('BTC', 'USDT', make_condition(2.0, False))
+
+    assert get_met_values(condition_store.pop_triggered('BTC', 'USDT', 2.0)) == [(2.0, False)]
+    assert get_met_values(condition_store.pop_triggered('BTC', 'USDT', 2.5)) == [(2.0, True)]
+
+
+def test_thresholds_are_cut_at_the_pair_value(condition_store):
+    for check_value in (1.0, 2.0, 3.0):
+        condition_store.add('BTC', 'USDT', make_condition(check_value, True))
+        condition_store.add('BTC', 'USDT', make_condition(check_value, False))
+
+    assert get_met_values(condition_store.pop_triggered('BTC', 'USDT', 2.5)) == [(1.0, True), (2.0, True), (3.0, False)]
+    assert condition_store.get_condition_count() == 3
+
+
+def test_inverted_conditions_share_the_canonical_bucket():
+    condition_store = ConditionStore()
+    assert condition_store.add('USDT', 'BTC', make_condition(0.5, True)) == ('BTC', 'USDT')
+    assert condition_store.add('USDT', 'BTC', make_condition(0.5, False)) == ('BTC', 'USDT')
+
+    bucket = condition_store.get_bucket('BTC', 'USDT')
+    assert len(bucket.above_keys) == 1
+    assert len(bucket.below_keys) == 1
+
+
+def test_inverted_threshold_keeps_its_strictness_at_equality(condition_store):
+    # USDT/BTC == 0.5 exactly when BTC/USDT == 2.0
+    condition_store.add('USDT', 'BTC', make_condition(0.5, True, user_id=1))
+    condition_store.add('USDT', 'BTC', make_condition(0.5, False, user_id=2))
+    condition_store.add('BTC', 'USDT', make_condition(2.0, True, user_id=3))
+    condition_store.add('BTC', 'USDT', make_condition(2.0, False, user_id=4))
+
+    triggered_groups = condition_store.pop_triggered('BTC', 'USDT', 2.0)
+
+    # "USDT/BTC <= 0.5" and "BTC/USDT <= 2.0" are met, "USDT/BTC > 0.5" and "BTC/USDT > 2.0" are not
+    assert sorted(message_data["user"][0] for group in triggered_groups for message_data in group) == [2, 4]
+    assert condition_store.get_condition_count() == 2
+
+
+def test_will_cross_at_equality_is_decided_the_same_in_both_orders(condition_store):
+    condition_store.add('USDT', 'BTC', make_condition(0.5, None, user_id=1))
+    condition_store.add('BTC', 'USDT', make_condition(2.0, None, user_id=2))
+
+    triggered_groups = condition_store.pop_triggered('BTC', 'USDT', 2.0)
+
+    assert sorted((message_data["user"][0], message_data["condition_flag"]) for group in triggered_groups for message_data in group) == [(1, False), (2, False)]
+
+
+def test_removed_conditions_are_not_met(condition_store):
+    removed_condition = make_condition(1.0, True, user_id=1)
+    condition_store.add('BTC', 'USDT', removed_condition)
+    condition_store.add('BTC', 'USDT', make_condition(1.0, True, user_id=2))
+    condition_store.add('BTC', 'USDT', make_condition(1.5, True, user_id=3))
+
+    condition_store.remove(removed_condition["id"])
+
+    assert sorted(message_data["user"][0] for group in condition_store.pop_triggered('BTC', 'USDT', 2.0) for message_data in group) == [2, 3]
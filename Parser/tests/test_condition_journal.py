@@ -0,0 +1,149 @@
+from condition_journal import ConditionJournal, get_journal_paths, migrate_legacy_cache
+from condition_snapshot import read_snapshot
+from condition_store import ConditionStore
+
+import json
+import os
+import pytest
+
+
+def make_condition(check_value, condition_flag, user_id=1):
+    return {"user": [user_id, f'user_{user_id}'], "check_value": check_value, "condition_flag": condition_flag}
+
+
+def get_conditions(mq):
+    return sorted(
+        (pair1_name, pair2_name, message_data["check_value"], message_data["condition_flag"])
+        for pair1_name in mq for pair2_name, messages in mq[pair1_name].items() for message_data in messages
+    )
+
+
+class JournaledStore():
+    def __init__(self, path_to_mq_cache):
+        self.condition_store = ConditionStore()
+        self.condition_journal = ConditionJournal(path_to_mq_cache)
+        self.condition_journal.reset(self.condition_store)
+
+    def add(self, check_value, condition_flag, user_id=1):
+        message_data = make_condition(check_value, condition_flag, user_id)
+        pair1_name, pair2_name = self.condition_store.add('BTC', 'USDT', message_data)
+        self.condition_journal.append_add(pair1_name, pair2_name, message_data)
+        return message_data
+
+    def remove(self, message_data):
+        pair1_name, pair2_name, message_data = self.condition_store.remove(message_data["id"])
+        self.condition_journal.append_remove(pair1_name, pair2_name, message_data)
+
+
+@pytest.fixture
+def path_to_mq_cache(tmp_path):
+    return str(tmp_path / 'mq_cache.bpcs')
+
+
+@pytest.fixture
+def journaled_store(path_to_mq_cache):
+    journaled_store = JournaledStore(path_to_mq_cache)
+    yield journaled_store
+    if journaled_store.condition_journal.persister is not None:
+        journaled_store.condition_journal.close(journaled_store.condition_store)
+
+
+def recover(path_to_mq_cache):
+    return get_conditions(ConditionJournal(path_to_mq_cache).recover())
+
+
+def test_journal_is_replayed_over_the_snapshot(journaled_store, path_to_mq_cache):
+    journaled_store.add(1.0, True)
+    removed = journaled_store.add(2.0, False)
+    journaled_store.remove(removed)
+
+    resolved = journaled_store.add(3.0, None)
+    resolved["condition_flag"] = True
+    journaled_store.condition_journal.append_resolve('BTC', 'USDT', resolved)
+    journaled_store.condition_journal.flush()
+
+    assert recover(path_to_mq_cache) == [('BTC', 'USDT', 1.0, True), ('BTC', 'USDT', 3.0, True)]
+
+
+def test_cut_last_line_of_the_journal_is_ignored(journaled_store, path_to_mq_cache):
+    journaled_store.add(1.0, True)
+    journaled_store.condition_journal.flush()
+
+    with open(get_journal_paths(path_to_mq_cache)[0], 'a', encoding='utf-8') as journal_fp:
+        journal_fp.write('["add", "00000000')
+
+    assert recover(path_to_mq_cache) == [('BTC', 'USDT', 1.0, True)]
+
+
+def test_compaction_keeps_changes_made_while_it_runs(journaled_store, path_to_mq_cache):
+    first = journaled_store.add(1.0, True)
+    journaled_store.add(2.0, True)
+
+    journaled_store.condition_journal.compact()
+    journaled_store.remove(first)
+    journaled_store.add(3.0, False)
+    journaled_store.condition_journal.wait_compaction()
+    journaled_store.condition_journal.flush()
+
+    journal_path, old_journal_path = get_journal_paths(path_to_mq_cache)
+    assert os.path.exists(old_journal_path) is False
+    assert get_conditions(read_snapshot(path_to_mq_cache)) == [('BTC', 'USDT', 1.0, True), ('BTC', 'USDT', 2.0, True)]
+    assert recover(path_to_mq_cache) == [('BTC', 'USDT', 2.0, True), ('BTC', 'USDT', 3.0, False)]
+
+
+def test_recovery_after_a_crash_during_compaction(journaled_store, path_to_mq_cache):
+    journaled_store.add(1.0, True)
+    with journaled_store.condition_journal.lock:
+        # The journal is set aside, but the snapshot isn`t written
+        journaled_store.condition_journal._rotate()
+    journaled_store.add(2.0, False)
+    journaled_store.condition_journal.flush()
+
+    assert recover(path_to_mq_cache) == [('BTC', 'USDT', 1.0, True), ('BTC', 'USDT', 2.0, False)]
+
+
+def test_replaying_a_journal_included_in_the_snapshot_changes_nothing(journaled_store, path_to_mq_cache):
+    journaled_store.add(1.0, True)
+    removed = journaled_store.add(2.0, False)
+    journaled_store.remove(removed)
+    journaled_store.condition_journal.flush()
+
+    journal_path, _ = get_journal_paths(path_to_mq_cache)
+    with open(journal_path, 'r', encoding='utf-8') as journal_fp:
+        journal = journal_fp.read()
+    journaled_store.condition_journal.compact(is_background=False)
+    with open(journal_path, 'a', encoding='utf-8') as journal_fp:
+        journal_fp.write(journal)
+
+    assert recover(path_to_mq_cache) == [('BTC', 'USDT', 1.0, True)]
+
+
+def test_close_writes_the_store_and_removes_the_journals(journaled_store, path_to_mq_cache):
+    journaled_store.add(1.0, True)
+    journaled_store.condition_journal.close(journaled_store.condition_store)
+
+    assert get_conditions(read_snapshot(path_to_mq_cache)) == [('BTC', 'USDT', 1.0, True)]
+    assert os.path.exists(get_journal_paths(path_to_mq_cache)[1]) is False
+
+
+def test_legacy_json_cache_is_migrated(tmp_path):
+    legacy_path = tmp_path / 'mq_cache.json'
+    legacy_path.write_text(json.dumps({'BTC': {'USDT': [make_condition(1.0, True)]}}, indent=4), encoding='utf-8')
+
+    path_to_mq_cache = migrate_legacy_cache(str(legacy_path))
+
+    assert path_to_mq_cache == str(tmp_path / 'mq_cache.bpcs')
+    assert os.path.exists(f'{legacy_path}.migrated') is True
+    assert recover(path_to_mq_cache) == [('BTC', 'USDT', 1.0, True)]
+    # A migrated file isn`t migrated again
+    assert migrate_legacy_cache(str(legacy_path)) == path_to_mq_cache
+
+
+def test_shard_caches_are_migrated_next_to_the_cache(tmp_path):
+    for shard_id in range(2):
+        (tmp_path / f'mq_cache.shard{shard_id}of2.json').write_text(json.dumps({'BTC': {'USDT': [make_condition(float(shard_id), True)]}}), encoding='utf-8')
+
+    migrate_legacy_cache(str(tmp_path / 'mq_cache.bpcs'))
+
+    for shard_id in range(2):
+        assert recover(str(tmp_path / f'mq_cache.shard{shard_id}of2.bpcs')) == [('BTC', 'USDT', float(shard_id), True)]
@@ -0,0 +1,69 @@
+from condition_snapshot import HEADER_STRUCT, SNAPSHOT_MAGIC, decode_snapshot, encode_snapshot, read_legacy_cache, read_snapshot
+
+import json
+import pytest
+
+
+def make_mq():
+    return {
+        'BTC': {
+            'USDT': [
+                {"user": [1, 'user_1'], "check_value": 63000.5, "condition_flag": True, "id": '00000000000000a1'},
+                {"user": [2, 'user_2'], "check_value": 61000.0, "condition_flag": False, "id": 'ffffffffffffffff'},
+                {"user": [1, 'user_1'], "check_value": 62000.0, "condition_flag": None, "id": '0123456789abcdef'}
+            ]
+        },
+        'ETH': {
+            'BTC': [{"user": [3, 'user_3'], "check_value": 2.5, "condition_flag": True, "kind": 'percent_move', "window": 900, "id": '1111111111111111'}],
+            'USDT': [{"user": [2, 'user_2'], "check_value": 3000.0, "condition_flag": False}]
+        }
+    }
+
+
+def test_snapshot_round_trip_keeps_every_condition():
+    mq = make_mq()
+
+    assert decode_snapshot(encode_snapshot(mq)) == mq
+
+
+def test_empty_snapshot_round_trip():
+    assert decode_snapshot(encode_snapshot({})) == {}
+
+
+def test_snapshot_file_is_read_through_a_memory_map(tmp_path):
+    path = tmp_path / 'mq_cache.bpcs'
+    path.write_bytes(encode_snapshot(make_mq()))
+
+    assert read_snapshot(str(path)) == make_mq()
+
+
+def test_snapshot_with_another_magic_is_rejected():
+    snapshot = bytearray(encode_snapshot(make_mq()))
+    snapshot[:len(SNAPSHOT_MAGIC)] = b'JSON'
+
+    with pytest.raises(ValueError):
+        decode_snapshot(bytes(snapshot))
+
+
+def test_snapshot_of_an_unsupported_version_is_rejected():
+    snapshot = bytearray(encode_snapshot(make_mq()))
+    _, _, reserved, pair_count, condition_count, tables_length = HEADER_STRUCT.unpack_from(snapshot)
+    HEADER_STRUCT.pack_into(snapshot, 0, SNAPSHOT_MAGIC, 99, reserved, pair_count, condition_count, tables_length)
+
+    with pytest.raises(ValueError):
+        decode_snapshot(bytes(snapshot))
+
+
+def test_truncated_snapshot_is_rejected():
+    with pytest.raises(ValueError):
+        decode_snapshot(encode_snapshot(make_mq())[:HEADER_STRUCT.size - 1])
+
+
+def test_legacy_cache_is_read_as_json_or_as_a_snapshot(tmp_path):
+    json_path = tmp_path / 'json_cache.json'
+    json_path.write_text(json.dumps(make_mq(), indent=4), encoding='utf-8')
+    snapshot_path = tmp_path / 'snapshot_cache.json'
+    snapshot_path.write_bytes(encode_snapshot(make_mq()))
+
+    assert read_legacy_cache(str(json_path)) == make_mq()
+    assert read_legacy_cache(str(snapshot_path)) == make_mq()
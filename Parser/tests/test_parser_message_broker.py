@@ -0,0 +1,117 @@
+from memory_broker import MemoryConnection
+from parser_logger import ParserLogger
+from parser_message_broker import ParserMessageBroker
+from wire_format import decode_message, encode_message
+
+import logging
+import pika
+import pytest
+
+
+@pytest.fixture(scope='module')
+def parser_docker_logger():
+    parser_docker_logger = ParserLogger(name='TESTS')
+    parser_docker_logger.logger.setLevel(logging.CRITICAL)
+    return parser_docker_logger
+
+
+@pytest.fixture
+def path_to_mq_cache(tmp_path):
+    return str(tmp_path / 'mq_cache.bpcs')
+
+
+@pytest.fixture
+def message_broker(parser_docker_logger, path_to_mq_cache):
+    message_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=path_to_mq_cache, connection=MemoryConnection())
+    yield message_broker
+    if message_broker.condition_journal.persister is not None:
+        message_broker.close_connection()
+
+
+def make_message(user_id, check_value, condition_flag=True, condition_id=None):
+    message = [[user_id, f'user_{user_id}'], 'BTC', 'USDT', check_value, condition_flag]
+    if condition_id is not None:
+        message.append({"id": condition_id})
+    return message
+
+
+def publish(message_broker, queue_name, message):
+    body, content_type = encode_message(message, 'json')
+    message_broker.channel.basic_publish('', queue_name, body, properties=pika.BasicProperties(content_type=content_type))
+
+
+def get_published(message_broker, queue_name):
+    return [decode_message(body, properties.content_type) for properties, body in message_broker.channel.queues[queue_name]]
+
+
+def test_intake_takes_delivered_messages_at_once_and_skips_malformed_ones(message_broker):
+    for user_id in range(3):
+        publish(message_broker, 'bot2parser_queue', make_message(user_id, 100.0 + user_id))
+    message_broker.channel.basic_publish('', 'bot2parser_queue', b'{"broken', properties=pika.BasicProperties(content_type='application/json'))
+
+    messages = message_broker.get_messages_from_bot2parser_queue()
+    assert [message[3] for message in messages] == [100.0, 101.0, 102.0]
+    assert len(message_broker.channel.unacked_tags) == 4
+
+    message_broker.ack_bot2parser_queue()
+    assert len(message_broker.channel.unacked_tags) == 0
+
+
+def test_redelivered_condition_is_skipped_by_its_id(message_broker):
+    assert message_broker.add_message(make_message(1, 100.0, condition_id='0123456789abcdef')) is True
+    assert message_broker.add_message(make_message(1, 100.0, condition_id='0123456789abcdef')) is False
+    assert message_broker.mq.get_condition_count() == 1
+
+
+def test_conditions_survive_a_restart(parser_docker_logger, message_broker, path_to_mq_cache):
+    message_broker.add_message(make_message(1, 100.0))
+    message_broker.add_message(make_message(2, 200.0, condition_flag=False))
+    message_broker.cancel_condition(message_broker.mq.to_dict()['BTC']['USDT'][0]["id"])
+    message_broker.sync_mq_cache(is_forced=True)
+    message_broker.condition_journal.flush()
+
+    restarted_broker = ParserMessageBroker(parser_docker_logger, path_to_mq_cache=path_to_mq_cache, connection=MemoryConnection())
+    try:
+        assert [message_data["check_value"] for message_data in restarted_broker.mq.to_dict()['BTC']['USDT']] == [200.0]
+    finally:
+        restarted_broker.close_connection()
+
+
+def test_condition_is_removed_once_its_notification_is_confirmed(message_broker):
+    message_broker.add_message(make_message(1, 100.0))
+    triggered_groups = message_broker.mq.pop_triggered('BTC', 'USDT', 150.0)
+    message_broker.add_notifications('BTC', 'USDT', [message_data for group in triggered_groups for message_data in group], 150.0)
+
+    assert message_broker.send_message2parser2bot_queue() == 1
+    notifications = get_published(message_broker, 'parser2bot_queue')
+    assert [(notification["check_value"], notification["now_pair_value"]) for notification in notifications[0]] == [(100.0, 150.0)]
+    assert len(message_broker.pending_notifications) == 0
+
+
+def test_unconfirmed_notification_is_published_again(message_broker):
+    class NackingChannel():
+        def basic_publish(self, **kwargs):
+            raise pika.exceptions.NackError([])
+
+    message_broker.add_message(make_message(1, 100.0))
+    triggered_groups = message_broker.mq.pop_triggered('BTC', 'USDT', 150.0)
+    message_broker.add_notifications('BTC', 'USDT', [message_data for group in triggered_groups for message_data in group], 150.0)
+
+    message_broker.notification_channel = NackingChannel()
+    assert message_broker.send_message2parser2bot_queue() == 0
+    # The condition is kept in the store until the broker confirms the notification
+    assert message_broker.mq.get_condition_count() == 1
+
+    message_broker.notification_channel = None
+    assert message_broker.send_message2parser2bot_queue() == 1
+    assert message_broker.mq.get_condition_count() == 0
+
+
+def test_keyframe_requests_are_taken_at_once(message_broker):
+    assert message_broker.take_keyframe_requests() is False
+
+    for _ in range(3):
+        publish(message_broker, 'bot2parser_keyframe_queue', {"version": 5})
+
+    assert message_broker.take_keyframe_requests() is True
+    assert message_broker.take_keyframe_requests() is False
@@ -0,0 +1,48 @@
+from condition_journal import ConditionJournal
+from condition_snapshot import encode_snapshot
+from sharded_condition_evaluator import get_shard_cache_path, get_shard_id, reshard_mq_cache
+
+import os
+
+
+def make_mq():
+    return {
+        f'COIN{coin_id}': {'USDT': [{"user": [coin_id, f'user_{coin_id}'], "check_value": float(coin_id), "condition_flag": True}]}
+        for coin_id in range(20)
+    }
+
+
+def get_check_values(mq):
+    return sorted(message_data["check_value"] for pairs in mq.values() for messages in pairs.values() for message_data in messages)
+
+
+def test_both_orders_of_a_pair_belong_to_one_shard():
+    for coin_id in range(50):
+        assert get_shard_id(f'COIN{coin_id}', 'USDT', 4) == get_shard_id('USDT', f'COIN{coin_id}', 4)
+
+
+def test_single_shard_uses_the_unsharded_cache():
+    assert get_shard_cache_path('mq_cache.bpcs', 0, 1) == 'mq_cache.bpcs'
+    assert get_shard_cache_path('mq_cache.bpcs', 1, 3) == 'mq_cache.shard1of3.bpcs'
+    assert get_shard_cache_path(None, 1, 3) is None
+
+
+def test_reshard_moves_every_condition_to_its_shard(tmp_path):
+    path_to_mq_cache = str(tmp_path / 'mq_cache.bpcs')
+    with open(path_to_mq_cache, 'wb') as cache_fp:
+        cache_fp.write(encode_snapshot(make_mq()))
+
+    reshard_mq_cache(path_to_mq_cache, 3)
+
+    assert os.path.exists(path_to_mq_cache) is False
+    check_values = []
+    for shard_id in range(3):
+        shard_mq = ConditionJournal(get_shard_cache_path(path_to_mq_cache, shard_id, 3)).recover()
+        assert all(get_shard_id(pair1_name, 'USDT', 3) == shard_id for pair1_name in shard_mq)
+        check_values += get_check_values(shard_mq)
+    assert sorted(check_values) == get_check_values(make_mq())
+
+    reshard_mq_cache(path_to_mq_cache, 1)
+
+    assert get_check_values(ConditionJournal(path_to_mq_cache).recover()) == get_check_values(make_mq())
+    assert sorted(os.listdir(tmp_path)) == ['mq_cache.bpcs']
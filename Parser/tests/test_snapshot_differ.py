@@ -0,0 +1,51 @@
+from snapshot_differ import SnapshotDiffer
+
+
+def test_identical_and_empty_snapshots_are_skipped():
+    snapshot_differ = SnapshotDiffer()
+    snapshot_differ.diff({'BTC': 63000.0})
+
+    assert snapshot_differ.diff({'BTC': 63000.0}) == (None, set())
+    assert snapshot_differ.diff({}) == (None, set())
+    assert snapshot_differ.version == 1
+
+
+def test_delta_holds_changed_and_removed_currencies():
+    snapshot_differ = SnapshotDiffer()
+    snapshot_differ.diff({'BTC': 63000.0, 'ETH': 3000.0, 'BNB': 500.0})
+
+    snapshot_delta, changed_names = snapshot_differ.diff({'BTC': 64000.0, 'ETH': 3000.0})
+
+    assert snapshot_delta["is_keyframe"] is False
+    assert snapshot_delta["currencies"] == {'BTC': 64000.0}
+    assert snapshot_delta["removed"] == ['BNB']
+    assert changed_names == {'BTC', 'BNB'}
+
+
+def test_every_delta_is_based_on_the_previous_version():
+    snapshot_differ = SnapshotDiffer()
+    snapshot_deltas = [snapshot_differ.diff({'BTC': float(price)})[0] for price in range(5)]
+
+    assert [snapshot_delta["version"] for snapshot_delta in snapshot_deltas] == [1, 2, 3, 4, 5]
+    assert [snapshot_delta["base_version"] for snapshot_delta in snapshot_deltas] == [0, 1, 2, 3, 4]
+
+
+def test_keyframes_are_sent_every_interval():
+    snapshot_differ = SnapshotDiffer(keyframe_interval=3)
+    snapshot_deltas = [snapshot_differ.diff({'BTC': float(price), 'ETH': 3000.0})[0] for price in range(7)]
+
+    assert [snapshot_delta["is_keyframe"] for snapshot_delta in snapshot_deltas] == [True, False, False, True, False, False, True]
+    assert snapshot_deltas[3]["currencies"] == {'BTC': 3.0, 'ETH': 3000.0}
+
+
+def test_requested_keyframe_is_sent_for_an_identical_snapshot():
+    snapshot_differ = SnapshotDiffer()
+    snapshot_differ.diff({'BTC': 63000.0})
+    snapshot_differ.diff({'BTC': 64000.0})
+
+    snapshot_differ.request_keyframe()
+    snapshot_delta, _ = snapshot_differ.diff({'BTC': 64000.0})
+
+    assert snapshot_delta["is_keyframe"] is True
+    assert snapshot_delta["currencies"] == {'BTC': 64000.0}
+    assert snapshot_differ.diff({'BTC': 64000.0}) == (None, set())
@@ -0,0 +1,41 @@
+from tick_scheduler import TickScheduler
+
+
+def test_period_backs_off_while_idle_up_to_the_maximum():
+    tick_scheduler = TickScheduler(period=1.0, max_period=3.0, backoff_factor=2.0)
+
+    assert [tick_scheduler.update_period(True) for _ in range(3)] == [2.0, 3.0, 3.0]
+    assert tick_scheduler.update_period(False) == 1.0
+
+
+def test_period_drops_to_the_minimum_near_a_threshold():
+    tick_scheduler = TickScheduler(period=1.0, min_period=0.25, near_distance=0.01)
+
+    assert tick_scheduler.update_period(True, nearest_distance=0.005) == 0.25
+    assert tick_scheduler.update_period(False, nearest_distance=0.5) == 1.0
+
+
+def test_minimum_period_is_never_longer_than_the_period():
+    assert TickScheduler(period=0.1, min_period=0.25).min_period == 0.1
+
+
+def test_time_of_the_tick_is_subtracted_from_the_sleep():
+    tick_scheduler = TickScheduler(period=10.0)
+    tick_scheduler.start_tick()
+
+    assert 9.0 < tick_scheduler.get_sleep_time() <= 10.0
+
+
+def test_new_work_ends_a_backed_off_wait():
+    tick_scheduler = TickScheduler(period=0.01, max_period=60.0, backoff_factor=1000.0)
+    tick_scheduler.start_tick()
+    wait_times = []
+
+    def wait_function(timeout):
+        wait_times.append(timeout)
+        return True
+
+    tick_scheduler.wait(True, wait_function=wait_function)
+
+    assert len(wait_times) == 1
+    assert tick_scheduler.current_period == 0.01
@@ -0,0 +1,64 @@
+from window_conditions import MA_CROSS_KIND, PERCENT_MOVE_KIND, RollingWindow, WindowConditionGroup
+
+
+def make_condition(check_value, condition_flag, kind, window, user_id=1):
+    return {"user": [user_id, f'user_{user_id}'], "check_value": check_value, "condition_flag": condition_flag, "kind": kind, "window": window}
+
+
+def test_rolling_window_evicts_old_values():
+    rolling_window = RollingWindow(10)
+    for timestamp, value in ((0, 5.0), (4, 1.0), (8, 3.0), (12, 2.0)):
+        rolling_window.append(timestamp, value)
+
+    assert len(rolling_window) == 3
+    assert rolling_window.get_min() == 1.0
+    assert rolling_window.get_max() == 3.0
+    assert rolling_window.get_mean() == 2.0
+
+    rolling_window.append(15, 4.0)
+    assert rolling_window.get_min() == 2.0
+    assert rolling_window.get_max() == 4.0
+
+
+def test_percent_move_is_measured_from_the_window_extremes():
+    group = WindowConditionGroup(PERCENT_MOVE_KIND, 60)
+    up = make_condition(5.0, True, PERCENT_MOVE_KIND, 60, user_id=1)
+    down = make_condition(5.0, False, PERCENT_MOVE_KIND, 60, user_id=2)
+    either = make_condition(8.0, None, PERCENT_MOVE_KIND, 60, user_id=3)
+    for message_data in (up, down, either):
+        group.add(message_data)
+
+    assert group.pop_triggered(100.0, 0) == []
+    assert group.pop_triggered(104.0, 10) == []
+    assert group.pop_triggered(105.0, 20) == [up]
+    assert group.pop_triggered(99.0, 30) == [down]
+    assert group.pop_triggered(91.0, 40) == [either]
+    assert len(group) == 0
+
+
+def test_ma_cross_waits_for_a_full_window_and_a_cross():
+    group = WindowConditionGroup(MA_CROSS_KIND, 20)
+    upwards = make_condition(0.0, True, MA_CROSS_KIND, 20, user_id=1)
+    any_direction = make_condition(0.0, None, MA_CROSS_KIND, 20, user_id=2)
+    group.add(upwards)
+    group.add(any_direction)
+
+    # The window isn`t full yet, a cross isn`t detected
+    assert group.pop_triggered(10.0, 0) == []
+    assert group.pop_triggered(20.0, 10) == []
+    assert group.pop_triggered(5.0, 20) == []
+    assert group.pop_triggered(4.0, 30) == []
+    assert group.pop_triggered(30.0, 40) == [upwards, any_direction]
+    assert len(group) == 0
+
+
+def test_dropped_conditions_are_not_met():
+    group = WindowConditionGroup(PERCENT_MOVE_KIND, 60)
+    kept = make_condition(1.0, True, PERCENT_MOVE_KIND, 60, user_id=1)
+    dropped = make_condition(2.0, True, PERCENT_MOVE_KIND, 60, user_id=2)
+    group.add(kept)
+    group.add(dropped)
+    group.drop_messages({id(dropped)})
+
+    group.pop_triggered(100.0, 0)
+    assert group.pop_triggered(110.0, 1) == [kept]
@@ -0,0 +1,66 @@
+from wire_format import BINARY_CONTENT_TYPE, JSON_CONTENT_TYPE, WireFormatError, decode_message, encode_message
+
+import json
+import pytest
+
+
+def make_snapshot_delta():
+    return {
+        "version": 7,
+        "base_version": 6,
+        "is_keyframe": False,
+        "timestamp": 1700000000.25,
+        "currencies": {'BTC': 63000.5, 'ETH': 3000.0, 'TINY': 1e-9},
+        "removed": ['BNB']
+    }
+
+
+@pytest.mark.parametrize('message', [
+    make_snapshot_delta(),
+    [[1, 'user_1'], 'BTC', 'USDT', 63000.0, None, {"kind": 'percent_move', "window": 900, "id": '0123456789abcdef'}],
+    {"nested": [{"a": 1, "b": [True, False, None]}, -2 ** 40, 'text'], "empty": {}},
+    []
+])
+def test_binary_round_trip(message):
+    body, content_type = encode_message(message, 'binary')
+
+    assert content_type.startswith(BINARY_CONTENT_TYPE)
+    assert decode_message(body, content_type) == message
+
+
+def test_json_round_trip():
+    body, content_type = encode_message(make_snapshot_delta(), 'json')
+
+    assert content_type == JSON_CONTENT_TYPE
+    assert decode_message(body, content_type) == make_snapshot_delta()
+
+
+def test_messages_without_a_content_type_are_json():
+    assert decode_message(json.dumps(make_snapshot_delta()).encode('utf-8')) == make_snapshot_delta()
+
+
+def test_binary_message_is_smaller_than_json():
+    snapshot_delta = dict(make_snapshot_delta(), currencies={f'COIN{coin_id}': coin_id * 1.2345678901 + 0.1 for coin_id in range(500)})
+
+    assert len(encode_message(snapshot_delta, 'binary')[0]) < len(encode_message(snapshot_delta, 'json')[0])
+
+
+def test_unsupported_binary_version_is_rejected():
+    body, content_type = encode_message(make_snapshot_delta(), 'binary')
+    body = body[:2] + bytes([99]) + body[3:]
+
+    with pytest.raises(WireFormatError):
+        decode_message(body, content_type)
+
+
+@pytest.mark.parametrize('cut', [1, 5, 20])
+def test_truncated_binary_message_is_rejected(cut):
+    body, content_type = encode_message(make_snapshot_delta(), 'binary')
+
+    with pytest.raises(ValueError):
+        decode_message(body[:-cut], content_type)
+
+
+def test_malformed_json_is_a_value_error():
+    with pytest.raises(ValueError):
+        decode_message(b'{"version": ', JSON_CONTENT_TYPE)
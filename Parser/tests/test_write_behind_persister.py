@@ -0,0 +1,72 @@
+from write_behind_persister import WriteBehindPersister, write_atomically
+
+import os
+import threading
+
+
+class RecordingFlush():
+    def __init__(self, failure_count=0):
+        self.failure_count = failure_count
+        self.call_count = 0
+        self.flushed = threading.Event()
+
+    def __call__(self):
+        self.call_count += 1
+        if self.failure_count > 0:
+            self.failure_count -= 1
+            raise OSError('disk is full')
+        self.flushed.set()
+        return 10
+
+
+def test_burst_of_changes_costs_one_flush():
+    flush_function = RecordingFlush()
+    persister = WriteBehindPersister(flush_function, flush_interval=60.0)
+    for _ in range(100):
+        persister.mark_dirty()
+
+    persister.flush()
+    persister.flush()
+
+    assert flush_function.call_count == 1
+    assert persister.flushed_mark_count == 100
+    assert persister.bytes_written == 10
+
+
+def test_requested_flush_runs_in_the_thread_without_waiting_for_the_interval():
+    flush_function = RecordingFlush()
+    persister = WriteBehindPersister(flush_function, flush_interval=60.0)
+    persister.start()
+    try:
+        persister.mark_dirty()
+        persister.request_flush()
+
+        assert flush_function.flushed.wait(5.0) is True
+    finally:
+        persister.close()
+    assert persister.flush_count == 1
+
+
+def test_failed_flush_keeps_its_changes_marked():
+    flush_function = RecordingFlush(failure_count=1)
+    persister = WriteBehindPersister(flush_function, flush_interval=60.0)
+    for _ in range(3):
+        persister.mark_dirty()
+
+    persister.flush()
+    assert persister.failed_flush_count == 1
+    assert persister.is_dirty is True
+
+    persister.flush()
+    assert persister.flushed_mark_count == 3
+    assert 'disk is full' in persister.get_stats_string()
+
+
+def test_write_atomically_replaces_the_file(tmp_path):
+    path = str(tmp_path / 'cache.bin')
+    write_atomically(path, 'old')
+
+    assert write_atomically(path, b'new content') == 11
+    with open(path, 'rb') as cache_fp:
+        assert cache_fp.read() == b'new content'
+    assert os.listdir(tmp_path) == ['cache.bin']
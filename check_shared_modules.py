@@ -0,0 +1,42 @@
+"""
+Checks that the modules shared by the parser and the bot are the same in both services.
+
+Every service is built from its own directory, so a shared module is kept as a copy
+in both app directories. Run the check after changing one of them:
+    $ python check_shared_modules.py
+"""
+import filecmp
+import os
+import sys
+
+# Modules both services import, they must not drift apart
+SHARED_MODULES = ('currency_snapshot.py', 'wire_format.py')
+
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+APP_DIRECTORIES = (os.path.join(ROOT_DIRECTORY, 'Parser', 'app'), os.path.join(ROOT_DIRECTORY, 'Bot', 'app'))
+
+
+def get_different_modules():
+    """
+    Compares the copies of the shared modules.
+
+    Returns:
+        list: Names of the modules whose copies differ or are missing.
+    """
+    parser_directory, bot_directory = APP_DIRECTORIES
+    different_modules = []
+    for module_name in SHARED_MODULES:
+        parser_path = os.path.join(parser_directory, module_name)
+        bot_path = os.path.join(bot_directory, module_name)
+        if os.path.exists(parser_path) is False or os.path.exists(bot_path) is False \
+                or filecmp.cmp(parser_path, bot_path, shallow=False) is False:
+            different_modules.append(module_name)
+    return different_modules
+
+
+if __name__ == '__main__':
+    different_modules = get_different_modules()
+    if len(different_modules) > 0:
+        print(f'Copies of the shared modules differ in Parser/app and Bot/app: {", ".join(different_modules)}')
+        sys.exit(1)
+    print(f'Shared modules are the same: {", ".join(SHARED_MODULES)}')